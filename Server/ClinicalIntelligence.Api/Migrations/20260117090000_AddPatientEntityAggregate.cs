@@ -0,0 +1,151 @@
+using System;
+using Microsoft.EntityFrameworkCore.Migrations;
+using Npgsql.EntityFrameworkCore.PostgreSQL.Metadata;
+
+#nullable disable
+
+namespace ClinicalIntelligence.Api.Migrations
+{
+    /// <summary>
+    /// Per-patient entity aggregate maintained by the AI worker (worker/patient_aggregate.py).
+    ///
+    /// patient_entity_values holds one row per distinct value of a merged entity with its citation
+    /// count; patient_entity_citations holds one row per citing document. The worker replaces a
+    /// document's citations when its extraction result arrives, and worker/conflict_detector.py reads
+    /// the other documents' values per entity key. The tables are written with SQL only and have no
+    /// entity types in ApplicationDbContext.
+    ///
+    /// Deleting a document, or setting its IsDeleted flag, retracts its citations in a trigger and
+    /// decrements the value counts, so the aggregate never keeps values of a deleted document. A
+    /// restored document is added back when the worker applies it again or rebuilds the patient.
+    /// </summary>
+    public partial class AddPatientEntityAggregate : Migration
+    {
+        /// <inheritdoc />
+        protected override void Up(MigrationBuilder migrationBuilder)
+        {
+            migrationBuilder.CreateTable(
+                name: "patient_entity_values",
+                columns: table => new
+                {
+                    PatientId = table.Column<Guid>(type: "uuid", nullable: false),
+                    EntityKey = table.Column<string>(type: "text", nullable: false),
+                    ValueKey = table.Column<string>(type: "text", nullable: false),
+                    Category = table.Column<string>(type: "text", nullable: false),
+                    Name = table.Column<string>(type: "text", nullable: false),
+                    Value = table.Column<string>(type: "text", nullable: false),
+                    Citations = table.Column<int>(type: "integer", nullable: false),
+                    UpdatedAt = table.Column<DateTime>(type: "timestamp with time zone", nullable: false, defaultValueSql: "CURRENT_TIMESTAMP")
+                },
+                constraints: table =>
+                {
+                    table.PrimaryKey("PK_patient_entity_values", x => new { x.PatientId, x.EntityKey, x.ValueKey });
+                    table.ForeignKey(
+                        name: "FK_patient_entity_values_erd_patients_PatientId",
+                        column: x => x.PatientId,
+                        principalTable: "erd_patients",
+                        principalColumn: "Id",
+                        onDelete: ReferentialAction.Cascade);
+                });
+
+            migrationBuilder.CreateTable(
+                name: "patient_entity_citations",
+                columns: table => new
+                {
+                    Id = table.Column<long>(type: "bigint", nullable: false)
+                        .Annotation("Npgsql:ValueGenerationStrategy", NpgsqlValueGenerationStrategy.IdentityByDefaultColumn),
+                    PatientId = table.Column<Guid>(type: "uuid", nullable: false),
+                    EntityKey = table.Column<string>(type: "text", nullable: false),
+                    ValueKey = table.Column<string>(type: "text", nullable: false),
+                    DocumentId = table.Column<Guid>(type: "uuid", nullable: false),
+                    Page = table.Column<int>(type: "integer", nullable: true),
+                    Section = table.Column<string>(type: "text", nullable: true),
+                    SourceText = table.Column<string>(type: "text", nullable: true)
+                },
+                constraints: table =>
+                {
+                    table.PrimaryKey("PK_patient_entity_citations", x => x.Id);
+                    table.ForeignKey(
+                        name: "FK_patient_entity_citations_documents_DocumentId",
+                        column: x => x.DocumentId,
+                        principalTable: "documents",
+                        principalColumn: "Id",
+                        onDelete: ReferentialAction.Cascade);
+                    table.ForeignKey(
+                        name: "FK_patient_entity_citations_erd_patients_PatientId",
+                        column: x => x.PatientId,
+                        principalTable: "erd_patients",
+                        principalColumn: "Id",
+                        onDelete: ReferentialAction.Cascade);
+                });
+
+            // Retracting a document's citations.
+            migrationBuilder.CreateIndex(
+                name: "ix_patient_entity_citations_patient_document",
+                table: "patient_entity_citations",
+                columns: new[] { "PatientId", "DocumentId" });
+
+            // Reading a patient's citations and the conflict lookup by entity key.
+            migrationBuilder.CreateIndex(
+                name: "ix_patient_entity_citations_patient_value",
+                table: "patient_entity_citations",
+                columns: new[] { "PatientId", "EntityKey", "ValueKey" });
+
+            // Cascade deletes from documents.
+            migrationBuilder.CreateIndex(
+                name: "ix_patient_entity_citations_document_id",
+                table: "patient_entity_citations",
+                column: "DocumentId");
+
+            // Runs before the cascade from documents, which then finds no citations left. Takes the
+            // same per-patient advisory lock as the worker (patient_aggregate._LOCK_PATIENT_SQL).
+            migrationBuilder.Sql(@"
+CREATE FUNCTION retract_patient_entity_citations() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtextextended(OLD.""PatientId""::text, 0));
+    WITH retracted AS (
+        DELETE FROM patient_entity_citations
+        WHERE ""PatientId"" = OLD.""PatientId"" AND ""DocumentId"" = OLD.""Id""
+        RETURNING ""EntityKey"", ""ValueKey""
+    ), counts AS (
+        SELECT ""EntityKey"", ""ValueKey"", count(*) AS n FROM retracted GROUP BY ""EntityKey"", ""ValueKey""
+    )
+    UPDATE patient_entity_values v
+    SET ""Citations"" = v.""Citations"" - counts.n, ""UpdatedAt"" = now()
+    FROM counts
+    WHERE v.""PatientId"" = OLD.""PatientId"" AND v.""EntityKey"" = counts.""EntityKey""
+        AND v.""ValueKey"" = counts.""ValueKey"";
+    DELETE FROM patient_entity_values WHERE ""PatientId"" = OLD.""PatientId"" AND ""Citations"" <= 0;
+    RETURN OLD;
+END;
+$$;
+
+CREATE TRIGGER trg_documents_retract_patient_entity_citations
+BEFORE DELETE ON documents
+FOR EACH ROW EXECUTE FUNCTION retract_patient_entity_citations();
+
+CREATE TRIGGER trg_documents_soft_delete_patient_entity_citations
+AFTER UPDATE OF ""IsDeleted"" ON documents
+FOR EACH ROW WHEN (NEW.""IsDeleted"" AND NOT OLD.""IsDeleted"")
+EXECUTE FUNCTION retract_patient_entity_citations();
+");
+        }
+
+        /// <inheritdoc />
+        protected override void Down(MigrationBuilder migrationBuilder)
+        {
+            migrationBuilder.Sql(@"
+DROP TRIGGER IF EXISTS trg_documents_soft_delete_patient_entity_citations ON documents;
+DROP TRIGGER IF EXISTS trg_documents_retract_patient_entity_citations ON documents;
+DROP FUNCTION IF EXISTS retract_patient_entity_citations();
+");
+
+            migrationBuilder.DropTable(
+                name: "patient_entity_citations");
+
+            migrationBuilder.DropTable(
+                name: "patient_entity_values");
+        }
+    }
+}
@@ -0,0 +1,126 @@
+"""Catalog snapshot: worker startup time and memory, building the code index vs mapping a snapshot.
+
+Uses the synthetic 70k ICD-10 + 10k CPT catalog of `bench_code_index.py`.
+`--processes` worker processes start at once in each mode, and each reports:
+
+- load: `CodeIndex.build` or `read_snapshot`, plus the first search. In
+  `build` mode the catalog rows are generated first, standing in for the
+  database read, which is not counted,
+- startup: from process start to the first answered search, with imports
+  (numpy included) and without the row generation,
+- memory: Rss and Pss of the process after 200 searches, while all the
+  processes are still running. Pss splits shared pages between the
+  processes that map them, so it is lower than Rss when the snapshot
+  pages are shared.
+
+It also reports the compile time and size of the snapshot file.
+
+Usage:
+    python worker/benchmarks/bench_catalog_snapshot.py
+    python worker/benchmarks/bench_catalog_snapshot.py --processes 4
+"""
+
+import time
+
+_STARTED = time.perf_counter()
+
+import argparse
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bench_code_index import _catalog, _queries
+from catalog_snapshot import catalog_version, read_snapshot, write_snapshot
+from code_index import CodeIndex
+
+import numpy  # noqa: F401  imported lazily by code_index; counted with the imports, not the load
+
+_imported = time.perf_counter()
+
+
+def _memory_kb():
+    values = {}
+    try:
+        with open("/proc/self/smaps_rollup") as handle:
+            for line in handle:
+                name, _, rest = line.partition(":")
+                if name in ("Rss", "Pss"):
+                    values[name] = int(rest.split()[0])
+    except OSError:
+        pass
+    return values.get("Rss", 0), values.get("Pss", 0)
+
+
+def _child(mode: str, path: str) -> None:
+    if mode == "build":
+        items = _catalog(70_000, 10_000, random.Random(23))  # stands in for the database read
+        loading = time.perf_counter()
+        index = CodeIndex.build(items)
+    else:
+        loading = time.perf_counter()
+        index = read_snapshot(path).index
+    index.search("type 2 diabetes mellitus")
+    finished = time.perf_counter()
+    load, startup = finished - loading, finished - _STARTED - (loading - _imported)
+
+    sample = [index.item(i) for i in range(0, len(index), 97)]
+    for text, _ in _queries(sample, 200, random.Random(5)):
+        index.search(text)
+    print(f"{load:.4f} {startup:.4f}", flush=True)
+    sys.stdin.readline()
+    print("%d %d" % _memory_kb(), flush=True)
+
+
+def _run(mode: str, path: str, processes: int):
+    children = [
+        subprocess.Popen(
+            [sys.executable, __file__, "--child", mode, path],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        )
+        for _ in range(processes)
+    ]
+    startups = [tuple(float(v) for v in child.stdout.readline().split()) for child in children]
+    memory = []
+    for child in children:
+        child.stdin.write("\n")
+        child.stdin.flush()
+    for child in children:
+        memory.append(tuple(int(v) for v in child.stdout.readline().split()))
+        child.wait()
+    return startups, memory
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(*args.child)
+        return
+
+    items = _catalog(70_000, 10_000, random.Random(23))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "codes.snapshot")
+        started = time.perf_counter()
+        write_snapshot(CodeIndex.build(items), path, catalog_version(items))
+        compile_seconds = time.perf_counter() - started
+        print(f"{len(items)} catalog items, snapshot {os.path.getsize(path) / 2 ** 20:.1f} MB, "
+              f"compiled in {compile_seconds:.2f} s; {args.processes} processes per mode")
+        print(f"  {'mode':>8} {'load ms':>8} {'startup ms':>10} {'Rss MB':>7} {'Pss MB':>7}")
+        for mode in ("build", "snapshot"):
+            startups, memory = _run(mode, path, args.processes)
+            rss = statistics.mean(m[0] for m in memory) / 1024
+            pss = statistics.mean(m[1] for m in memory) / 1024
+            load = statistics.median(s[0] for s in startups) * 1000
+            startup = statistics.median(s[1] for s in startups) * 1000
+            print(f"  {mode:>8} {load:>8.1f} {startup:>10.0f} {rss:>7.1f} {pss:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Chunk persistence throughput (rows/s): per-row INSERT vs multi-row INSERT vs binary COPY.
+
+Needs a PostgreSQL server with the pgvector extension, for example:
+    docker run -d -p 5432:5432 -e POSTGRES_PASSWORD=postgres pgvector/pgvector:pg16
+
+The benchmark creates a scratch schema holding `documents` and
+`document_chunks` (same columns, indexes and ON DELETE CASCADE as
+add_vector_tables.sql). Every document is written in its own transaction over
+one pooled connection, and the schema is dropped at the end. With --encode-only it measures only client-side payload
+encoding and needs no database.
+
+Usage:
+    python worker/benchmarks/bench_chunk_persistence.py --dsn "host=localhost user=postgres password=postgres"
+    python worker/benchmarks/bench_chunk_persistence.py --encode-only
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from array import array
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from chunker import Chunk, chunk_hash
+from db import to_libpq_dsn
+from vector_store import PgvectorChunkWriter, build_chunk_rows, encode_copy_rows, insert_statements
+
+
+SCHEMA = "bench_chunk_persistence"
+
+_SETUP_SQL = f"""
+CREATE EXTENSION IF NOT EXISTS vector;
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+CREATE TABLE {SCHEMA}.documents ("Id" uuid PRIMARY KEY);
+CREATE TABLE {SCHEMA}.document_chunks (
+    "Id" uuid NOT NULL,
+    "DocumentId" uuid NOT NULL,
+    "Page" integer,
+    "Section" character varying(100),
+    "Coordinates" character varying(100),
+    "TextContent" text NOT NULL,
+    "Embedding" vector(768),
+    "TokenCount" integer,
+    "ChunkHash" character varying(64),
+    CONSTRAINT "PK_document_chunks" PRIMARY KEY ("Id"),
+    CONSTRAINT "FK_document_chunks_documents_DocumentId" FOREIGN KEY ("DocumentId")
+        REFERENCES {SCHEMA}.documents("Id") ON DELETE CASCADE
+);
+CREATE INDEX ON {SCHEMA}.document_chunks ("DocumentId");
+CREATE INDEX ON {SCHEMA}.document_chunks ("ChunkHash");
+"""
+
+
+def _documents(count: int, chunks_per_document: int, dimensions: int):
+    rng = random.Random(11)
+    documents = []
+    for d in range(count):
+        chunks, embeddings = [], []
+        for i in range(chunks_per_document):
+            text = f"Document {d} chunk {i}: " + " ".join(rng.choice(("BP", "HbA1c", "mg", "daily", "120/80")) for _ in range(400))
+            chunks.append(Chunk(i, text, 600, i // 2 + 1, i // 2 + 1, "Assessment", "72,90,540,700", chunk_hash(text)))
+            embeddings.append(array("f", (rng.uniform(-1, 1) for _ in range(dimensions))))
+        documents.append((str(uuid.UUID(int=rng.getrandbits(128), version=4)), chunks, embeddings))
+    return documents
+
+
+def _per_row(connect, document_id, chunks, embeddings):
+    rows = build_chunk_rows(document_id, chunks, embeddings)
+    with connect() as conn, conn.transaction(), conn.cursor() as cur:
+        cur.execute('DELETE FROM document_chunks WHERE "DocumentId" = %s', (rows[0].document_id,))
+        for row in rows:
+            sql, params = next(insert_statements([row], 1))
+            cur.execute(sql, params)
+
+
+def _encode_only(documents) -> None:
+    rows = [row for document_id, chunks, embeddings in documents for row in build_chunk_rows(document_id, chunks, embeddings)]
+    for name, encode in (
+        ("binary COPY payload", lambda: encode_copy_rows(rows)),
+        ("multi-row INSERT params", lambda: list(insert_statements(rows, 200))),
+    ):
+        started = time.perf_counter()
+        encode()
+        elapsed = time.perf_counter() - started
+        print(f"  {name:<24} {len(rows) / elapsed:12.0f} rows/s encoded")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dsn", default=os.getenv("DATABASE_CONNECTION_STRING", ""))
+    parser.add_argument("--documents", type=int, default=50)
+    parser.add_argument("--chunks", type=int, default=40, help="chunks per document")
+    parser.add_argument("--dimensions", type=int, default=768)
+    parser.add_argument("--encode-only", action="store_true")
+    args = parser.parse_args()
+
+    documents = _documents(args.documents, args.chunks, args.dimensions)
+    total_rows = args.documents * args.chunks
+    print(f"{args.documents} documents x {args.chunks} chunks, {args.dimensions}-d embeddings ({total_rows} rows)")
+    if args.encode_only:
+        _encode_only(documents)
+        return
+    if not args.dsn:
+        parser.error("--dsn or DATABASE_CONNECTION_STRING is required (or use --encode-only)")
+
+    import psycopg
+    from psycopg_pool import ConnectionPool
+
+    dsn = to_libpq_dsn(args.dsn)
+    with psycopg.connect(dsn, autocommit=True) as admin:
+        admin.execute(_SETUP_SQL)
+    pool = ConnectionPool(dsn, min_size=1, max_size=1, kwargs={"options": f"-c search_path={SCHEMA}"})
+    connect = pool.connection
+    try:
+        with connect() as conn:
+            conn.cursor().executemany(
+                'INSERT INTO documents ("Id") VALUES (%s)', [(uuid.UUID(d),) for d, _, _ in documents]
+            )
+
+        modes = (
+            ("per-row INSERT", lambda d, c, e: _per_row(connect, d, c, e)),
+            ("multi-row INSERT", PgvectorChunkWriter(connect, method="insert").write_document),
+            ("binary COPY", PgvectorChunkWriter(connect, method="copy").write_document),
+        )
+        for name, write in modes:
+            started = time.perf_counter()
+            for document_id, chunks, embeddings in documents:
+                write(document_id, chunks, embeddings)
+            elapsed = time.perf_counter() - started
+            print(f"  {name:<18} {total_rows / elapsed:10.0f} rows/s  ({elapsed * 1000 / args.documents:.1f} ms/document)")
+
+        with connect() as conn:
+            conn.execute("DELETE FROM documents")
+            remaining = conn.execute("SELECT count(*) FROM document_chunks").fetchone()[0]
+        print(f"  chunks left after deleting their documents (ON DELETE CASCADE): {remaining}")
+    finally:
+        pool.close()
+        with psycopg.connect(dsn, autocommit=True) as admin:
+            admin.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+
+
+if __name__ == "__main__":
+    main()
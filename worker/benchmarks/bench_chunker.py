@@ -0,0 +1,58 @@
+"""Chunking throughput over synthetic 10/100/1000-page documents.
+
+Pages are generated in memory (no PDF parsing) so the numbers isolate the
+chunker. Time per page should stay flat as the document grows.
+
+Usage:
+    python worker/benchmarks/bench_chunker.py [--pages 10 100 1000] [--words-per-page 450]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from chunker import iter_chunks
+from document_parser import ParsedPage
+
+
+VOCABULARY = (
+    "patient reports chest pain blood pressure mmHg metformin mg daily hba1c glucose history of present illness "
+    "denies fever shortness breath lisinopril allergy penicillin follow up weeks labs reviewed within normal limits"
+).split()
+
+
+def _pages(count: int, words_per_page: int):
+    rng = random.Random(7)
+    for number in range(1, count + 1):
+        lines = []
+        for _ in range(words_per_page // 15):
+            lines.append(" ".join(rng.choice(VOCABULARY) for _ in range(15)) + ".")
+        header = "ASSESSMENT AND PLAN\n" if number % 5 == 0 else ""
+        yield ParsedPage(page_number=number, text=header + "\n".join(lines))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--words-per-page", type=int, default=450)
+    args = parser.parse_args()
+
+    print(f"{'pages':>6} {'chunks':>7} {'tokens':>9} {'seconds':>8} {'ms/page':>8} {'tokens/s':>10}")
+    for count in args.pages:
+        pages = list(_pages(count, args.words_per_page))
+        started = time.perf_counter()
+        chunks = list(iter_chunks(pages))
+        elapsed = time.perf_counter() - started
+        tokens = sum(c.token_count for c in chunks)
+        print(
+            f"{count:>6} {len(chunks):>7} {tokens:>9} {elapsed:>8.3f} "
+            f"{elapsed / count * 1000:>8.3f} {tokens / elapsed:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
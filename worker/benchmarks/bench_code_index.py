@@ -0,0 +1,158 @@
+"""Code index: build time and lookups/s over an ICD-10/CPT-sized catalog.
+
+The catalog is synthetic, `--icd10` ICD-10 and `--cpt` CPT items whose
+descriptions are drawn from a clinical vocabulary in the style of the real
+code sets ("Type 2 diabetes mellitus with ... of left eye"). Queries are taken
+from catalog descriptions: a third as stored, a third with words dropped and
+reordered, a third with a misspelled word, all restricted to the code type a
+diagnosis or procedure would use. It reports:
+
+- build: `CodeIndex.build` over the whole catalog, and the size of its arrays,
+- lookups: `CodeIndex.search` top-5 at the suggestion `min_score`, as
+  lookups/s and p50/p99 latency,
+- hit rate: share of queries whose source item is in the top 5.
+
+Usage:
+    python worker/benchmarks/bench_code_index.py
+    python worker/benchmarks/bench_code_index.py --icd10 70000 --cpt 10000 --queries 2000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from code_index import CPT, ICD10, CatalogItem, CodeIndex
+from config import CodeIndexConfig
+
+
+_CONDITIONS = (
+    "diabetes mellitus", "hypertension", "asthma", "pneumonia", "fracture", "osteoarthritis", "neoplasm",
+    "infection", "ulcer", "dermatitis", "cataract", "glaucoma", "anemia", "hypothyroidism", "migraine",
+    "epilepsy", "depression", "anxiety disorder", "heart failure", "atrial fibrillation", "bronchitis",
+    "cellulitis", "gastritis", "hepatitis", "nephropathy", "neuropathy", "retinopathy", "sprain", "contusion",
+    "laceration", "burn", "dislocation", "stenosis", "embolism", "thrombosis", "hernia", "calculus",
+)
+_QUALIFIERS = (
+    "without complications", "with complications", "with hyperglycemia", "unspecified", "acute", "chronic",
+    "recurrent", "in remission", "initial encounter", "subsequent encounter", "sequela", "mild", "moderate",
+    "severe", "type 1", "type 2", "primary", "secondary", "due to underlying condition", "with exacerbation",
+)
+_SITES = (
+    "of right eye", "of left eye", "of bilateral eyes", "of right hand", "of left hand", "of right knee",
+    "of left knee", "of lower back", "of upper arm", "of right foot", "of left foot", "of lung", "of kidney",
+    "of liver", "of colon", "of stomach", "of skin", "of shoulder", "of hip", "of ankle", "of wrist",
+)
+_PROCEDURES = (
+    "office visit", "outpatient visit", "evaluation and management", "colonoscopy", "endoscopy", "biopsy",
+    "excision", "incision and drainage", "repair", "arthroscopy", "injection", "radiologic examination",
+    "computed tomography", "magnetic resonance imaging", "ultrasound", "electrocardiogram", "echocardiography",
+    "anesthesia", "immunization administration", "physical therapy evaluation", "laboratory panel",
+)
+_PROCEDURE_QUALIFIERS = (
+    "established patient", "new patient", "with contrast", "without contrast", "flexible", "diagnostic",
+    "with biopsy", "single lesion", "multiple lesions", "complex", "simple", "limited", "complete",
+    "each additional", "first hour", "bilateral", "unilateral", "with interpretation and report",
+)
+
+
+_SYLLABLES = (
+    "ab", "ac", "ad", "al", "an", "ar", "bi", "bro", "car", "cho", "cys", "der", "do", "du", "en", "gas", "glo",
+    "hem", "hep", "hy", "ic", "in", "is", "lat", "leu", "lo", "ma", "men", "my", "neu", "no", "ob", "os", "pa",
+    "per", "pha", "pul", "ra", "ren", "ro", "sa", "sco", "spi", "ta", "ter", "thro", "to", "tra", "ul", "va", "vas",
+)
+
+
+def _terms(count: int, rng: random.Random):
+    """Pseudo-medical words standing in for the catalog's long tail of specific terms."""
+    terms = set()
+    while len(terms) < count:
+        terms.add("".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))) + rng.choice(("itis", "osis", "oma", "al", "ic", "ia", "us", "")))
+    return sorted(terms)
+
+
+def _zipf(terms, rng: random.Random) -> str:
+    return terms[min(int(rng.paretovariate(0.8)) - 1, len(terms) - 1)]
+
+
+def _catalog(icd10: int, cpt: int, rng: random.Random, vocabulary: int = 10_000):
+    terms = _terms(vocabulary, rng)
+    rng.shuffle(terms)
+    items, seen = [], set()
+    while len(items) < icd10:
+        text = f"{rng.choice(_QUALIFIERS).capitalize()} {_zipf(terms, rng)} {rng.choice(_CONDITIONS)} {rng.choice(_SITES)}"
+        if rng.random() < 0.5:
+            text += f", {rng.choice(_QUALIFIERS)}"
+        if text not in seen:
+            seen.add(text)
+            items.append(CatalogItem(f"{chr(65 + len(items) % 26)}{len(items) // 26 % 100:02d}.{len(items):05d}", ICD10, text))
+    while len(items) < icd10 + cpt:
+        text = (f"{rng.choice(_PROCEDURES).capitalize()} {_zipf(terms, rng)}, {rng.choice(_PROCEDURE_QUALIFIERS)}; "
+                f"{rng.choice(_PROCEDURE_QUALIFIERS)} {rng.choice(_SITES)}")
+        if text not in seen:
+            seen.add(text)
+            items.append(CatalogItem(f"{10000 + len(items):05d}", CPT, text))
+    return items
+
+
+def _misspell(word: str, rng: random.Random) -> str:
+    if len(word) < 5:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    return word[:i] + word[i + 1:]
+
+
+def _queries(items, count: int, rng: random.Random):
+    queries = []
+    for n in range(count):
+        item = rng.choice(items)
+        words = item.description.replace(",", "").replace(";", "").split()
+        if n % 3 == 1:
+            words = rng.sample(words, max(2, len(words) * 2 // 3))
+        elif n % 3 == 2:
+            i = rng.randrange(len(words))
+            words[i] = _misspell(words[i], rng)
+        queries.append((" ".join(words), item))
+    return queries
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--icd10", type=int, default=70_000)
+    parser.add_argument("--cpt", type=int, default=10_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--min-score", type=float, default=CodeIndexConfig().min_score)
+    args = parser.parse_args()
+
+    rng = random.Random(23)
+    items = _catalog(args.icd10, args.cpt, rng)
+    queries = _queries(items, args.queries, rng)
+
+    started = time.perf_counter()
+    index = CodeIndex.build(items)
+    build_seconds = time.perf_counter() - started
+    size = sum(array.nbytes for array in index.arrays.values())
+
+    timings, hits = [], 0
+    for text, item in queries:
+        started = time.perf_counter()
+        candidates = index.search(text, args.limit, (item.code_type,), args.min_score)
+        timings.append(time.perf_counter() - started)
+        hits += any(c.code == item.code for c in candidates)
+    timings.sort()
+
+    print(f"{len(items)} catalog items ({args.icd10} ICD-10, {args.cpt} CPT), {len(queries)} queries, "
+          f"min_score {args.min_score}")
+    print(f"  build:       {build_seconds:8.2f} s, {size / 2 ** 20:.1f} MB of arrays")
+    print(f"  lookups/s:   {len(timings) / sum(timings):8.0f}")
+    print(f"  p50 / p99:   {statistics.median(timings) * 1000:8.3f} / {timings[int(len(timings) * 0.99)] * 1000:.3f} ms")
+    print(f"  top-{args.limit} hits: {hits / len(queries):8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Conflict detection: hash-indexed buckets vs pairwise comparison for one patient.
+
+A synthetic patient gets `--entities` entities spread over `--documents`
+documents, drawn from a vocabulary of medications, labs, vitals and
+demographics whose values come in equivalent spellings (`500 mg`, `0.5 g`,
+`500mg`) and a few genuinely different ones. It reports:
+
+- build: `ConflictIndex.from_records` over every entity (normalizing values),
+- full: `ConflictIndex.conflicts()` over every key,
+- incremental: `ConflictIndex.add_document` for one new document, which only
+  checks the keys that document touches,
+- naive: `tests.fixtures.conflicts.naive_conflicts` (every pair of entities), timed on a sample of
+  `--naive-sample` entities and extrapolated quadratically to the full set.
+
+Usage:
+    python worker/benchmarks/bench_conflict_detector.py
+    python worker/benchmarks/bench_conflict_detector.py --entities 50000 --documents 1000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from conflict_detector import ConflictIndex, EntityRecord
+from tests.fixtures.conflicts import naive_conflicts
+
+
+_SPELLINGS = {
+    "dose": [("500 mg", "0.5 g", "500mg"), ("850 mg",), ("1000 mg", "1 g")],
+    "frequency": [("500 mg PO BID", "500 mg by mouth twice daily"), ("500 mg daily", "500 mg once a day")],
+    "lab": [("7.1%", "7.1 %"), ("6.8%",)],
+    "vital": [("120/80 mmHg", "120/80"), ("98.6 F", "37 C"), ("135/85",)],
+    "date": [("03/15/1980", "1980-03-15", "March 15, 1980"), ("05/13/1980",)],
+}
+_KINDS = (
+    ("medications", "dose"), ("medications", "frequency"), ("labs", "lab"),
+    ("vitals", "vital"), ("patient_demographics", "date"),
+)
+
+
+def _records(count: int, documents: int, vocabulary: int, rng: random.Random):
+    records = []
+    for i in range(count):
+        item = min(int(rng.paretovariate(1.1)) - 1, vocabulary - 1)
+        group, kind = _KINDS[item % len(_KINDS)]
+        choices = _SPELLINGS[kind]
+        # Most items agree across documents; roughly one in ten has a second value.
+        variant = choices[0] if item % 10 or rng.random() < 0.7 else rng.choice(choices)
+        records.append(EntityRecord(f"doc-{i % documents}", group, f"Entity {item}", rng.choice(variant)))
+    return records
+
+
+def _median_ms(fn, repeat: int):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", type=int, default=50_000, help="entities per patient")
+    parser.add_argument("--documents", type=int, default=1000)
+    parser.add_argument("--vocabulary", type=int, default=2000, help="distinct fields per patient")
+    parser.add_argument("--naive-sample", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(22)
+    records = _records(args.entities, args.documents, args.vocabulary, rng)
+    per_document = args.entities // args.documents
+    new = [
+        EntityRecord("doc-new", r.entity_group_name, r.entity_name, r.entity_value)
+        for r in rng.sample(records, per_document)
+    ]
+
+    build_ms, index = _median_ms(lambda: ConflictIndex.from_records(records), args.repeat)
+    full_ms, groups = _median_ms(index.conflicts, args.repeat)
+    incremental_ms, touched = _median_ms(lambda: index.add_document("doc-new", new), args.repeat)
+    sample = records[: args.naive_sample]
+    sample_ms, _ = _median_ms(lambda: naive_conflicts(sample), 1)
+    naive_ms = sample_ms * (len(records) / len(sample)) ** 2
+
+    print(f"{len(records)} entities, {args.documents} documents, {args.vocabulary}-field vocabulary")
+    print(f"  conflicting fields: {len(groups)}")
+    print(f"  build index:            {build_ms:10.1f} ms")
+    print(f"  full detection:         {full_ms:10.1f} ms")
+    print(f"  incremental (1 doc, {len(new)} entities, {len(touched)} conflicts): {incremental_ms:.2f} ms")
+    print(f"  naive pairwise:         {naive_ms:10.0f} ms (extrapolated from {len(sample)} entities: {sample_ms:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Consumer throughput (messages/s) at different prefetch settings.
+
+Runs JobConsumer against the in-memory broker with a handler that simulates
+I/O-bound work, so the effect of prefetch and in-flight concurrency is visible
+without a RabbitMQ server.
+
+Usage:
+    python worker/benchmarks/bench_consumer.py [--messages 2000] [--handler-ms 2]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from broker import InMemoryBroker
+from config import RabbitMqConfig
+from consumer import JobConsumer
+
+
+QUEUE = "document-processing"
+DLQ = "document-processing-dlq"
+
+
+def _run(messages: int, prefetch: int, max_in_flight: int, handler_ms: float) -> float:
+    broker = InMemoryBroker()
+    broker.declare_queue(QUEUE, dead_letter_queue=DLQ)
+    for i in range(messages):
+        broker.publish(QUEUE, json.dumps({
+            "schema_version": "1.0",
+            "job_id": "3f2504e0-4f89-11d3-9a0c-0305e82c3301",
+            "document_id": f"doc-{i}",
+            "status": "pending",
+            "payload": {},
+        }).encode())
+
+    config = RabbitMqConfig(prefetch_count=prefetch, max_in_flight=max_in_flight, ack_batch_size=prefetch)
+    consumer = JobConsumer(broker.channel(), lambda job: time.sleep(handler_ms / 1000), config, 0.01)
+
+    started = time.perf_counter()
+    stats = consumer.run(exit_when_idle=True)
+    elapsed = time.perf_counter() - started
+    assert stats.processed == messages
+    return messages / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--handler-ms", type=float, default=2.0)
+    parser.add_argument("--max-in-flight", type=int, default=16)
+    args = parser.parse_args()
+
+    print(f"{args.messages} messages, handler {args.handler_ms} ms, max_in_flight {args.max_in_flight}")
+    for prefetch in (1, 4, 16, 64, 256):
+        rate = _run(args.messages, prefetch, args.max_in_flight, args.handler_ms)
+        print(f"  prefetch={prefetch:<4} {rate:10.0f} messages/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Peak RSS of naive vs page-streaming document loading.
+
+Each measurement runs in a fresh subprocess. The RSS high-water mark is reset
+after imports (Linux /proc/self/clear_refs), so the peak reflects only that
+loader. "naive" reads the file into memory and materializes every page's text
+with `PdfReader(...).pages`; "streaming" consumes `iter_document_pages`, which
+memory-maps the file and yields one page at a time.
+
+Usage:
+    python worker/benchmarks/bench_document_loader.py [--pages 250 1000 4000]
+"""
+
+import argparse
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from document_parser import PDF_MIME_TYPE, iter_document_pages
+from tests.fixtures.documents import build_pdf
+
+
+LINE = "Patient reports intermittent chest pain; BP 132/84 mmHg; metformin 500 mg twice daily. "
+
+
+def _rss_kb(field: str) -> int:
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith(field):
+                return int(line.split()[1])
+    raise RuntimeError(f"{field} not found in /proc/self/status")
+
+
+def _child(mode: str, path: str) -> None:
+    from pypdf import PdfReader
+
+    with open("/proc/self/clear_refs", "w") as clear_refs:
+        clear_refs.write("5")
+    baseline = _rss_kb("VmRSS:")
+    started = time.perf_counter()
+    if mode == "naive":
+        with open(path, "rb") as handle:
+            reader = PdfReader(io.BytesIO(handle.read()))
+        pages = [page.extract_text() for page in reader.pages]
+        count = len(pages)
+    else:
+        count = sum(1 for _ in iter_document_pages(path, PDF_MIME_TYPE))
+    elapsed = time.perf_counter() - started
+    peak = _rss_kb("VmHWM:") - baseline
+    print(f"{count} {peak} {elapsed}")
+
+
+def _measure(mode: str, path: str) -> tuple:
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", mode, path], check=True, capture_output=True, text=True
+    ).stdout.split()
+    return int(output[0]), int(output[1]) / 1024, float(output[2])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[250, 1000, 4000])
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(*args.child)
+        return
+
+    print(f"{'pages':>6} {'file MB':>8} {'naive peak MB':>14} {'streaming peak MB':>18} {'naive s':>8} {'streaming s':>12}")
+    for pages in args.pages:
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as handle:
+            handle.write(build_pdf([f"{i} {LINE * 30}" for i in range(pages)]))
+            path = handle.name
+        try:
+            size = os.path.getsize(path) / 1e6
+            _, naive_peak, naive_s = _measure("naive", path)
+            count, streaming_peak, streaming_s = _measure("streaming", path)
+            assert count == pages
+            print(f"{pages:>6} {size:>8.1f} {naive_peak:>14.1f} {streaming_peak:>18.1f} {naive_s:>8.2f} {streaming_s:>12.2f}")
+        finally:
+            os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Requests per document and p95 embed latency with and without batching.
+
+Documents arrive at a fixed interval and embed their chunks concurrently. The
+embedding model is simulated with a fixed per-request latency plus a small
+per-text cost, roughly the shape of the batchEmbedContents endpoint. Both modes
+are held to the same number of concurrent requests (`--max-concurrent`), as
+the API quota would require.
+
+Usage:
+    python worker/benchmarks/bench_embedding_batcher.py [--documents 200] [--chunks 8] [--arrival-ms 5]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config import EmbeddingConfig
+from embedding_client import EmbeddingBatcher
+
+
+class SimulatedModel:
+    def __init__(self, request_ms: float, per_text_ms: float, max_concurrent: int):
+        self.request_ms = request_ms
+        self.per_text_ms = per_text_ms
+        self.max_concurrent = max_concurrent
+        self.requests = 0
+        self._semaphore = None
+
+    async def __call__(self, texts):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        async with self._semaphore:
+            self.requests += 1
+            await asyncio.sleep((self.request_ms + self.per_text_ms * len(texts)) / 1000)
+        return [[0.0] * 8 for _ in texts]
+
+
+async def _run(embed, documents: int, chunks: int, arrival_ms: float) -> list:
+    latencies = []
+
+    async def document(index: int) -> None:
+        await asyncio.sleep(index * arrival_ms / 1000)
+        started = time.perf_counter()
+        await embed([f"document {index} chunk {c} " * 50 for c in range(chunks)])
+        latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(document(i) for i in range(documents)))
+    return latencies
+
+
+def _p95(values: list) -> float:
+    return statistics.quantiles(values, n=20)[-1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--chunks", type=int, default=8)
+    parser.add_argument("--arrival-ms", type=float, default=5.0)
+    parser.add_argument("--request-ms", type=float, default=80.0)
+    parser.add_argument("--per-text-ms", type=float, default=0.5)
+    parser.add_argument("--max-concurrent", type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"{args.documents} documents x {args.chunks} chunks, one every {args.arrival_ms} ms")
+    print(f"  {'mode':<28} {'requests/doc':>12} {'p95 ms':>8} {'mean ms':>8}")
+
+    model = SimulatedModel(args.request_ms, args.per_text_ms, args.max_concurrent)
+    latencies = asyncio.run(_run(model, args.documents, args.chunks, args.arrival_ms))
+    print(f"  {'one request per document':<28} {model.requests / args.documents:>12.2f} "
+          f"{_p95(latencies) * 1000:>8.1f} {statistics.mean(latencies) * 1000:>8.1f}")
+
+    for wait_ms in (10, 50):
+        model = SimulatedModel(args.request_ms, args.per_text_ms, args.max_concurrent)
+        config = EmbeddingConfig(batch_max_wait_seconds=wait_ms / 1000, max_concurrent_requests=args.max_concurrent)
+        batcher = EmbeddingBatcher(model, config)
+        latencies = asyncio.run(_run(batcher.embed, args.documents, args.chunks, args.arrival_ms))
+        label = f"batched (wait {wait_ms} ms)"
+        print(f"  {label:<28} {model.requests / args.documents:>12.2f} "
+              f"{_p95(latencies) * 1000:>8.1f} {statistics.mean(latencies) * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Event-loop responsiveness and throughput while parsing PDFs.
+
+Compares parsing directly on the event loop (blocking) with the parser process
+pool. A heartbeat task measures the worst event-loop stall in each mode.
+
+Usage:
+    python worker/benchmarks/bench_parser_pool.py [--documents 20] [--pages 50] [--pool-size 2]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config import ParserPoolConfig
+from document_parser import PDF_MIME_TYPE, parse_document
+from parser_pool import ParserPool
+from tests.fixtures.documents import build_pdf
+
+
+async def _heartbeat(stop: asyncio.Event, worst: list) -> None:
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(0.001)
+        now = time.perf_counter()
+        worst[0] = max(worst[0], now - last)
+        last = now
+
+
+async def _measure(parse_all) -> tuple:
+    stop = asyncio.Event()
+    worst = [0.0]
+    heartbeat = asyncio.create_task(_heartbeat(stop, worst))
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    await parse_all()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await heartbeat
+    return elapsed, worst[0]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--pool-size", type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as handle:
+        handle.write(build_pdf([f"Page {i} blood pressure 120/80 mmHg metformin 500 mg" for i in range(args.pages)]))
+        path = handle.name
+
+    async def inline():
+        for _ in range(args.documents):
+            parse_document(path, PDF_MIME_TYPE)
+
+    pool = ParserPool(ParserPoolConfig(pool_size=args.pool_size))
+    pool.parse(path, PDF_MIME_TYPE)  # warm worker imports
+
+    async def pooled():
+        await asyncio.gather(*(pool.parse_async(path, PDF_MIME_TYPE) for _ in range(args.documents)))
+
+    try:
+        print(f"{args.documents} documents x {args.pages} pages, cpu_count={os.cpu_count()}")
+        for label, parse_all in (("on event loop", inline), (f"process pool x{args.pool_size}", pooled)):
+            elapsed, stall = asyncio.run(_measure(parse_all))
+            print(f"  {label:<18} {args.documents / elapsed:8.1f} docs/s   worst loop stall {stall * 1000:8.1f} ms")
+    finally:
+        pool.close()
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
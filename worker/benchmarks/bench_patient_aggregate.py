@@ -0,0 +1,111 @@
+"""Patient aggregate: incremental delta vs full recompute for 10/100/1000 documents.
+
+Synthetic patients get documents of `--entities` entities each, drawn with a
+skewed distribution from a vocabulary of medications, diagnoses, labs and
+vitals, so common entities (e.g. Metformin) are cited by most documents. For
+each history size it reports:
+
+- delta: applying one more document to the in-memory `PatientAggregate` and
+  retracting it again (`citation_rows`, `count_changes` and the value counts,
+  twice), and the rows `PgPatientAggregateStore.apply` writes for it:
+  citations inserted plus value counts changed,
+- recompute: `PatientAggregate.rebuild` over every document, and the rows a
+  full rewrite writes (what recomputing per document or per read costs),
+- read: `merge_entities` over the stored rows, i.e. the Patient 360 view from
+  the aggregate tables with no recomputation.
+
+Database round trips are not included.
+
+Usage:
+    python worker/benchmarks/bench_patient_aggregate.py
+    python worker/benchmarks/bench_patient_aggregate.py --documents 10 100 1000 --entities 40
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from patient_aggregate import PatientAggregate
+
+
+_CATEGORIES = ("medications", "diagnoses", "labs", "vitals", "procedures", "allergies")
+
+
+def _vocabulary(size: int):
+    return [(_CATEGORIES[i % len(_CATEGORIES)], f"Entity {i}") for i in range(size)]
+
+
+def _document(index: int, entities: int, vocabulary, rng: random.Random) -> dict:
+    picks = set()
+    while len(picks) < entities:
+        picks.add(min(int(rng.paretovariate(1.1)) - 1, len(vocabulary) - 1))
+    return {
+        "schema_version": "1.0",
+        "document_id": f"00000000-0000-0000-0000-{index:012d}",
+        "extracted_entities": [
+            {
+                "entity_group_name": vocabulary[i][0],
+                "entity_name": vocabulary[i][1],
+                "entity_value": f"{rng.choice((250, 500, 850, 1000))} mg",
+                "document_location": {"page": rng.randint(1, 20), "section": "Medications"},
+                "source_text": f"{vocabulary[i][1]} as documented on page {rng.randint(1, 20)}",
+            }
+            for i in sorted(picks)
+        ],
+    }
+
+
+def _delta(aggregate: PatientAggregate, payload: dict) -> int:
+    delta = aggregate.apply(payload)
+    aggregate.remove_document(payload["document_id"])
+    return delta.inserted + delta.changed_values
+
+
+def _recompute(payloads) -> int:
+    aggregate = PatientAggregate.rebuild(payloads)
+    return len(aggregate.values) + sum(len(rows) for rows in aggregate.document_citations.values())
+
+
+def _median_ms(fn, repeat: int):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--entities", type=int, default=40, help="entities per document")
+    parser.add_argument("--vocabulary", type=int, default=400, help="distinct entities per patient")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(21)
+    vocabulary = _vocabulary(args.vocabulary)
+    print(f"{args.entities} entities/document, {args.vocabulary}-entity vocabulary")
+    print(f"  {'documents':>9} {'values':>6} {'citations':>9} {'delta ms':>9} {'rows':>5} "
+          f"{'recompute ms':>12} {'rows':>6} {'read ms':>8}")
+    for count in args.documents:
+        payloads = [_document(i, args.entities, vocabulary, rng) for i in range(count)]
+        aggregate = PatientAggregate.rebuild(payloads)
+        citations = sum(len(rows) for rows in aggregate.document_citations.values())
+        new = _document(count, args.entities, vocabulary, rng)
+
+        delta_ms, delta_rows = _median_ms(lambda: _delta(aggregate, new), args.repeat)
+        full_ms, full_rows = _median_ms(lambda: _recompute(payloads + [new]), args.repeat)
+        read_ms, _ = _median_ms(aggregate.by_category, args.repeat)
+        print(f"  {count:>9} {len(aggregate.values):>6} {citations:>9} {delta_ms:>9.2f} {delta_rows:>5} "
+              f"{full_ms:>12.1f} {full_rows:>6} {read_ms:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
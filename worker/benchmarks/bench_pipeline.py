@@ -0,0 +1,74 @@
+"""Pipelined vs sequential throughput for the document-processing stages.
+
+Every stage is simulated with an I/O wait (asyncio.sleep), so the numbers show
+how much overlapping stages across jobs buys over running each job end to end.
+
+Usage:
+    python worker/benchmarks/bench_pipeline.py [--jobs 200] [--stage-ms 5] [--concurrency 4]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pipeline import DEFAULT_STAGE_NAMES, PipelineExecutor, Stage
+
+
+JOB = {
+    "schema_version": "1.0",
+    "job_id": "3f2504e0-4f89-11d3-9a0c-0305e82c3301",
+    "document_id": "doc",
+    "status": "pending",
+    "payload": {},
+}
+
+
+def _stages(stage_ms: float, concurrency: int):
+    async def run(context):
+        await asyncio.sleep(stage_ms / 1000)
+
+    return [Stage(name, run, concurrency=concurrency) for name in DEFAULT_STAGE_NAMES]
+
+
+async def _sequential(jobs: int, stage_ms: float) -> float:
+    stages = _stages(stage_ms, 1)
+    started = time.perf_counter()
+    for _ in range(jobs):
+        for stage in stages:
+            await stage.run(None)
+    return time.perf_counter() - started
+
+
+async def _pipelined(jobs: int, stage_ms: float, concurrency: int) -> tuple:
+    executor = PipelineExecutor(_stages(stage_ms, concurrency), queue_size=concurrency * 2)
+    await executor.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(executor.submit(JOB) for _ in range(jobs)))
+    elapsed = time.perf_counter() - started
+    await executor.close()
+    return elapsed, executor.stats()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--stage-ms", type=float, default=5.0)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{args.jobs} jobs, {len(DEFAULT_STAGE_NAMES)} stages x {args.stage_ms} ms")
+    sequential = asyncio.run(_sequential(args.jobs, args.stage_ms))
+    print(f"  {'sequential':<24} {args.jobs / sequential:10.1f} jobs/s")
+    pipelined, stats = asyncio.run(_pipelined(args.jobs, args.stage_ms, args.concurrency))
+    label = f"pipelined (x{args.concurrency} per stage)"
+    print(f"  {label:<24} {args.jobs / pipelined:10.1f} jobs/s")
+    for stage in stats:
+        print(f"    {stage.name:<17} completed={stage.completed:<5} mean={stage.latency.mean * 1000:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Embedding quantization: memory per 100k chunks and recall@K for float32, float16 and int8.
+
+Vectors are clustered synthetic 768-d embeddings (as in bench_vector_index.py).
+For each precision it reports:
+
+- index bytes: `ExactIndex.nbytes` for the chunk set,
+- cache bytes: traced allocations of an `LruCache` holding every vector in the
+  form `EmbeddingCache` keeps (array('f') for float32, bytes otherwise), per
+  100k entries, Python object overhead included,
+- recall@K of the quantized index against float32 exact search, without and
+  with full-precision re-ranking of the top `k * rerank_factor` candidates
+  (the full-precision vectors come from an in-memory array here; in the worker
+  they come from pgvector via `PgvectorChunkSearch.fetch_vectors`),
+- the best of three timings for searching the whole batch of queries.
+
+Usage:
+    python worker/benchmarks/bench_quantization.py
+    python worker/benchmarks/bench_quantization.py --chunks 100000 --queries 100 --k 10 --rerank-factor 4
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from embedding_cache import LruCache
+from quantization import FLOAT16, FLOAT32, INT8, encode_vector
+from vector_index import ExactIndex
+
+
+def _dataset(count: int, dimensions: int, queries: int, rng):
+    centres = rng.standard_normal((max(count // 50, 1), dimensions)).astype(np.float32)
+    vectors = centres[rng.integers(0, len(centres), count)] + 0.6 * rng.standard_normal((count, dimensions)).astype(np.float32)
+    picks = rng.integers(0, count, queries)
+    query_vectors = vectors[picks] + 0.3 * rng.standard_normal((queries, dimensions)).astype(np.float32)
+    return vectors, query_vectors
+
+
+def _cache_bytes_per_100k(vectors, precision: str, sample: int) -> float:
+    rows = vectors[:sample].tolist()
+    tracemalloc.start()
+    cache = LruCache(sample)
+    for i, row in enumerate(rows):
+        cache.put(f"{i:064x}", encode_vector(row, precision))
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current * 100_000 / sample
+
+
+def _recall(results, expected, k: int) -> float:
+    found = sum(len({h.id for h in a} & {h.id for h in e}) for a, e in zip(results, expected))
+    return found / (len(expected) * k)
+
+
+def _search(index, queries, k, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        results = index.search_many(queries, k)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return results, best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--dimensions", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rerank-factor", type=int, default=4)
+    parser.add_argument("--cache-sample", type=int, default=20_000, help="entries used to measure cache memory")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(23)
+    vectors, queries = _dataset(args.chunks, args.dimensions, args.queries, rng)
+    ids = list(range(args.chunks))
+    print(f"{args.chunks} chunks, {args.dimensions}-d, {args.queries} queries, top {args.k}, "
+          f"re-rank top {args.k * args.rerank_factor}")
+    print(f"  {'precision':<9} {'index MB/100k':>13} {'cache MB/100k':>13} {'recall':>8} {'+rerank':>8} "
+          f"{'ms/batch':>9} {'+rerank ms':>10}")
+
+    expected = None
+    for precision in (FLOAT32, FLOAT16, INT8):
+        plain = ExactIndex(args.dimensions, args.chunks, precision)
+        plain.add(ids, vectors)
+        results, elapsed = _search(plain, queries, args.k)
+        if expected is None:
+            expected = results
+        index_mb = plain.nbytes * 100_000 / args.chunks / 1e6
+        cache_mb = _cache_bytes_per_100k(vectors, precision, min(args.cache_sample, args.chunks)) / 1e6
+        recall = _recall(results, expected, args.k)
+        if precision == FLOAT32:
+            print(f"  {precision:<9} {index_mb:>13.1f} {cache_mb:>13.1f} {recall:>8.3f} {'-':>8} "
+                  f"{elapsed * 1000:>9.1f} {'-':>10}")
+            continue
+        del plain
+        reranked = ExactIndex(
+            args.dimensions, args.chunks, precision, lambda chunk_ids: vectors[list(chunk_ids)], args.rerank_factor
+        )
+        reranked.add(ids, vectors)
+        rerank_results, rerank_elapsed = _search(reranked, queries, args.k)
+        print(f"  {precision:<9} {index_mb:>13.1f} {cache_mb:>13.1f} {recall:>8.3f} "
+              f"{_recall(rerank_results, expected, args.k):>8.3f} {elapsed * 1000:>9.1f} {rerank_elapsed * 1000:>10.1f}")
+        del reranked
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Interactive job latency under a saturating bulk backfill (simulation).
+
+A discrete-event simulation of one worker: a backfill of bulk jobs is queued
+at t=0, and single interactive uploads arrive at random intervals while it
+runs. The broker queue is FIFO. The worker holds at most `prefetch` unacked
+messages and runs `max_in_flight` jobs at a time. Jobs start either in arrival
+order or in FairScheduler order. Reports interactive latency (arrival to
+completion) and the backfill makespan, in simulated seconds.
+
+Usage:
+    python worker/benchmarks/bench_scheduler.py [--bulk 5000] [--interactive 60] [--job-seconds 3]
+"""
+
+import argparse
+import heapq
+import os
+import random
+import sys
+from collections import deque
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config import SchedulerConfig
+from scheduler import BULK, INTERACTIVE, FairScheduler
+
+
+class _FifoQueue:
+    def __init__(self):
+        self._jobs = deque()
+
+    def push(self, job, token=None):
+        self._jobs.append(job)
+
+    def pop(self):
+        return self._jobs.popleft() if self._jobs else None
+
+    def finish(self, scheduled):
+        pass
+
+
+def _simulate(args, prefetch: int, bulk_cap):
+    """bulk_cap None runs jobs in arrival order; otherwise FairScheduler with that bulk cap."""
+    rng = random.Random(args.seed)
+    now = [0.0]
+    arrivals = deque()
+    for i in range(args.bulk):
+        user = f"backfill-{i % args.bulk_users}"
+        arrivals.append((0.0, {"document_id": f"bulk-{i}", "payload": {"priority": BULK, "uploadedByUserId": user}}))
+    t = 0.0
+    for i in range(args.interactive):
+        t += rng.expovariate(1.0 / args.interactive_interval)
+        arrivals.append((t, {"document_id": f"upload-{i}", "payload": {"priority": INTERACTIVE, "uploadedByUserId": f"clinician-{i % 7}"}}))
+    arrivals = deque(sorted(arrivals, key=lambda a: a[0]))
+    durations = {job["document_id"]: rng.lognormvariate(0, 0.5) * args.job_seconds for _, job in arrivals}
+
+    if bulk_cap is None:
+        local = _FifoQueue()
+    else:
+        config = SchedulerConfig(interactive_max_in_flight=args.max_in_flight, bulk_max_in_flight=bulk_cap)
+        local = FairScheduler(config, clock=lambda: now[0])
+    broker = deque()
+    events = []  # (finish time, tiebreak, item)
+    outstanding = running = 0
+    arrived_at = {}
+    latencies = []
+    makespan = 0.0
+
+    def fill_and_start():
+        nonlocal outstanding, running
+        while broker and outstanding < prefetch:
+            job = broker.popleft()
+            local.push(job)
+            outstanding += 1
+        while running < args.max_in_flight:
+            item = local.pop()
+            if item is None:
+                break
+            running += 1
+            job = item.job if hasattr(item, "job") else item
+            heapq.heappush(events, (now[0] + durations[job["document_id"]], id(item), item))
+
+    while arrivals or events:
+        next_arrival = arrivals[0][0] if arrivals else float("inf")
+        if events and events[0][0] <= next_arrival:
+            now[0], _, item = heapq.heappop(events)
+            local.finish(item)
+            running -= 1
+            outstanding -= 1
+            job = item.job if hasattr(item, "job") else item
+            if job["payload"]["priority"] == INTERACTIVE:
+                latencies.append(now[0] - arrived_at[job["document_id"]])
+            else:
+                makespan = now[0]
+        else:
+            now[0], job = arrivals.popleft()
+            arrived_at[job["document_id"]] = now[0]
+            broker.append(job)
+        fill_and_start()
+
+    latencies.sort()
+    return latencies, makespan
+
+
+def _percentile(values, p):
+    return values[min(len(values) - 1, int(p * len(values)))] if values else 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bulk", type=int, default=5000)
+    parser.add_argument("--bulk-users", type=int, default=2)
+    parser.add_argument("--interactive", type=int, default=60)
+    parser.add_argument("--interactive-interval", type=float, default=60.0, help="mean seconds between uploads")
+    parser.add_argument("--job-seconds", type=float, default=3.0)
+    parser.add_argument("--max-in-flight", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(
+        f"{args.bulk} bulk jobs at t=0, {args.interactive} interactive uploads every ~{args.interactive_interval:.0f} s, "
+        f"~{args.job_seconds:.0f} s/job, max_in_flight {args.max_in_flight}"
+    )
+    modes = (
+        ("fifo", None),
+        ("fair", args.max_in_flight),
+        (f"fair, bulk cap {args.max_in_flight - 1}", args.max_in_flight - 1),
+    )
+    print(f"  {'mode':<18} {'prefetch':>8} {'p50 s':>9} {'p95 s':>9} {'max s':>9} {'backfill s':>11}")
+    for prefetch in (10, 100, 1000, args.bulk + args.interactive):
+        for name, bulk_cap in modes:
+            latencies, makespan = _simulate(args, prefetch, bulk_cap)
+            print(
+                f"  {name:<18} {prefetch:>8} {_percentile(latencies, 0.5):>9.1f} "
+                f"{_percentile(latencies, 0.95):>9.1f} {latencies[-1]:>9.1f} {makespan:>11.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Exact top-K over one patient's chunks: Python loop vs NumPy kernel vs pgvector round-trips.
+
+The default workload is one patient batch of 10 documents x 60 chunks with
+768-d embeddings and 16 queries (one per extraction prompt). It compares:
+
+- a per-chunk Python loop over lists of floats (cosine per chunk, then heapq),
+- the `top_k` kernel called once per query (matrix-vector product),
+- the `top_k` kernel called once for all queries (matrix-matrix product),
+- `ExactIndex.search_many`, i.e. the kernel plus building `SearchHit`s,
+- with --dsn, one `PgvectorChunkSearch` query per query against a scratch
+  schema (same layout as bench_chunk_persistence.py, dropped at the end).
+
+Usage:
+    python worker/benchmarks/bench_similarity_kernel.py
+    python worker/benchmarks/bench_similarity_kernel.py --documents 10 --chunks 60 --queries 16 --dsn "host=localhost user=postgres password=postgres"
+"""
+
+import argparse
+import heapq
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from vector_index import ExactIndex, normalize_rows, top_k
+
+
+def _python_loop(chunks, queries, k):
+    results = []
+    norms = [math.sqrt(sum(x * x for x in chunk)) for chunk in chunks]
+    for query in queries:
+        query_norm = math.sqrt(sum(x * x for x in query))
+        scores = (
+            (sum(a * b for a, b in zip(chunk, query)) / (norm * query_norm), i)
+            for i, (chunk, norm) in enumerate(zip(chunks, norms))
+        )
+        results.append([i for _, i in heapq.nlargest(k, scores)])
+    return results
+
+
+def _time(call, repeat):
+    best = math.inf
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = call()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def _pgvector(dsn, vectors, queries, documents, chunks_per_document, k):
+    import psycopg
+    from psycopg_pool import ConnectionPool
+
+    import bench_chunk_persistence as persistence
+    from chunker import Chunk, chunk_hash
+    from db import to_libpq_dsn
+    from vector_store import PgvectorChunkSearch, PgvectorChunkWriter
+
+    dsn = to_libpq_dsn(dsn)
+    with psycopg.connect(dsn, autocommit=True) as admin:
+        admin.execute(persistence._SETUP_SQL)
+    pool = ConnectionPool(dsn, min_size=1, max_size=1, kwargs={"options": f"-c search_path={persistence.SCHEMA}"})
+    try:
+        document_ids = [f"00000000-0000-4000-8000-{d:012d}" for d in range(documents)]
+        with pool.connection() as conn:
+            conn.cursor().executemany('INSERT INTO documents ("Id") VALUES (%s)', [(d,) for d in document_ids])
+        writer = PgvectorChunkWriter(pool.connection)
+        for d, document_id in enumerate(document_ids):
+            rows = vectors[d * chunks_per_document:(d + 1) * chunks_per_document]
+            chunks = [Chunk(i, f"chunk {i}", 1, 1, 1, None, None, chunk_hash(f"chunk {i}")) for i in range(len(rows))]
+            writer.write_document(document_id, chunks, rows.tolist())
+        search = PgvectorChunkSearch(pool.connection).search
+        search(queries[0].tolist(), k, document_ids)
+        started = time.perf_counter()
+        for query in queries:
+            search(query.tolist(), k, document_ids)
+        return time.perf_counter() - started
+    finally:
+        pool.close()
+        with psycopg.connect(dsn, autocommit=True) as admin:
+            admin.execute(f"DROP SCHEMA IF EXISTS {persistence.SCHEMA} CASCADE")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=10)
+    parser.add_argument("--chunks", type=int, default=60, help="chunks per document")
+    parser.add_argument("--dimensions", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=16)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20, help="best of N runs for the NumPy modes")
+    parser.add_argument("--dsn", default=os.getenv("DATABASE_CONNECTION_STRING", ""))
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(17)
+    count = args.documents * args.chunks
+    vectors = rng.standard_normal((count, args.dimensions)).astype(np.float32)
+    queries = rng.standard_normal((args.queries, args.dimensions)).astype(np.float32)
+    print(f"{count} chunks ({args.documents} documents x {args.chunks}), {args.dimensions}-d, "
+          f"{args.queries} queries, top {args.k}")
+
+    matrix = normalize_rows(vectors, args.dimensions)
+    unit_queries = normalize_rows(queries, args.dimensions)
+    index = ExactIndex(args.dimensions, capacity=count)
+    index.add(list(range(count)), vectors)
+
+    loop_time, expected = _time(lambda: _python_loop(vectors.tolist(), queries.tolist(), args.k), 1)
+    modes = [
+        ("Python loop per chunk", loop_time, expected),
+        ("kernel, one query per call", *_time(
+            lambda: [top_k(matrix, q[None, :], args.k)[0][0].tolist() for q in unit_queries], args.repeat)),
+        ("kernel, all queries in one call", *_time(
+            lambda: top_k(matrix, unit_queries, args.k)[0].tolist(), args.repeat)),
+        ("ExactIndex.search_many", *_time(
+            lambda: [[h.id for h in hits] for hits in index.search_many(queries, args.k)], args.repeat)),
+    ]
+    for name, elapsed, result in modes:
+        match = "same top-K" if result == expected else "DIFFERENT top-K"
+        print(f"  {name:<34} {elapsed * 1000:9.3f} ms total  {elapsed * 1e6 / args.queries:9.1f} us/query  {match}")
+
+    if args.dsn:
+        elapsed = _pgvector(args.dsn, vectors, queries, args.documents, args.chunks, args.k)
+        print(f"  {'pgvector, one round-trip per query':<34} {elapsed * 1000:9.3f} ms total  "
+              f"{elapsed * 1e6 / args.queries:9.1f} us/query")
+    else:
+        print("  pgvector round-trips: skipped (pass --dsn or set DATABASE_CONNECTION_STRING)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Per-payload validation cost: uncached vs cached Draft7Validator vs generated fast path.
+
+Usage:
+    python worker/benchmarks/bench_validation.py [--iterations 20000] [--entities 50]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from jsonschema import Draft7Validator
+
+from main import _load_entity_schema, _load_job_schema, validate_entity_payload, validate_job_payload
+from fast_validators import compile_schema
+
+
+JOB = {
+    "schema_version": "1.0",
+    "job_id": "3f2504e0-4f89-11d3-9a0c-0305e82c3301",
+    "document_id": "doc-123",
+    "status": "pending",
+    "payload": {"patient_id": "p-1"},
+}
+
+
+def _entity_payload(count: int) -> dict:
+    return {
+        "schema_version": "1.0",
+        "document_id": "doc-123",
+        "extracted_entities": [
+            {
+                "entity_group_name": "medications",
+                "entity_name": f"medication_{i}",
+                "entity_value": "Aspirin 81 mg",
+                "document_location": {"page": 1 + i % 10, "section": "Medications"},
+            }
+            for i in range(count)
+        ],
+    }
+
+
+def _per_call_us(fn, iterations: int) -> float:
+    return timeit.timeit(fn, number=iterations) / iterations * 1e6
+
+
+def _uncached(loader):
+    def run(payload):
+        validator = Draft7Validator(loader())
+        sorted(validator.iter_errors(payload), key=lambda e: e.path)
+    return run
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--entities", type=int, default=50)
+    args = parser.parse_args()
+
+    entity = _entity_payload(args.entities)
+    job_schema = _load_job_schema()
+    entity_schema = _load_entity_schema("1.0")
+
+    cases = [
+        ("job", JOB, {
+            "uncached (load + Draft7Validator per call)": _uncached(_load_job_schema),
+            "cached Draft7Validator.iter_errors": lambda p, v=Draft7Validator(job_schema): sorted(v.iter_errors(p), key=lambda e: e.path),
+            "generated fast path": compile_schema(job_schema),
+            "validate_job_payload": validate_job_payload,
+        }),
+        (f"entity ({args.entities} entities)", entity, {
+            "uncached (load + Draft7Validator per call)": _uncached(lambda: _load_entity_schema("1.0")),
+            "cached Draft7Validator.iter_errors": lambda p, v=Draft7Validator(entity_schema): sorted(v.iter_errors(p), key=lambda e: e.path),
+            "generated fast path": compile_schema(entity_schema),
+            "validate_entity_payload": validate_entity_payload,
+        }),
+    ]
+
+    for label, payload, variants in cases:
+        print(f"{label}:")
+        iterations = args.iterations if label == "job" else max(1, args.iterations // 20)
+        for name, fn in variants.items():
+            cost = _per_call_us(lambda: fn(payload), iterations)
+            print(f"  {name:<45} {cost:10.2f} us/payload")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Local chunk retrieval: exact NumPy search vs HNSW, recall@K and query latency.
+
+Vectors are synthetic 768-d embeddings drawn around a few hundred cluster
+centres, which is closer to real chunk embeddings than uniform noise (uniform
+noise in 768 dimensions has almost no structure for HNSW to exploit). Queries
+are perturbed copies of indexed vectors. Recall@K is the share of the exact
+top-K that HNSW returns.
+
+Usage:
+    python worker/benchmarks/bench_vector_index.py
+    python worker/benchmarks/bench_vector_index.py --sizes 1000,10000 --queries 200 --k 10
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config import RetrievalConfig
+from vector_index import ExactIndex, HnswIndex
+
+
+def _dataset(count: int, dimensions: int, queries: int, rng):
+    centres = rng.standard_normal((max(count // 50, 1), dimensions)).astype(np.float32)
+    vectors = centres[rng.integers(0, len(centres), count)] + 0.6 * rng.standard_normal((count, dimensions)).astype(np.float32)
+    picks = rng.integers(0, count, queries)
+    query_vectors = vectors[picks] + 0.3 * rng.standard_normal((queries, dimensions)).astype(np.float32)
+    return vectors, query_vectors
+
+
+def _timed_queries(index, queries, k):
+    latencies, results = [], []
+    for query in queries:
+        started = time.perf_counter()
+        results.append(index.search(query, k))
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return results, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,5000,20000")
+    parser.add_argument("--dimensions", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    config = RetrievalConfig()
+    print(f"{args.dimensions}-d vectors, {args.queries} queries, top {args.k}, "
+          f"HNSW M={config.hnsw_m} ef_construction={config.hnsw_ef_construction} ef_search={config.hnsw_ef_search}")
+    print(f"  {'vectors':>8} {'index':<6} {'build s':>8} {'p50 ms':>8} {'p95 ms':>8} {'recall@' + str(args.k):>10}")
+    rng = np.random.default_rng(5)
+    for size in (int(s) for s in args.sizes.split(",")):
+        vectors, queries = _dataset(size, args.dimensions, args.queries, rng)
+        ids = list(range(size))
+        exact_hits = None
+        for name, index in (("exact", ExactIndex(args.dimensions)), ("hnsw", HnswIndex(args.dimensions, config, size))):
+            started = time.perf_counter()
+            index.add(ids, vectors)
+            build = time.perf_counter() - started
+            hits, p50, p95 = _timed_queries(index, queries, args.k)
+            if exact_hits is None:
+                exact_hits = hits
+            found = sum(len({h.id for h in a} & {h.id for h in e}) for a, e in zip(hits, exact_hits))
+            recall = found / (len(queries) * args.k)
+            print(f"  {size:>8} {name:<6} {build:>8.2f} {p50 * 1000:>8.2f} {p95 * 1000:>8.2f} {recall:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""Message broker channels used by the job consumer.
+
+`InMemoryBroker` is a local stand-in that enforces the RabbitMQ semantics the
+consumer depends on (prefetch limits, delivery tags, multiple acks, rejection to
+a dead-letter queue). `PikaChannel` adapts a real RabbitMQ connection to the
+same interface.
+"""
+
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional
+
+from config import RabbitMqConfig
+
+
+@dataclass(frozen=True)
+class Delivery:
+    delivery_tag: int
+    body: bytes
+    redelivered: bool = False
+
+
+class BrokerError(RuntimeError):
+    pass
+
+
+class InMemoryBroker:
+    def __init__(self):
+        self._queues: Dict[str, Deque[tuple]] = {}
+        self._dead_letter: Dict[str, Optional[str]] = {}
+        self._condition = threading.Condition()
+
+    def declare_queue(self, name: str, dead_letter_queue: Optional[str] = None) -> None:
+        with self._condition:
+            self._queues.setdefault(name, deque())
+            self._dead_letter[name] = dead_letter_queue
+            if dead_letter_queue is not None:
+                self._queues.setdefault(dead_letter_queue, deque())
+                self._dead_letter.setdefault(dead_letter_queue, None)
+
+    def publish(self, queue: str, body: bytes) -> None:
+        self._enqueue(queue, body, redelivered=False)
+
+    def queue_depth(self, queue: str) -> int:
+        with self._condition:
+            return len(self._queues[queue])
+
+    def messages(self, queue: str) -> List[bytes]:
+        with self._condition:
+            return [body for body, _ in self._queues[queue]]
+
+    def channel(self) -> "InMemoryChannel":
+        return InMemoryChannel(self)
+
+    def _enqueue(self, queue: str, body: bytes, redelivered: bool, front: bool = False) -> None:
+        with self._condition:
+            if queue not in self._queues:
+                raise BrokerError(f"Queue '{queue}' is not declared")
+            if front:
+                self._queues[queue].appendleft((body, redelivered))
+            else:
+                self._queues[queue].append((body, redelivered))
+            self._condition.notify_all()
+
+
+class InMemoryChannel:
+    def __init__(self, broker: InMemoryBroker):
+        self._broker = broker
+        self._queue: Optional[str] = None
+        self._prefetch = 0
+        self._next_tag = 1
+        self._unacked: "OrderedDict[int, bytes]" = OrderedDict()
+
+    @property
+    def is_open(self) -> bool:
+        return True
+
+    def qos(self, prefetch_count: int) -> None:
+        self._prefetch = prefetch_count
+
+    def consume(self, queue: str) -> None:
+        with self._broker._condition:
+            if queue not in self._broker._queues:
+                raise BrokerError(f"Queue '{queue}' is not declared")
+        self._queue = queue
+
+    def get_next(self, timeout: float) -> Optional[Delivery]:
+        condition = self._broker._condition
+        with condition:
+            ready = condition.wait_for(self._can_deliver, timeout=timeout)
+            if not ready:
+                return None
+            body, redelivered = self._broker._queues[self._queue].popleft()
+            tag = self._next_tag
+            self._next_tag += 1
+            self._unacked[tag] = body
+            return Delivery(delivery_tag=tag, body=body, redelivered=redelivered)
+
+    def ack(self, delivery_tag: int, multiple: bool = False) -> None:
+        with self._broker._condition:
+            self._require_unacked(delivery_tag)
+            if multiple:
+                for tag in [t for t in self._unacked if t <= delivery_tag]:
+                    del self._unacked[tag]
+            else:
+                del self._unacked[delivery_tag]
+            self._broker._condition.notify_all()
+
+    def reject(self, delivery_tag: int, requeue: bool) -> None:
+        with self._broker._condition:
+            self._require_unacked(delivery_tag)
+            body = self._unacked.pop(delivery_tag)
+            if requeue:
+                self._broker._enqueue(self._queue, body, redelivered=True, front=True)
+                return
+            dead_letter_queue = self._broker._dead_letter.get(self._queue)
+            if dead_letter_queue is not None:
+                self._broker._enqueue(dead_letter_queue, body, redelivered=False)
+            self._broker._condition.notify_all()
+
+    def cancel(self) -> None:
+        with self._broker._condition:
+            for tag in reversed(list(self._unacked)):
+                self._broker._enqueue(self._queue, self._unacked.pop(tag), redelivered=True, front=True)
+        self._queue = None
+
+    def _can_deliver(self) -> bool:
+        if self._queue is None or not self._broker._queues[self._queue]:
+            return False
+        return self._prefetch <= 0 or len(self._unacked) < self._prefetch
+
+    def _require_unacked(self, delivery_tag: int) -> None:
+        if delivery_tag not in self._unacked:
+            raise BrokerError(f"PRECONDITION_FAILED - unknown delivery tag {delivery_tag}")
+
+
+class PikaChannel:
+    """RabbitMQ channel backed by a pika BlockingConnection.
+
+    Declares the dead-letter topology described in contracts/jobs/v1/README.md:
+    messages rejected without requeue are routed through `<exchange>.dlx` to the
+    configured dead-letter queue.
+    """
+
+    def __init__(self, config: RabbitMqConfig):
+        try:
+            import pika
+        except ModuleNotFoundError as e:
+            raise ModuleNotFoundError(
+                "Missing dependency 'pika'. Install worker requirements with: pip install -r worker/requirements.txt"
+            ) from e
+
+        credentials = pika.PlainCredentials(config.username, config.password)
+        parameters = pika.ConnectionParameters(
+            host=config.host,
+            port=config.port,
+            virtual_host=config.virtual_host,
+            credentials=credentials,
+        )
+        self._connection = pika.BlockingConnection(parameters)
+        self._channel = self._connection.channel()
+        self._queue = config.queue
+        self._consumer = None
+
+        dead_letter_exchange = f"{config.exchange}.dlx"
+        self._channel.exchange_declare(exchange=dead_letter_exchange, exchange_type="direct", durable=True)
+        self._channel.queue_declare(queue=config.dead_letter_queue, durable=True)
+        self._channel.queue_bind(
+            queue=config.dead_letter_queue, exchange=dead_letter_exchange, routing_key=config.queue
+        )
+        self._channel.queue_declare(
+            queue=config.queue,
+            durable=True,
+            arguments={
+                "x-dead-letter-exchange": dead_letter_exchange,
+                "x-dead-letter-routing-key": config.queue,
+            },
+        )
+
+    @property
+    def is_open(self) -> bool:
+        return self._connection.is_open and self._channel.is_open
+
+    def qos(self, prefetch_count: int) -> None:
+        self._channel.basic_qos(prefetch_count=prefetch_count)
+
+    def consume(self, queue: str) -> None:
+        self._queue = queue
+
+    def get_next(self, timeout: float) -> Optional[Delivery]:
+        if self._consumer is None:
+            self._consumer = self._channel.consume(self._queue, inactivity_timeout=timeout)
+        method, _, body = next(self._consumer)
+        if method is None:
+            return None
+        return Delivery(delivery_tag=method.delivery_tag, body=body, redelivered=method.redelivered)
+
+    def ack(self, delivery_tag: int, multiple: bool = False) -> None:
+        self._channel.basic_ack(delivery_tag=delivery_tag, multiple=multiple)
+
+    def reject(self, delivery_tag: int, requeue: bool) -> None:
+        self._channel.basic_reject(delivery_tag=delivery_tag, requeue=requeue)
+
+    def cancel(self) -> None:
+        if self._consumer is not None:
+            self._channel.cancel()
+            self._consumer = None
+
+    def close(self) -> None:
+        self.cancel()
+        self._connection.close()
@@ -0,0 +1,281 @@
+"""Prebuilt, memory-mapped billing catalog snapshots for fast worker startup (NFR-009, DR-007).
+
+`compile_catalog` reads `billing_code_catalog_items`, builds the `CodeIndex`
+and writes it to one snapshot file. Workers open the file with
+`read_snapshot`, which memory-maps it read-only and wraps the index arrays
+around the mapped pages with no copy. Startup does not rebuild the index, and
+every worker process on a host shares the same page-cache pages.
+
+File layout (little-endian):
+
+    magic (8 bytes) | format version (u32) | header length (u32) | data offset (u64)
+    header: UTF-8 JSON with catalog_version, built_at, code_types and, per
+            array, its name, dtype, length and offset from the data offset
+    arrays: raw bytes, each starting on a 64-byte boundary
+
+Bump `FORMAT_VERSION` whenever the layout or `CodeIndex.ARRAYS` changes.
+
+The compiler writes to a temporary file next to the snapshot and
+`os.replace`s it, so readers see either the old or the new file, never a
+partial one. It skips the write when the catalog is unchanged.
+`SnapshotCodeIndex` checks the file every `refresh_seconds` and maps a
+replaced file without a restart. Searches in progress keep using the old
+mapping until they finish.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Tuple
+
+from code_index import CatalogItem, CodeCandidate, CodeIndex, load_catalog
+from config import CodeIndexConfig
+from local_state import ensure_private_dir
+
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"CICODES\x00"
+FORMAT_VERSION = 1
+_PREAMBLE = struct.Struct("<8sIIQ")
+_ALIGNMENT = 64
+
+FileId = Tuple[int, int, int]
+
+
+def _numpy():
+    try:
+        import numpy
+    except ModuleNotFoundError as e:
+        raise ModuleNotFoundError(
+            "Missing dependency 'numpy'. Install worker requirements with: pip install -r worker/requirements.txt"
+        ) from e
+    return numpy
+
+
+def catalog_version(items: Iterable[CatalogItem]) -> str:
+    """SHA-256 of the catalog rows, independent of their order."""
+    digest = hashlib.sha256()
+    for item in sorted(items, key=lambda i: (i.code, i.code_type)):
+        digest.update(f"{item.code}\x00{item.code_type}\x00{item.description}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class CodeIndexSnapshot:
+    index: CodeIndex
+    catalog_version: str
+    built_at: float
+    file_id: FileId  # (device, inode, mtime_ns) of the mapped file
+
+
+def _align(offset: int) -> int:
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def write_snapshot(index: CodeIndex, path: str, version: str, built_at: Optional[float] = None) -> None:
+    """Write `index` to `path` atomically (temporary file, fsync, rename)."""
+    np = _numpy()
+    arrays = []
+    offset = 0
+    for name in CodeIndex.ARRAYS:
+        array = np.ascontiguousarray(index.arrays[name])
+        array = array.astype(array.dtype.newbyteorder("<"), copy=False)
+        arrays.append((name, array, offset))
+        offset = _align(offset + array.nbytes)
+    header = json.dumps({
+        "catalog_version": version,
+        "built_at": time.time() if built_at is None else built_at,
+        "code_types": list(index.code_types),
+        "arrays": [
+            {"name": name, "dtype": array.dtype.str, "length": len(array), "offset": start}
+            for name, array, start in arrays
+        ],
+    }).encode("utf-8")
+    data_offset = _align(_PREAMBLE.size + len(header))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    ensure_private_dir(directory)
+    fd, temporary = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header), data_offset))
+            handle.write(header)
+            for name, array, start in arrays:
+                handle.seek(data_offset + start)
+                handle.write(array.tobytes())
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.unlink(temporary)
+        raise
+
+
+def read_snapshot(path: str) -> CodeIndexSnapshot:
+    """Map a snapshot read-only. Raises ValueError for a file that is not a valid snapshot."""
+    np = _numpy()
+    with open(path, "rb") as handle:
+        stat = os.fstat(handle.fileno())
+        if stat.st_size < _PREAMBLE.size:
+            raise ValueError(f"Code index snapshot {path} is truncated")
+        mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    arrays = {}
+    try:
+        magic, version, header_length, data_offset = _PREAMBLE.unpack_from(mapped, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a code index snapshot")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Code index snapshot {path} has format {version}, expected {FORMAT_VERSION}")
+        try:
+            header = json.loads(mapped[_PREAMBLE.size:_PREAMBLE.size + header_length].decode("utf-8"))
+            specs = [(spec["name"], np.dtype(spec["dtype"]), spec["offset"], spec["length"]) for spec in header["arrays"]]
+            code_types, catalog, built_at = header["code_types"], header["catalog_version"], header["built_at"]
+        except (UnicodeDecodeError, ValueError, KeyError, TypeError) as e:
+            raise ValueError(f"Code index snapshot {path} has a corrupt header") from e
+
+        for name, dtype, offset, length in specs:
+            start = data_offset + offset
+            if start + length * dtype.itemsize > len(mapped):
+                raise ValueError(f"Code index snapshot {path} is truncated")
+            arrays[name] = np.frombuffer(mapped, dtype=dtype, count=length, offset=start) if length else np.empty(0, dtype=dtype)
+        return CodeIndexSnapshot(
+            index=CodeIndex(arrays, code_types),
+            catalog_version=catalog,
+            built_at=built_at,
+            file_id=(stat.st_dev, stat.st_ino, stat.st_mtime_ns),
+        )
+    except BaseException:
+        # The arrays export the mapping's buffer; drop them so it can be closed.
+        arrays.clear()
+        mapped.close()
+        raise
+
+
+def _snapshot_version(path: str) -> Optional[str]:
+    try:
+        return read_snapshot(path).catalog_version
+    except (OSError, ValueError):
+        return None
+
+
+def compile_catalog(connect: Callable[[], Any], path: str, force: bool = False) -> Tuple[str, bool]:
+    """Snapshot the catalog table to `path`; returns `(catalog_version, written)`."""
+    items = load_catalog(connect)
+    version = catalog_version(items)
+    if not force and _snapshot_version(path) == version:
+        return version, False
+    write_snapshot(CodeIndex.build(items), path, version)
+    logger.info("Wrote code index snapshot %s (%d items, catalog %s)", path, len(items), version[:12])
+    return version, True
+
+
+@dataclass(frozen=True)
+class SnapshotStats:
+    catalog_version: str
+    items: int
+    refreshes: int
+    refresh_errors: int
+
+
+class SnapshotCodeIndex:
+    """The `CodeIndex` of a snapshot file, re-mapped when the file is replaced.
+
+    A `stat` of the file at most every `refresh_seconds`, on the next search,
+    decides whether to map it again. The swap is a single reference
+    assignment. A replaced file that cannot be read is logged and the current
+    snapshot stays in use.
+    """
+
+    def __init__(self, path: str, refresh_seconds: float = 300.0, clock: Callable[[], float] = time.monotonic):
+        self._path = path
+        self._refresh_seconds = refresh_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._snapshot = read_snapshot(path)
+        self._checked_at = clock()
+        self._refreshes = 0
+        self._refresh_errors = 0
+
+    @property
+    def snapshot(self) -> CodeIndexSnapshot:
+        return self._snapshot
+
+    def search(
+        self, text: str, limit: int = 5, code_types: Optional[Sequence[str]] = None, min_score: float = 0.3
+    ) -> List[CodeCandidate]:
+        if self._clock() - self._checked_at >= self._refresh_seconds:
+            self.refresh()
+        return self._snapshot.index.search(text, limit, code_types, min_score)
+
+    def refresh(self) -> bool:
+        """Map the file again if it was replaced; returns whether the index changed."""
+        with self._lock:
+            self._checked_at = self._clock()
+            try:
+                stat = os.stat(self._path)
+                if (stat.st_dev, stat.st_ino, stat.st_mtime_ns) == self._snapshot.file_id:
+                    return False
+                snapshot = read_snapshot(self._path)
+            except (OSError, ValueError) as e:
+                self._refresh_errors += 1
+                logger.warning("Keeping code index snapshot %s: %s", self._snapshot.catalog_version[:12], e)
+                return False
+            self._snapshot = snapshot
+            self._refreshes += 1
+        logger.info("Mapped code index snapshot %s (%d items)", snapshot.catalog_version[:12], len(snapshot.index))
+        return True
+
+    def stats(self) -> SnapshotStats:
+        snapshot = self._snapshot
+        return SnapshotStats(snapshot.catalog_version, len(snapshot.index), self._refreshes, self._refresh_errors)
+
+
+def open_code_index(config: CodeIndexConfig, connect: Callable[[], Any]) -> SnapshotCodeIndex:
+    """The snapshot at `config.snapshot_path`, compiled from the catalog table first if there is none."""
+    if _snapshot_version(config.snapshot_path) is None:
+        compile_catalog(connect, config.snapshot_path)
+    return SnapshotCodeIndex(config.snapshot_path, config.refresh_seconds)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compile and inspect billing catalog snapshots.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    compile_ = subcommands.add_parser("compile", help="Snapshot billing_code_catalog_items")
+    compile_.add_argument("--path", help="Snapshot file (default: WORKER_CODE_INDEX_SNAPSHOT)")
+    compile_.add_argument("--force", action="store_true", help="Write even if the catalog is unchanged")
+    info = subcommands.add_parser("info", help="Print a snapshot's catalog version and size")
+    info.add_argument("--path", help="Snapshot file (default: WORKER_CODE_INDEX_SNAPSHOT)")
+    args = parser.parse_args(argv)
+
+    from config import load_code_index_config
+
+    path = args.path or load_code_index_config().snapshot_path
+    if args.command == "info":
+        snapshot = read_snapshot(path)
+        print(f"{path}: catalog {snapshot.catalog_version}, {len(snapshot.index)} items, "
+              f"built {time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(snapshot.built_at))}")
+        return 0
+
+    from config import load_database_config
+    from db import connect
+
+    database_config = load_database_config()
+    version, written = compile_catalog(lambda: connect(database_config), path, force=args.force)
+    print(f"{path}: catalog {version} {'written' if written else 'unchanged'}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
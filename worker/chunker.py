@@ -0,0 +1,197 @@
+"""Token-aware streaming chunker for parsed document pages (TR-005).
+
+Pages are consumed one at a time from the loader's generator and tokenized
+exactly once; each token is a (page, start, end) reference into its page text,
+so the 100-token overlap between consecutive chunks is carried as token
+references rather than re-tokenized text. Chunks prefer to end on a sentence or
+line boundary between `min_tokens` and `max_tokens`. Work and memory are
+linear in document length; only the pages still referenced by the token buffer
+are kept.
+"""
+
+import asyncio
+import hashlib
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from document_parser import ParsedPage
+from pipeline import JobContext, Stage
+
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+_HEADING = re.compile(r"^(?:[A-Z][A-Z0-9 /&,()'-]{2,59}|[A-Z][\w /&,()'-]{2,59}:)$")
+_SENTENCE_END = frozenset(".?!")
+
+SECTION_MAX_LENGTH = 100
+
+Tokenizer = Callable[[str], Iterable[Tuple[int, int]]]
+
+
+@dataclass(frozen=True)
+class ChunkingConfig:
+    min_tokens: int = 500
+    max_tokens: int = 1000
+    overlap_tokens: int = 100
+
+
+@dataclass(frozen=True)
+class Chunk:
+    index: int
+    text: str
+    token_count: int
+    page: int
+    page_end: int
+    section: Optional[str]
+    coordinates: Optional[str]
+    chunk_hash: str
+
+
+def regex_tokenize(text: str) -> Iterator[Tuple[int, int]]:
+    """Default tokenizer: words and individual punctuation marks, as character spans.
+
+    Approximates subword tokenizers closely enough for sizing chunks.
+    """
+    return (match.span() for match in _TOKEN_PATTERN.finditer(text))
+
+
+def normalize_chunk_text(text: str) -> str:
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def chunk_hash(text: str) -> str:
+    """SHA-256 hex digest (64 chars, the `ChunkHash` column width) of normalized chunk text."""
+    return hashlib.sha256(normalize_chunk_text(text).encode("utf-8")).hexdigest()
+
+
+class _Page:
+    __slots__ = ("number", "text", "span_offsets")
+
+    def __init__(self, page: ParsedPage):
+        self.number = page.page_number
+        self.text = page.text
+        # Locate each coordinate span in the page text with a single forward scan.
+        offsets = []
+        cursor = 0
+        for span in page.spans:
+            start = page.text.find(span.text, cursor)
+            if start >= 0:
+                cursor = start + len(span.text)
+                offsets.append((start, cursor, span.x, span.y))
+        self.span_offsets = offsets
+
+    def coordinates(self, start: int, end: int) -> Optional[str]:
+        points = [(x, y) for span_start, span_end, x, y in self.span_offsets if span_start < end and span_end > start]
+        if not points:
+            return None
+        xs, ys = [p[0] for p in points], [p[1] for p in points]
+        return f"{min(xs):.1f},{min(ys):.1f},{max(xs):.1f},{max(ys):.1f}"
+
+
+# Token: (page number, start offset, end offset, section, ends a sentence or line)
+_Token = Tuple[int, int, int, Optional[str], bool]
+
+
+def _page_tokens(page: ParsedPage, tokenize: Tokenizer, section: Optional[str]) -> Tuple[List[_Token], Optional[str]]:
+    text = page.text
+    headings = {}
+    offset = 0
+    for line in text.splitlines(keepends=True):
+        stripped = line.strip()
+        if stripped and _HEADING.match(stripped):
+            headings[offset + line.index(stripped[0])] = stripped.rstrip(":")[:SECTION_MAX_LENGTH]
+        offset += len(line)
+
+    tokens = []
+    for start, end in tokenize(text):
+        if start in headings:
+            section = headings[start]
+        boundary = text[end - 1] in _SENTENCE_END or text[end:end + 1] in ("\n", "\r")
+        tokens.append((page.page_number, start, end, section, boundary))
+    return tokens, section
+
+
+def _build_chunk(index: int, tokens: List[_Token], pages: Dict[int, _Page]) -> Chunk:
+    parts = []
+    run_page, run_start, run_end = tokens[0][0], tokens[0][1], tokens[0][2]
+    first_page_end = None
+    for page_number, start, end, _, _ in tokens:
+        if page_number != run_page:
+            parts.append(pages[run_page].text[run_start:run_end])
+            if first_page_end is None:
+                first_page_end = run_end
+            run_page, run_start = page_number, start
+        run_end = end
+    parts.append(pages[run_page].text[run_start:run_end])
+
+    first = tokens[0]
+    text = "\n".join(parts)
+    return Chunk(
+        index=index,
+        text=text,
+        token_count=len(tokens),
+        page=first[0],
+        page_end=tokens[-1][0],
+        section=first[3],
+        coordinates=pages[first[0]].coordinates(first[1], first_page_end or run_end),
+        chunk_hash=chunk_hash(text),
+    )
+
+
+def _cut_point(buffer: List[_Token], start: int, config: ChunkingConfig) -> int:
+    for i in range(start + config.max_tokens - 1, start + config.min_tokens - 2, -1):
+        if buffer[i][4]:
+            return i + 1
+    return start + config.max_tokens
+
+
+def iter_chunks(
+    pages: Iterable[ParsedPage], config: ChunkingConfig = ChunkingConfig(), tokenize: Tokenizer = regex_tokenize
+) -> Iterator[Chunk]:
+    if not 0 <= config.overlap_tokens < config.min_tokens <= config.max_tokens:
+        raise ValueError("Chunking requires 0 <= overlap_tokens < min_tokens <= max_tokens")
+
+    # Chunks are cut from buffer[start:]; the consumed prefix is dropped once per
+    # page, so a long page is not re-copied for every chunk.
+    buffer: List[_Token] = []
+    start = 0
+    carried = 0
+    live_pages: Dict[int, _Page] = {}
+    section = None
+    index = 0
+
+    for page in pages:
+        live_pages[page.page_number] = _Page(page)
+        tokens, section = _page_tokens(page, tokenize, section)
+        buffer.extend(tokens)
+
+        while len(buffer) - start >= config.max_tokens:
+            cut = _cut_point(buffer, start, config)
+            yield _build_chunk(index, buffer[start:cut], live_pages)
+            index += 1
+            start = cut - config.overlap_tokens
+            carried = config.overlap_tokens
+            oldest = buffer[start][0] if start < len(buffer) else page.page_number
+            for number in [n for n in live_pages if n < oldest]:
+                del live_pages[number]
+        del buffer[:start]
+        start = 0
+
+    if len(buffer) > carried:
+        yield _build_chunk(index, buffer, live_pages)
+
+
+def chunk_stage(config: ChunkingConfig = ChunkingConfig(), tokenize: Tokenizer = regex_tokenize) -> Stage:
+    """Pipeline `chunk` stage: chunk `artifacts['pages']` into `artifacts['chunks']`.
+
+    Runs in a thread so a lazy page iterator is parsed and chunked page by page
+    without blocking the event loop.
+    """
+
+    async def run(context: JobContext) -> None:
+        pages = context.artifacts["pages"]
+        context.artifacts["chunks"] = await asyncio.to_thread(lambda: list(iter_chunks(pages, config, tokenize)))
+
+    return Stage("chunk", run, outputs=("chunks",))
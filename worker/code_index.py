@@ -0,0 +1,448 @@
+"""In-memory fuzzy index over the billing code catalog for code suggestions (TR-009).
+
+Matching every extracted diagnosis and procedure with a `LIKE` or pg_trgm
+query against `billing_code_catalog_items` (~70k ICD-10 and ~10k CPT codes)
+is one database round trip per entity. `CodeIndex` answers the same question
+in-process:
+
+- a code map: a query that is itself a catalog code (`E11.9`, `e119`, `99213`),
+- a token-normalized exact map: the description's words, case-folded, sorted,
+  without punctuation or filler words (`Mellitus, type 2 diabetes` finds
+  `Type 2 diabetes mellitus`),
+- a trigram inverted index over the catalog's vocabulary, which maps each
+  query word to the catalog words it may be a misspelling of (`diabtes` to
+  `diabetes`), and word postings to score items.
+
+An item's score is the average of the share of query words it contains and
+the Jaccard similarity of the two word sets, with a misspelled word counting
+its trigram similarity instead of 1. So shorter, closer descriptions rank
+first. Scoring works on word postings, which are short next to trigram
+postings over the whole catalog.
+
+All index state is flat NumPy arrays (trigrams and hashed keys as integers,
+CSR postings, UTF-8 string blobs), so it is compact and can be written to and
+read from a snapshot as is. `suggest_codes` turns an `EntityExtractionResult`
+into `CodeSuggestion`-ready records.
+"""
+
+import hashlib
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Protocol, Sequence, Tuple
+
+from config import CodeIndexConfig
+from pipeline import JobContext, Stage
+
+
+logger = logging.getLogger(__name__)
+
+ICD10 = "ICD-10"
+CPT = "CPT"
+HCPCS = "HCPCS"
+
+# Entity categories that get code suggestions, and the code types they are matched against.
+CODE_TYPES_BY_CATEGORY: Dict[str, Tuple[str, ...]] = {
+    "diagnoses": (ICD10,),
+    "procedures": (CPT, HCPCS),
+}
+
+_FILLER = frozenset({"a", "an", "and", "as", "by", "for", "in", "of", "on", "or", "the", "to"})
+_WORD = re.compile(r"[^\W_]+")
+_CODE = re.compile(r"^[a-z]?\d[0-9a-z]{1,2}\.?[0-9a-z]{0,4}$")
+_CHAR_BITS = 21
+# Trigram similarity at which a query word counts as a misspelling of a catalog word,
+# and how many catalog words one query word may stand for.
+_SPELLING_SIMILARITY = 0.5
+_SPELLINGS = 8
+
+
+def _numpy():
+    try:
+        import numpy
+    except ModuleNotFoundError as e:
+        raise ModuleNotFoundError(
+            "Missing dependency 'numpy'. Install worker requirements with: pip install -r worker/requirements.txt"
+        ) from e
+    return numpy
+
+
+def normalize_tokens(text: str) -> List[str]:
+    """Distinct case-folded words of `text`, in order, without filler words."""
+    return list(dict.fromkeys(word for word in _WORD.findall(text.casefold()) if word not in _FILLER))
+
+
+def exact_key(text: str) -> str:
+    """Order-insensitive form of a description, for the exact map."""
+    return " ".join(sorted(normalize_tokens(text)))
+
+
+def code_key(code: str) -> str:
+    """`E11.9`, `e119` and ` E11.9 ` all become `E119`."""
+    return re.sub(r"[\s.]", "", code).upper()
+
+
+def trigrams(word: str) -> List[int]:
+    """pg_trgm-style trigrams of a word (padded with two spaces before, one after), as sorted integers."""
+    padded = f"  {word} "
+    return sorted({
+        (ord(padded[i]) << 2 * _CHAR_BITS) | (ord(padded[i + 1]) << _CHAR_BITS) | ord(padded[i + 2])
+        for i in range(len(padded) - 2)
+    })
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+@dataclass(frozen=True)
+class CatalogItem:
+    """A `billing_code_catalog_items` row."""
+
+    code: str
+    code_type: str
+    description: str
+
+
+@dataclass(frozen=True)
+class CodeCandidate:
+    code: str
+    code_type: str
+    description: str
+    score: float
+    match: str  # "code", "exact" or "fuzzy"
+
+
+class CodeSearch(Protocol):
+    def search(
+        self, text: str, limit: int = 5, code_types: Optional[Sequence[str]] = None, min_score: float = 0.3
+    ) -> List[CodeCandidate]: ...
+
+
+class CodeIndex:
+    """Code map, exact map, vocabulary trigram index and word postings, held in NumPy arrays.
+
+    `arrays` is what `build` produces and what a snapshot stores:
+
+    - `words`, `word_offsets`: the vocabulary (UTF-8 blob, int64 offsets), and
+      `word_hashes` (uint64, sorted) with `word_ids` (int32) to look words up,
+    - `posting_offsets` (int64) and `postings` (int32, sorted per word): the
+      items containing each word; `item_words` (int32): distinct words per item,
+    - `trigram_keys` (int64, sorted), `trigram_offsets` (int64) and
+      `trigram_words` (int32): the words containing each trigram;
+      `word_trigrams` (int32): distinct trigrams per word,
+    - `exact_hashes` (uint64, sorted) and `exact_items` (int32): exact map,
+    - `code_hashes` (uint64, sorted) and `code_items` (int32): code map,
+    - `type_ids` (uint8): index into `code_types` per item,
+    - `codes`, `descriptions` (uint8 UTF-8 blobs) with `code_offsets` and
+      `description_offsets` (int64).
+    """
+
+    ARRAYS = (
+        "words", "word_offsets", "word_hashes", "word_ids", "posting_offsets", "postings", "item_words",
+        "trigram_keys", "trigram_offsets", "trigram_words", "word_trigrams",
+        "exact_hashes", "exact_items", "code_hashes", "code_items", "type_ids",
+        "codes", "code_offsets", "descriptions", "description_offsets",
+    )
+
+    def __init__(self, arrays: Dict[str, Any], code_types: Sequence[str]):
+        missing = [name for name in self.ARRAYS if name not in arrays]
+        if missing:
+            raise ValueError(f"Code index is missing arrays: {', '.join(missing)}")
+        self.arrays = arrays
+        self.code_types = tuple(code_types)
+        self._size = len(arrays["item_words"])
+
+    @classmethod
+    def build(cls, items: Iterable[CatalogItem]) -> "CodeIndex":
+        np = _numpy()
+        items = list(items)
+        code_types = tuple(sorted({item.code_type for item in items}))
+        type_position = {code_type: i for i, code_type in enumerate(code_types)}
+
+        item_tokens = [normalize_tokens(item.description) for item in items]
+        vocabulary = sorted({token for tokens in item_tokens for token in tokens})
+        word_id = {word: i for i, word in enumerate(vocabulary)}
+        posting_offsets, postings = _csr(np, ([word_id[t] for t in tokens] for tokens in item_tokens), len(vocabulary))
+        word_trigrams = [trigrams(word) for word in vocabulary]
+        trigram_keys, trigram_offsets, trigram_words = _inverted(np, word_trigrams)
+
+        words, word_offsets = _blob(np, vocabulary)
+        word_hashes, word_ids = _hash_map(np, vocabulary)
+        exact_hashes, exact_items = _hash_map(np, (" ".join(sorted(tokens)) for tokens in item_tokens))
+        code_hashes, code_items = _hash_map(np, (code_key(item.code) for item in items))
+        codes, code_offsets = _blob(np, (item.code for item in items))
+        descriptions, description_offsets = _blob(np, (item.description for item in items))
+        arrays = {
+            "words": words,
+            "word_offsets": word_offsets,
+            "word_hashes": word_hashes,
+            "word_ids": word_ids,
+            "posting_offsets": posting_offsets,
+            "postings": postings,
+            "item_words": np.fromiter((len(t) for t in item_tokens), dtype=np.int32, count=len(items)),
+            "trigram_keys": trigram_keys,
+            "trigram_offsets": trigram_offsets,
+            "trigram_words": trigram_words,
+            "word_trigrams": np.fromiter((len(t) for t in word_trigrams), dtype=np.int32, count=len(vocabulary)),
+            "exact_hashes": exact_hashes,
+            "exact_items": exact_items,
+            "code_hashes": code_hashes,
+            "code_items": code_items,
+            "type_ids": np.fromiter((type_position[item.code_type] for item in items), dtype=np.uint8, count=len(items)),
+            "codes": codes,
+            "code_offsets": code_offsets,
+            "descriptions": descriptions,
+            "description_offsets": description_offsets,
+        }
+        return cls(arrays, code_types)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def item(self, position: int) -> CatalogItem:
+        a = self.arrays
+        return CatalogItem(
+            _text(a["codes"], a["code_offsets"], position),
+            self.code_types[int(a["type_ids"][position])],
+            _text(a["descriptions"], a["description_offsets"], position),
+        )
+
+    def get(self, code: str) -> Optional[CatalogItem]:
+        key = code_key(code)
+        for position in self._lookup("code_hashes", "code_items", key):
+            item = self.item(position)
+            if code_key(item.code) == key:
+                return item
+        return None
+
+    def search(
+        self, text: str, limit: int = 5, code_types: Optional[Sequence[str]] = None, min_score: float = 0.3
+    ) -> List[CodeCandidate]:
+        """Best `limit` catalog items for `text`, highest score first (1.0 for code and exact matches).
+
+        The default `min_score` is pg_trgm's default similarity threshold.
+        """
+        if not text.strip() or limit <= 0 or not self._size:
+            return []
+        allowed = self._type_filter(code_types)
+        found: Dict[int, Tuple[float, str]] = {}
+
+        key = code_key(text)
+        if _CODE.match(key.lower()):
+            for position in self._lookup("code_hashes", "code_items", key):
+                if code_key(self.item(position).code) == key:
+                    found[position] = (1.0, "code")
+        key = exact_key(text)
+        for position in self._lookup("exact_hashes", "exact_items", key):
+            if position not in found and exact_key(self.item(position).description) == key:
+                found[position] = (1.0, "exact")
+
+        tokens = normalize_tokens(text)
+        if tokens:
+            matches = [self._word_postings(token) for token in tokens]
+            positions, scores = self._score(matches, len(tokens), allowed, min_score, limit)
+            for position, score in zip(positions, scores):
+                found.setdefault(position, (round(score, 4), "fuzzy"))
+
+        results = []
+        for position, (score, match) in found.items():
+            item = self.item(position)
+            if allowed is None or item.code_type in code_types:
+                results.append(CodeCandidate(item.code, item.code_type, item.description, score, match))
+        results.sort(key=lambda c: (-c.score, len(c.description), c.code))
+        return results[:limit]
+
+    def _word_postings(self, token: str):
+        """`(items, weights)` for one query word: its catalog word, or the words it may misspell."""
+        np = _numpy()
+        a = self.arrays
+        for word in self._lookup("word_hashes", "word_ids", token):
+            if _text(a["words"], a["word_offsets"], word) == token:
+                return self._postings(word), None
+        query = np.asarray(trigrams(token), dtype=np.int64)
+        keys = a["trigram_keys"]
+        if not len(keys):
+            return np.empty(0, dtype=np.int32), None
+        slots = np.minimum(np.searchsorted(keys, query), len(keys) - 1)
+        slots = slots[keys[slots] == query].tolist()
+        if not slots:
+            return np.empty(0, dtype=np.int32), None
+        offsets, owners = a["trigram_offsets"], a["trigram_words"]
+        words, shared = np.unique(np.concatenate([owners[offsets[s]:offsets[s + 1]] for s in slots]), return_counts=True)
+        similarity = shared / (len(query) + a["word_trigrams"][words] - shared)
+        keep = np.flatnonzero(similarity >= _SPELLING_SIMILARITY)
+        keep = keep[np.argsort(-similarity[keep], kind="stable")[:_SPELLINGS]]
+        if not len(keep):
+            return np.empty(0, dtype=np.int32), None
+        items = np.concatenate([self._postings(w) for w in words[keep].tolist()])
+        weights = np.repeat(similarity[keep], [len(self._postings(w)) for w in words[keep].tolist()])
+        # An item containing several spellings counts its closest one.
+        order = np.lexsort((-weights, items))
+        items, weights = items[order], weights[order]
+        first = np.r_[True, items[1:] != items[:-1]]
+        return items[first], weights[first]
+
+    def _postings(self, word: int):
+        a = self.arrays
+        offsets = a["posting_offsets"]
+        return a["postings"][offsets[word]:offsets[word + 1]]
+
+    def _score(self, matches, q: int, allowed, min_score: float, limit: int):
+        """Best `limit` items scoring at least `min_score` against the query words' postings.
+
+        Word postings are short next to the catalog, so the matched weight is
+        accumulated densely, one vectorized add per query word.
+        """
+        np = _numpy()
+        a = self.arrays
+        shared = np.zeros(self._size)
+        for items, weights in matches:
+            shared[items] += 1.0 if weights is None else weights
+        # An item matching words of total weight `w` scores at most `w / q`.
+        candidates = np.flatnonzero(shared >= max(min_score * q - 1e-9, 1e-9))
+        if allowed is not None:
+            candidates = candidates[allowed[a["type_ids"][candidates]]]
+        # Several misspelled query words can match the same item word; an item
+        # cannot share more words than it has, which keeps fuzzy scores within 1.0.
+        common = np.minimum(shared[candidates], a["item_words"][candidates])
+        scores = (common / q + common / (q + a["item_words"][candidates] - common)) / 2
+        keep = scores >= min_score
+        candidates, scores = candidates[keep], scores[keep]
+        if len(candidates) > limit:
+            best = np.argpartition(-scores, limit - 1)[:limit]
+            candidates, scores = candidates[best], scores[best]
+        return candidates.tolist(), scores.tolist()
+
+    def _lookup(self, hashes_name: str, items_name: str, key: str) -> List[int]:
+        np = _numpy()
+        if not key:
+            return []
+        hashes = self.arrays[hashes_name]
+        target = np.uint64(_hash(key))
+        lo, hi = np.searchsorted(hashes, target, "left"), np.searchsorted(hashes, target, "right")
+        return self.arrays[items_name][lo:hi].tolist()
+
+    def _type_filter(self, code_types: Optional[Sequence[str]]):
+        if code_types is None:
+            return None
+        np = _numpy()
+        return np.array([code_type in code_types for code_type in self.code_types], dtype=bool)
+
+
+def _csr(np, rows: Iterable[List[int]], columns: int):
+    """Transpose rows of column ids into `(offsets, row ids)` per column, row ids ascending."""
+    rows = list(rows)
+    lengths = np.fromiter((len(r) for r in rows), dtype=np.int64, count=len(rows))
+    flat = np.fromiter((c for r in rows for c in r), dtype=np.int64, count=int(lengths.sum()))
+    owners = np.repeat(np.arange(len(rows), dtype=np.int32), lengths)
+    order = np.argsort(flat, kind="stable")
+    offsets = np.zeros(columns + 1, dtype=np.int64)
+    np.cumsum(np.bincount(flat, minlength=columns), out=offsets[1:])
+    return offsets, owners[order]
+
+
+def _inverted(np, rows: List[List[int]]):
+    """`(sorted keys, offsets, row ids)` for rows of integer keys."""
+    lengths = np.fromiter((len(r) for r in rows), dtype=np.int64, count=len(rows))
+    flat = np.fromiter((k for r in rows for k in r), dtype=np.int64, count=int(lengths.sum()))
+    owners = np.repeat(np.arange(len(rows), dtype=np.int32), lengths)
+    order = np.argsort(flat, kind="stable")
+    flat, owners = flat[order], owners[order]
+    starts = np.flatnonzero(np.r_[True, flat[1:] != flat[:-1]]) if len(flat) else np.empty(0, dtype=np.int64)
+    return flat[starts], np.append(starts, len(flat)).astype(np.int64), owners
+
+
+def _hash_map(np, keys: Iterable[str]):
+    hashes = np.fromiter((_hash(key) for key in keys), dtype=np.uint64)
+    order = np.argsort(hashes, kind="stable")
+    return hashes[order], order.astype(np.int32)
+
+
+def _blob(np, texts: Iterable[str]):
+    encoded = [text.encode("utf-8") for text in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _text(blob, offsets, position: int) -> str:
+    return blob[int(offsets[position]):int(offsets[position + 1])].tobytes().decode("utf-8")
+
+
+@dataclass(frozen=True)
+class SuggestedCode:
+    """A catalog code proposed for one extracted diagnosis or procedure."""
+
+    entity_group_name: str
+    entity_name: str
+    source_text: str
+    candidate: CodeCandidate
+
+    def row(self, patient_id: str, extracted_entity_id: Optional[str] = None) -> Dict[str, Any]:
+        """Column values for a new `code_suggestions` row; the Server assigns `Id` and `SuggestedAt`."""
+        return {
+            "PatientId": patient_id,
+            "ExtractedEntityId": extracted_entity_id,
+            "Code": self.candidate.code,
+            "CodeType": self.candidate.code_type,
+            "SourceText": self.source_text,
+            "Status": "Pending",
+        }
+
+
+def suggest_codes(
+    index: CodeSearch, payload: dict, limit: int = 3, min_score: float = 0.5
+) -> List[SuggestedCode]:
+    """Candidate codes for each diagnosis and procedure of an EntityExtractionResult."""
+    suggestions = []
+    for entity in payload["extracted_entities"]:
+        code_types = CODE_TYPES_BY_CATEGORY.get(entity["entity_group_name"].strip().casefold())
+        if code_types is None:
+            continue
+        # A value that is a catalog code ("E11.9") is taken as stated; otherwise it may
+        # qualify the name ("without complications"), so both are matched.
+        candidates = index.search(entity["entity_value"], limit, code_types, min_score=1.0)
+        if not candidates:
+            seen = set()
+            for query in (f'{entity["entity_name"]} {entity["entity_value"]}', entity["entity_name"]):
+                for candidate in index.search(query, limit, code_types, min_score):
+                    if candidate.code not in seen:
+                        seen.add(candidate.code)
+                        candidates.append(candidate)
+            candidates.sort(key=lambda c: -c.score)
+        source_text = entity.get("source_text") or f'{entity["entity_name"]} {entity["entity_value"]}'
+        suggestions.extend(
+            SuggestedCode(entity["entity_group_name"], entity["entity_name"], source_text, candidate)
+            for candidate in candidates[:limit]
+        )
+    return suggestions
+
+
+_CATALOG_SQL = 'SELECT "Code", "CodeType", "Description" FROM billing_code_catalog_items ORDER BY "Code"'
+
+
+def load_catalog(connect: Callable[[], Any]) -> List[CatalogItem]:
+    """Every `billing_code_catalog_items` row; `connect` returns a context-managed psycopg connection."""
+    with connect() as conn:
+        with conn.cursor() as cur:
+            cur.execute(_CATALOG_SQL)
+            return [CatalogItem(code, code_type, description) for code, code_type, description in cur.fetchall()]
+
+
+def build_code_index(connect: Callable[[], Any]) -> CodeIndex:
+    """Index built from the catalog table at startup."""
+    index = CodeIndex.build(load_catalog(connect))
+    logger.info("Built code index over %d catalog items", len(index))
+    return index
+
+
+def code_suggestion_stage(index: CodeSearch, config: CodeIndexConfig = CodeIndexConfig(), concurrency: int = 1) -> Stage:
+    """Pipeline `codes` stage: sets `artifacts['code_suggestions']` from `artifacts['entities']`."""
+
+    async def run(context: JobContext) -> None:
+        context.artifacts["code_suggestions"] = suggest_codes(
+            index, context.artifacts["entities"], config.top_n, config.min_score
+        )
+
+    return Stage("codes", run, concurrency=concurrency, outputs=("code_suggestions",))
@@ -2,11 +2,126 @@ import os
 from dataclasses import dataclass
 
 
+def _state_path(filename: str) -> str:
+    """Default location for worker state: `$XDG_STATE_HOME` (or `~/.local/state`) `/clinical-intelligence`."""
+    base = os.getenv("XDG_STATE_HOME") or os.path.join(os.path.expanduser("~"), ".local", "state")
+    return os.path.join(base, "clinical-intelligence", filename)
+
+
 @dataclass(frozen=True)
 class WorkerConfig:
     gemini_api_key: str
 
 
+@dataclass(frozen=True)
+class RabbitMqConfig:
+    host: str = "localhost"
+    port: int = 5672
+    username: str = "guest"
+    password: str = "guest"
+    virtual_host: str = "/"
+    queue: str = "document-processing"
+    dead_letter_queue: str = "document-processing-dlq"
+    exchange: str = "clinical-intelligence"
+    prefetch_count: int = 10
+    max_in_flight: int = 4
+    ack_batch_size: int = 10
+    ack_interval_seconds: float = 0.5
+
+
+@dataclass(frozen=True)
+class DocumentStorageConfig:
+    base_path: str = "./storage/documents"
+
+
+@dataclass(frozen=True)
+class DatabaseConfig:
+    connection_string: str
+
+
+@dataclass(frozen=True)
+class EmbeddingConfig:
+    model: str = "text-embedding-004"
+    dimensions: int = 768
+    cache_capacity: int = 10000
+    batch_max_texts: int = 100
+    batch_max_tokens: int = 20000
+    batch_max_wait_seconds: float = 0.05
+    max_concurrent_requests: int = 2
+    cache_precision: str = "float32"
+    column_type: str = "vector"
+
+
+@dataclass(frozen=True)
+class ParserPoolConfig:
+    pool_size: int = 2
+    task_timeout_seconds: float = 120.0
+    max_tasks_per_worker: int = 50
+
+
+@dataclass(frozen=True)
+class ExtractionConfig:
+    model: str = "gemini-2.5-flash"
+    context_token_budget: int = 24000
+    max_output_tokens: int = 8192
+
+
+@dataclass(frozen=True)
+class RetrievalConfig:
+    top_k: int = 10
+    hnsw_threshold: int = 2000
+    hnsw_m: int = 16
+    hnsw_ef_construction: int = 200
+    hnsw_ef_search: int = 64
+    index_precision: str = "float32"
+    rerank_factor: int = 4
+
+
+@dataclass(frozen=True)
+class SchedulerConfig:
+    default_class: str = "interactive"
+    interactive_max_in_flight: int = 4
+    bulk_max_in_flight: int = 4
+
+
+@dataclass(frozen=True)
+class LedgerConfig:
+    path: str = _state_path("stage-ledger.sqlite3")
+    retention_hours: float = 72.0
+
+
+@dataclass(frozen=True)
+class ExtractionCacheConfig:
+    path: str = _state_path("extraction-cache.sqlite3")
+    ttl_hours: float = 720.0
+    max_megabytes: float = 256.0
+
+
+@dataclass(frozen=True)
+class CodeIndexConfig:
+    top_n: int = 3
+    min_score: float = 0.5
+    snapshot_path: str = _state_path("code-index.snapshot")
+    refresh_seconds: float = 300.0
+
+
+@dataclass(frozen=True)
+class HealthConfig:
+    host: str = "0.0.0.0"
+    port: int = 8081
+
+
+@dataclass(frozen=True)
+class RateLimitConfig:
+    llm_model: str = "gemini-2.5-flash"
+    llm_requests_per_minute: int = 15
+    llm_tokens_per_day: int = 1_000_000
+    embedding_requests_per_minute: int = 15
+    embedding_tokens_per_day: int = 1_000_000
+    backend: str = "file"
+    state_path: str = _state_path("gemini-quota.json")
+
+
 def _repo_root() -> str:
     return os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 
@@ -30,3 +145,233 @@ def load_config() -> WorkerConfig:
         raise RuntimeError("Missing required configuration value 'GEMINI_API_KEY'.")
 
     return WorkerConfig(gemini_api_key=gemini_api_key)
+
+
+def _get_env(name: str, default: str) -> str:
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip()
+
+
+def _get_number_env(name: str, default, cast, minimum):
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        value = cast(raw.strip())
+    except ValueError:
+        raise RuntimeError(f"Invalid configuration value '{name}': expected a number, got '{raw}'.")
+    if value < minimum:
+        raise RuntimeError(f"Invalid configuration value '{name}': must be at least {minimum}.")
+    return value
+
+
+def load_rabbitmq_config() -> RabbitMqConfig:
+    _try_load_dotenv()
+
+    defaults = RabbitMqConfig()
+    return RabbitMqConfig(
+        host=_get_env("RABBITMQ_HOST", defaults.host),
+        port=_get_number_env("RABBITMQ_PORT", defaults.port, int, 1),
+        username=_get_env("RABBITMQ_USERNAME", defaults.username),
+        password=_get_env("RABBITMQ_PASSWORD", defaults.password),
+        virtual_host=_get_env("RABBITMQ_VIRTUAL_HOST", defaults.virtual_host),
+        queue=_get_env("RABBITMQ_DOCUMENT_PROCESSING_QUEUE", defaults.queue),
+        dead_letter_queue=_get_env("RABBITMQ_DEAD_LETTER_QUEUE", defaults.dead_letter_queue),
+        exchange=_get_env("RABBITMQ_EXCHANGE", defaults.exchange),
+        prefetch_count=_get_number_env("WORKER_PREFETCH_COUNT", defaults.prefetch_count, int, 1),
+        max_in_flight=_get_number_env("WORKER_MAX_IN_FLIGHT", defaults.max_in_flight, int, 1),
+        ack_batch_size=_get_number_env("WORKER_ACK_BATCH_SIZE", defaults.ack_batch_size, int, 1),
+        ack_interval_seconds=_get_number_env(
+            "WORKER_ACK_INTERVAL_SECONDS", defaults.ack_interval_seconds, float, 0.0
+        ),
+    )
+
+
+def load_parser_pool_config() -> ParserPoolConfig:
+    _try_load_dotenv()
+
+    defaults = ParserPoolConfig()
+    return ParserPoolConfig(
+        pool_size=_get_number_env("WORKER_PARSER_POOL_SIZE", defaults.pool_size, int, 0),
+        task_timeout_seconds=_get_number_env(
+            "WORKER_PARSE_TIMEOUT_SECONDS", defaults.task_timeout_seconds, float, 1.0
+        ),
+        max_tasks_per_worker=_get_number_env(
+            "WORKER_PARSER_MAX_TASKS_PER_WORKER", defaults.max_tasks_per_worker, int, 1
+        ),
+    )
+
+
+def load_document_storage_config() -> DocumentStorageConfig:
+    _try_load_dotenv()
+
+    return DocumentStorageConfig(
+        base_path=_get_env("DOCUMENT_STORAGE_BASE_PATH", DocumentStorageConfig().base_path),
+    )
+
+
+def load_database_config() -> DatabaseConfig:
+    _try_load_dotenv()
+
+    connection_string = os.getenv("DATABASE_CONNECTION_STRING")
+    if not connection_string or not connection_string.strip():
+        raise RuntimeError("Missing required configuration value 'DATABASE_CONNECTION_STRING'.")
+    return DatabaseConfig(connection_string=connection_string.strip())
+
+
+def load_embedding_config() -> EmbeddingConfig:
+    _try_load_dotenv()
+
+    defaults = EmbeddingConfig()
+    cache_precision = _get_env("WORKER_EMBEDDING_CACHE_PRECISION", defaults.cache_precision).lower()
+    if cache_precision not in ("float32", "float16", "int8"):
+        raise RuntimeError(
+            f"Invalid configuration value 'WORKER_EMBEDDING_CACHE_PRECISION': expected 'float32', 'float16' or 'int8', got '{cache_precision}'."
+        )
+    column_type = _get_env("WORKER_EMBEDDING_COLUMN_TYPE", defaults.column_type).lower()
+    if column_type not in ("vector", "halfvec"):
+        raise RuntimeError(
+            f"Invalid configuration value 'WORKER_EMBEDDING_COLUMN_TYPE': expected 'vector' or 'halfvec', got '{column_type}'."
+        )
+    return EmbeddingConfig(
+        model=_get_env("GEMINI_EMBEDDING_MODEL", defaults.model),
+        dimensions=defaults.dimensions,
+        cache_capacity=_get_number_env("WORKER_EMBEDDING_CACHE_SIZE", defaults.cache_capacity, int, 0),
+        batch_max_texts=_get_number_env("WORKER_EMBEDDING_BATCH_SIZE", defaults.batch_max_texts, int, 1),
+        batch_max_tokens=_get_number_env("WORKER_EMBEDDING_BATCH_TOKENS", defaults.batch_max_tokens, int, 1),
+        batch_max_wait_seconds=_get_number_env(
+            "WORKER_EMBEDDING_BATCH_WAIT_SECONDS", defaults.batch_max_wait_seconds, float, 0.0
+        ),
+        max_concurrent_requests=_get_number_env(
+            "WORKER_EMBEDDING_MAX_CONCURRENT_REQUESTS", defaults.max_concurrent_requests, int, 1
+        ),
+        cache_precision=cache_precision,
+        column_type=column_type,
+    )
+
+
+def load_rate_limit_config() -> RateLimitConfig:
+    _try_load_dotenv()
+
+    defaults = RateLimitConfig()
+    backend = _get_env("WORKER_RATE_LIMIT_BACKEND", defaults.backend).lower()
+    if backend not in ("file", "memory"):
+        raise RuntimeError(
+            f"Invalid configuration value 'WORKER_RATE_LIMIT_BACKEND': expected 'file' or 'memory', got '{backend}'."
+        )
+    return RateLimitConfig(
+        llm_model=_get_env("GEMINI_LLM_MODEL", defaults.llm_model),
+        llm_requests_per_minute=_get_number_env("GEMINI_LLM_RPM", defaults.llm_requests_per_minute, int, 1),
+        llm_tokens_per_day=_get_number_env("GEMINI_LLM_TOKENS_PER_DAY", defaults.llm_tokens_per_day, int, 1),
+        embedding_requests_per_minute=_get_number_env(
+            "GEMINI_EMBEDDING_RPM", defaults.embedding_requests_per_minute, int, 1
+        ),
+        embedding_tokens_per_day=_get_number_env(
+            "GEMINI_EMBEDDING_TOKENS_PER_DAY", defaults.embedding_tokens_per_day, int, 1
+        ),
+        backend=backend,
+        state_path=_get_env("WORKER_RATE_LIMIT_STATE_PATH", defaults.state_path),
+    )
+
+
+def load_scheduler_config() -> SchedulerConfig:
+    _try_load_dotenv()
+
+    defaults = SchedulerConfig()
+    default_class = _get_env("WORKER_DEFAULT_PRIORITY", defaults.default_class).lower()
+    if default_class not in ("interactive", "bulk"):
+        raise RuntimeError(
+            f"Invalid configuration value 'WORKER_DEFAULT_PRIORITY': expected 'interactive' or 'bulk', got '{default_class}'."
+        )
+    return SchedulerConfig(
+        default_class=default_class,
+        interactive_max_in_flight=_get_number_env(
+            "WORKER_INTERACTIVE_MAX_IN_FLIGHT", defaults.interactive_max_in_flight, int, 1
+        ),
+        bulk_max_in_flight=_get_number_env("WORKER_BULK_MAX_IN_FLIGHT", defaults.bulk_max_in_flight, int, 1),
+    )
+
+
+def load_ledger_config() -> LedgerConfig:
+    _try_load_dotenv()
+
+    defaults = LedgerConfig()
+    return LedgerConfig(
+        path=_get_env("WORKER_LEDGER_PATH", defaults.path),
+        retention_hours=_get_number_env("WORKER_LEDGER_RETENTION_HOURS", defaults.retention_hours, float, 0.0),
+    )
+
+
+def load_extraction_config() -> ExtractionConfig:
+    _try_load_dotenv()
+
+    defaults = ExtractionConfig()
+    return ExtractionConfig(
+        model=_get_env("GEMINI_LLM_MODEL", defaults.model),
+        context_token_budget=_get_number_env(
+            "WORKER_EXTRACTION_CONTEXT_TOKENS", defaults.context_token_budget, int, 1
+        ),
+        max_output_tokens=_get_number_env(
+            "WORKER_EXTRACTION_MAX_OUTPUT_TOKENS", defaults.max_output_tokens, int, 1
+        ),
+    )
+
+
+def load_extraction_cache_config() -> ExtractionCacheConfig:
+    _try_load_dotenv()
+
+    defaults = ExtractionCacheConfig()
+    return ExtractionCacheConfig(
+        path=_get_env("WORKER_EXTRACTION_CACHE_PATH", defaults.path),
+        ttl_hours=_get_number_env("WORKER_EXTRACTION_CACHE_TTL_HOURS", defaults.ttl_hours, float, 0.0),
+        max_megabytes=_get_number_env("WORKER_EXTRACTION_CACHE_MAX_MB", defaults.max_megabytes, float, 0.0),
+    )
+
+
+def load_code_index_config() -> CodeIndexConfig:
+    _try_load_dotenv()
+
+    defaults = CodeIndexConfig()
+    min_score = _get_number_env("WORKER_CODE_SUGGESTION_MIN_SCORE", defaults.min_score, float, 0.0)
+    if min_score > 1.0:
+        raise RuntimeError("Invalid configuration value 'WORKER_CODE_SUGGESTION_MIN_SCORE': must be at most 1.0.")
+    return CodeIndexConfig(
+        top_n=_get_number_env("WORKER_CODE_SUGGESTION_TOP_N", defaults.top_n, int, 1),
+        min_score=min_score,
+        snapshot_path=_get_env("WORKER_CODE_INDEX_SNAPSHOT", defaults.snapshot_path),
+        refresh_seconds=_get_number_env("WORKER_CODE_INDEX_REFRESH_SECONDS", defaults.refresh_seconds, float, 0.0),
+    )
+
+
+def load_health_config() -> HealthConfig:
+    _try_load_dotenv()
+
+    defaults = HealthConfig()
+    return HealthConfig(
+        host=_get_env("WORKER_HEALTH_HOST", defaults.host),
+        port=_get_number_env("WORKER_HEALTH_PORT", defaults.port, int, 0),
+    )
+
+
+def load_retrieval_config() -> RetrievalConfig:
+    _try_load_dotenv()
+
+    defaults = RetrievalConfig()
+    index_precision = _get_env("WORKER_INDEX_PRECISION", defaults.index_precision).lower()
+    if index_precision not in ("float32", "float16", "int8"):
+        raise RuntimeError(
+            f"Invalid configuration value 'WORKER_INDEX_PRECISION': expected 'float32', 'float16' or 'int8', got '{index_precision}'."
+        )
+    return RetrievalConfig(
+        top_k=_get_number_env("WORKER_RETRIEVAL_TOP_K", defaults.top_k, int, 1),
+        hnsw_threshold=_get_number_env("WORKER_HNSW_THRESHOLD", defaults.hnsw_threshold, int, 1),
+        hnsw_m=_get_number_env("WORKER_HNSW_M", defaults.hnsw_m, int, 2),
+        hnsw_ef_construction=_get_number_env(
+            "WORKER_HNSW_EF_CONSTRUCTION", defaults.hnsw_ef_construction, int, 1
+        ),
+        hnsw_ef_search=_get_number_env("WORKER_HNSW_EF_SEARCH", defaults.hnsw_ef_search, int, 1),
+        index_precision=index_precision,
+        rerank_factor=_get_number_env("WORKER_INDEX_RERANK_FACTOR", defaults.rerank_factor, int, 1),
+    )
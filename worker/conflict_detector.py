@@ -0,0 +1,364 @@
+"""Cross-document conflict detection for a patient's extracted entities (DR-009).
+
+Entities are bucketed by `patient_aggregate.entity_key` (normalized
+`entity_group_name` and `entity_name`) in a hash index, and values are only
+compared within a bucket. Each value is reduced to a comparable form first
+(`normalize_value`): dates become ISO dates, quantities are converted to a
+base unit (`0.5 g` and `500 mg` agree), and dose wording is canonicalized
+(`twice daily` is `bid`, `by mouth` is `po`). A bucket is a conflict when it
+holds at least two distinct normalized values from at least two documents.
+Detection is linear in the number of entities, not quadratic.
+
+`ConflictIndex.add_document` is the incremental mode: it replaces one
+document's entities and only re-checks the keys that document touches.
+`annotate_conflicts` writes the result into the document's payload as
+`conflicts` entries of the entity contract (`conflicting_value`,
+`source_document`, `document_location`).
+"""
+
+import asyncio
+import functools
+import re
+import uuid
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from patient_aggregate import entity_key
+from pipeline import JobContext, Stage
+
+
+# Conflict severity per category, using the ErdConflict levels. DOB, allergies
+# and medication doses are the critical fields (FR-058); labs and vitals change
+# between encounters, so their differences are only worth a look.
+SEVERITY_BY_CATEGORY: Dict[str, str] = {
+    "patient_demographics": "Critical",
+    "allergies": "High",
+    "medications": "High",
+    "diagnoses": "Medium",
+    "procedures": "Medium",
+    "labs": "Low",
+    "vitals": "Low",
+}
+DEFAULT_SEVERITY = "Medium"
+
+# unit -> (base unit, factor to the base unit)
+_UNITS: Dict[str, Tuple[str, float]] = {
+    "mg": ("mg", 1.0), "milligram": ("mg", 1.0), "milligrams": ("mg", 1.0),
+    "g": ("mg", 1000.0), "gm": ("mg", 1000.0), "gram": ("mg", 1000.0), "grams": ("mg", 1000.0),
+    "mcg": ("mg", 0.001), "ug": ("mg", 0.001), "µg": ("mg", 0.001), "microgram": ("mg", 0.001),
+    "micrograms": ("mg", 0.001),
+    "kg": ("kg", 1.0), "kilogram": ("kg", 1.0), "kilograms": ("kg", 1.0),
+    "lb": ("kg", 0.45359237), "lbs": ("kg", 0.45359237), "pound": ("kg", 0.45359237), "pounds": ("kg", 0.45359237),
+    "ml": ("ml", 1.0), "l": ("ml", 1000.0), "cc": ("ml", 1.0),
+    "cm": ("cm", 1.0), "mm": ("cm", 0.1), "m": ("cm", 100.0), "in": ("cm", 2.54), "inch": ("cm", 2.54),
+    "inches": ("cm", 2.54),
+    "unit": ("unit", 1.0), "units": ("unit", 1.0), "u": ("unit", 1.0), "iu": ("unit", 1.0),
+    "meq": ("meq", 1.0), "mmol": ("mmol", 1.0), "%": ("%", 1.0),
+    "bpm": ("/min", 1.0), "/min": ("/min", 1.0), "mg/dl": ("mg/dl", 1.0), "mmol/l": ("mmol/l", 1.0),
+    "mmhg": ("mmhg", 1.0),
+}
+_TEMPERATURE_UNITS = {"c": "c", "°c": "c", "degc": "c", "f": "f", "°f": "f", "degf": "f"}
+
+# Multi-word phrases first; applied to lower-cased text with periods between letters removed.
+_PHRASES: Sequence[Tuple[str, str]] = (
+    (r"\b(?:twice (?:a )?da(?:il)?y|two times (?:a |per )?day|2 times (?:a |per )?day|2x daily|every 12 hours|q12h)\b", "bid"),
+    (r"\b(?:three times (?:a |per )?day|3 times (?:a |per )?day|3x daily|every 8 hours|q8h)\b", "tid"),
+    (r"\b(?:four times (?:a |per )?day|4 times (?:a |per )?day|4x daily|every 6 hours|q6h)\b", "qid"),
+    (r"\b(?:once (?:a )?da(?:il)?y|every day|(?:1|one) times? (?:a |per )?day|daily|q24h|qday)\b", "qd"),
+    (r"\b(?:at bedtime|nightly|every night)\b", "qhs"),
+    (r"\b(?:as needed|when needed)\b", "prn"),
+    (r"\b(?:by mouth|orally|oral)\b", "po"),
+    (r"\b(?:intravenous(?:ly)?)\b", "iv"),
+    (r"\b(?:subcutaneous(?:ly)?|subq|sq)\b", "sc"),
+)
+_FILLER = {"take", "takes", "taking", "of", "a", "an", "the", "per", "dose", "doses"}
+
+_MONTHS = {m: i + 1 for i, m in enumerate(("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"))}
+_MONTH_NAME = r"(?P<month_name>jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)"
+_DATE_PATTERNS = (
+    re.compile(r"\b(?P<year>\d{4})-(?P<month>\d{1,2})-(?P<day>\d{1,2})(?:t[\d:.]+z?)?\b"),
+    re.compile(r"\b(?P<month>\d{1,2})[/-](?P<day>\d{1,2})[/-](?P<year>\d{4}|\d{2})\b"),
+    re.compile(r"\b" + _MONTH_NAME + r"\.? (?P<day>\d{1,2})(?:st|nd|rd|th)?,? (?P<year>\d{4})\b"),
+    re.compile(r"\b(?P<day>\d{1,2})(?:st|nd|rd|th)?[ -]" + _MONTH_NAME + r"\.?[ -,]+(?P<year>\d{4})\b"),
+)
+_RATIO = re.compile(r"(?<![\w.])(\d{2,3})\s*/\s*(\d{2,3})(?:\s*mm\s*hg\b)?(?![\w/])")
+_QUANTITY = re.compile(r"(?<![\w.:-])(\d+(?:\.\d+)?|\.\d+)\s*(°?[a-zµ%]+(?:/[a-z]+)?)?(?![\w.])")
+_INNER_PERIOD = re.compile(r"(?<=[a-z])\.(?=[a-z])|(?<=\b[a-z])\.(?=\s|$)")
+_TOKEN = re.compile(r"[a-z0-9µ%°/.:-]+")
+
+
+def _number(value: float) -> str:
+    return f"{round(value, 4):g}"
+
+
+def _date_token(match: "re.Match") -> str:
+    parts = match.groupdict()
+    try:
+        month = _MONTHS[parts["month_name"][:3]] if parts.get("month_name") else int(parts["month"])
+        year = int(parts["year"])
+        if year < 100:
+            year += 2000 if year <= date.today().year % 100 else 1900
+        return "date:" + date(year, month, int(parts["day"])).isoformat()
+    except (KeyError, ValueError):
+        return match.group(0)
+
+
+def _quantity_token(match: "re.Match") -> str:
+    number, unit = float(match.group(1)), (match.group(2) or "")
+    if unit in _TEMPERATURE_UNITS:
+        celsius = number if _TEMPERATURE_UNITS[unit] == "c" else (number - 32) * 5 / 9
+        return f"{round(celsius, 1):g}c"
+    if unit in _UNITS:
+        base, factor = _UNITS[unit]
+        return f"{_number(number * factor)}{base}"
+    return f"{_number(number)} {unit}".strip()
+
+
+@functools.lru_cache(maxsize=65536)
+def normalize_value(value: str) -> str:
+    """Comparable form of an entity value: ISO dates, base units, canonical dose wording.
+
+    Memoized: a patient's values repeat across documents.
+    """
+    text = " ".join(str(value).casefold().split())
+    text = _INNER_PERIOD.sub("", text)
+    for pattern in _DATE_PATTERNS:
+        text = pattern.sub(_date_token, text)
+    for pattern, replacement in _PHRASES:
+        text = re.sub(pattern, replacement, text)
+    text = _RATIO.sub(lambda m: f"{int(m.group(1))}/{int(m.group(2))}", text)
+    text = _QUANTITY.sub(_quantity_token, text)
+    tokens = [t.strip(".:-") for t in _TOKEN.findall(text)]
+    return " ".join(sorted(t for t in tokens if t and t not in _FILLER))
+
+
+@dataclass(frozen=True)
+class EntityRecord:
+    document_id: str
+    entity_group_name: str
+    entity_name: str
+    entity_value: str
+    document_location: Optional[dict] = None
+
+    @property
+    def key(self) -> str:
+        return entity_key(self.entity_group_name, self.entity_name)
+
+
+def entity_records(payload: dict) -> List[EntityRecord]:
+    """The entities of an EntityExtractionResult, without their LLM-reported conflicts."""
+    document_id = str(payload["document_id"])
+    return [
+        EntityRecord(
+            document_id,
+            entity["entity_group_name"],
+            entity["entity_name"],
+            entity["entity_value"],
+            entity.get("document_location"),
+        )
+        for entity in payload["extracted_entities"]
+    ]
+
+
+@dataclass(frozen=True)
+class ConflictGroup:
+    """Disagreeing values for one field of a patient."""
+
+    key: str
+    entity_group_name: str
+    entity_name: str
+    severity: str
+    values: Dict[str, Tuple[EntityRecord, ...]]
+
+    @property
+    def documents(self) -> Set[str]:
+        return {record.document_id for records in self.values.values() for record in records}
+
+    def conflicts_for(self, record: EntityRecord) -> List[dict]:
+        """`Conflict` entries for one entity: the other values, once per document that states them."""
+        own = normalize_value(record.entity_value)
+        conflicts = []
+        for normalized, records in self.values.items():
+            if normalized == own:
+                continue
+            seen = set()
+            for other in records:
+                if other.document_id in seen:
+                    continue
+                seen.add(other.document_id)
+                conflicts.append(_conflict(other))
+        return conflicts
+
+    def conflicting_values(self) -> List[dict]:
+        """One `Conflict` entry per value and document, e.g. for `ErdConflict.ConflictingValues`."""
+        entries = []
+        for records in self.values.values():
+            seen = set()
+            for record in records:
+                if record.document_id not in seen:
+                    seen.add(record.document_id)
+                    entries.append(_conflict(record))
+        return entries
+
+
+def _conflict(record: EntityRecord) -> dict:
+    conflict: Dict[str, Any] = {"conflicting_value": record.entity_value, "source_document": record.document_id}
+    if record.document_location:
+        conflict["document_location"] = record.document_location
+    return conflict
+
+
+class ConflictIndex:
+    """Hash index of a patient's entities: key -> normalized value -> records."""
+
+    def __init__(self, severity: Dict[str, str] = SEVERITY_BY_CATEGORY):
+        self._buckets: Dict[str, Dict[str, List[EntityRecord]]] = {}
+        self._document_keys: Dict[str, Set[str]] = {}
+        self._severity = severity
+
+    @classmethod
+    def from_records(cls, records: Iterable[EntityRecord], **kwargs) -> "ConflictIndex":
+        index = cls(**kwargs)
+        for record in records:
+            index._add(record)
+        return index
+
+    def __len__(self) -> int:
+        return sum(len(records) for bucket in self._buckets.values() for records in bucket.values())
+
+    def add_document(self, document_id: str, records: Sequence[EntityRecord]) -> List[ConflictGroup]:
+        """Replace a document's entities; returns the conflicts among the keys it touches."""
+        document_id = str(document_id)
+        previous = self.remove_document(document_id)
+        for record in records:
+            self._add(record)
+        return self.conflicts(previous | {record.key for record in records})
+
+    def remove_document(self, document_id: str) -> Set[str]:
+        """Drop a document's entities; returns the keys it had touched."""
+        keys = self._document_keys.pop(str(document_id), set())
+        for key in keys:
+            bucket = self._buckets[key]
+            for normalized in list(bucket):
+                remaining = [r for r in bucket[normalized] if r.document_id != document_id]
+                if remaining:
+                    bucket[normalized] = remaining
+                else:
+                    del bucket[normalized]
+            if not bucket:
+                del self._buckets[key]
+        return keys
+
+    def conflicts(self, keys: Optional[Iterable[str]] = None) -> List[ConflictGroup]:
+        """Conflicts among `keys`, or across every key."""
+        groups = []
+        for key in sorted(self._buckets if keys is None else set(keys)):
+            bucket = self._buckets.get(key)
+            if not bucket or len(bucket) < 2:
+                continue
+            documents = {r.document_id for records in bucket.values() for r in records}
+            if len(documents) < 2:
+                continue
+            first = next(iter(bucket.values()))[0]
+            groups.append(ConflictGroup(
+                key=key,
+                entity_group_name=first.entity_group_name,
+                entity_name=first.entity_name,
+                severity=self._severity.get(first.entity_group_name, DEFAULT_SEVERITY),
+                values={normalized: tuple(records) for normalized, records in bucket.items()},
+            ))
+        return groups
+
+    def _add(self, record: EntityRecord) -> None:
+        key = record.key
+        self._buckets.setdefault(key, {}).setdefault(normalize_value(record.entity_value), []).append(record)
+        self._document_keys.setdefault(record.document_id, set()).add(key)
+
+
+def annotate_conflicts(payload: dict, groups: Sequence[ConflictGroup]) -> dict:
+    """Copy of the payload with cross-document conflicts added to its entities' `conflicts`.
+
+    Conflicts the extraction already reported are kept; an entry with the
+    same normalized value and source document is not added twice.
+    """
+    document_id = str(payload["document_id"])
+    by_key = {group.key: group for group in groups}
+    entities = []
+    for entity in payload["extracted_entities"]:
+        entity = dict(entity)
+        group = by_key.get(entity_key(entity["entity_group_name"], entity["entity_name"]))
+        if group is not None:
+            record = EntityRecord(document_id, entity["entity_group_name"], entity["entity_name"], entity["entity_value"])
+            existing = list(entity.get("conflicts") or [])
+            seen = {
+                (normalize_value(c["conflicting_value"]), c.get("source_document", document_id)) for c in existing
+            }
+            for conflict in group.conflicts_for(record):
+                marker = (normalize_value(conflict["conflicting_value"]), conflict["source_document"])
+                if conflict["source_document"] != document_id and marker not in seen:
+                    seen.add(marker)
+                    existing.append(conflict)
+            if existing:
+                entity["conflicts"] = existing
+        entities.append(entity)
+    return {**payload, "extracted_entities": entities}
+
+
+_OTHER_DOCUMENTS_SQL = (
+    'SELECT c."DocumentId", v."Category", v."Name", v."Value", c."Page", c."Section" '
+    "FROM documents d "
+    'JOIN patient_entity_citations c ON c."PatientId" = d."PatientId" '
+    'JOIN patient_entity_values v ON v."PatientId" = c."PatientId" AND v."EntityKey" = c."EntityKey" '
+    'AND v."ValueKey" = c."ValueKey" '
+    'WHERE d."Id" = %s AND c."EntityKey" = ANY(%s) AND c."DocumentId" <> d."Id"'
+)
+
+
+class PgConflictSource:
+    """Loads the patient's other documents' values for given keys from the aggregate tables.
+
+    `connect` returns a context-managed psycopg connection. The tables are
+    created by the Server migration 20260117090000_AddPatientEntityAggregate.
+    """
+
+    def __init__(self, connect: Callable[[], Any]):
+        self._connect = connect
+
+    def other_documents(self, document_id: str, keys: Sequence[str]) -> List[EntityRecord]:
+        if not keys:
+            return []
+        with self._connect() as conn:
+            with conn.cursor() as cur:
+                cur.execute(_OTHER_DOCUMENTS_SQL, (uuid.UUID(str(document_id)), list(keys)))
+                return [
+                    EntityRecord(
+                        str(other_id), category, name, value,
+                        {k: v for k, v in (("page", page), ("section", section)) if v is not None} or None,
+                    )
+                    for other_id, category, name, value, page, section in cur.fetchall()
+                ]
+
+
+def detect_conflicts(payload: dict, others: Sequence[EntityRecord]) -> Tuple[dict, List[ConflictGroup]]:
+    """Incremental check of one document against the patient's other documents."""
+    records = entity_records(payload)
+    index = ConflictIndex.from_records(others)
+    groups = index.add_document(str(payload["document_id"]), records)
+    return annotate_conflicts(payload, groups), groups
+
+
+def conflict_stage(source: PgConflictSource, concurrency: int = 1) -> Stage:
+    """Pipeline `conflicts` stage: annotates `artifacts['entities']` and sets `artifacts['conflicts']`.
+
+    Runs between `extract` and `aggregate`: it compares the document with the
+    patient's other documents, which are already in the aggregate.
+    """
+
+    async def run(context: JobContext) -> None:
+        payload = context.artifacts["entities"]
+        keys = sorted({record.key for record in entity_records(payload)})
+        others = await asyncio.to_thread(source.other_documents, context.document_id, keys)
+        context.artifacts["entities"], context.artifacts["conflicts"] = detect_conflicts(payload, others)
+
+    return Stage("conflicts", run, concurrency=concurrency, outputs=("entities", "conflicts"))
@@ -0,0 +1,257 @@
+"""Long-running consumer for the document-processing queue.
+
+Deliveries are validated against the job contract on the consumer thread and
+handed to a bounded pool of handler threads. Acknowledgements are batched: the
+consumer acks (with multiple=True) the highest successfully processed delivery
+tag below which every delivery has been settled, once `ack_batch_size`
+deliveries are ready or `ack_interval_seconds` has passed; when the consumer
+goes idle, completions stuck behind a slower delivery are acked individually so
+they do not hold prefetch slots. Messages that fail schema validation or
+processing are rejected without requeue, which routes them to the dead-letter
+exchange (see contracts/jobs/v1/README.md).
+
+With a `FairScheduler`, valid deliveries are queued instead of started in
+arrival order, and handler slots go to the next job by priority class and
+uploader (see scheduler.py).
+
+All channel calls happen on the thread running `run()`, because broker channels
+(pika in particular) are not thread-safe.
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Optional
+
+from broker import Delivery
+from config import RabbitMqConfig
+from main import validate_job_payload
+from scheduler import FairScheduler, ScheduledJob
+
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[dict], None]
+
+_ACK = "ack"
+_REJECT = "reject"
+_SETTLED = "settled"
+
+
+@dataclass(frozen=True)
+class ConsumerStats:
+    received: int
+    processed: int
+    dead_lettered_invalid: int
+    dead_lettered_failed: int
+    ack_batches: int
+    in_flight: int
+    queued: int = 0
+
+
+class JobConsumer:
+    def __init__(
+        self,
+        channel,
+        handler: JobHandler,
+        config: RabbitMqConfig = RabbitMqConfig(),
+        poll_interval_seconds: float = 0.1,
+        scheduler: Optional[FairScheduler] = None,
+    ):
+        self._channel = channel
+        self._handler = handler
+        self._scheduler = scheduler
+        self._running: Dict[int, ScheduledJob] = {}
+        self._config = config
+        self._poll_interval = poll_interval_seconds
+        self._ack_batch_size = min(config.ack_batch_size, config.prefetch_count)
+
+        self._completions: "queue.Queue[tuple]" = queue.Queue()
+        self._stop = threading.Event()
+        self._pending: Deque[int] = deque()
+        self._outcomes: Dict[int, str] = {}
+        self._ack_upto: Optional[int] = None
+        self._ready_acks = 0
+        self._last_flush = time.monotonic()
+        self._in_flight = 0
+        self._outstanding = 0
+
+        self._received = 0
+        self._processed = 0
+        self._dead_lettered_invalid = 0
+        self._dead_lettered_failed = 0
+        self._ack_batches = 0
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> ConsumerStats:
+        return ConsumerStats(
+            received=self._received,
+            processed=self._processed,
+            dead_lettered_invalid=self._dead_lettered_invalid,
+            dead_lettered_failed=self._dead_lettered_failed,
+            ack_batches=self._ack_batches,
+            in_flight=self._in_flight,
+            queued=self._queued(),
+        )
+
+    def run(self, exit_when_idle: bool = False) -> ConsumerStats:
+        """Consume until stop() is called (or the queue is drained, if exit_when_idle)."""
+        self._channel.qos(self._config.prefetch_count)
+        self._channel.consume(self._config.queue)
+
+        with ThreadPoolExecutor(
+            max_workers=self._config.max_in_flight, thread_name_prefix="job-handler"
+        ) as pool:
+            try:
+                while not self._stop.is_set():
+                    self._settle_completions(block=False)
+                    self._flush_acks(force=self._prefetch_full())
+                    self._start_scheduled(pool)
+                    if self._prefetch_full() or (
+                        self._scheduler is None and self._in_flight >= self._config.max_in_flight
+                    ):
+                        self._settle_completions(block=True)
+                        continue
+
+                    delivery = self._channel.get_next(timeout=self._poll_interval)
+                    if delivery is None:
+                        self._flush_acks(force=True)
+                        if exit_when_idle and self._in_flight == 0 and not self._queued():
+                            break
+                        continue
+
+                    self._dispatch(delivery, pool)
+            finally:
+                while self._in_flight:
+                    self._settle_completions(block=True)
+                self._flush_acks(force=True)
+                self._channel.cancel()
+
+        return self.stats()
+
+    def _queued(self) -> int:
+        return len(self._scheduler) if self._scheduler is not None else 0
+
+    def _prefetch_full(self) -> bool:
+        return self._outstanding >= self._config.prefetch_count
+
+    def _dispatch(self, delivery: Delivery, pool: ThreadPoolExecutor) -> None:
+        self._received += 1
+        self._outstanding += 1
+        self._pending.append(delivery.delivery_tag)
+
+        try:
+            job = json.loads(delivery.body)
+            if not isinstance(job, dict):
+                raise ValueError("Invalid job payload: message body is not a JSON object")
+            validate_job_payload(job)
+        except ValueError as e:
+            logger.warning(
+                "Rejecting job message to DLX: delivery_tag=%s reason=%s", delivery.delivery_tag, e
+            )
+            self._dead_lettered_invalid += 1
+            self._settle(delivery.delivery_tag, _REJECT)
+            return
+
+        if self._scheduler is not None:
+            self._scheduler.push(job, delivery.delivery_tag)
+            self._start_scheduled(pool)
+            return
+
+        self._in_flight += 1
+        pool.submit(self._handle, delivery.delivery_tag, job)
+
+    def _start_scheduled(self, pool: ThreadPoolExecutor) -> None:
+        """Start queued jobs in scheduler order while handler slots are free."""
+        if self._scheduler is None:
+            return
+        while self._in_flight < self._config.max_in_flight:
+            scheduled = self._scheduler.pop()
+            if scheduled is None:
+                return
+            self._running[scheduled.token] = scheduled
+            self._in_flight += 1
+            pool.submit(self._handle, scheduled.token, scheduled.job)
+
+    def _handle(self, delivery_tag: int, job: dict) -> None:
+        try:
+            self._handler(job)
+        except Exception:
+            logger.exception(
+                "Job processing failed: job_id=%s document_id=%s", job.get("job_id"), job.get("document_id")
+            )
+            self._completions.put((delivery_tag, _REJECT))
+        else:
+            self._completions.put((delivery_tag, _ACK))
+
+    def _settle_completions(self, block: bool) -> None:
+        try:
+            first = self._completions.get(timeout=self._poll_interval) if block else self._completions.get_nowait()
+        except queue.Empty:
+            return
+
+        completion = first
+        while True:
+            delivery_tag, outcome = completion
+            self._in_flight -= 1
+            scheduled = self._running.pop(delivery_tag, None)
+            if scheduled is not None:
+                self._scheduler.finish(scheduled)
+            if outcome == _ACK:
+                self._processed += 1
+            else:
+                self._dead_lettered_failed += 1
+            self._settle(delivery_tag, outcome)
+            try:
+                completion = self._completions.get_nowait()
+            except queue.Empty:
+                return
+
+    def _settle(self, delivery_tag: int, outcome: str) -> None:
+        if outcome == _REJECT:
+            self._channel.reject(delivery_tag, requeue=False)
+            self._outstanding -= 1
+            outcome = _SETTLED
+        self._outcomes[delivery_tag] = outcome
+        self._advance()
+
+    def _advance(self) -> None:
+        while self._pending and self._pending[0] in self._outcomes:
+            tag = self._pending.popleft()
+            if self._outcomes.pop(tag) == _ACK:
+                self._ack_upto = tag
+                self._ready_acks += 1
+
+    def _flush_acks(self, force: bool = False) -> None:
+        if force:
+            for tag, outcome in list(self._outcomes.items()):
+                if outcome == _ACK:
+                    self._channel.ack(tag, multiple=False)
+                    self._outstanding -= 1
+                    self._outcomes[tag] = _SETTLED
+
+        if self._ack_upto is None:
+            self._last_flush = time.monotonic()
+            return
+
+        due = (
+            force
+            or self._ready_acks >= self._ack_batch_size
+            or time.monotonic() - self._last_flush >= self._config.ack_interval_seconds
+        )
+        if not due:
+            return
+
+        self._channel.ack(self._ack_upto, multiple=True)
+        self._outstanding -= self._ready_acks
+        self._ack_batches += 1
+        self._ack_upto = None
+        self._ready_acks = 0
+        self._last_flush = time.monotonic()
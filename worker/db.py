@@ -0,0 +1,74 @@
+"""PostgreSQL connectivity for the worker.
+
+The worker shares `DATABASE_CONNECTION_STRING` with the Backend API, which uses
+the Npgsql `Key=Value;` format; it is translated to a libpq DSN for psycopg.
+"""
+
+from typing import Dict
+
+from config import DatabaseConfig
+
+
+_NPGSQL_KEYS: Dict[str, str] = {
+    "host": "host",
+    "server": "host",
+    "port": "port",
+    "database": "dbname",
+    "username": "user",
+    "user id": "user",
+    "userid": "user",
+    "password": "password",
+    "ssl mode": "sslmode",
+    "sslmode": "sslmode",
+    "timeout": "connect_timeout",
+}
+
+
+def to_libpq_dsn(connection_string: str) -> str:
+    """Translate an Npgsql connection string to a libpq DSN; URIs pass through unchanged."""
+    if connection_string.startswith(("postgres://", "postgresql://")):
+        return connection_string
+
+    parts = []
+    for item in connection_string.split(";"):
+        if not item.strip():
+            continue
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"Invalid connection string segment: '{item.strip()}'")
+        libpq_key = _NPGSQL_KEYS.get(key.strip().lower())
+        if libpq_key is None:
+            continue
+        value = value.strip()
+        if libpq_key == "sslmode":
+            value = value.lower()
+        escaped = value.replace("\\", "\\\\").replace("'", "\\'")
+        parts.append(f"{libpq_key}='{escaped}'")
+    return " ".join(parts)
+
+
+def connect(config: DatabaseConfig):
+    try:
+        import psycopg
+    except ModuleNotFoundError as e:
+        raise ModuleNotFoundError(
+            "Missing dependency 'psycopg'. Install worker requirements with: pip install -r worker/requirements.txt"
+        ) from e
+
+    return psycopg.connect(to_libpq_dsn(config.connection_string))
+
+
+def create_pool(config: DatabaseConfig, size: int):
+    """Open a fixed-size psycopg connection pool; use `pool.connection` as a connect callable.
+
+    Size it to the number of stage workers that hold a connection at once (e.g.
+    the `persist_chunks` concurrency plus the embedding store lookups).
+    """
+    try:
+        from psycopg_pool import ConnectionPool
+    except ModuleNotFoundError as e:
+        raise ModuleNotFoundError(
+            "Missing dependency 'psycopg-pool'. Install worker requirements with: pip install -r worker/requirements.txt"
+        ) from e
+
+    return ConnectionPool(to_libpq_dsn(config.connection_string), min_size=size, max_size=size, name="worker", open=True)
@@ -0,0 +1,41 @@
+"""Page-streaming loader for stored documents referenced by processing jobs.
+
+Resolves the job payload's `storagePath` (relative to the document storage base
+path, as written by the Backend API's `LocalFileStorageService`) and returns a
+lazy page iterator, so the chunker can consume page 1 before the last page has
+been parsed.
+"""
+
+import os
+from typing import Iterator
+
+from config import DocumentStorageConfig
+from document_parser import ParsedPage, iter_document_pages
+from pipeline import JobContext, Stage
+
+
+def resolve_storage_path(base_path: str, storage_path: str) -> str:
+    """Return the absolute path for a stored document, rejecting path traversal."""
+    root = os.path.abspath(base_path)
+    path = os.path.abspath(os.path.join(root, storage_path))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f"Storage path escapes the document storage root: {storage_path}")
+    return path
+
+
+def open_job_pages(job: dict, config: DocumentStorageConfig = DocumentStorageConfig()) -> Iterator[ParsedPage]:
+    """Open the job's document for streaming; missing files fail here rather than mid-stream."""
+    payload = job.get("payload") or {}
+    path = resolve_storage_path(config.base_path, payload["storagePath"])
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"Document not found in storage: {payload['storagePath']}")
+    return iter_document_pages(path, payload["mimeType"])
+
+
+def load_stage(config: DocumentStorageConfig = DocumentStorageConfig()) -> Stage:
+    """Pipeline `load` stage that sets `artifacts['pages']` to a lazy page iterator."""
+
+    async def run(context: JobContext) -> None:
+        context.artifacts["pages"] = open_job_pages(context.job, config)
+
+    return Stage("load", run, checkpoint=False)
@@ -0,0 +1,181 @@
+"""Text extraction for uploaded PDF and DOCX documents.
+
+PDFs are read with pypdf, the library behind LangChain's `PyPDFLoader`; DOCX
+body text is streamed straight from `word/document.xml` with the standard
+library. `iter_document_pages` yields pages one at a time (PDFs are
+memory-mapped), so downstream stages can start on page 1 while later pages are
+still unparsed and memory use does not grow with file size.
+Parsing is CPU-bound; run it through `parser_pool.ParserPool` or a thread
+rather than on the event loop.
+"""
+
+import mmap
+import zipfile
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+from xml.etree import ElementTree
+
+
+PDF_MIME_TYPE = "application/pdf"
+DOCX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+_PDF_INHERITABLE = ("/Resources", "/MediaBox", "/CropBox", "/Rotate")
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+@dataclass(frozen=True)
+class TextSpan:
+    """A run of text and its origin in PDF user space (points, origin bottom-left)."""
+
+    text: str
+    x: float
+    y: float
+
+
+@dataclass(frozen=True)
+class ParsedPage:
+    page_number: int
+    text: str
+    width: Optional[float] = None
+    height: Optional[float] = None
+    spans: Tuple[TextSpan, ...] = ()
+
+
+class UnsupportedDocumentError(ValueError):
+    pass
+
+
+def _missing_dependency(name: str) -> ModuleNotFoundError:
+    return ModuleNotFoundError(
+        f"Missing dependency '{name}'. Install worker requirements with: pip install -r worker/requirements.txt"
+    )
+
+
+def _release(mapped: mmap.mmap) -> None:
+    # Drop pages already read from this process's mapping; they stay in the page cache.
+    if hasattr(mmap, "MADV_DONTNEED"):
+        mapped.madvise(mmap.MADV_DONTNEED)
+
+
+def _walk_page_tree(reader, node_ref, inherited: dict, visited: Optional[set] = None):
+    from pypdf import PageObject
+    from pypdf.generic import IndirectObject, NameObject
+
+    # A malformed /Kids entry can point back up the tree; visit each object once.
+    visited = set() if visited is None else visited
+    if isinstance(node_ref, IndirectObject):
+        if (node_ref.idnum, node_ref.generation) in visited:
+            return
+        visited.add((node_ref.idnum, node_ref.generation))
+
+    node = node_ref.get_object()
+    if "/Kids" in node:
+        inherited = {**inherited, **{key: node[key] for key in _PDF_INHERITABLE if key in node}}
+        for kid in node["/Kids"]:
+            yield from _walk_page_tree(reader, kid, inherited, visited)
+        return
+
+    page = PageObject(reader, node_ref)
+    page.update(node)
+    for key, value in inherited.items():
+        if key not in page:
+            page[NameObject(key)] = value
+    yield page
+
+
+def _pdf_page(page_number: int, page) -> ParsedPage:
+    spans = []
+
+    def visit(text, cm, tm, font_dict, font_size):
+        if text.strip():
+            x = tm[4] * cm[0] + tm[5] * cm[2] + cm[4]
+            y = tm[4] * cm[1] + tm[5] * cm[3] + cm[5]
+            spans.append(TextSpan(text=text.strip(), x=round(float(x), 2), y=round(float(y), 2)))
+
+    text = page.extract_text(visitor_text=visit) or ""
+    box = page.mediabox
+    return ParsedPage(
+        page_number=page_number,
+        text=text,
+        width=float(box.width),
+        height=float(box.height),
+        spans=tuple(spans),
+    )
+
+
+def iter_pdf_pages(path: str) -> Iterator[ParsedPage]:
+    try:
+        from pypdf import PdfReader
+    except ModuleNotFoundError as e:
+        raise _missing_dependency("pypdf") from e
+
+    with open(path, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        reader = PdfReader(mapped)
+        # reader.pages would flatten and cache the whole page tree; walk it lazily
+        # instead and drop resolved objects after each page. `resolved_objects` is
+        # pypdf's internal object cache; without it pages are still parsed, only
+        # memory is no longer bounded.
+        resolved = getattr(reader, "resolved_objects", None)
+        pages_ref = reader.trailer["/Root"].raw_get("/Pages")
+        for page_number, page in enumerate(_walk_page_tree(reader, pages_ref, {}), start=1):
+            parsed = _pdf_page(page_number, page)
+            if resolved is not None:
+                resolved.clear()
+            _release(mapped)
+            yield parsed
+
+
+def iter_docx_pages(path: str) -> Iterator[ParsedPage]:
+    """Yield DOCX text split at explicit and last-rendered page breaks.
+
+    DOCX has no fixed layout, so pages carry no coordinates and page numbers
+    follow the breaks Word recorded when the file was last saved.
+    """
+    # The archive member is decompressed and parsed incrementally; only the
+    # current page's paragraphs are held in memory.
+    with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as document:
+        page_number = 1
+        paragraphs: List[str] = []
+        runs: List[str] = []
+
+        for event, element in ElementTree.iterparse(document, events=("start", "end")):
+            tag = element.tag
+            if event == "start":
+                is_break = tag == f"{_W}lastRenderedPageBreak" or (
+                    tag == f"{_W}br" and element.get(f"{_W}type") == "page"
+                )
+                # Word records a lastRenderedPageBreak right after an explicit break
+                # too; a break with no text gathered since the last one starts no page.
+                if is_break:
+                    text = "\n".join(paragraphs + ["".join(runs)]).strip()
+                    if text:
+                        yield ParsedPage(page_number=page_number, text=text)
+                        page_number += 1
+                        paragraphs = []
+                        runs = []
+                continue
+
+            if tag == f"{_W}t":
+                runs.append(element.text or "")
+            elif tag == f"{_W}tab":
+                runs.append("\t")
+            elif tag == f"{_W}p":
+                paragraphs.append("".join(runs))
+                runs = []
+                element.clear()
+
+        text = "\n".join(paragraphs).strip()
+        if text or page_number == 1:
+            yield ParsedPage(page_number=page_number, text=text)
+
+
+def iter_document_pages(path: str, mime_type: str) -> Iterator[ParsedPage]:
+    if mime_type == PDF_MIME_TYPE:
+        return iter_pdf_pages(path)
+    if mime_type == DOCX_MIME_TYPE:
+        return iter_docx_pages(path)
+    raise UnsupportedDocumentError(f"Unsupported document type: {mime_type}")
+
+
+def parse_document(path: str, mime_type: str) -> List[ParsedPage]:
+    return list(iter_document_pages(path, mime_type))
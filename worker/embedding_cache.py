@@ -0,0 +1,206 @@
+"""Content-addressed embedding cache keyed by ChunkHash.
+
+Chunks are resolved in three tiers: an in-process LRU, then one bulk lookup of
+embeddings already stored in `document_chunks` (ix_document_chunks_chunk_hash),
+and only the remaining misses are sent to the embedding model. Repeated
+boilerplate (letterheads, consent text, lab footers) therefore costs one
+embedding call ever, which stretches the free-tier token budget.
+
+The in-process tier can hold entries as float16 or int8 (`cache_precision`)
+to fit more embeddings in memory; hits are decoded back to float32. Those
+decoded vectors are approximations, so `embed_chunks` only returns them with
+`exact=False`. The `embed` stage, whose vectors `persist_chunks` writes to
+pgvector, always gets the model's vectors: with a quantized tier its chunks
+are looked up in the store or embedded, as if the memory tier missed.
+"""
+
+import asyncio
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Generic, List, Optional, Protocol, Sequence, TypeVar, Union
+
+from chunker import Chunk
+from config import EmbeddingConfig
+from pipeline import JobContext, Stage
+from quantization import FLOAT32, bytes_per_vector, check_precision, decode_vector, encode_vector
+
+
+logger = logging.getLogger(__name__)
+
+EmbedFn = Callable[[List[str]], Awaitable[List[Sequence[float]]]]
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class EmbeddingStore(Protocol):
+    def fetch_embeddings(self, chunk_hashes: Sequence[str]) -> Dict[str, Sequence[float]]:
+        ...
+
+
+@dataclass(frozen=True)
+class EmbeddingCacheStats:
+    lookups: int
+    memory_hits: int
+    store_hits: int
+    misses: int
+    store_errors: int
+    tokens_saved: int
+    tokens_embedded: int
+    cached: int
+    cached_bytes: int
+
+    @property
+    def hit_ratio(self) -> float:
+        return (self.memory_hits + self.store_hits) / self.lookups if self.lookups else 0.0
+
+
+class LruCache(Generic[K, V]):
+    """Thread-safe bounded LRU map; capacity 0 disables caching."""
+
+    def __init__(self, capacity: int):
+        self._capacity = capacity
+        self._items: "OrderedDict[K, V]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: K) -> Optional[V]:
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key: K, value: V) -> None:
+        if self._capacity <= 0:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self._capacity:
+                self._items.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+
+class EmbeddingCache:
+    def __init__(
+        self,
+        embed: EmbedFn,
+        store: Optional[EmbeddingStore] = None,
+        config: EmbeddingConfig = EmbeddingConfig(),
+    ):
+        self._embed = embed
+        self._store = store
+        self._dimensions = config.dimensions
+        self._precision = check_precision(config.cache_precision)
+        self._memory: LruCache[str, Union[array, bytes]] = LruCache(config.cache_capacity)
+        self._lock = threading.Lock()
+        self._lookups = 0
+        self._memory_hits = 0
+        self._store_hits = 0
+        self._misses = 0
+        self._store_errors = 0
+        self._tokens_saved = 0
+        self._tokens_embedded = 0
+
+    async def embed_chunks(self, chunks: Sequence[Chunk], exact: bool = True) -> List[array]:
+        """Return one float32 vector per chunk, in order.
+
+        With `exact=False`, hits in a float16 or int8 memory tier are returned
+        decoded, with their rounding error.
+        """
+        results: List[Optional[array]] = [None] * len(chunks)
+        pending: Dict[str, List[int]] = {}
+        memory_hits = tokens_saved = 0
+        use_memory = not exact or self._precision == FLOAT32
+
+        for i, chunk in enumerate(chunks):
+            encoded = self._memory.get(chunk.chunk_hash) if use_memory else None
+            if encoded is not None:
+                results[i] = decode_vector(encoded, self._precision)
+                memory_hits += 1
+                tokens_saved += chunk.token_count
+            else:
+                pending.setdefault(chunk.chunk_hash, []).append(i)
+
+        store_hits = store_errors = 0
+        if pending and self._store is not None:
+            try:
+                found = await asyncio.to_thread(self._store.fetch_embeddings, list(pending))
+            except Exception as e:
+                logger.warning("Embedding store lookup failed; embedding %d chunks instead: %s", len(pending), e)
+                store_errors = 1
+                found = {}
+            for chunk_hash, vector in found.items():
+                indexes = pending.pop(chunk_hash, None)
+                if indexes is None:
+                    continue
+                vector = self._remember(chunk_hash, vector)
+                for i in indexes:
+                    results[i] = vector
+                    store_hits += 1
+                    tokens_saved += chunks[i].token_count
+
+        misses = tokens_embedded = 0
+        if pending:
+            groups = list(pending.items())
+            vectors = await self._embed([chunks[indexes[0]].text for _, indexes in groups])
+            if len(vectors) != len(groups):
+                raise ValueError(f"Embedding model returned {len(vectors)} vectors for {len(groups)} texts")
+            for (chunk_hash, indexes), vector in zip(groups, vectors):
+                vector = self._remember(chunk_hash, vector)
+                misses += 1
+                tokens_embedded += chunks[indexes[0]].token_count
+                # Identical chunks within the batch share the single embedding call.
+                for i in indexes:
+                    results[i] = vector
+                for i in indexes[1:]:
+                    memory_hits += 1
+                    tokens_saved += chunks[i].token_count
+
+        with self._lock:
+            self._lookups += len(chunks)
+            self._memory_hits += memory_hits
+            self._store_hits += store_hits
+            self._misses += misses
+            self._store_errors += store_errors
+            self._tokens_saved += tokens_saved
+            self._tokens_embedded += tokens_embedded
+        return results
+
+    def stats(self) -> EmbeddingCacheStats:
+        cached = len(self._memory)
+        with self._lock:
+            return EmbeddingCacheStats(
+                lookups=self._lookups,
+                memory_hits=self._memory_hits,
+                store_hits=self._store_hits,
+                misses=self._misses,
+                store_errors=self._store_errors,
+                tokens_saved=self._tokens_saved,
+                tokens_embedded=self._tokens_embedded,
+                cached=cached,
+                cached_bytes=cached * bytes_per_vector(self._dimensions, self._precision),
+            )
+
+    def _remember(self, chunk_hash: str, vector: Sequence[float]) -> array:
+        if not isinstance(vector, array) or vector.typecode != "f":
+            vector = array("f", vector)
+        if len(vector) != self._dimensions:
+            raise ValueError(f"Expected {self._dimensions}-d embedding for chunk {chunk_hash}, got {len(vector)}")
+        self._memory.put(chunk_hash, encode_vector(vector, self._precision))
+        return vector
+
+
+def embed_stage(cache: EmbeddingCache, concurrency: int = 1) -> Stage:
+    """Pipeline `embed` stage: sets `artifacts['embeddings']` aligned with `artifacts['chunks']`."""
+
+    async def run(context: JobContext) -> None:
+        context.artifacts["embeddings"] = await cache.embed_chunks(context.artifacts["chunks"])
+
+    return Stage("embed", run, concurrency=concurrency, outputs=("embeddings",))
@@ -0,0 +1,233 @@
+"""Gemini embedding client and a cross-job request batcher.
+
+`GeminiEmbeddingClient` calls the `batchEmbedContents` REST endpoint.
+`EmbeddingBatcher` sits in front of it and coalesces texts from concurrent
+jobs into shared requests, bounded by text count and estimated tokens. A batch
+is sent as soon as it is full or once its oldest text has waited
+`batch_max_wait_seconds`, and each caller gets back exactly its own vectors.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple
+
+from chunker import regex_tokenize
+from config import EmbeddingConfig
+from metrics import HistogramSnapshot, LatencyHistogram
+
+
+logger = logging.getLogger(__name__)
+
+GEMINI_API_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+
+EmbedFn = Callable[[List[str]], Awaitable[List[Sequence[float]]]]
+
+
+class EmbeddingApiError(RuntimeError):
+    def __init__(self, status: int, message: str):
+        super().__init__(f"Embedding request failed with HTTP {status}: {message}")
+        self.status = status
+
+
+class GeminiEmbeddingClient:
+    def __init__(
+        self,
+        api_key: str,
+        config: EmbeddingConfig = EmbeddingConfig(),
+        base_url: str = GEMINI_API_BASE_URL,
+        timeout_seconds: float = 30.0,
+        task_type: str = "RETRIEVAL_DOCUMENT",
+    ):
+        self._api_key = api_key
+        self._model = config.model
+        self._url = f"{base_url.rstrip('/')}/models/{config.model}:batchEmbedContents"
+        self._timeout = timeout_seconds
+        self._task_type = task_type
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return await asyncio.to_thread(self._post, texts)
+
+    def _post(self, texts: List[str]) -> List[List[float]]:
+        body = json.dumps({
+            "requests": [
+                {
+                    "model": f"models/{self._model}",
+                    "content": {"parts": [{"text": text}]},
+                    "taskType": self._task_type,
+                }
+                for text in texts
+            ]
+        }).encode("utf-8")
+        request = urllib.request.Request(
+            self._url,
+            data=body,
+            method="POST",
+            headers={"Content-Type": "application/json", "x-goog-api-key": self._api_key},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self._timeout) as response:
+                payload = json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise EmbeddingApiError(e.code, e.read().decode("utf-8", "replace")[:500]) from e
+
+        embeddings = payload.get("embeddings") or []
+        if len(embeddings) != len(texts):
+            raise EmbeddingApiError(200, f"expected {len(texts)} embeddings, got {len(embeddings)}")
+        return [embedding["values"] for embedding in embeddings]
+
+
+def estimate_tokens(text: str) -> int:
+    return sum(1 for _ in regex_tokenize(text))
+
+
+@dataclass(frozen=True)
+class EmbeddingBatcherStats:
+    requests: int
+    texts: int
+    failed_requests: int
+    size_flushes: int
+    deadline_flushes: int
+    pending: int
+    request_latency: HistogramSnapshot
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.texts / self.requests if self.requests else 0.0
+
+
+_Item = Tuple[str, int, asyncio.Future]
+
+
+class EmbeddingBatcher:
+    """Coalesces `embed(texts)` calls from concurrent jobs into shared requests.
+
+    Must be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        embed: EmbedFn,
+        config: EmbeddingConfig = EmbeddingConfig(),
+        count_tokens: Callable[[str], int] = estimate_tokens,
+    ):
+        self._embed = embed
+        self._max_texts = config.batch_max_texts
+        self._max_tokens = config.batch_max_tokens
+        self._max_wait = config.batch_max_wait_seconds
+        self._count_tokens = count_tokens
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._max_concurrent = config.max_concurrent_requests
+        self._pending: List[_Item] = []
+        self._pending_tokens = 0
+        self._deadline: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._texts = 0
+        self._failed_requests = 0
+        self._size_flushes = 0
+        self._deadline_flushes = 0
+        self._latency = LatencyHistogram()
+
+    async def embed(self, texts: List[str]) -> List[Sequence[float]]:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrent)
+
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            futures.append(future)
+            self._pending.append((text, self._count_tokens(text), future))
+            self._pending_tokens += self._pending[-1][1]
+            while self._is_full():
+                self._size_flushes += 1
+                self._flush(loop)
+
+        if self._pending and self._deadline is None:
+            self._deadline = loop.call_later(self._max_wait, self._on_deadline, loop)
+        return list(await asyncio.gather(*futures))
+
+    async def close(self) -> None:
+        """Send anything still pending and wait for in-flight requests."""
+        if self._pending:
+            self._flush(asyncio.get_running_loop())
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> EmbeddingBatcherStats:
+        with self._lock:
+            return EmbeddingBatcherStats(
+                requests=self._requests,
+                texts=self._texts,
+                failed_requests=self._failed_requests,
+                size_flushes=self._size_flushes,
+                deadline_flushes=self._deadline_flushes,
+                pending=len(self._pending),
+                request_latency=self._latency.snapshot(),
+            )
+
+    def _is_full(self) -> bool:
+        return len(self._pending) >= self._max_texts or (
+            self._pending_tokens >= self._max_tokens and len(self._pending) > 1
+        )
+
+    def _on_deadline(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._deadline = None
+        while self._pending:
+            self._deadline_flushes += 1
+            self._flush(loop)
+
+    def _flush(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Move the largest prefix of pending texts that fits both limits into one request."""
+        batch: List[_Item] = []
+        tokens = 0
+        for item in self._pending:
+            if batch and (len(batch) >= self._max_texts or tokens + item[1] > self._max_tokens):
+                break
+            batch.append(item)
+            tokens += item[1]
+        self._pending = self._pending[len(batch):]
+        self._pending_tokens -= tokens
+
+        if self._deadline is not None and not self._pending:
+            self._deadline.cancel()
+            self._deadline = None
+
+        task = loop.create_task(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: List[_Item]) -> None:
+        async with self._semaphore:
+            started = time.perf_counter()
+            try:
+                vectors = await self._embed([text for text, _, _ in batch])
+                if len(vectors) != len(batch):
+                    raise EmbeddingApiError(200, f"expected {len(batch)} embeddings, got {len(vectors)}")
+            except Exception as e:
+                logger.warning("Embedding request for %d texts failed: %s", len(batch), e)
+                with self._lock:
+                    self._requests += 1
+                    self._failed_requests += 1
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            finally:
+                self._latency.observe(time.perf_counter() - started)
+
+        with self._lock:
+            self._requests += 1
+            self._texts += len(batch)
+        for (_, _, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
@@ -0,0 +1,478 @@
+"""Single-call entity extraction (TR-006) into the EntityExtractionResult contract.
+
+Retrieved chunks are packed into one token-budgeted context: duplicates are
+dropped, the overlap the chunker repeats between consecutive chunks is sent
+once, and excerpts are ordered by document and page. One LLM call asks for every
+entity category at once, and the JSON reply is parsed straight into the shape of
+contracts/entities/v1/entity.schema.json and checked with
+`validate_entity_payload`. The model cites excerpts by label (`C1`, `C2`, ...),
+and the parser turns those labels into `document_location` and
+`source_document` from the chunk metadata, so provenance never depends on the
+model copying page numbers correctly.
+"""
+
+import json
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from chunker import Chunk
+from config import ExtractionConfig, RetrievalConfig
+from embedding_client import estimate_tokens
+from llm_client import GenerateFn
+from main import validate_entity_payload
+from metrics import HistogramSnapshot, LatencyHistogram
+from pipeline import JobContext, Stage
+from vector_index import build_index
+
+if TYPE_CHECKING:
+    from extraction_cache import ExtractionCache
+
+logger = logging.getLogger(__name__)
+
+ENTITY_SCHEMA_VERSION = "1.0"
+# Bump whenever the prompt wording or response handling changes; cached results key on it.
+PROMPT_VERSION = "1"
+
+# Core categories (category id -> what to extract); the id is the entity_group_name.
+ENTITY_CATEGORIES: Dict[str, str] = {
+    "patient_demographics": "patient name, date of birth, sex, address, contact details and identifiers",
+    "allergies": "allergies and intolerances with reaction and severity",
+    "medications": "medications with dose, route, frequency and status",
+    "diagnoses": "diagnoses, conditions and problems with status and onset",
+    "procedures": "procedures and surgeries with dates",
+    "labs": "laboratory tests with result value, units, reference range and date",
+    "vitals": "vital signs: blood pressure, heart rate, temperature, weight, height, BMI, oxygen saturation",
+    "social_history": "smoking, alcohol and substance use, occupation and living situation",
+    "clinical_notes": "chief complaint, assessment, plan and follow-up instructions",
+    "document_metadata": "document type and date, author, facility and encounter details",
+}
+
+_PROMPT_TEMPLATE = """You extract structured clinical entities from excerpts of a patient's medical documents.
+
+Return only a JSON object, without markdown, in exactly this form:
+{{"extracted_entities": [{{"entity_group_name": "medications", "entity_name": "Metformin", "entity_value": "500 mg twice daily", "chunk": "C1", "source_text": "Metformin 500 mg PO BID", "rationale": "Listed under current medications", "conflicts": [{{"conflicting_value": "850 mg twice daily", "chunk": "C4"}}]}}]}}
+
+Rules:
+- Extract all of the categories below in this single response. entity_group_name must be one of the category ids.
+- entity_value is a string. Keep units, doses and dates as written.
+- chunk is the label of the excerpt the value comes from. source_text quotes that excerpt verbatim, at most 200 characters.
+- When excerpts disagree about the same entity, report it once and list every other value in conflicts, each with its chunk label.
+- Leave out anything the excerpts do not state. Do not infer or guess values.
+
+Categories:
+{categories}
+
+Excerpts:
+{context}
+"""
+
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+_SOURCE_TEXT_MAX = 200
+
+
+class ExtractionResponseError(ValueError):
+    """The LLM reply is not JSON in the expected shape."""
+
+
+@dataclass(frozen=True)
+class RetrievedChunk:
+    document_id: str
+    chunk: Chunk
+    score: float = 0.0
+
+
+@dataclass(frozen=True)
+class PackedContext:
+    chunks: Tuple[RetrievedChunk, ...]
+    labels: Tuple[str, ...]
+    text: str
+    tokens: int
+    dropped_chunks: int
+    overlap_tokens_removed: int
+
+    @property
+    def chunk_hashes(self) -> List[str]:
+        """ChunkHash of every excerpt, in prompt order."""
+        return [c.chunk.chunk_hash for c in self.chunks]
+
+
+def _overlap_chars(previous: str, following: str, probe_length: int = 32) -> int:
+    """Length of the longest suffix of `previous` that is also a prefix of `following`."""
+    if len(following) < probe_length or len(previous) < probe_length:
+        return 0
+    probe = following[:probe_length]
+    position = previous.find(probe)
+    while position != -1:
+        length = len(previous) - position
+        if following.startswith(previous[position:]) and length < len(following):
+            return length
+        position = previous.find(probe, position + 1)
+    return 0
+
+
+def _header(label: str, chunk: Chunk) -> str:
+    pages = f"page {chunk.page}" if chunk.page == chunk.page_end else f"pages {chunk.page}-{chunk.page_end}"
+    section = f" | section {chunk.section}" if chunk.section else ""
+    return f"[{label} | {pages}{section}]"
+
+
+def pack_context(
+    chunks: Sequence[RetrievedChunk],
+    token_budget: int,
+    count_tokens: Callable[[str], int] = estimate_tokens,
+) -> PackedContext:
+    """Fit the best-ranked chunks into `token_budget` tokens.
+
+    `chunks` is in rank order. Chunks are taken greedily in that order while
+    they fit. A chunk's cost is its header plus its text, minus any overlap
+    shared with an already selected neighbour (consecutive chunk indexes of the
+    same document), because that overlap is sent once. Selected chunks are
+    emitted grouped by document (in order of first appearance) and by page.
+    """
+    candidates: List[RetrievedChunk] = []
+    seen_hashes, seen_keys = set(), set()
+    for retrieved in chunks:
+        key = (retrieved.document_id, retrieved.chunk.index)
+        if key in seen_keys or retrieved.chunk.chunk_hash in seen_hashes:
+            continue
+        seen_keys.add(key)
+        seen_hashes.add(retrieved.chunk.chunk_hash)
+        candidates.append(retrieved)
+
+    by_key = {(c.document_id, c.chunk.index): c for c in candidates}
+    overlaps: Dict[Tuple[str, int], Tuple[int, int]] = {}
+
+    def overlap(document_id: str, index: int) -> Tuple[int, int]:
+        """(chars, tokens) that chunk `index` repeats from chunk `index - 1`."""
+        key = (document_id, index)
+        if key not in overlaps:
+            previous = by_key.get((document_id, index - 1))
+            chars = _overlap_chars(previous.chunk.text, by_key[key].chunk.text) if previous else 0
+            overlaps[key] = (chars, count_tokens(by_key[key].chunk.text[:chars]) if chars else 0)
+        return overlaps[key]
+
+    selected = set()
+    remaining = token_budget
+    dropped = removed = 0
+    for retrieved in candidates:
+        document_id, index = retrieved.document_id, retrieved.chunk.index
+        cost = count_tokens(_header("C0", retrieved.chunk)) + count_tokens(retrieved.chunk.text)
+        saved = 0
+        if (document_id, index - 1) in selected:
+            saved += overlap(document_id, index)[1]
+        if (document_id, index + 1) in selected:
+            saved += overlap(document_id, index + 1)[1]
+        if cost - saved > remaining:
+            dropped += 1
+            continue
+        selected.add((document_id, index))
+        remaining -= cost - saved
+        removed += saved
+
+    document_order = {}
+    for retrieved in candidates:
+        document_order.setdefault(retrieved.document_id, len(document_order))
+    ordered = sorted(
+        (by_key[key] for key in selected),
+        key=lambda c: (document_order[c.document_id], c.chunk.page, c.chunk.index),
+    )
+
+    labels, parts = [], []
+    for number, retrieved in enumerate(ordered, 1):
+        label = f"C{number}"
+        labels.append(label)
+        text = retrieved.chunk.text
+        if (retrieved.document_id, retrieved.chunk.index - 1) in selected:
+            text = text[overlap(retrieved.document_id, retrieved.chunk.index)[0]:]
+        parts.append(f"{_header(label, retrieved.chunk)}\n{text}")
+    return PackedContext(
+        chunks=tuple(ordered),
+        labels=tuple(labels),
+        text="\n\n".join(parts),
+        tokens=token_budget - remaining,
+        dropped_chunks=dropped,
+        overlap_tokens_removed=removed,
+    )
+
+
+def build_prompt(context: PackedContext, categories: Dict[str, str] = ENTITY_CATEGORIES) -> str:
+    category_lines = "\n".join(f"- {category_id}: {description}" for category_id, description in categories.items())
+    return _PROMPT_TEMPLATE.format(categories=category_lines, context=context.text)
+
+
+def _category_id(name: Any) -> str:
+    category = _NON_WORD.sub("_", str(name).strip().lower()).strip("_")
+    if category not in ENTITY_CATEGORIES and f"{category}s" in ENTITY_CATEGORIES:
+        return f"{category}s"
+    return category
+
+
+def _location(chunk: Chunk) -> dict:
+    location: Dict[str, Any] = {"page": chunk.page}
+    if chunk.section:
+        location["section"] = chunk.section
+    if chunk.coordinates:
+        try:
+            x0, y0, x1, y1 = (float(v) for v in chunk.coordinates.split(","))
+        except ValueError:
+            pass
+        else:
+            location["coordinates"] = {"x": x0, "y": y0, "width": x1 - x0, "height": y1 - y0}
+    return location
+
+
+def _text(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, (dict, list)):
+        return None
+    text = str(value).strip()
+    return text or None
+
+
+def parse_extraction_response(text: str, document_id: str, context: PackedContext) -> dict:
+    """Turn the model's JSON reply into an EntityExtractionResult payload (not yet validated).
+
+    Entities without a name or value are left out. Unknown chunk labels just
+    lose their location.
+    """
+    try:
+        data = json.loads(_FENCE.sub("", text.strip()))
+    except json.JSONDecodeError as e:
+        raise ExtractionResponseError(f"LLM response is not valid JSON: {e}") from e
+    if isinstance(data, list):
+        data = {"extracted_entities": data}
+    if not isinstance(data, dict) or not isinstance(data.get("extracted_entities"), list):
+        raise ExtractionResponseError("LLM response has no 'extracted_entities' list")
+
+    chunks = dict(zip(context.labels, context.chunks))
+    entities = []
+    for item in data["extracted_entities"]:
+        if not isinstance(item, dict):
+            continue
+        group, name, value = _text(item.get("entity_group_name")), _text(item.get("entity_name")), _text(item.get("entity_value"))
+        if group is None or name is None or value is None:
+            continue
+        entity: Dict[str, Any] = {"entity_group_name": _category_id(group), "entity_name": name, "entity_value": value}
+        source = chunks.get(str(item.get("chunk", "")).strip())
+        if source is not None:
+            entity["document_location"] = _location(source.chunk)
+        for key in ("rationale", "source_text"):
+            field_text = _text(item.get(key))
+            if field_text is not None:
+                entity[key] = field_text[:_SOURCE_TEXT_MAX] if key == "source_text" else field_text
+        conflicts = []
+        for conflict in item.get("conflicts") or []:
+            conflicting_value = _text(conflict.get("conflicting_value")) if isinstance(conflict, dict) else None
+            if conflicting_value is None:
+                continue
+            entry: Dict[str, Any] = {"conflicting_value": conflicting_value}
+            conflict_source = chunks.get(str(conflict.get("chunk", "")).strip())
+            if conflict_source is not None:
+                entry["source_document"] = conflict_source.document_id
+                entry["document_location"] = _location(conflict_source.chunk)
+            conflicts.append(entry)
+        if conflicts:
+            entity["conflicts"] = conflicts
+        entities.append(entity)
+
+    payload: Dict[str, Any] = {
+        "schema_version": ENTITY_SCHEMA_VERSION,
+        "document_id": str(document_id),
+        "extracted_entities": entities,
+    }
+    if isinstance(data.get("additional_entities"), dict):
+        payload["additional_entities"] = data["additional_entities"]
+    return payload
+
+
+@dataclass(frozen=True)
+class ExtractionUsage:
+    prompt_tokens: int
+    completion_tokens: int
+    latency_seconds: float
+    context_tokens: int
+    context_chunks: int
+    dropped_chunks: int
+    cached: bool = False
+
+
+@dataclass(frozen=True)
+class ExtractionResult:
+    payload: dict
+    usage: ExtractionUsage
+    context: PackedContext
+
+
+@dataclass(frozen=True)
+class ExtractionStats:
+    jobs: int
+    llm_calls: int
+    cache_hits: int
+    failures: int
+    entities: int
+    prompt_tokens: int
+    completion_tokens: int
+    latency: HistogramSnapshot
+
+
+class ExtractionEngine:
+    """Packs retrieved chunks, makes one LLM call and returns a validated entity payload.
+
+    `generate` is `GeminiLlmClient(...).generate` or any async
+    `prompt -> LlmResponse` callable (a rate-limited wrapper, a local fake).
+    With an `ExtractionCache` (extraction_cache.py), a context that was
+    already extracted with the same model and prompt version is served from
+    the cache without an LLM call.
+    """
+
+    def __init__(
+        self,
+        generate: GenerateFn,
+        config: ExtractionConfig = ExtractionConfig(),
+        count_tokens: Callable[[str], int] = estimate_tokens,
+        categories: Dict[str, str] = ENTITY_CATEGORIES,
+        cache: Optional["ExtractionCache"] = None,
+    ):
+        self._generate = generate
+        self._model = config.model
+        self._cache = cache
+        self._token_budget = config.context_token_budget
+        self._count_tokens = count_tokens
+        self._categories = categories
+        self._lock = threading.Lock()
+        self._jobs = 0
+        self._llm_calls = 0
+        self._cache_hits = 0
+        self._failures = 0
+        self._entities = 0
+        self._prompt_tokens = 0
+        self._completion_tokens = 0
+        self._latency = LatencyHistogram()
+
+    def pack(self, chunks: Sequence[RetrievedChunk]) -> PackedContext:
+        return pack_context(chunks, self._token_budget, self._count_tokens)
+
+    async def extract(self, document_id: str, chunks: Sequence[RetrievedChunk]) -> ExtractionResult:
+        """Extract every category for `document_id` from `chunks` (best-ranked first) in one call."""
+        context = self.pack(chunks)
+        started = time.perf_counter()
+        prompt_tokens = completion_tokens = 0
+        called = False
+        cached = None
+        entities = None
+        try:
+            if context.chunks and self._cache is not None:
+                cached = await self._cache.lookup(self._model, document_id, context)
+            if cached is not None:
+                # The cache has already re-validated the payload for this document.
+                payload = cached.payload
+            elif context.chunks:
+                called = True
+                response = await self._generate(build_prompt(context, self._categories))
+                prompt_tokens, completion_tokens = response.prompt_tokens, response.completion_tokens
+                payload = parse_extraction_response(response.text, document_id, context)
+                validate_entity_payload(payload)
+            else:
+                payload = {"schema_version": ENTITY_SCHEMA_VERSION, "document_id": str(document_id), "extracted_entities": []}
+                validate_entity_payload(payload)
+            entities = len(payload["extracted_entities"])
+        finally:
+            with self._lock:
+                self._jobs += 1
+                self._llm_calls += int(called)
+                self._cache_hits += int(cached is not None)
+                self._prompt_tokens += prompt_tokens
+                self._completion_tokens += completion_tokens
+                if entities is None:
+                    self._failures += 1
+                else:
+                    self._entities += entities
+        if called and self._cache is not None:
+            await self._cache.store(self._model, context, payload, prompt_tokens, completion_tokens)
+        elapsed = time.perf_counter() - started
+        self._latency.observe(elapsed)
+
+        usage = ExtractionUsage(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            latency_seconds=elapsed,
+            context_tokens=context.tokens,
+            context_chunks=len(context.chunks),
+            dropped_chunks=context.dropped_chunks,
+            cached=cached is not None,
+        )
+        return ExtractionResult(payload, usage, context)
+
+    def stats(self) -> ExtractionStats:
+        with self._lock:
+            return ExtractionStats(
+                jobs=self._jobs,
+                llm_calls=self._llm_calls,
+                cache_hits=self._cache_hits,
+                failures=self._failures,
+                entities=self._entities,
+                prompt_tokens=self._prompt_tokens,
+                completion_tokens=self._completion_tokens,
+                latency=self._latency.snapshot(),
+            )
+
+
+def rank_chunks(
+    document_id: str,
+    chunks: Sequence[Chunk],
+    embeddings: Optional[Sequence[Sequence[float]]],
+    category_vectors: Any = None,
+    config: RetrievalConfig = RetrievalConfig(),
+) -> List[RetrievedChunk]:
+    """Order a document's chunks for packing.
+
+    With `category_vectors` (one query embedding per category), the top
+    `config.top_k` chunks of every category come first, interleaved by rank so
+    each category gets its best chunk before any gets its second. The
+    remaining chunks follow in document order and only fill leftover budget.
+    """
+    if category_vectors is None or not embeddings or not chunks:
+        return [RetrievedChunk(document_id, chunk) for chunk in chunks]
+
+    index = build_index(list(range(len(chunks))), embeddings, len(embeddings[0]), config)
+    results = index.search_many(category_vectors, config.top_k)
+    ranked: List[RetrievedChunk] = []
+    taken = set()
+    for rank in range(max((len(hits) for hits in results), default=0)):
+        for hits in results:
+            if rank < len(hits) and hits[rank].id not in taken:
+                taken.add(hits[rank].id)
+                ranked.append(RetrievedChunk(document_id, chunks[hits[rank].id], hits[rank].score))
+    ranked.extend(RetrievedChunk(document_id, chunk) for i, chunk in enumerate(chunks) if i not in taken)
+    return ranked
+
+
+def extract_stage(
+    engine: ExtractionEngine,
+    category_vectors: Any = None,
+    config: RetrievalConfig = RetrievalConfig(),
+    concurrency: int = 1,
+) -> Stage:
+    """Pipeline `extract` stage: sets `artifacts['entities']` and `artifacts['extraction_usage']`.
+
+    `category_vectors` are the embeddings of the `ENTITY_CATEGORIES`
+    descriptions (embed them once at startup with the query task type).
+    """
+
+    async def run(context: JobContext) -> None:
+        ranked = rank_chunks(
+            context.document_id,
+            context.artifacts["chunks"],
+            context.artifacts.get("embeddings"),
+            category_vectors,
+            config,
+        )
+        result = await engine.extract(context.document_id, ranked)
+        context.artifacts["entities"] = result.payload
+        context.artifacts["extraction_usage"] = result.usage
+
+    return Stage("extract", run, concurrency=concurrency, outputs=("entities", "extraction_usage"))
@@ -0,0 +1,372 @@
+"""Persistent cache of entity extraction results keyed by the packed context.
+
+Re-uploads of the same document, DLQ replays and retries pack the same
+excerpts, so they would pay for the same LLM call again. The cache key is a
+SHA-256 of the model, `PROMPT_VERSION` and the ordered `ChunkHash` list of the
+`PackedContext`. The stored value is the validated EntityExtractionResult
+payload. A hit skips the LLM but is checked with `validate_entity_payload`
+again; an entry that no longer validates (e.g. after a contract change) is
+dropped and counted as a miss.
+
+Payloads name the document they were extracted from. On a hit the top-level
+`document_id` is rewritten to the requesting document, and each conflict's
+`source_document` is mapped through the excerpt positions of the stored
+context. The key covers chunk text only, so an entry is only reused when the
+excerpts also have the same page, section and coordinates; otherwise the
+stored `document_location`s would point at the wrong place.
+
+Entries expire `ttl_hours` after they were written. When the stored payloads
+exceed `max_megabytes`, the least recently used entries are evicted.
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Protocol, Sequence, Tuple
+
+from config import ExtractionCacheConfig
+from extraction import PROMPT_VERSION, PackedContext
+from local_state import ensure_private_file
+from main import validate_entity_payload
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CachedExtraction:
+    payload: dict
+    document_ids: Tuple[str, ...]
+    locations: str
+    prompt_tokens: int
+    completion_tokens: int
+    created_at: float
+
+
+class ExtractionStore(Protocol):
+    def get(self, key: str, now: float) -> Optional[CachedExtraction]:
+        ...
+
+    def put(self, key: str, entry: CachedExtraction, now: float) -> int:
+        """Store the entry; returns the number of entries evicted to stay within the size limit."""
+        ...
+
+    def delete(self, key: str) -> None:
+        ...
+
+
+def extraction_key(model: str, prompt_version: str, chunk_hashes: Sequence[str]) -> str:
+    digest = hashlib.sha256()
+    for part in (model, prompt_version, *chunk_hashes):
+        encoded = part.encode("utf-8")
+        digest.update(b"%d:" % len(encoded) + encoded)
+    return digest.hexdigest()
+
+
+def location_fingerprint(context: PackedContext) -> str:
+    """Digest of the per-excerpt metadata that ends up in `document_location`."""
+    metadata = [[c.chunk.page, c.chunk.page_end, c.chunk.section, c.chunk.coordinates] for c in context.chunks]
+    return hashlib.sha256(json.dumps(metadata).encode("utf-8")).hexdigest()
+
+
+def _serialize(entry: CachedExtraction) -> bytes:
+    return json.dumps(
+        {
+            "payload": entry.payload,
+            "document_ids": list(entry.document_ids),
+            "locations": entry.locations,
+            "prompt_tokens": entry.prompt_tokens,
+            "completion_tokens": entry.completion_tokens,
+        },
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def _deserialize(data: bytes, created_at: float) -> CachedExtraction:
+    value = json.loads(data)
+    return CachedExtraction(
+        payload=value["payload"],
+        document_ids=tuple(value["document_ids"]),
+        locations=value["locations"],
+        prompt_tokens=value["prompt_tokens"],
+        completion_tokens=value["completion_tokens"],
+        created_at=created_at,
+    )
+
+
+class InMemoryExtractionStore:
+    def __init__(self, ttl_seconds: float, max_bytes: int):
+        self._ttl = ttl_seconds
+        self._max_bytes = max_bytes
+        self._items: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str, now: float) -> Optional[CachedExtraction]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            data, created_at = item
+            if now - created_at > self._ttl:
+                self._remove(key)
+                return None
+            self._items.move_to_end(key)
+        return _deserialize(data, created_at)
+
+    def put(self, key: str, entry: CachedExtraction, now: float) -> int:
+        data = _serialize(entry)
+        evicted = 0
+        with self._lock:
+            self._remove(key)
+            self._items[key] = (data, now)
+            self._bytes += len(data)
+            while self._bytes > self._max_bytes and self._items:
+                self._remove(next(iter(self._items)))
+                evicted += 1
+        return evicted
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        item = self._items.pop(key, None)
+        if item is not None:
+            self._bytes -= len(item[0])
+
+
+class SqliteExtractionStore:
+    """Extraction cache in a SQLite file (WAL mode), shared by the worker processes on a host.
+
+    The file holds extracted entities (PHI); it is created with mode 0600.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, max_bytes: int):
+        if path != ":memory:":
+            ensure_private_file(path)
+        self._ttl = ttl_seconds
+        self._max_bytes = max_bytes
+        self._connection = sqlite3.connect(path, timeout=30.0, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS extraction_cache ("
+                " cache_key TEXT PRIMARY KEY, entry BLOB NOT NULL, size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL, last_used_at REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS ix_extraction_cache_last_used_at ON extraction_cache (last_used_at)"
+            )
+
+    def get(self, key: str, now: float) -> Optional[CachedExtraction]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT entry, created_at FROM extraction_cache WHERE cache_key = ? AND created_at >= ?",
+                (key, now - self._ttl),
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute("UPDATE extraction_cache SET last_used_at = ? WHERE cache_key = ?", (now, key))
+        return _deserialize(row[0], row[1])
+
+    def put(self, key: str, entry: CachedExtraction, now: float) -> int:
+        data = _serialize(entry)
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO extraction_cache (cache_key, entry, size, created_at, last_used_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), now, now),
+            )
+            (total,) = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM extraction_cache").fetchone()
+            if total <= self._max_bytes:
+                return 0
+            victims = []
+            for victim, size in self._connection.execute(
+                "SELECT cache_key, size FROM extraction_cache ORDER BY last_used_at"
+            ):
+                if total <= self._max_bytes:
+                    break
+                victims.append((victim,))
+                total -= size
+            self._connection.executemany("DELETE FROM extraction_cache WHERE cache_key = ?", victims)
+            return len(victims)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM extraction_cache WHERE cache_key = ?", (key,))
+
+    def prune(self, now: float) -> int:
+        """Delete expired entries."""
+        with self._lock:
+            cursor = self._connection.execute(
+                "DELETE FROM extraction_cache WHERE created_at < ?", (now - self._ttl,)
+            )
+            return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+@dataclass(frozen=True)
+class ExtractionCacheStats:
+    lookups: int
+    hits: int
+    misses: int
+    rejected_entries: int
+    stored: int
+    evicted: int
+    store_errors: int
+    prompt_tokens_saved: int
+    completion_tokens_saved: int
+
+    @property
+    def hit_ratio(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    @property
+    def llm_calls_saved(self) -> int:
+        return self.hits
+
+
+class ExtractionCache:
+    def __init__(self, store: ExtractionStore, clock=time.time):
+        self._store = store
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._lookups = 0
+        self._hits = 0
+        self._misses = 0
+        self._rejected_entries = 0
+        self._stored = 0
+        self._evicted = 0
+        self._store_errors = 0
+        self._prompt_tokens_saved = 0
+        self._completion_tokens_saved = 0
+
+    async def lookup(self, model: str, document_id: str, context: PackedContext) -> Optional[CachedExtraction]:
+        """Return the cached extraction for this context, rewritten for `document_id`, or None."""
+        key = extraction_key(model, PROMPT_VERSION, context.chunk_hashes)
+        try:
+            entry = await asyncio.to_thread(self._store.get, key, self._clock())
+        except Exception as e:
+            logger.warning("Extraction cache lookup failed for document %s; calling the LLM: %s", document_id, e)
+            self._count(lookups=1, misses=1, store_errors=1)
+            return None
+        if entry is None:
+            self._count(lookups=1, misses=1)
+            return None
+
+        payload = _rebind(entry, document_id, context)
+        if payload is not None:
+            try:
+                validate_entity_payload(payload)
+            except Exception as e:
+                logger.warning("Dropping cached extraction that no longer validates: %s", e)
+                payload = None
+            if payload is None:
+                await self._discard(key)
+        if payload is None:
+            self._count(lookups=1, misses=1, rejected_entries=1)
+            return None
+
+        self._count(
+            lookups=1,
+            hits=1,
+            prompt_tokens_saved=entry.prompt_tokens,
+            completion_tokens_saved=entry.completion_tokens,
+        )
+        return CachedExtraction(
+            payload=payload,
+            document_ids=tuple(c.document_id for c in context.chunks),
+            locations=entry.locations,
+            prompt_tokens=entry.prompt_tokens,
+            completion_tokens=entry.completion_tokens,
+            created_at=entry.created_at,
+        )
+
+    async def store(
+        self, model: str, context: PackedContext, payload: dict, prompt_tokens: int, completion_tokens: int
+    ) -> None:
+        """Remember a validated payload for this context."""
+        key = extraction_key(model, PROMPT_VERSION, context.chunk_hashes)
+        now = self._clock()
+        entry = CachedExtraction(
+            payload=payload,
+            document_ids=tuple(c.document_id for c in context.chunks),
+            locations=location_fingerprint(context),
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            created_at=now,
+        )
+        try:
+            evicted = await asyncio.to_thread(self._store.put, key, entry, now)
+        except Exception as e:
+            logger.warning("Extraction cache write failed for document %s: %s", payload.get("document_id"), e)
+            self._count(store_errors=1)
+            return
+        self._count(stored=1, evicted=evicted)
+
+    def stats(self) -> ExtractionCacheStats:
+        with self._lock:
+            return ExtractionCacheStats(
+                lookups=self._lookups,
+                hits=self._hits,
+                misses=self._misses,
+                rejected_entries=self._rejected_entries,
+                stored=self._stored,
+                evicted=self._evicted,
+                store_errors=self._store_errors,
+                prompt_tokens_saved=self._prompt_tokens_saved,
+                completion_tokens_saved=self._completion_tokens_saved,
+            )
+
+    async def _discard(self, key: str) -> None:
+        try:
+            await asyncio.to_thread(self._store.delete, key)
+        except Exception as e:
+            logger.warning("Extraction cache delete failed: %s", e)
+            self._count(store_errors=1)
+
+    def _count(self, **deltas: int) -> None:
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, f"_{name}", getattr(self, f"_{name}") + delta)
+
+
+def _rebind(entry: CachedExtraction, document_id: str, context: PackedContext) -> Optional[dict]:
+    """Copy of the cached payload pointing at the current documents, or None if it cannot be reused."""
+    if len(entry.document_ids) != len(context.chunks) or entry.locations != location_fingerprint(context):
+        return None
+    mapping: Dict[str, str] = {}
+    for cached_id, retrieved in zip(entry.document_ids, context.chunks):
+        if mapping.setdefault(cached_id, retrieved.document_id) != retrieved.document_id:
+            return None
+
+    payload = copy.deepcopy(entry.payload)
+    if not isinstance(payload, dict) or not isinstance(payload.get("extracted_entities"), list):
+        return None
+    payload["document_id"] = str(document_id)
+    for entity in payload["extracted_entities"]:
+        if not isinstance(entity, dict):
+            continue
+        for conflict in entity.get("conflicts") or []:
+            if isinstance(conflict, dict) and conflict.get("source_document") in mapping:
+                conflict["source_document"] = mapping[conflict["source_document"]]
+    return payload
+
+
+def build_extraction_cache(config: ExtractionCacheConfig = ExtractionCacheConfig()) -> ExtractionCache:
+    """SQLite-backed cache; expired entries are pruned on startup."""
+    store = SqliteExtractionStore(config.path, config.ttl_hours * 3600, int(config.max_megabytes * 1024 * 1024))
+    store.prune(time.time())
+    return ExtractionCache(store)
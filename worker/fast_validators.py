@@ -0,0 +1,222 @@
+"""Compile JSON contract schemas into specialized Python predicates.
+
+The generated functions answer only "is this payload valid?" and are used as the
+happy-path check in front of the generic Draft7Validator, which is still used to
+produce detailed error messages when a payload fails. Only the subset of draft-07
+used by the worker contracts is supported; anything else raises
+UnsupportedSchemaError so callers can fall back to the generic validator.
+
+Usage (print the generated source for a schema):
+    python worker/fast_validators.py contracts/jobs/v1/job.schema.json
+"""
+
+import json
+import re
+import sys
+from typing import Any, Callable, Dict, List, Tuple
+
+
+FastCheck = Callable[[Any], bool]
+
+_TYPE_CHECKS = {
+    "object": "isinstance({v}, dict)",
+    "array": "isinstance({v}, list)",
+    "string": "isinstance({v}, str)",
+    "boolean": "isinstance({v}, bool)",
+    "null": "{v} is None",
+    "number": "(isinstance({v}, (int, float)) and not isinstance({v}, bool))",
+    "integer": "(isinstance({v}, int) and not isinstance({v}, bool) or isinstance({v}, float) and {v}.is_integer())",
+}
+
+_IGNORED_KEYWORDS = frozenset({"$schema", "$id", "title", "description", "definitions", "examples", "$comment"})
+_SUPPORTED_KEYWORDS = frozenset({"type", "enum", "pattern", "required", "properties", "items", "minimum", "$ref"})
+
+
+class UnsupportedSchemaError(ValueError):
+    pass
+
+
+class _Compiler:
+    def __init__(self, root: dict):
+        self._root = root
+        self._lines: List[str] = []
+        self._constants: List[str] = []
+        self._functions: Dict[int, str] = {}
+        self._refs: Dict[str, str] = {}
+        self._counter = 0
+
+    def compile(self) -> Tuple[str, str]:
+        if not isinstance(self._root, dict) or "$ref" in self._root:
+            raise UnsupportedSchemaError("Root schema must be an object schema without '$ref'")
+        entry = self._function_for(self._root)
+        header = ["import re", "", "_MISSING = object()"] + self._constants
+        return "\n".join(header + [""] + self._lines) + "\n", entry
+
+    def _name(self, prefix: str) -> str:
+        self._counter += 1
+        return f"_{prefix}{self._counter}"
+
+    def _constant(self, prefix: str, expression: str) -> str:
+        name = self._name(prefix)
+        self._constants.append(f"{name} = {expression}")
+        return name
+
+    def _check(self, schema: Any, var: str) -> str:
+        """Return a boolean expression checking `var` against `schema`.
+
+        Leaf schemas (type/enum/pattern/minimum only) are inlined; anything with
+        nested structure becomes a generated function.
+        """
+        if not isinstance(schema, dict):
+            raise UnsupportedSchemaError("Only object schemas are supported")
+        if "$ref" in schema:
+            if len(schema) != 1:
+                raise UnsupportedSchemaError("'$ref' with sibling keywords is not supported")
+            return f"{self._function_for_ref(schema['$ref'])}({var})"
+        if self._is_leaf(schema):
+            return " and ".join(self._leaf_conditions(schema, var)) or "True"
+        return f"{self._function_for(schema)}({var})"
+
+    def _is_leaf(self, schema: dict) -> bool:
+        return not ({"required", "properties", "items"} & set(schema))
+
+    def _function_for(self, schema: dict) -> str:
+        key = id(schema)
+        if key in self._functions:
+            return self._functions[key]
+
+        name = self._name("check")
+        self._functions[key] = name
+        body = self._body(schema)
+        self._lines.append(f"def {name}(v):")
+        self._lines.extend(f"    {line}" for line in body)
+        self._lines.append("    return True")
+        self._lines.append("")
+        return name
+
+    def _function_for_ref(self, ref: Any) -> str:
+        if ref in self._refs:
+            return self._refs[ref]
+        prefix = "#/definitions/"
+        if not isinstance(ref, str) or not ref.startswith(prefix):
+            raise UnsupportedSchemaError(f"Unsupported $ref: {ref}")
+
+        definitions = self._root.get("definitions", {})
+        target = definitions.get(ref[len(prefix):])
+        if not isinstance(target, dict) or "$ref" in target:
+            raise UnsupportedSchemaError(f"Unresolvable $ref: {ref}")
+
+        name = self._function_for(target)
+        self._refs[ref] = name
+        return name
+
+    def _types(self, schema: dict) -> List[str]:
+        if "type" not in schema:
+            return []
+        types = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+        if not types or not all(isinstance(t, str) and t in _TYPE_CHECKS for t in types):
+            raise UnsupportedSchemaError(f"Unsupported type: {schema['type']}")
+        return types
+
+    def _leaf_conditions(self, schema: dict, var: str) -> List[str]:
+        unknown = set(schema) - _SUPPORTED_KEYWORDS - _IGNORED_KEYWORDS
+        if unknown:
+            raise UnsupportedSchemaError(f"Unsupported keywords: {sorted(unknown)}")
+
+        types = self._types(schema)
+        conditions: List[str] = []
+        if types:
+            checks = [_TYPE_CHECKS[t].format(v=var) for t in types]
+            conditions.append(checks[0] if len(checks) == 1 else f"({' or '.join(checks)})")
+
+        is_string = types == ["string"]
+        if "enum" in schema:
+            values = schema["enum"]
+            if not isinstance(values, list) or not values or not all(isinstance(value, str) for value in values):
+                raise UnsupportedSchemaError("Only non-empty string enums are supported")
+            enum_name = self._constant("ENUM", f"frozenset({sorted(set(values))!r})")
+            membership = f"{var} in {enum_name}"
+            conditions.append(membership if is_string else f"(isinstance({var}, str) and {membership})")
+
+        if "pattern" in schema:
+            pattern = schema["pattern"]
+            try:
+                re.compile(pattern)
+            except (re.error, TypeError):
+                raise UnsupportedSchemaError(f"Unsupported pattern: {pattern!r}")
+            regex_name = self._constant("RE", f"re.compile({pattern!r})")
+            search = f"{regex_name}.search({var}) is not None"
+            conditions.append(search if is_string else f"(not isinstance({var}, str) or {search})")
+
+        if "minimum" in schema:
+            minimum = schema["minimum"]
+            if isinstance(minimum, bool) or not isinstance(minimum, (int, float)):
+                raise UnsupportedSchemaError("'minimum' must be a number")
+            number = _TYPE_CHECKS["number"].format(v=var)
+            conditions.append(f"(not {number} or {var} >= {minimum!r})")
+
+        return conditions
+
+    def _body(self, schema: dict) -> List[str]:
+        lines: List[str] = []
+        conditions = self._leaf_conditions(schema, "v")
+        if conditions:
+            lines.append(f"if not ({' and '.join(conditions)}):")
+            lines.append("    return False")
+
+        types = self._types(schema)
+        required = schema.get("required", [])
+        properties = schema.get("properties", {})
+        if not isinstance(required, list) or not isinstance(properties, dict):
+            raise UnsupportedSchemaError("'required' must be a list and 'properties' an object")
+        if required or properties:
+            object_lines: List[str] = []
+            if required:
+                keys = " and ".join(f"{field!r} in v" for field in required)
+                object_lines.append(f"if not ({keys}):")
+                object_lines.append("    return False")
+            for field, subschema in properties.items():
+                object_lines.append(f"x = v.get({field!r}, _MISSING)")
+                object_lines.append(f"if x is not _MISSING and not ({self._check(subschema, 'x')}):")
+                object_lines.append("    return False")
+            if types == ["object"]:
+                lines.extend(object_lines)
+            else:
+                lines.append("if isinstance(v, dict):")
+                lines.extend(f"    {line}" for line in object_lines)
+
+        if "items" in schema:
+            if not isinstance(schema["items"], dict):
+                raise UnsupportedSchemaError("Only single-schema 'items' is supported")
+            item_lines = [
+                "for x in v:",
+                f"    if not ({self._check(schema['items'], 'x')}):",
+                "        return False",
+            ]
+            if types == ["array"]:
+                lines.extend(item_lines)
+            else:
+                lines.append("if isinstance(v, list):")
+                lines.extend(f"    {line}" for line in item_lines)
+
+        return lines
+
+
+def generate_source(schema: dict) -> str:
+    source, entry = _Compiler(schema).compile()
+    return source + f"\nis_valid = {entry}\n"
+
+
+def compile_schema(schema: dict) -> FastCheck:
+    namespace: Dict[str, Any] = {}
+    exec(compile(generate_source(schema), f"<fast validator: {schema.get('title', 'schema')}>", "exec"), namespace)
+    return namespace["is_valid"]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python worker/fast_validators.py <schema.json>", file=sys.stderr)
+        sys.exit(2)
+
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        print(generate_source(json.load(f)), end="")
@@ -0,0 +1,290 @@
+"""Embedded health and metrics HTTP server for the worker (TR-012, NFR-011).
+
+`HealthServer` serves, from a daemon thread:
+
+- `/health/live`: 200 while the process can answer, plus any liveness checks
+  (e.g. the consumer thread is alive),
+- `/health/ready`: 200 only when every readiness check passes (schema
+  registry loaded, broker channel open, database pool open), 503 otherwise,
+- `/health`: both sets of checks,
+- `/metrics`: Prometheus text format from the registered collectors.
+
+Checks and collectors read the in-memory stats snapshots the components already
+keep (`JobConsumer.stats()`, `PipelineExecutor.stats()`, `RateLimiter.stats()`).
+They do no network I/O, so a probe never competes with jobs for a broker channel
+or a database connection, and the job threads never wait on the server.
+"""
+
+import json
+import logging
+import math
+import threading
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from config import HealthConfig
+from metrics import HistogramSnapshot
+
+
+logger = logging.getLogger(__name__)
+
+HealthCheck = Callable[[], Optional[str]]
+"""Returns a detail string (or None) when healthy; raises when unhealthy."""
+
+MetricsCollector = Callable[[], Iterable[str]]
+"""Yields Prometheus exposition lines."""
+
+HEALTHY = "Healthy"
+UNHEALTHY = "Unhealthy"
+_CONTENT_TYPE_METRICS = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@dataclass(frozen=True)
+class CheckResult:
+    name: str
+    healthy: bool
+    detail: Optional[str] = None
+
+
+def run_checks(checks: Mapping[str, HealthCheck]) -> List[CheckResult]:
+    results = []
+    for name, check in checks.items():
+        try:
+            results.append(CheckResult(name, True, check()))
+        except Exception as e:
+            results.append(CheckResult(name, False, str(e) or type(e).__name__))
+    return results
+
+
+def schema_registry_check(registry, keys: Iterable[Tuple[str, str]]) -> HealthCheck:
+    """Ready once the contract schemas in `keys` load and compile.
+
+    The first probe loads them; later probes are registry cache hits.
+    """
+    keys = list(keys)
+
+    def check() -> str:
+        registry.warm(keys)
+        return f"{registry.stats().cached} schemas cached"
+
+    return check
+
+
+def broker_check(channel) -> HealthCheck:
+    def check() -> None:
+        if not channel.is_open:
+            raise RuntimeError("Broker connection is closed")
+
+    return check
+
+
+def pool_check(pool) -> HealthCheck:
+    """Ready while the psycopg pool is open and has connections (from `db.create_pool`)."""
+
+    def check() -> str:
+        if pool.closed:
+            raise RuntimeError("Database pool is closed")
+        stats = pool.get_stats()
+        if stats.get("pool_size", 0) == 0:
+            raise RuntimeError("Database pool has no connections")
+        return f"{stats.get('pool_available', 0)} of {stats['pool_size']} connections available"
+
+    return check
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(labels: Mapping[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _header(name: str, kind: str, help_text: str) -> Iterator[str]:
+    yield f"# HELP {name} {help_text}"
+    yield f"# TYPE {name} {kind}"
+
+
+def _histogram(name: str, labels: Dict[str, str], snapshot: HistogramSnapshot) -> Iterator[str]:
+    for bound, count in snapshot.buckets:
+        yield f"{name}_bucket{_labels({**labels, 'le': _number(bound)})} {count}"
+    yield f"{name}_sum{_labels(labels)} {_number(snapshot.sum)}"
+    yield f"{name}_count{_labels(labels)} {snapshot.count}"
+
+
+def consumer_metrics(consumer) -> MetricsCollector:
+    """Job counts of a `JobConsumer`."""
+
+    def collect() -> Iterator[str]:
+        stats = consumer.stats()
+        yield from _header("worker_jobs_received_total", "counter", "Job messages received from the broker.")
+        yield f"worker_jobs_received_total {stats.received}"
+        yield from _header("worker_jobs_processed_total", "counter", "Jobs processed and acknowledged.")
+        yield f"worker_jobs_processed_total {stats.processed}"
+        yield from _header("worker_jobs_dead_lettered_total", "counter", "Jobs rejected to the dead-letter queue.")
+        yield f'worker_jobs_dead_lettered_total{{reason="invalid"}} {stats.dead_lettered_invalid}'
+        yield f'worker_jobs_dead_lettered_total{{reason="failed"}} {stats.dead_lettered_failed}'
+        yield from _header("worker_jobs_in_flight", "gauge", "Jobs running on handler threads.")
+        yield f"worker_jobs_in_flight {stats.in_flight}"
+        yield from _header("worker_jobs_queued", "gauge", "Valid jobs waiting in the scheduler for a handler slot.")
+        yield f"worker_jobs_queued {stats.queued}"
+
+    return collect
+
+
+def pipeline_metrics(executor) -> MetricsCollector:
+    """Per-stage queue depth, jobs and latency of a `PipelineExecutor`."""
+
+    def collect() -> Iterator[str]:
+        stages = executor.stats()
+        yield from _header("worker_stage_queue_depth", "gauge", "Jobs waiting in the stage input queue.")
+        for stage in stages:
+            yield f"worker_stage_queue_depth{_labels({'stage': stage.name})} {stage.queue_depth}"
+        yield from _header("worker_stage_in_progress", "gauge", "Jobs the stage is running.")
+        for stage in stages:
+            yield f"worker_stage_in_progress{_labels({'stage': stage.name})} {stage.in_progress}"
+        yield from _header("worker_stage_jobs_total", "counter", "Jobs that left the stage, by outcome.")
+        for stage in stages:
+            for outcome, count in (("completed", stage.completed), ("failed", stage.failed), ("skipped", stage.skipped)):
+                yield f"worker_stage_jobs_total{_labels({'stage': stage.name, 'outcome': outcome})} {count}"
+        yield from _header("worker_stage_duration_seconds", "histogram", "Stage run time per job.")
+        for stage in stages:
+            yield from _histogram("worker_stage_duration_seconds", {"stage": stage.name}, stage.latency)
+
+    return collect
+
+
+def rate_limiter_metrics(limiter) -> MetricsCollector:
+    """Permits, throttling and quota waits of a Gemini `RateLimiter`, per model."""
+
+    def collect() -> Iterator[str]:
+        models = limiter.stats()
+        yield from _header("worker_gemini_requests_total", "counter", "Gemini request permits acquired.")
+        for model in models:
+            yield f"worker_gemini_requests_total{_labels({'model': model.model})} {model.acquired}"
+        yield from _header("worker_gemini_throttled_total", "counter", "Gemini requests that waited for quota.")
+        for model in models:
+            yield f"worker_gemini_throttled_total{_labels({'model': model.model})} {model.throttled}"
+        yield from _header("worker_gemini_tokens_total", "counter", "Estimated Gemini tokens requested.")
+        for model in models:
+            yield f"worker_gemini_tokens_total{_labels({'model': model.model})} {model.tokens}"
+        yield from _header("worker_gemini_quota_wait_seconds", "histogram", "Time spent waiting for Gemini quota.")
+        for model in models:
+            yield from _histogram("worker_gemini_quota_wait_seconds", {"model": model.model}, model.wait)
+
+    return collect
+
+
+def render_metrics(collectors: Sequence[MetricsCollector]) -> str:
+    lines: List[str] = []
+    for collect in collectors:
+        try:
+            lines.extend(collect())
+        except Exception:
+            logger.exception("Metrics collector failed")
+    return "\n".join(lines) + "\n"
+
+
+class HealthServer:
+    """Serves the health and metrics endpoints on a daemon thread.
+
+    Port 0 binds a free port; `port` reports the bound one.
+    """
+
+    def __init__(
+        self,
+        config: HealthConfig = HealthConfig(),
+        readiness: Optional[Mapping[str, HealthCheck]] = None,
+        liveness: Optional[Mapping[str, HealthCheck]] = None,
+        collectors: Sequence[MetricsCollector] = (),
+    ):
+        self._config = config
+        self._readiness = dict(readiness or {})
+        self._liveness = dict(liveness or {})
+        self._collectors = list(collectors)
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        if self._server is None:
+            raise RuntimeError("Health server is not started")
+        return self._server.server_address[1]
+
+    def start(self) -> None:
+        if self._server is not None:
+            raise RuntimeError("Health server already started")
+        self._server = ThreadingHTTPServer((self._config.host, self._config.port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="health-server", daemon=True)
+        self._thread.start()
+        logger.info("Health server listening on %s:%d", self._config.host, self.port)
+
+    def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+        self._thread = None
+
+    def __enter__(self) -> "HealthServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def respond(self, path: str) -> Tuple[int, str, str]:
+        """(status code, content type, body) for a request path."""
+        path = path.split("?", 1)[0].rstrip("/") or "/"
+        if path == "/metrics":
+            return 200, _CONTENT_TYPE_METRICS, render_metrics(self._collectors)
+        if path == "/health/live":
+            checks = self._liveness
+        elif path == "/health/ready":
+            checks = self._readiness
+        elif path == "/health":
+            checks = {**self._liveness, **self._readiness}
+        else:
+            return 404, "application/json", json.dumps({"error": "Not found"})
+
+        results = run_checks(checks)
+        healthy = all(result.healthy for result in results)
+        body = {
+            "status": HEALTHY if healthy else UNHEALTHY,
+            "checks": {
+                result.name: {"status": HEALTHY if result.healthy else UNHEALTHY, "detail": result.detail}
+                for result in results
+            },
+        }
+        return (200 if healthy else 503), "application/json", json.dumps(body)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                status, content_type, body = server.respond(self.path)
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format: str, *args) -> None:
+                logger.debug("%s %s", self.address_string(), format % args)
+
+        return Handler
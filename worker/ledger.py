@@ -0,0 +1,360 @@
+"""Per-job stage ledger so a retried job resumes where it failed.
+
+After each checkpointed stage succeeds, the ledger records the stage, a
+fingerprint of the artifacts it produced (`Stage.outputs`) and the artifacts
+themselves, keyed by `job_id` and `document_id`. When the same job is
+delivered again, e.g. after an extraction timeout, `restore` puts the stored
+artifacts back into the context. The pipeline then skips every stage before
+the first unfinished one, so a retry does not re-chunk or re-embed the
+document.
+
+Stages with `checkpoint=False` (the `load` stages, whose output is a page
+stream) are never skipped on their own; if the stage right after them has to
+run again, they run again too. Stored artifacts whose fingerprint no longer
+matches are treated as missing. Once every stage has completed, the stored
+artifacts are dropped and only the completion marks are kept, so a
+redelivered message for a finished job is a no-op.
+
+Artifacts are stored as tagged JSON (`encode_outputs`). Decoding only builds
+the dataclasses listed in `ARTIFACT_TYPES`, so a tampered ledger cannot run
+code in the worker, unlike pickle.
+"""
+
+import asyncio
+import base64
+import hashlib
+import importlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from array import array
+from dataclasses import dataclass, fields, is_dataclass
+from typing import Any, Dict, List, Optional, Protocol, Sequence
+
+from config import LedgerConfig
+from local_state import ensure_private_file
+from pipeline import JobContext, Stage
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class StageRecord:
+    stage: str
+    fingerprint: str
+    outputs: Optional[bytes]
+    completed_at: float
+
+
+class LedgerStore(Protocol):
+    def load(self, job_key: str) -> Dict[str, StageRecord]:
+        ...
+
+    def save(self, job_key: str, record: StageRecord) -> None:
+        ...
+
+    def drop_outputs(self, job_key: str) -> None:
+        ...
+
+
+class InMemoryLedgerStore:
+    def __init__(self):
+        self._records: Dict[str, Dict[str, StageRecord]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, job_key: str) -> Dict[str, StageRecord]:
+        with self._lock:
+            return dict(self._records.get(job_key, {}))
+
+    def save(self, job_key: str, record: StageRecord) -> None:
+        with self._lock:
+            self._records.setdefault(job_key, {})[record.stage] = record
+
+    def drop_outputs(self, job_key: str) -> None:
+        with self._lock:
+            records = self._records.get(job_key, {})
+            for stage, record in records.items():
+                records[stage] = StageRecord(record.stage, record.fingerprint, None, record.completed_at)
+
+
+class SqliteLedgerStore:
+    """Ledger in a SQLite file (WAL mode), shared by the worker processes on a host.
+
+    The file is created with mode 0600 (SQLite gives the WAL files the same mode).
+    """
+
+    def __init__(self, path: str):
+        if path != ":memory:":
+            ensure_private_file(path)
+        self._connection = sqlite3.connect(path, timeout=30.0, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS stage_ledger ("
+                " job_key TEXT NOT NULL, stage TEXT NOT NULL, fingerprint TEXT NOT NULL,"
+                " outputs BLOB, completed_at REAL NOT NULL, PRIMARY KEY (job_key, stage))"
+            )
+
+    def load(self, job_key: str) -> Dict[str, StageRecord]:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT stage, fingerprint, outputs, completed_at FROM stage_ledger WHERE job_key = ?", (job_key,)
+            ).fetchall()
+        return {row[0]: StageRecord(*row) for row in rows}
+
+    def save(self, job_key: str, record: StageRecord) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO stage_ledger (job_key, stage, fingerprint, outputs, completed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (job_key, record.stage, record.fingerprint, record.outputs, record.completed_at),
+            )
+
+    def drop_outputs(self, job_key: str) -> None:
+        with self._lock:
+            self._connection.execute("UPDATE stage_ledger SET outputs = NULL WHERE job_key = ?", (job_key,))
+
+    def prune(self, completed_before: float) -> int:
+        """Delete records of jobs whose latest stage completed before the given time."""
+        with self._lock:
+            cursor = self._connection.execute(
+                "DELETE FROM stage_ledger WHERE job_key IN ("
+                " SELECT job_key FROM stage_ledger GROUP BY job_key HAVING MAX(completed_at) < ?)",
+                (completed_before,),
+            )
+            return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+# Dataclasses the pipeline stages put in `Stage.outputs`, as "module.Class".
+ARTIFACT_TYPES = frozenset({
+    "chunker.Chunk",
+    "extraction.ExtractionUsage",
+    "conflict_detector.EntityRecord",
+    "conflict_detector.ConflictGroup",
+    "code_index.CodeCandidate",
+    "code_index.SuggestedCode",
+})
+
+
+def encode_outputs(outputs: Dict[str, Any]) -> bytes:
+    """JSON for stage artifacts: JSON values, tuples, bytes, float arrays and `ARTIFACT_TYPES`."""
+    return json.dumps(_encode(outputs), separators=(",", ":")).encode("utf-8")
+
+
+def decode_outputs(data: bytes) -> Dict[str, Any]:
+    """Inverse of `encode_outputs`. Raises ValueError for an unknown tag or type."""
+    return _decode(json.loads(data.decode("utf-8")))
+
+
+def _encode(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    if isinstance(value, tuple):
+        return {"$tuple": [_encode(item) for item in value]}
+    if isinstance(value, dict):
+        if all(isinstance(key, str) and not key.startswith("$") for key in value):
+            return {key: _encode(item) for key, item in value.items()}
+        return {"$dict": [[_encode(key), _encode(item)] for key, item in value.items()]}
+    if isinstance(value, array):
+        return {"$array": value.typecode, "data": base64.b64encode(value.tobytes()).decode("ascii")}
+    if isinstance(value, (bytes, bytearray)):
+        return {"$bytes": base64.b64encode(bytes(value)).decode("ascii")}
+    if is_dataclass(value) and not isinstance(value, type):
+        name = f"{type(value).__module__}.{type(value).__qualname__}"
+        if name not in ARTIFACT_TYPES:
+            raise TypeError(f"Stage artifact type {name} is not in ledger.ARTIFACT_TYPES")
+        return {"$type": name, "fields": {f.name: _encode(getattr(value, f.name)) for f in fields(value)}}
+    raise TypeError(f"Stage artifact of type {type(value).__name__} cannot be stored in the ledger")
+
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if not any(key.startswith("$") for key in value):
+        return {key: _decode(item) for key, item in value.items()}
+    if "$tuple" in value:
+        return tuple(_decode(item) for item in value["$tuple"])
+    if "$dict" in value:
+        return {_decode(key): _decode(item) for key, item in value["$dict"]}
+    if "$array" in value:
+        return array(value["$array"], base64.b64decode(value["data"]))
+    if "$bytes" in value:
+        return base64.b64decode(value["$bytes"])
+    if "$type" in value:
+        name = value["$type"]
+        if name not in ARTIFACT_TYPES:
+            raise ValueError(f"Stage artifact type {name} is not in ledger.ARTIFACT_TYPES")
+        module, _, cls = name.rpartition(".")
+        return getattr(importlib.import_module(module), cls)(
+            **{key: _decode(item) for key, item in value["fields"].items()}
+        )
+    raise ValueError(f"Unknown stage artifact tag in {sorted(value)}")
+
+
+def fingerprint(value: Any) -> str:
+    """Stable SHA-256 of stage artifacts (lists, dicts, dataclasses, float arrays, scalars)."""
+    digest = hashlib.sha256()
+    _feed(digest, value)
+    return digest.hexdigest()
+
+
+def _feed(digest, value: Any) -> None:
+    if isinstance(value, array):
+        digest.update(b"a" + value.typecode.encode() + value.tobytes())
+    elif isinstance(value, (bytes, bytearray)):
+        digest.update(b"b%d:" % len(value) + bytes(value))
+    elif isinstance(value, str):
+        encoded = value.encode("utf-8")
+        digest.update(b"s%d:" % len(encoded) + encoded)
+    elif isinstance(value, dict):
+        digest.update(b"d%d:" % len(value))
+        for key in sorted(value, key=str):
+            _feed(digest, str(key))
+            _feed(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(b"l%d:" % len(value))
+        for item in value:
+            _feed(digest, item)
+    elif is_dataclass(value):
+        digest.update(b"o" + type(value).__name__.encode())
+        _feed(digest, {f.name: getattr(value, f.name) for f in fields(value)})
+    else:
+        digest.update(b"r" + repr(value).encode("utf-8"))
+
+
+def job_key(context: JobContext) -> str:
+    return f"{context.job_id}:{context.document_id}"
+
+
+@dataclass(frozen=True)
+class LedgerStats:
+    restored_jobs: int
+    skipped_stages: int
+    recorded_stages: int
+    stale_records: int
+    store_errors: int
+
+
+class StageLedger:
+    def __init__(self, store: LedgerStore):
+        self._store = store
+        self._lock = threading.Lock()
+        self._restored_jobs = 0
+        self._skipped_stages = 0
+        self._recorded_stages = 0
+        self._stale_records = 0
+        self._store_errors = 0
+
+    async def restore(self, context: JobContext, stages: Sequence[Stage]) -> List[str]:
+        """Restore artifacts of completed stages into the context; return the stage names to skip."""
+        try:
+            records = await asyncio.to_thread(self._store.load, job_key(context))
+        except Exception as e:
+            logger.warning("Stage ledger lookup failed for job %s; running every stage: %s", context.job_id, e)
+            self._count(store_errors=1)
+            return []
+
+        restored: Dict[str, Any] = {}
+        resume = 0
+        stale = 0
+        finished = all(stage.name in records for stage in stages)
+        for stage in stages:
+            if not stage.checkpoint and not finished:
+                resume += 1
+                continue
+            record = records.get(stage.name)
+            if record is None:
+                break
+            if stage.checkpoint and stage.outputs and not finished:
+                outputs = self._load_outputs(record)
+                if outputs is None or fingerprint([outputs.get(k) for k in stage.outputs]) != record.fingerprint:
+                    stale += 1
+                    break
+                restored.update(outputs)
+            resume += 1
+
+        # A non-checkpoint stage before the resume point has to run again with its successor.
+        while resume and resume < len(stages) and not stages[resume - 1].checkpoint:
+            resume -= 1
+
+        skipped = [stage.name for stage in stages[:resume]]
+        for stage in stages[:resume]:
+            for key in stage.outputs:
+                if key in restored:
+                    context.artifacts[key] = restored[key]
+        self._count(restored_jobs=int(bool(skipped)), skipped_stages=len(skipped), stale_records=stale)
+        return skipped
+
+    async def record(self, context: JobContext, stage: Stage) -> None:
+        if not stage.checkpoint:
+            return
+        outputs = {key: context.artifacts.get(key) for key in stage.outputs}
+        try:
+            record = StageRecord(
+                stage=stage.name,
+                fingerprint=fingerprint([outputs[k] for k in stage.outputs]),
+                outputs=encode_outputs(outputs) if outputs else None,
+                completed_at=time.time(),
+            )
+            await asyncio.to_thread(self._store.save, job_key(context), record)
+        except Exception as e:
+            logger.warning("Stage ledger write failed for job %s stage %s: %s", context.job_id, stage.name, e)
+            self._count(store_errors=1)
+            return
+        self._count(recorded_stages=1)
+
+    async def complete(self, context: JobContext, stages: Sequence[Stage]) -> None:
+        """Mark the job finished: record non-checkpoint stages too and drop stored artifacts."""
+        try:
+            for stage in stages:
+                if not stage.checkpoint:
+                    await asyncio.to_thread(
+                        self._store.save, job_key(context), StageRecord(stage.name, "", None, time.time())
+                    )
+            await asyncio.to_thread(self._store.drop_outputs, job_key(context))
+        except Exception as e:
+            logger.warning("Stage ledger completion failed for job %s: %s", context.job_id, e)
+            self._count(store_errors=1)
+
+    def stats(self) -> LedgerStats:
+        with self._lock:
+            return LedgerStats(
+                restored_jobs=self._restored_jobs,
+                skipped_stages=self._skipped_stages,
+                recorded_stages=self._recorded_stages,
+                stale_records=self._stale_records,
+                store_errors=self._store_errors,
+            )
+
+    def _load_outputs(self, record: StageRecord) -> Optional[Dict[str, Any]]:
+        if record.outputs is None:
+            return None
+        try:
+            return decode_outputs(record.outputs)
+        except Exception as e:
+            logger.warning("Discarding unreadable stage ledger outputs for stage %s: %s", record.stage, e)
+            return None
+
+    def _count(self, **deltas: int) -> None:
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, f"_{name}", getattr(self, f"_{name}") + delta)
+
+
+def build_stage_ledger(config: LedgerConfig = LedgerConfig()) -> StageLedger:
+    """SQLite-backed ledger; records older than the retention period are pruned on startup."""
+    store = SqliteLedgerStore(config.path)
+    store.prune(time.time() - config.retention_hours * 3600)
+    return StageLedger(store)
@@ -0,0 +1,90 @@
+"""Gemini text generation client used by entity extraction.
+
+`GeminiLlmClient` calls the `generateContent` REST endpoint with JSON output
+requested (`responseMimeType: application/json`) and returns the text with the
+token counts from `usageMetadata`. Any async callable with the same
+`generate(prompt) -> LlmResponse` shape can stand in for it, e.g. a local fake
+in tests or `RateLimiter.limit(...)` around the client.
+"""
+
+import asyncio
+import json
+import logging
+import urllib.error
+import urllib.request
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from config import ExtractionConfig
+from embedding_client import GEMINI_API_BASE_URL
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class LlmResponse:
+    text: str
+    prompt_tokens: int
+    completion_tokens: int
+
+
+GenerateFn = Callable[[str], Awaitable[LlmResponse]]
+
+
+class LlmApiError(RuntimeError):
+    def __init__(self, status: int, message: str):
+        super().__init__(f"LLM request failed with HTTP {status}: {message}")
+        self.status = status
+
+
+class GeminiLlmClient:
+    def __init__(
+        self,
+        api_key: str,
+        config: ExtractionConfig = ExtractionConfig(),
+        base_url: str = GEMINI_API_BASE_URL,
+        timeout_seconds: float = 120.0,
+    ):
+        self._api_key = api_key
+        self._url = f"{base_url.rstrip('/')}/models/{config.model}:generateContent"
+        self._max_output_tokens = config.max_output_tokens
+        self._timeout = timeout_seconds
+
+    async def generate(self, prompt: str) -> LlmResponse:
+        return await asyncio.to_thread(self._post, prompt)
+
+    def _post(self, prompt: str) -> LlmResponse:
+        body = json.dumps({
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+            "generationConfig": {
+                "temperature": 0.0,
+                "maxOutputTokens": self._max_output_tokens,
+                "responseMimeType": "application/json",
+            },
+        }).encode("utf-8")
+        request = urllib.request.Request(
+            self._url,
+            data=body,
+            method="POST",
+            headers={"Content-Type": "application/json", "x-goog-api-key": self._api_key},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self._timeout) as response:
+                payload = json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise LlmApiError(e.code, e.read().decode("utf-8", "replace")[:500]) from e
+
+        candidates = payload.get("candidates") or []
+        if not candidates:
+            raise LlmApiError(200, f"no candidates returned: {json.dumps(payload.get('promptFeedback', {}))[:500]}")
+        candidate = candidates[0]
+        if candidate.get("finishReason") == "MAX_TOKENS":
+            raise LlmApiError(200, f"response truncated at {self._max_output_tokens} output tokens")
+        text = "".join(part.get("text", "") for part in candidate.get("content", {}).get("parts", []))
+        usage = payload.get("usageMetadata") or {}
+        return LlmResponse(
+            text=text,
+            prompt_tokens=int(usage.get("promptTokenCount", 0)),
+            completion_tokens=int(usage.get("candidatesTokenCount", 0)),
+        )
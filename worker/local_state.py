@@ -0,0 +1,45 @@
+"""Private on-disk locations for worker state.
+
+The stage ledger and the extraction cache hold document text and extracted
+entities (PHI). They must not sit at a predictable name in the shared temp
+directory, where another local user could read them or plant a file first.
+By default they live in a per-user state directory (see `config._state_path`),
+created with mode 0700 by `ensure_private_file`. The code index snapshot is
+written to the same directory, so no other user can replace it, and so is the
+Gemini quota file shared by the worker processes.
+"""
+
+import os
+import stat
+
+
+def ensure_private_dir(directory: str) -> None:
+    """Create `directory` (mode 0700) if missing.
+
+    Raises PermissionError if it belongs to another user (other than root) or
+    anyone can replace files in it (world-writable without the sticky bit).
+    """
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.stat(directory)
+    if info.st_uid not in (os.getuid(), 0):
+        raise PermissionError(f"State directory {directory} is owned by another user (uid {info.st_uid})")
+    if info.st_mode & stat.S_IWOTH and not info.st_mode & stat.S_ISVTX:
+        raise PermissionError(f"State directory {directory} is writable by every user")
+
+
+def ensure_private_file(path: str) -> None:
+    """Create `path` readable and writable only by this user, or check an existing one.
+
+    An existing file owned by another user raises PermissionError; one with
+    looser permissions is narrowed to 0600. Symlinks are not followed.
+    """
+    ensure_private_dir(os.path.dirname(os.path.abspath(path)))
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+    try:
+        info = os.fstat(fd)
+        if info.st_uid != os.getuid():
+            raise PermissionError(f"{path} is owned by another user (uid {info.st_uid})")
+        if stat.S_IMODE(info.st_mode) & 0o077:
+            os.fchmod(fd, 0o600)
+    finally:
+        os.close(fd)
@@ -1,5 +1,7 @@
 import json
 import os
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
 try:
     from jsonschema import Draft7Validator
 except ModuleNotFoundError as e:
@@ -7,6 +9,14 @@ except ModuleNotFoundError as e:
         "Missing dependency 'jsonschema'. Install worker requirements with: pip install -r worker/requirements.txt"
     ) from e
 
+from schema_registry import CompiledSchema, SchemaRegistry, SchemaRegistryStats
+
+
+JOB_CONTRACT = "job"
+ENTITY_CONTRACT = "entity"
+JOB_SCHEMA_VERSION = "1.0"
+_ENTITY_SCHEMA_DIRS = {"1.0": "v1"}
+
 
 def _repo_root() -> str:
     return os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -26,9 +36,9 @@ def _load_job_schema() -> dict:
 
 
 def _load_entity_schema(schema_version: str) -> dict:
-    if schema_version == "1.0":
+    if schema_version in _ENTITY_SCHEMA_DIRS:
         schema_path = os.path.join(
-            _repo_root(), "contracts", "entities", "v1", "entity.schema.json"
+            _repo_root(), "contracts", "entities", _ENTITY_SCHEMA_DIRS[schema_version], "entity.schema.json"
         )
     else:
         raise ValueError(f"Unknown entity schema version: {schema_version}")
@@ -44,28 +54,148 @@ def _load_entity_schema(schema_version: str) -> dict:
         raise RuntimeError(f"Unexpected error loading entity schema: {e}")
 
 
-def validate_job_payload(payload: dict) -> None:
-    schema = _load_job_schema()
-    validator = Draft7Validator(schema)
+def _load_job_schema_version(schema_version: str) -> dict:
+    if schema_version != JOB_SCHEMA_VERSION:
+        raise ValueError(f"Unknown job schema version: {schema_version}")
+    return _load_job_schema()
+
+
+_schema_registry = SchemaRegistry(
+    {
+        JOB_CONTRACT: _load_job_schema_version,
+        ENTITY_CONTRACT: _load_entity_schema,
+    }
+)
+
 
-    errors = sorted(validator.iter_errors(payload), key=lambda e: e.path)
+def get_schema_registry() -> SchemaRegistry:
+    return _schema_registry
+
+
+def reload_schemas() -> SchemaRegistryStats:
+    _schema_registry.reload()
+    return _schema_registry.stats()
+
+
+def _raise_for_errors(compiled: CompiledSchema, payload: dict, label: str) -> None:
+    if compiled.is_valid(payload):
+        return
+
+    errors = sorted(compiled.validator.iter_errors(payload), key=lambda e: e.path)
     if errors:
         messages = [f"{list(e.path)}: {e.message}" for e in errors]
-        raise ValueError("Invalid job payload: " + "; ".join(messages))
+        raise ValueError(f"Invalid {label} payload: " + "; ".join(messages))
+
+
+def validate_job_payload(payload: dict) -> None:
+    compiled = _schema_registry.get(JOB_CONTRACT, JOB_SCHEMA_VERSION)
+    _raise_for_errors(compiled, payload, "job")
 
 
 def validate_entity_payload(payload: dict) -> None:
     schema_version = payload.get("schema_version")
     if not schema_version:
         raise ValueError("Invalid entity payload: missing required field 'schema_version'")
+    if not isinstance(schema_version, str):
+        raise ValueError(f"Unknown entity schema version: {schema_version}")
 
-    schema = _load_entity_schema(schema_version)
-    validator = Draft7Validator(schema)
+    compiled = _schema_registry.get(ENTITY_CONTRACT, schema_version)
+    _raise_for_errors(compiled, payload, "entity")
 
-    errors = sorted(validator.iter_errors(payload), key=lambda e: e.path)
-    if errors:
-        messages = [f"{list(e.path)}: {e.message}" for e in errors]
-        raise ValueError("Invalid entity payload: " + "; ".join(messages))
+
+@dataclass(frozen=True)
+class ValidationIssue:
+    index: int
+    path: str
+    code: str
+    message: str
+    entity_index: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class EntityBatchResult:
+    valid: List[dict]
+    valid_indexes: List[int]
+    errors: List[ValidationIssue]
+    rejected_indexes: List[int]
+    dropped_entities: int
+
+
+def _entity_index(error) -> Optional[int]:
+    path = error.absolute_path
+    if len(path) >= 2 and path[0] == "extracted_entities" and isinstance(path[1], int):
+        return path[1]
+    return None
+
+
+def _entity_payload_issues(index: int, payload) -> List[ValidationIssue]:
+    if not isinstance(payload, dict):
+        return [ValidationIssue(index, "$", "type", "Entity payload must be an object")]
+
+    schema_version = payload.get("schema_version")
+    if not schema_version:
+        return [ValidationIssue(index, "$", "required", "missing required field 'schema_version'")]
+    if not isinstance(schema_version, str) or schema_version not in _ENTITY_SCHEMA_DIRS:
+        message = f"Unknown entity schema version: {schema_version}"
+        return [ValidationIssue(index, "$.schema_version", "unknown_schema_version", message)]
+
+    compiled = _schema_registry.get(ENTITY_CONTRACT, schema_version)
+    if compiled.is_valid(payload):
+        return []
+
+    errors = sorted(compiled.validator.iter_errors(payload), key=lambda e: e.path)
+    return [
+        ValidationIssue(index, e.json_path, e.validator, e.message, _entity_index(e))
+        for e in errors
+    ]
+
+
+def validate_entity_payloads_batch(
+    payloads: Iterable[dict], drop_invalid_entities: bool = False
+) -> EntityBatchResult:
+    """Validate many entity extraction results in one pass.
+
+    Instead of raising, every problem is reported as a ValidationIssue carrying
+    the payload index, JSON path and failing keyword (`code`). With
+    `drop_invalid_entities=True`, a payload whose only problems are inside
+    individual `extracted_entities` items is accepted with those items removed;
+    the removed items are still reported in `errors`.
+    """
+    valid: List[dict] = []
+    valid_indexes: List[int] = []
+    errors: List[ValidationIssue] = []
+    rejected_indexes: List[int] = []
+    dropped_entities = 0
+
+    for index, payload in enumerate(payloads):
+        issues = _entity_payload_issues(index, payload)
+        errors.extend(issues)
+        if not issues:
+            valid.append(payload)
+            valid_indexes.append(index)
+            continue
+
+        invalid_entities = {issue.entity_index for issue in issues}
+        if not drop_invalid_entities or None in invalid_entities:
+            rejected_indexes.append(index)
+            continue
+
+        kept = [
+            entity
+            for position, entity in enumerate(payload["extracted_entities"])
+            if position not in invalid_entities
+        ]
+        valid.append({**payload, "extracted_entities": kept})
+        valid_indexes.append(index)
+        dropped_entities += len(invalid_entities)
+
+    return EntityBatchResult(
+        valid=valid,
+        valid_indexes=valid_indexes,
+        errors=errors,
+        rejected_indexes=rejected_indexes,
+        dropped_entities=dropped_entities,
+    )
 
 
 if __name__ == "__main__":
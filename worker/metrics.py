@@ -0,0 +1,51 @@
+"""In-process metric primitives shared by the worker components."""
+
+import bisect
+import threading
+from dataclasses import dataclass
+from typing import Sequence, Tuple
+
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+@dataclass(frozen=True)
+class HistogramSnapshot:
+    buckets: Tuple[Tuple[float, int], ...]
+    count: int
+    sum: float
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+
+class LatencyHistogram:
+    """Thread-safe fixed-bucket histogram of durations in seconds.
+
+    Snapshots report cumulative bucket counts (Prometheus `le` semantics).
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self._bounds = tuple(sorted(buckets))
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        index = bisect.bisect_left(self._bounds, seconds)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += seconds
+
+    def snapshot(self) -> HistogramSnapshot:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+
+        cumulative = []
+        running = 0
+        for bound, count in zip(self._bounds + (float("inf"),), counts):
+            running += count
+            cumulative.append((bound, running))
+        return HistogramSnapshot(buckets=tuple(cumulative), count=running, sum=total)
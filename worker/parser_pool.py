@@ -0,0 +1,263 @@
+"""Process pool dedicated to CPU-bound document parsing.
+
+Each pool worker is a separate process with its own pipe, so a parse that
+exceeds its timeout can be killed without disturbing other in-flight parses,
+and a worker is replaced after `max_tasks_per_worker` documents to cap memory
+growth from leaky parsers. With `pool_size=0` parsing runs in the calling
+thread (no timeout enforcement), which keeps tests simple.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from config import DocumentStorageConfig, ParserPoolConfig
+from document_loader import resolve_storage_path
+from document_parser import ParsedPage, parse_document
+from metrics import HistogramSnapshot, LatencyHistogram
+from pipeline import JobContext, Stage
+
+
+logger = logging.getLogger(__name__)
+
+ParseFn = Callable[[str, str], List[ParsedPage]]
+
+
+class ParseTimeoutError(TimeoutError):
+    pass
+
+
+class ParserWorkerError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class ParserPoolStats:
+    size: int
+    busy: int
+    waiting: int
+    completed: int
+    failed: int
+    timed_out: int
+    recycled: int
+    latency: HistogramSnapshot
+
+    @property
+    def saturation(self) -> float:
+        """Fraction of pool workers currently parsing (0.0 for in-process mode)."""
+        return self.busy / self.size if self.size else 0.0
+
+
+def _worker_main(conn, parse_fn: ParseFn) -> None:
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        try:
+            result = ("ok", parse_fn(*task))
+        except Exception as e:
+            result = ("error", e)
+        try:
+            conn.send(result)
+        except Exception as e:
+            conn.send(("error", ParserWorkerError(f"Unpicklable parse result: {type(e).__name__}: {e}")))
+
+
+class _WorkerProcess:
+    def __init__(self, context, parse_fn: ParseFn):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, parse_fn), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+
+    def stop(self, timeout: float = 5.0) -> None:
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class ParserPool:
+    def __init__(
+        self,
+        config: ParserPoolConfig = ParserPoolConfig(),
+        parse_fn: ParseFn = parse_document,
+        mp_context=None,
+    ):
+        self._config = config
+        self._parse_fn = parse_fn
+        self._context = mp_context or multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._idle: "queue.Queue[_WorkerProcess]" = queue.Queue()
+        self._closed = False
+        self._busy = 0
+        self._waiting = 0
+        self._completed = 0
+        self._failed = 0
+        self._timed_out = 0
+        self._recycled = 0
+        self._latency = LatencyHistogram()
+
+        for _ in range(config.pool_size):
+            self._idle.put(_WorkerProcess(self._context, parse_fn))
+
+    @property
+    def size(self) -> int:
+        return self._config.pool_size
+
+    def parse(self, path: str, mime_type: str, timeout: Optional[float] = None) -> List[ParsedPage]:
+        """Parse a document on a pool worker, blocking until a worker is free."""
+        if self._closed:
+            raise RuntimeError("Parser pool is closed")
+
+        started = time.perf_counter()
+        try:
+            if self.size == 0:
+                return self._parse_in_process(path, mime_type)
+            return self._parse_on_worker(path, mime_type, timeout or self._config.task_timeout_seconds)
+        finally:
+            self._latency.observe(time.perf_counter() - started)
+
+    async def parse_async(self, path: str, mime_type: str, timeout: Optional[float] = None) -> List[ParsedPage]:
+        return await asyncio.to_thread(self.parse, path, mime_type, timeout)
+
+    def stats(self) -> ParserPoolStats:
+        with self._lock:
+            return ParserPoolStats(
+                size=self.size,
+                busy=self._busy,
+                waiting=self._waiting,
+                completed=self._completed,
+                failed=self._failed,
+                timed_out=self._timed_out,
+                recycled=self._recycled,
+                latency=self._latency.snapshot(),
+            )
+
+    def close(self) -> None:
+        """Stop all workers, waiting for in-flight parses to finish."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in range(self.size):
+            self._idle.get().stop()
+
+    def __enter__(self) -> "ParserPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _parse_in_process(self, path: str, mime_type: str) -> List[ParsedPage]:
+        with self._lock:
+            self._busy += 1
+        try:
+            result = self._parse_fn(path, mime_type)
+        except Exception:
+            self._finish(failed=True)
+            raise
+        self._finish(failed=False)
+        return result
+
+    def _parse_on_worker(self, path: str, mime_type: str, timeout: float) -> List[ParsedPage]:
+        with self._lock:
+            self._waiting += 1
+        worker = self._idle.get()
+        with self._lock:
+            self._waiting -= 1
+            self._busy += 1
+
+        try:
+            if worker.conn.closed:
+                # An earlier replacement could not be started; try again.
+                worker = self._respawn(worker)
+            try:
+                worker.conn.send((path, mime_type))
+                ready = worker.conn.poll(timeout)
+                if ready:
+                    status, value = worker.conn.recv()
+            except Exception as e:
+                # The worker died while idle (send fails) or mid-parse (recv fails), or its reply was unreadable.
+                logger.error("Parser worker pid=%s failed while parsing %s: %r", worker.process.pid, path, e)
+                worker = self._replace(worker)
+                self._finish(failed=True)
+                raise ParserWorkerError(f"Parser worker exited while parsing {path}") from e
+
+            if not ready:
+                logger.warning("Parsing %s exceeded %.1fs; killing parser worker pid=%s", path, timeout, worker.process.pid)
+                worker = self._replace(worker)
+                with self._lock:
+                    self._timed_out += 1
+                self._finish(failed=True)
+                raise ParseTimeoutError(f"Parsing {path} exceeded {timeout}s")
+
+            worker.tasks += 1
+            if worker.tasks >= self._config.max_tasks_per_worker:
+                worker.stop()
+                worker = self._respawn(worker)
+                with self._lock:
+                    self._recycled += 1
+
+            if status == "error":
+                self._finish(failed=True)
+                raise value
+            self._finish(failed=False)
+            return value
+        finally:
+            self._idle.put(worker)
+
+    def _replace(self, worker: _WorkerProcess) -> _WorkerProcess:
+        worker.kill()
+        return self._respawn(worker)
+
+    def _respawn(self, stopped: _WorkerProcess) -> _WorkerProcess:
+        """A new worker for `stopped`'s slot.
+
+        If it cannot be started, the stopped worker keeps the slot, so `close()`
+        still finds every slot; the next parse to take it tries again.
+        """
+        try:
+            return _WorkerProcess(self._context, self._parse_fn)
+        except Exception:
+            logger.exception("Could not start a replacement parser worker")
+            return stopped
+
+    def _finish(self, failed: bool) -> None:
+        with self._lock:
+            self._busy -= 1
+            if failed:
+                self._failed += 1
+            else:
+                self._completed += 1
+
+
+def parse_stage(
+    pool: ParserPool, storage: DocumentStorageConfig = DocumentStorageConfig(), concurrency: Optional[int] = None
+) -> Stage:
+    """Pipeline `load` stage: parse the job's stored document into `artifacts['pages']`."""
+
+    async def run(context: JobContext) -> None:
+        payload = context.job["payload"]
+        path = resolve_storage_path(storage.base_path, payload["storagePath"])
+        context.artifacts["pages"] = await pool.parse_async(path, payload["mimeType"])
+
+    return Stage("load", run, concurrency=concurrency or max(pool.size, 1), checkpoint=False)
@@ -0,0 +1,439 @@
+"""Incrementally maintained per-patient entity aggregate for the Patient 360 view.
+
+The aggregate merges a patient's extracted entities by category and
+normalized entity name. Each merged entity lists the distinct values found
+(case and whitespace-insensitive), each with its citations: document, page,
+section and quoted source text. Conflicting values reported by extraction
+become further values of the same entity.
+
+It is stored as one row per citation (`patient_entity_citations`) and one row
+per distinct value with its citation count (`patient_entity_values`). When a
+document's validated EntityExtractionResult arrives, its earlier citations
+are deleted, its new ones inserted and the affected counts adjusted; values
+left without citations are removed. Applying a document again (retry,
+re-extraction) therefore replaces rather than duplicates, and the work is
+proportional to the document, not to the patient's history. Reads are two
+indexed queries with no merging left to do.
+
+`PgPatientAggregateStore.rebuild` recomputes a patient from
+`extracted_entities` for repair; run it with
+`python worker/patient_aggregate.py rebuild <patient_id>`.
+"""
+
+import argparse
+import asyncio
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from metrics import HistogramSnapshot, LatencyHistogram
+from pipeline import JobContext, Stage
+
+
+ValueId = Tuple[str, str]
+
+
+def _normalize(text: str) -> str:
+    return " ".join(str(text).casefold().split())
+
+
+def entity_key(entity_group_name: str, entity_name: str) -> str:
+    return f"{_normalize(entity_group_name)}/{_normalize(entity_name)}"
+
+
+@dataclass(frozen=True)
+class CitationRow:
+    entity_key: str
+    value_key: str
+    entity_group_name: str
+    entity_name: str
+    value: str
+    document_id: str
+    page: Optional[int]
+    section: Optional[str]
+    source_text: Optional[str]
+
+    @property
+    def value_id(self) -> ValueId:
+        return self.entity_key, self.value_key
+
+
+def citation_rows(payload: dict) -> List[CitationRow]:
+    """One row per entity value and per conflicting value of an EntityExtractionResult.
+
+    Conflicts sourced from another document (added by `conflict_detector`) are
+    skipped: that document cites the value itself.
+    """
+    document_id = str(payload["document_id"])
+    rows = []
+    for entity in payload["extracted_entities"]:
+        group, name = entity["entity_group_name"], entity["entity_name"]
+        key = entity_key(group, name)
+        found = [(entity["entity_value"], entity.get("document_location"), entity.get("source_text"))]
+        found.extend(
+            (conflict["conflicting_value"], conflict.get("document_location"), None)
+            for conflict in entity.get("conflicts") or []
+            if str(conflict.get("source_document", document_id)) == document_id
+        )
+        for value, location, source_text in found:
+            location = location or {}
+            rows.append(CitationRow(
+                entity_key=key,
+                value_key=_normalize(value),
+                entity_group_name=group,
+                entity_name=name,
+                value=value,
+                document_id=document_id,
+                page=location.get("page"),
+                section=location.get("section"),
+                source_text=source_text,
+            ))
+    return rows
+
+
+def count_changes(retracted: Iterable[ValueId], added: Iterable[CitationRow]) -> Dict[ValueId, int]:
+    """Net change in citation count per value."""
+    changes: Dict[ValueId, int] = {}
+    for value_id in retracted:
+        changes[value_id] = changes.get(value_id, 0) - 1
+    for row in added:
+        changes[row.value_id] = changes.get(row.value_id, 0) + 1
+    return {value_id: change for value_id, change in changes.items() if change}
+
+
+def merge_entities(values: Iterable[dict], citations: Iterable[CitationRow]) -> Dict[str, List[dict]]:
+    """Merged entities grouped by category, as the Patient 360 view reads them.
+
+    `values` are value rows (`entity_key`, `value_key`, `entity_group_name`,
+    `entity_name`, `value`); `citations` are the patient's citation rows.
+    """
+    cited: Dict[ValueId, List[dict]] = {}
+    for row in sorted(citations, key=lambda r: (r.document_id, r.page or 0)):
+        cited.setdefault(row.value_id, []).append(
+            {"document_id": row.document_id, "page": row.page, "section": row.section, "source_text": row.source_text}
+        )
+    entities: Dict[str, dict] = {}
+    for value in sorted(values, key=lambda v: (v["entity_key"], v["value_key"])):
+        entity = entities.setdefault(value["entity_key"], {
+            "entity_group_name": value["entity_group_name"],
+            "entity_name": value["entity_name"],
+            "values": [],
+        })
+        entity["values"].append(
+            {"value": value["value"], "citations": cited.get((value["entity_key"], value["value_key"]), [])}
+        )
+    grouped: Dict[str, List[dict]] = {}
+    for key, entity in entities.items():
+        grouped.setdefault(entity["entity_group_name"], []).append(entity)
+    return dict(sorted(grouped.items()))
+
+
+@dataclass(frozen=True)
+class AggregateDelta:
+    document_id: str
+    inserted: int
+    retracted: int
+    changed_values: int
+    deleted_values: int
+
+
+class PatientAggregate:
+    """One patient's aggregate held in memory; the reference for the stored form."""
+
+    def __init__(self):
+        self.values: Dict[ValueId, dict] = {}
+        self.document_citations: Dict[str, List[CitationRow]] = {}
+
+    @classmethod
+    def rebuild(cls, payloads: Iterable[dict]) -> "PatientAggregate":
+        aggregate = cls()
+        for payload in payloads:
+            aggregate.apply(payload)
+        return aggregate
+
+    def apply(self, payload: dict) -> AggregateDelta:
+        return self._apply(str(payload["document_id"]), citation_rows(payload))
+
+    def remove_document(self, document_id: str) -> AggregateDelta:
+        return self._apply(str(document_id), [])
+
+    def by_category(self) -> Dict[str, List[dict]]:
+        return merge_entities(
+            self.values.values(), (row for rows in self.document_citations.values() for row in rows)
+        )
+
+    def _apply(self, document_id: str, rows: List[CitationRow]) -> AggregateDelta:
+        previous = self.document_citations.pop(document_id, [])
+        if rows:
+            self.document_citations[document_id] = rows
+        first_rows = {}
+        for row in rows:
+            first_rows.setdefault(row.value_id, row)
+        changes = count_changes((row.value_id for row in previous), rows)
+        deleted = 0
+        for value_id, change in changes.items():
+            value = self.values.get(value_id)
+            if value is None:
+                value = self.values[value_id] = _value_row(first_rows[value_id], 0)
+            value["citations"] += change
+            if value["citations"] <= 0:
+                del self.values[value_id]
+                deleted += 1
+        return AggregateDelta(document_id, len(rows), len(previous), len(changes), deleted)
+
+
+def _value_row(row: CitationRow, citations: int) -> dict:
+    return {
+        "entity_key": row.entity_key,
+        "value_key": row.value_key,
+        "entity_group_name": row.entity_group_name,
+        "entity_name": row.entity_name,
+        "value": row.value,
+        "citations": citations,
+    }
+
+
+# Tables created by the Server migration 20260117090000_AddPatientEntityAggregate.
+_LOCK_DOCUMENT_SQL = 'SELECT "PatientId", "IsDeleted" FROM documents WHERE "Id" = %s FOR KEY SHARE'
+# A hard-deleted document's patient, if the migration's trigger has not already retracted it.
+_CITED_PATIENT_SQL = 'SELECT "PatientId" FROM patient_entity_citations WHERE "DocumentId" = %s LIMIT 1'
+# Serializes aggregate updates per patient; documents of one patient can finish concurrently.
+_LOCK_PATIENT_SQL = "SELECT pg_advisory_xact_lock(hashtextextended(%s, 0))"
+_RETRACT_CITATIONS_SQL = (
+    'DELETE FROM patient_entity_citations WHERE "PatientId" = %s AND "DocumentId" = %s '
+    'RETURNING "EntityKey", "ValueKey"'
+)
+_INSERT_CITATION_SQL = (
+    'INSERT INTO patient_entity_citations ("PatientId", "EntityKey", "ValueKey", "DocumentId", "Page", "Section", '
+    '"SourceText") VALUES (%s, %s, %s, %s, %s, %s, %s)'
+)
+# The first document to cite a value sets its display name and text.
+_CHANGE_VALUE_SQL = (
+    'INSERT INTO patient_entity_values ("PatientId", "EntityKey", "ValueKey", "Category", "Name", "Value", '
+    '"Citations", "UpdatedAt") VALUES (%s, %s, %s, %s, %s, %s, %s, now()) '
+    'ON CONFLICT ("PatientId", "EntityKey", "ValueKey") DO UPDATE SET '
+    '"Citations" = patient_entity_values."Citations" + EXCLUDED."Citations", "UpdatedAt" = EXCLUDED."UpdatedAt"'
+)
+_DELETE_EMPTY_VALUES_SQL = 'DELETE FROM patient_entity_values WHERE "PatientId" = %s AND "Citations" <= 0'
+_LOAD_VALUES_SQL = (
+    'SELECT "EntityKey", "ValueKey", "Category", "Name", "Value", "Citations" '
+    'FROM patient_entity_values WHERE "PatientId" = %s'
+)
+_LOAD_CITATIONS_SQL = (
+    'SELECT "EntityKey", "ValueKey", "DocumentId", "Page", "Section", "SourceText" '
+    'FROM patient_entity_citations WHERE "PatientId" = %s'
+)
+_REBUILD_SOURCE_SQL = (
+    'SELECT e."DocumentId", e."Category", e."Name", e."Value", c."Page", c."Section", c."CitedText" '
+    "FROM extracted_entities e "
+    'JOIN documents d ON d."Id" = e."DocumentId" AND NOT d."IsDeleted" '
+    'LEFT JOIN entity_citations c ON c."ExtractedEntityId" = e."Id" '
+    'WHERE e."PatientId" = %s AND e."Value" IS NOT NULL '
+    'ORDER BY e."DocumentId", e."Id", c."Page"'
+)
+_CLEAR_PATIENT_SQL = (
+    'DELETE FROM patient_entity_citations WHERE "PatientId" = %s',
+    'DELETE FROM patient_entity_values WHERE "PatientId" = %s',
+)
+
+
+@dataclass(frozen=True)
+class AggregateStats:
+    documents: int
+    citations_inserted: int
+    citations_retracted: int
+    rebuilds: int
+    latency: HistogramSnapshot
+
+
+class PgPatientAggregateStore:
+    """Keeps the aggregate in `patient_entity_values` and `patient_entity_citations`.
+
+    `connect` returns a context-managed psycopg connection (e.g. `pool.connection`
+    from `db.create_pool`). The patient is resolved from `documents`, or from the
+    document's citations once it is deleted. A deleted document (`IsDeleted`)
+    is retracted instead of applied, as `rebuild` leaves it out.
+    """
+
+    def __init__(self, connect: Callable[[], Any]):
+        self._connect = connect
+        self._lock = threading.Lock()
+        self._documents = 0
+        self._citations_inserted = 0
+        self._citations_retracted = 0
+        self._rebuilds = 0
+        self._latency = LatencyHistogram()
+
+    def apply(self, payload: dict) -> AggregateDelta:
+        """Apply a validated EntityExtractionResult to its patient's aggregate in one transaction."""
+        return self._apply(str(payload["document_id"]), citation_rows(payload))
+
+    def remove_document(self, document_id: str) -> AggregateDelta:
+        """Retract a document's citations, whether or not its `documents` row still exists."""
+        return self._apply(str(document_id), [])
+
+    def load(self, patient_id: str) -> Dict[str, List[dict]]:
+        """The patient's merged entities grouped by category."""
+        patient_uuid = uuid.UUID(str(patient_id))
+        with self._connect() as conn:
+            with conn.cursor() as cur:
+                cur.execute(_LOAD_VALUES_SQL, (patient_uuid,))
+                values = [
+                    {
+                        "entity_key": key, "value_key": value_key, "entity_group_name": category,
+                        "entity_name": name, "value": value, "citations": citations,
+                    }
+                    for key, value_key, category, name, value, citations in cur.fetchall()
+                ]
+                cur.execute(_LOAD_CITATIONS_SQL, (patient_uuid,))
+                citations = [
+                    CitationRow(key, value_key, "", "", "", str(document_id), page, section, source_text)
+                    for key, value_key, document_id, page, section, source_text in cur.fetchall()
+                ]
+        return merge_entities(values, citations)
+
+    def rebuild(self, patient_id: str) -> int:
+        """Recompute a patient's aggregate from `extracted_entities`; returns the number of values."""
+        patient_uuid = uuid.UUID(str(patient_id))
+        started = time.perf_counter()
+        with self._connect() as conn:
+            with conn.transaction():
+                with conn.cursor() as cur:
+                    cur.execute(_LOCK_PATIENT_SQL, (str(patient_uuid),))
+                    cur.execute(_REBUILD_SOURCE_SQL, (patient_uuid,))
+                    aggregate = PatientAggregate.rebuild(_payloads_from_rows(cur.fetchall()))
+                    for sql in _CLEAR_PATIENT_SQL:
+                        cur.execute(sql, (patient_uuid,))
+                    rows = [row for rows in aggregate.document_citations.values() for row in rows]
+                    self._insert_citations(cur, patient_uuid, rows)
+                    cur.executemany(_CHANGE_VALUE_SQL, [
+                        (patient_uuid, v["entity_key"], v["value_key"], v["entity_group_name"], v["entity_name"],
+                         v["value"], v["citations"])
+                        for v in aggregate.values.values()
+                    ])
+        self._latency.observe(time.perf_counter() - started)
+        with self._lock:
+            self._rebuilds += 1
+        return len(aggregate.values)
+
+    def stats(self) -> AggregateStats:
+        with self._lock:
+            return AggregateStats(
+                documents=self._documents,
+                citations_inserted=self._citations_inserted,
+                citations_retracted=self._citations_retracted,
+                rebuilds=self._rebuilds,
+                latency=self._latency.snapshot(),
+            )
+
+    def _apply(self, document_id: str, rows: List[CitationRow]) -> AggregateDelta:
+        document_uuid = uuid.UUID(document_id)
+        started = time.perf_counter()
+        with self._connect() as conn:
+            with conn.transaction():
+                with conn.cursor() as cur:
+                    cur.execute(_LOCK_DOCUMENT_SQL, (document_uuid,))
+                    found = cur.fetchone()
+                    if found is not None:
+                        patient_uuid, is_deleted = found
+                        if is_deleted:
+                            rows = []
+                    elif rows:
+                        raise LookupError(f"Document {document_id} no longer exists")
+                    else:
+                        cur.execute(_CITED_PATIENT_SQL, (document_uuid,))
+                        cited = cur.fetchone()
+                        patient_uuid = cited[0] if cited else None
+                    retracted: List[ValueId] = []
+                    changes: Dict[ValueId, int] = {}
+                    deleted = 0
+                    if patient_uuid is not None:
+                        cur.execute(_LOCK_PATIENT_SQL, (str(patient_uuid),))
+                        cur.execute(_RETRACT_CITATIONS_SQL, (patient_uuid, document_uuid))
+                        retracted = [(key, value_key) for key, value_key in cur.fetchall()]
+                        self._insert_citations(cur, patient_uuid, rows)
+                        changes = count_changes(retracted, rows)
+                        first_rows: Dict[ValueId, CitationRow] = {}
+                        for row in rows:
+                            first_rows.setdefault(row.value_id, row)
+                        # A value only retracted here already has a row, so its display columns are ignored.
+                        cur.executemany(_CHANGE_VALUE_SQL, [
+                            (patient_uuid, key, value_key, *_display(first_rows.get((key, value_key))), change)
+                            for (key, value_key), change in changes.items()
+                        ])
+                        if any(change < 0 for change in changes.values()):
+                            cur.execute(_DELETE_EMPTY_VALUES_SQL, (patient_uuid,))
+                            deleted = max(cur.rowcount, 0)
+        self._latency.observe(time.perf_counter() - started)
+        with self._lock:
+            self._documents += 1
+            self._citations_inserted += len(rows)
+            self._citations_retracted += len(retracted)
+        return AggregateDelta(document_id, len(rows), len(retracted), len(changes), deleted)
+
+    @staticmethod
+    def _insert_citations(cur, patient_uuid: uuid.UUID, rows: Sequence[CitationRow]) -> None:
+        if rows:
+            cur.executemany(_INSERT_CITATION_SQL, [
+                (patient_uuid, row.entity_key, row.value_key, uuid.UUID(row.document_id), row.page, row.section,
+                 row.source_text)
+                for row in rows
+            ])
+
+
+def _display(row: Optional[CitationRow]) -> Tuple[str, str, str]:
+    if row is None:
+        return "", "", ""
+    return row.entity_group_name, row.entity_name, row.value
+
+
+def _payloads_from_rows(rows: Sequence[Sequence[Any]]) -> List[dict]:
+    """Per-document payloads from `extracted_entities` rows joined with their citations.
+
+    An entity with several citations comes back once per citation; each row
+    becomes one entity, i.e. one citation of that value.
+    """
+    payloads: Dict[str, dict] = {}
+    for document_id, category, name, value, page, section, cited_text in rows:
+        payload = payloads.setdefault(str(document_id), {"document_id": str(document_id), "extracted_entities": []})
+        entity: Dict[str, Any] = {"entity_group_name": category, "entity_name": name, "entity_value": value}
+        if page is not None or section is not None:
+            entity["document_location"] = {"page": page, "section": section}
+        if cited_text is not None:
+            entity["source_text"] = cited_text
+        payload["extracted_entities"].append(entity)
+    return list(payloads.values())
+
+
+def aggregate_stage(store: PgPatientAggregateStore, concurrency: int = 1) -> Stage:
+    """Pipeline `aggregate` stage: applies `artifacts['entities']` to the patient's aggregate."""
+
+    async def run(context: JobContext) -> None:
+        await asyncio.to_thread(store.apply, context.artifacts["entities"])
+
+    return Stage("aggregate", run, concurrency=concurrency)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Maintain per-patient entity aggregates.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    rebuild = subcommands.add_parser("rebuild", help="Recompute aggregates from extracted_entities")
+    rebuild.add_argument("patient_ids", nargs="+", help="Patient Ids to rebuild")
+    args = parser.parse_args(argv)
+
+    from config import load_database_config
+    from db import connect
+
+    database_config = load_database_config()
+    store = PgPatientAggregateStore(lambda: connect(database_config))
+    for patient_id in args.patient_ids:
+        values = store.rebuild(patient_id)
+        print(f"{patient_id}: {values} values", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""asyncio stage pipeline for document processing jobs.
+
+A job flows through an ordered list of stages (by default load -> chunk ->
+embed -> persist_chunks -> extract -> persist_entities). Every stage has its own
+bounded input queue and a fixed number of worker tasks, so while one job waits
+on embedding calls another job can be in extraction. A full downstream queue
+blocks the upstream stage, which bounds memory per pipeline.
+
+Stages are async callables that read and write the shared JobContext. CPU-bound
+work should be offloaded by the stage itself (e.g. run_in_executor).
+
+With a `StageLedger` (ledger.py), each completed stage is recorded, and a
+redelivered job skips the stages it already finished.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from main import validate_job_payload
+from metrics import HistogramSnapshot, LatencyHistogram
+
+if TYPE_CHECKING:
+    from ledger import StageLedger
+
+
+DEFAULT_STAGE_NAMES = ("load", "chunk", "embed", "persist_chunks", "extract", "persist_entities")
+
+
+@dataclass
+class JobContext:
+    job: dict
+    artifacts: Dict[str, Any] = field(default_factory=dict)
+    stage_seconds: Dict[str, float] = field(default_factory=dict)
+    skipped_stages: Set[str] = field(default_factory=set)
+
+    @property
+    def job_id(self) -> str:
+        return self.job["job_id"]
+
+    @property
+    def document_id(self) -> str:
+        return self.job["document_id"]
+
+
+StageFn = Callable[[JobContext], Awaitable[None]]
+
+
+@dataclass(frozen=True)
+class Stage:
+    """A pipeline stage.
+
+    `outputs` names the artifacts the stage produces, which the stage ledger
+    stores so a retry can skip it. `checkpoint=False` marks stages whose output
+    cannot be stored (e.g. a lazy page stream); they are re-run when needed.
+    """
+
+    name: str
+    run: StageFn
+    concurrency: int = 1
+    outputs: Tuple[str, ...] = ()
+    checkpoint: bool = True
+
+
+@dataclass(frozen=True)
+class StageStats:
+    name: str
+    queue_depth: int
+    in_progress: int
+    completed: int
+    failed: int
+    latency: HistogramSnapshot
+    skipped: int = 0
+
+
+class StageError(RuntimeError):
+    def __init__(self, stage: str, job_id: str, cause: BaseException):
+        super().__init__(f"Stage '{stage}' failed for job {job_id}: {cause}")
+        self.stage = stage
+        self.job_id = job_id
+        self.cause = cause
+
+
+class _StageState:
+    def __init__(self, stage: Stage, queue_size: int):
+        self.stage = stage
+        self.queue: Optional[asyncio.Queue] = None
+        self.queue_size = queue_size
+        self.in_progress = 0
+        self.completed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.latency = LatencyHistogram()
+
+
+class PipelineExecutor:
+    def __init__(self, stages: Sequence[Stage], queue_size: int = 8, ledger: Optional["StageLedger"] = None):
+        if not stages:
+            raise ValueError("Pipeline requires at least one stage")
+        names = [stage.name for stage in stages]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Duplicate stage names: {names}")
+
+        self._stages = list(stages)
+        self._ledger = ledger
+        self._states = [_StageState(stage, queue_size) for stage in stages]
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    async def start(self) -> None:
+        if self._tasks:
+            raise RuntimeError("Pipeline already started")
+        self._loop = asyncio.get_running_loop()
+        for index, state in enumerate(self._states):
+            state.queue = asyncio.Queue(maxsize=state.queue_size)
+            for _ in range(state.stage.concurrency):
+                self._tasks.append(asyncio.create_task(self._worker(index), name=f"stage-{state.stage.name}"))
+
+    async def submit(self, job: dict) -> JobContext:
+        """Validate the job, run it through every stage and return its context."""
+        validate_job_payload(job)
+        return await self._submit_validated(job)
+
+    async def close(self) -> None:
+        """Wait for queued jobs to finish, then stop the stage workers."""
+        for state in self._states:
+            await state.queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> List[StageStats]:
+        return [
+            StageStats(
+                name=state.stage.name,
+                queue_depth=state.queue.qsize() if state.queue is not None else 0,
+                in_progress=state.in_progress,
+                completed=state.completed,
+                failed=state.failed,
+                latency=state.latency.snapshot(),
+                skipped=state.skipped,
+            )
+            for state in self._states
+        ]
+
+    def start_in_thread(self) -> None:
+        """Run the pipeline on a dedicated event loop thread (for the threaded job consumer)."""
+        started = threading.Event()
+        loop = asyncio.new_event_loop()
+
+        def run() -> None:
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(self.start())
+            started.set()
+            loop.run_forever()
+            loop.close()
+
+        self._thread = threading.Thread(target=run, name="pipeline-loop", daemon=True)
+        self._thread.start()
+        started.wait()
+
+    def submit_threadsafe(self, job: dict) -> "concurrent.futures.Future[JobContext]":
+        validate_job_payload(job)
+        return asyncio.run_coroutine_threadsafe(self._submit_validated(job), self._loop)
+
+    def close_thread(self) -> None:
+        asyncio.run_coroutine_threadsafe(self.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._thread = None
+
+    async def _submit_validated(self, job: dict) -> JobContext:
+        future = asyncio.get_running_loop().create_future()
+        context = JobContext(job=job)
+        if self._ledger is not None:
+            context.skipped_stages.update(await self._ledger.restore(context, self._stages))
+        await self._states[0].queue.put((context, future))
+        context = await future
+        if self._ledger is not None:
+            await self._ledger.complete(context, self._stages)
+        return context
+
+    async def _worker(self, index: int) -> None:
+        state = self._states[index]
+        next_queue = self._states[index + 1].queue if index + 1 < len(self._states) else None
+
+        while True:
+            context, future = await state.queue.get()
+            if not future.done() and state.stage.name in context.skipped_stages:
+                state.skipped += 1
+                state.queue.task_done()
+                await self._forward(context, future, next_queue)
+                continue
+            try:
+                if future.done():
+                    continue
+                state.in_progress += 1
+                started = time.perf_counter()
+                try:
+                    await state.stage.run(context)
+                finally:
+                    elapsed = time.perf_counter() - started
+                    state.in_progress -= 1
+                    state.latency.observe(elapsed)
+                    context.stage_seconds[state.stage.name] = elapsed
+                if self._ledger is not None:
+                    await self._ledger.record(context, state.stage)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                state.failed += 1
+                if not future.done():
+                    future.set_exception(StageError(state.stage.name, context.job_id, e))
+                continue
+            finally:
+                state.queue.task_done()
+
+            state.completed += 1
+            await self._forward(context, future, next_queue)
+
+    @staticmethod
+    async def _forward(context: JobContext, future: asyncio.Future, next_queue: Optional[asyncio.Queue]) -> None:
+        if next_queue is not None:
+            await next_queue.put((context, future))
+        elif not future.done():
+            future.set_result(context)
@@ -0,0 +1,108 @@
+"""Scalar quantization of embeddings for the in-process caches and indexes.
+
+A 768-d float32 embedding takes 3 KB. `float16` halves that with a relative
+error around 1e-3. `int8` stores each vector as 768 signed bytes plus one
+float32 scale (`max(|x|) / 127`), a quarter of the size. Indexes score
+candidates on the quantized rows and re-rank the best of them at full precision
+(see `vector_index.ExactIndex`).
+"""
+
+import struct
+from array import array
+from typing import Any, Optional, Sequence, Tuple, Union
+
+
+FLOAT32 = "float32"
+FLOAT16 = "float16"
+INT8 = "int8"
+PRECISIONS = (FLOAT32, FLOAT16, INT8)
+
+# Rows dequantized per step when scoring, bounding the float32 scratch memory.
+SCORE_BLOCK_ROWS = 8192
+
+_SCALE = struct.Struct("<f")
+
+
+def _numpy():
+    try:
+        import numpy
+    except ModuleNotFoundError as e:
+        raise ModuleNotFoundError(
+            "Missing dependency 'numpy'. Install worker requirements with: pip install -r worker/requirements.txt"
+        ) from e
+    return numpy
+
+
+def check_precision(precision: str) -> str:
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}', expected one of {', '.join(PRECISIONS)}")
+    return precision
+
+
+def storage_dtype(precision: str):
+    np = _numpy()
+    return {FLOAT32: np.float32, FLOAT16: np.float16, INT8: np.int8}[check_precision(precision)]
+
+
+def bytes_per_vector(dimensions: int, precision: str) -> int:
+    """Payload bytes of one quantized vector (the int8 scale included)."""
+    return dimensions * {FLOAT32: 4, FLOAT16: 2, INT8: 1}[check_precision(precision)] + (4 if precision == INT8 else 0)
+
+
+def quantize_rows(matrix: Any, precision: str) -> Tuple[Any, Optional[Any]]:
+    """Quantize a float32 matrix row by row; returns `(data, scales)`, `scales` only for int8."""
+    np = _numpy()
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if precision == INT8:
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        data = np.rint(matrix / scales[:, None]).astype(np.int8)
+        return data, scales.astype(np.float32)
+    return matrix.astype(storage_dtype(precision)), None
+
+
+def dequantize_rows(data: Any, scales: Optional[Any] = None):
+    np = _numpy()
+    matrix = data.astype(np.float32)
+    if scales is not None:
+        matrix *= scales[:, None]
+    return matrix
+
+
+def score_rows(queries: Any, data: Any, scales: Optional[Any] = None, block_rows: int = SCORE_BLOCK_ROWS):
+    """`queries @ dequantize_rows(data, scales).T`, dequantizing `block_rows` rows at a time."""
+    np = _numpy()
+    if data.dtype == np.float32:
+        return queries @ data.T
+    scores = np.empty((len(queries), len(data)), dtype=np.float32)
+    for start in range(0, len(data), block_rows):
+        block = data[start:start + block_rows].astype(np.float32)
+        np.matmul(queries, block.T, out=scores[:, start:start + len(block)])
+    if scales is not None:
+        scores *= scales
+    return scores
+
+
+def encode_vector(vector: Sequence[float], precision: str) -> Union[array, bytes]:
+    """Compact form of one vector for a cache entry; float32 keeps the `array('f')` itself."""
+    if precision == FLOAT32:
+        return vector if isinstance(vector, array) and vector.typecode == "f" else array("f", vector)
+    data, scales = quantize_rows([vector], precision)
+    if scales is None:
+        return data.tobytes()
+    return _SCALE.pack(scales[0]) + data.tobytes()
+
+
+def decode_vector(encoded: Union[array, bytes], precision: str) -> array:
+    """Inverse of `encode_vector`, back to a float32 `array('f')`."""
+    if precision == FLOAT32:
+        return encoded
+    np = _numpy()
+    if precision == INT8:
+        (scale,) = _SCALE.unpack_from(encoded)
+        values = np.frombuffer(encoded, dtype=np.int8, offset=_SCALE.size).astype(np.float32) * np.float32(scale)
+    else:
+        values = np.frombuffer(encoded, dtype=np.float16).astype(np.float32)
+    result = array("f")
+    result.frombytes(values.tobytes())
+    return result
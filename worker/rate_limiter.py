@@ -0,0 +1,227 @@
+"""Token-bucket rate limiting for Gemini quotas, shared across worker processes.
+
+Each model has two buckets: one for requests (RPM) and one for tokens (the
+daily token budget, refilled continuously). A permit is granted only when both
+buckets can cover it, and the deduction is atomic across them. Bucket state
+lives in a pluggable `BucketStore`:
+
+- `InMemoryBucketStore` for a single process (and tests),
+- `FileBucketStore` for every worker process on a host (state file guarded by
+  an exclusive `flock`),
+- any other implementation of `try_acquire` (e.g. Redis) for cross-node limits.
+
+Callers `await limiter.acquire(model, tokens)` and are delayed until the quota
+allows the call, instead of failing with HTTP 429 and burning retries.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Mapping, Optional, Protocol, Sequence, Tuple, TypeVar
+
+from config import EmbeddingConfig, RateLimitConfig
+from local_state import ensure_private_file
+from metrics import HistogramSnapshot, LatencyHistogram
+
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class BucketSpec:
+    capacity: float
+    refill_per_second: float
+
+
+@dataclass(frozen=True)
+class ModelQuota:
+    requests_per_minute: int = 15
+    tokens_per_day: int = 1_000_000
+
+    def buckets(self, model: str) -> Tuple[Tuple[str, BucketSpec], Tuple[str, BucketSpec]]:
+        return (
+            (f"{model}:requests", BucketSpec(self.requests_per_minute, self.requests_per_minute / 60.0)),
+            (f"{model}:tokens", BucketSpec(self.tokens_per_day, self.tokens_per_day / 86400.0)),
+        )
+
+
+# A cost is (bucket key, bucket spec, amount to take).
+BucketCost = Tuple[str, BucketSpec, float]
+
+
+class BucketStore(Protocol):
+    def try_acquire(self, costs: Sequence[BucketCost], now: float) -> float:
+        """Atomically take every cost, or none; return 0.0 on success, else seconds until it could succeed."""
+        ...
+
+
+def _try_acquire(state: Dict[str, List[float]], costs: Sequence[BucketCost], now: float) -> float:
+    """Shared bucket arithmetic. `state` maps key -> [level, last_refill_time] and is updated in place."""
+    levels = []
+    wait = 0.0
+    for key, spec, amount in costs:
+        level, updated = state.get(key, (spec.capacity, now))
+        level = min(spec.capacity, level + max(0.0, now - updated) * spec.refill_per_second)
+        levels.append(level)
+        if level < amount:
+            wait = max(wait, (amount - level) / spec.refill_per_second)
+
+    if wait > 0:
+        return wait
+    for (key, _, amount), level in zip(costs, levels):
+        state[key] = [level - amount, now]
+    return 0.0
+
+
+class InMemoryBucketStore:
+    def __init__(self):
+        self._state: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def try_acquire(self, costs: Sequence[BucketCost], now: float) -> float:
+        with self._lock:
+            return _try_acquire(self._state, costs, now)
+
+
+class FileBucketStore:
+    """Bucket state in a small JSON file, updated under an exclusive flock (POSIX hosts).
+
+    The file is private to the worker's user (see `local_state`): another user
+    could otherwise plant a symlink there, tamper with the buckets or hold the
+    lock and stall every permit.
+    """
+
+    def __init__(self, path: str = RateLimitConfig().state_path):
+        ensure_private_file(path)
+        self._path = path
+        self._lock = threading.Lock()
+
+    def try_acquire(self, costs: Sequence[BucketCost], now: float) -> float:
+        import fcntl
+
+        with self._lock, os.fdopen(os.open(self._path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600), "r+") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                handle.seek(0)
+                raw = handle.read()
+                state = json.loads(raw) if raw.strip() else {}
+                wait = _try_acquire(state, costs, now)
+                if wait == 0.0:
+                    handle.seek(0)
+                    handle.truncate()
+                    handle.write(json.dumps(state))
+                    handle.flush()
+                return wait
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+@dataclass(frozen=True)
+class RateLimiterStats:
+    model: str
+    acquired: int
+    throttled: int
+    tokens: int
+    wait_seconds: float
+    wait: HistogramSnapshot
+
+
+class _ModelCounters:
+    def __init__(self):
+        self.acquired = 0
+        self.throttled = 0
+        self.tokens = 0
+        self.wait_seconds = 0.0
+        self.wait = LatencyHistogram(buckets=(0.0, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0))
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        quotas: Mapping[str, ModelQuota],
+        store: Optional[BucketStore] = None,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+        max_sleep_seconds: float = 5.0,
+    ):
+        self._quotas = dict(quotas)
+        self._store = store if store is not None else InMemoryBucketStore()
+        self._clock = clock
+        self._sleep = sleep
+        self._max_sleep = max_sleep_seconds
+        self._lock = threading.Lock()
+        self._counters = {model: _ModelCounters() for model in self._quotas}
+
+    async def acquire(self, model: str, tokens: int = 0) -> float:
+        """Wait until one request of `tokens` tokens fits the model's quota; return seconds waited."""
+        quota = self._quotas.get(model)
+        if quota is None:
+            raise KeyError(f"No rate limit quota configured for model '{model}'")
+        if tokens > quota.tokens_per_day:
+            raise ValueError(f"Request of {tokens} tokens exceeds the {model} token budget of {quota.tokens_per_day}")
+
+        (request_key, request_spec), (token_key, token_spec) = quota.buckets(model)
+        costs = [(request_key, request_spec, 1.0)]
+        if tokens > 0:
+            costs.append((token_key, token_spec, float(tokens)))
+
+        started = self._clock()
+        throttled = False
+        while True:
+            # The store's critical section is a few microseconds, so it runs inline.
+            wait = self._store.try_acquire(costs, self._clock())
+            if wait == 0.0:
+                break
+            throttled = True
+            await self._sleep(min(wait, self._max_sleep))
+
+        waited = max(0.0, self._clock() - started)
+        counters = self._counters[model]
+        with self._lock:
+            counters.acquired += 1
+            counters.throttled += int(throttled)
+            counters.tokens += tokens
+            counters.wait_seconds += waited
+        counters.wait.observe(waited)
+        return waited
+
+    def limit(self, model: str, call: Callable[[T], Awaitable], count_tokens: Callable[[T], int]) -> Callable[[T], Awaitable]:
+        """Wrap an async single-argument call so every invocation first acquires a permit."""
+
+        async def limited(argument: T):
+            await self.acquire(model, count_tokens(argument))
+            return await call(argument)
+
+        return limited
+
+    def stats(self) -> List[RateLimiterStats]:
+        with self._lock:
+            return [
+                RateLimiterStats(
+                    model=model,
+                    acquired=counters.acquired,
+                    throttled=counters.throttled,
+                    tokens=counters.tokens,
+                    wait_seconds=counters.wait_seconds,
+                    wait=counters.wait.snapshot(),
+                )
+                for model, counters in self._counters.items()
+            ]
+
+
+def build_rate_limiter(
+    config: RateLimitConfig = RateLimitConfig(),
+    embedding: EmbeddingConfig = EmbeddingConfig(),
+) -> RateLimiter:
+    """Limiter with the configured LLM and embedding quotas on the configured backend."""
+    store: BucketStore = FileBucketStore(config.state_path) if config.backend == "file" else InMemoryBucketStore()
+    return RateLimiter(
+        {
+            config.llm_model: ModelQuota(config.llm_requests_per_minute, config.llm_tokens_per_day),
+            embedding.model: ModelQuota(config.embedding_requests_per_minute, config.embedding_tokens_per_day),
+        },
+        store=store,
+    )
@@ -0,0 +1,170 @@
+"""Priority classes and weighted fair scheduling for prefetched jobs.
+
+Every job is put in a priority class taken from its payload (`priority`:
+`interactive` or `bulk`, default `interactive`). Classes are served in
+priority order, so a queued upload takes the next free handler slot. Each class
+also has its own concurrency cap. A bulk cap below `WORKER_MAX_IN_FLIGHT` keeps
+a slot idle for uploads, which trades backfill throughput for not having to wait
+for a bulk job to finish.
+
+Within a class, jobs are shared fairly between uploaders (`uploadedByUserId`,
+falling back to `patientId`) using start-time fair queueing. Each uploader
+advances a virtual clock by `1 / weight` per started job, and the uploader
+furthest behind goes next. One user's 5,000-document backfill therefore
+interleaves with another user's, instead of running ahead of it.
+
+The scheduler only reorders jobs the consumer has already received. An upload
+still queued behind a backfill in RabbitMQ is invisible to it, so the prefetch
+window (`WORKER_PREFETCH_COUNT`) has to cover the expected backlog.
+"""
+
+import heapq
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Mapping, Optional, Tuple
+
+from config import SchedulerConfig
+from metrics import HistogramSnapshot, LatencyHistogram
+
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+PRIORITY_CLASSES = (INTERACTIVE, BULK)
+
+
+def classify_job(job: dict, default: str = INTERACTIVE) -> str:
+    payload = job.get("payload") or {}
+    priority = payload.get("priority")
+    if isinstance(priority, str) and priority.strip().lower() in PRIORITY_CLASSES:
+        return priority.strip().lower()
+    return default
+
+
+def job_tenant(job: dict) -> str:
+    payload = job.get("payload") or {}
+    return str(payload.get("uploadedByUserId") or payload.get("patientId") or "anonymous")
+
+
+@dataclass(frozen=True)
+class ScheduledJob:
+    job: dict
+    priority: str
+    tenant: str
+    token: Any = None
+
+
+@dataclass(frozen=True)
+class SchedulerClassStats:
+    name: str
+    queued: int
+    running: int
+    max_running: int
+    started: int
+    queue_wait: HistogramSnapshot
+
+
+class _ClassQueue:
+    def __init__(self, max_running: int):
+        self.max_running = max_running
+        self.running = 0
+        self.started = 0
+        self.queued = 0
+        self.virtual_time = 0.0
+        self.tenants: Dict[str, Deque[Tuple[float, ScheduledJob]]] = {}
+        self.tenant_time: Dict[str, float] = {}
+        # Heap of (virtual start time, arrival order, tenant) for tenants with queued jobs.
+        self.ready: List[Tuple[float, int, str]] = []
+        self.queue_wait = LatencyHistogram()
+
+
+class FairScheduler:
+    """Thread-safe priority + weighted-fair job queue. Callers must `finish` every job they `pop`."""
+
+    def __init__(
+        self,
+        config: SchedulerConfig = SchedulerConfig(),
+        weights: Optional[Mapping[str, float]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._default_class = config.default_class
+        self._classes = {
+            INTERACTIVE: _ClassQueue(config.interactive_max_in_flight),
+            BULK: _ClassQueue(config.bulk_max_in_flight),
+        }
+        self._weights = dict(weights or {})
+        self._clock = clock
+        self._arrivals = 0
+        self._lock = threading.Lock()
+
+    def push(self, job: dict, token: Any = None) -> ScheduledJob:
+        """Queue a job; `token` (e.g. a delivery tag) is handed back with it by `pop`."""
+        name = classify_job(job, self._default_class)
+        tenant = job_tenant(job)
+        scheduled = ScheduledJob(job, name, tenant, token)
+        with self._lock:
+            cls = self._classes[name]
+            jobs = cls.tenants.get(tenant)
+            if not jobs:
+                jobs = cls.tenants[tenant] = deque()
+                # A returning tenant does not get credit for the time it was idle.
+                start = max(cls.tenant_time.get(tenant, 0.0), cls.virtual_time)
+                cls.tenant_time[tenant] = start
+                self._arrivals += 1
+                heapq.heappush(cls.ready, (start, self._arrivals, tenant))
+            jobs.append((self._clock(), scheduled))
+            cls.queued += 1
+        return scheduled
+
+    def pop(self) -> Optional[ScheduledJob]:
+        """Next job to start, or None if nothing is queued within the class caps."""
+        with self._lock:
+            for name in PRIORITY_CLASSES:
+                cls = self._classes[name]
+                if cls.ready and cls.running < cls.max_running:
+                    return self._pop_from(cls)
+        return None
+
+    def finish(self, scheduled: ScheduledJob) -> None:
+        with self._lock:
+            self._classes[scheduled.priority].running -= 1
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(cls.queued for cls in self._classes.values())
+
+    def stats(self) -> List[SchedulerClassStats]:
+        with self._lock:
+            return [
+                SchedulerClassStats(
+                    name=name,
+                    queued=cls.queued,
+                    running=cls.running,
+                    max_running=cls.max_running,
+                    started=cls.started,
+                    queue_wait=cls.queue_wait.snapshot(),
+                )
+                for name, cls in self._classes.items()
+            ]
+
+    def _pop_from(self, cls: _ClassQueue) -> ScheduledJob:
+        start, _, tenant = heapq.heappop(cls.ready)
+        cls.virtual_time = start
+        jobs = cls.tenants[tenant]
+        enqueued, scheduled = jobs.popleft()
+
+        finish = start + 1.0 / self._weights.get(tenant, 1.0)
+        cls.tenant_time[tenant] = finish
+        if jobs:
+            self._arrivals += 1
+            heapq.heappush(cls.ready, (finish, self._arrivals, tenant))
+        else:
+            del cls.tenants[tenant]
+
+        cls.queued -= 1
+        cls.running += 1
+        cls.started += 1
+        cls.queue_wait.observe(max(0.0, self._clock() - enqueued))
+        return scheduled
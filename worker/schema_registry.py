@@ -0,0 +1,104 @@
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from jsonschema import Draft7Validator
+
+from fast_validators import FastCheck, UnsupportedSchemaError, compile_schema
+
+
+SchemaLoader = Callable[[str], dict]
+RegistryKey = Tuple[str, str]
+
+
+@dataclass(frozen=True)
+class CompiledSchema:
+    validator: Draft7Validator
+    is_valid: FastCheck
+
+
+@dataclass(frozen=True)
+class SchemaRegistryStats:
+    hits: int
+    loads: int
+    reloads: int
+    cached: int
+
+
+class SchemaRegistry:
+    """Process-wide cache of compiled validators keyed by (contract kind, schema_version).
+
+    Schemas are loaded lazily on first use through the loader registered for the
+    contract kind and compiled twice: into a generic Draft7Validator (used for
+    error reporting) and, where the schema allows, into a generated fast-path
+    predicate (see fast_validators.py). `reload()` re-reads cached (or selected)
+    schemas from disk and swaps them in only once every requested schema has
+    loaded successfully, so a broken contract rollout keeps serving the previous
+    validators.
+    """
+
+    def __init__(self, loaders: Dict[str, SchemaLoader]):
+        self._loaders = dict(loaders)
+        self._compiled: Dict[RegistryKey, CompiledSchema] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._loads = 0
+        self._reloads = 0
+
+    def get(self, kind: str, schema_version: str) -> CompiledSchema:
+        key = (kind, schema_version)
+        with self._lock:
+            compiled = self._compiled.get(key)
+            if compiled is not None:
+                self._hits += 1
+                return compiled
+
+            compiled = self._build(kind, schema_version)
+            self._compiled[key] = compiled
+            self._loads += 1
+            return compiled
+
+    def get_validator(self, kind: str, schema_version: str) -> Draft7Validator:
+        return self.get(kind, schema_version).validator
+
+    def get_schema(self, kind: str, schema_version: str) -> dict:
+        return self.get_validator(kind, schema_version).schema
+
+    def warm(self, keys: Iterable[RegistryKey]) -> None:
+        for kind, schema_version in keys:
+            self.get(kind, schema_version)
+
+    def reload(self, keys: Optional[Iterable[RegistryKey]] = None) -> None:
+        with self._lock:
+            targets = list(self._compiled) if keys is None else list(keys)
+            fresh = {key: self._build(*key) for key in targets}
+            self._compiled.update(fresh)
+            self._loads += len(fresh)
+            self._reloads += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._compiled.clear()
+
+    def stats(self) -> SchemaRegistryStats:
+        with self._lock:
+            return SchemaRegistryStats(
+                hits=self._hits,
+                loads=self._loads,
+                reloads=self._reloads,
+                cached=len(self._compiled),
+            )
+
+    def _build(self, kind: str, schema_version: str) -> CompiledSchema:
+        loader = self._loaders.get(kind)
+        if loader is None:
+            raise ValueError(f"Unknown contract kind: {kind}")
+
+        schema = loader(schema_version)
+        Draft7Validator.check_schema(schema)
+        validator = Draft7Validator(schema)
+        try:
+            is_valid = compile_schema(schema)
+        except UnsupportedSchemaError:
+            is_valid = validator.is_valid
+        return CompiledSchema(validator=validator, is_valid=is_valid)
@@ -0,0 +1,21 @@
+"""Pairwise conflict reference for conflict detector tests and the benchmark."""
+
+from typing import Sequence, Set
+
+from conflict_detector import EntityRecord, normalize_value
+
+
+def naive_conflicts(records: Sequence[EntityRecord]) -> Set[str]:
+    """Keys in conflict, by comparing every pair of entities."""
+    normalized = [normalize_value(record.entity_value) for record in records]
+    keys = [record.key for record in records]
+    found = set()
+    for i in range(len(records)):
+        for j in range(i + 1, len(records)):
+            if (
+                keys[i] == keys[j]
+                and normalized[i] != normalized[j]
+                and records[i].document_id != records[j].document_id
+            ):
+                found.add(keys[i])
+    return found
@@ -0,0 +1,23 @@
+"""Parse functions for parser pool tests (module-level so worker processes can import them)."""
+
+import os
+import time
+
+from document_parser import ParsedPage
+
+
+def pid_parse(path, mime_type):
+    return [ParsedPage(page_number=1, text=str(os.getpid()))]
+
+
+def slow_parse(path, mime_type):
+    time.sleep(float(path))
+    return [ParsedPage(page_number=1, text=path)]
+
+
+def failing_parse(path, mime_type):
+    raise ValueError(f"corrupt document: {path}")
+
+
+def crashing_parse(path, mime_type):
+    os._exit(3)
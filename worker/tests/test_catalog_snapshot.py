@@ -0,0 +1,191 @@
+"""Unit tests for memory-mapped billing catalog snapshots."""
+
+import os
+import struct
+from contextlib import contextmanager
+import pytest
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import catalog_snapshot
+from catalog_snapshot import (
+    SnapshotCodeIndex,
+    catalog_version,
+    compile_catalog,
+    open_code_index,
+    read_snapshot,
+    write_snapshot,
+)
+from code_index import CPT, ICD10, CatalogItem, CodeIndex
+from config import CodeIndexConfig
+
+
+CATALOG = [
+    CatalogItem("E11.9", ICD10, "Type 2 diabetes mellitus without complications"),
+    CatalogItem("I10", ICD10, "Essential (primary) hypertension"),
+    CatalogItem("45378", CPT, "Colonoscopy, flexible; diagnostic"),
+]
+UPDATED = CATALOG + [CatalogItem("J45.909", ICD10, "Unspecified asthma, uncomplicated")]
+
+
+class Catalog:
+    """Serves `billing_code_catalog_items` rows to `load_catalog`."""
+
+    def __init__(self, items):
+        self.items = items
+        self.reads = 0
+
+    @contextmanager
+    def connect(self):
+        yield self
+
+    @contextmanager
+    def cursor(self):
+        yield self
+
+    def execute(self, sql):
+        self.reads += 1
+
+    def fetchall(self):
+        return [(item.code, item.code_type, item.description) for item in self.items]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSnapshotFile:
+    def test_mapped_index_matches_the_built_one(self, tmp_path):
+        """
+        Given a catalog index written to a snapshot
+        When the snapshot is read
+        Then its read-only arrays answer every search like the built index
+        """
+        path = str(tmp_path / "codes.snapshot")
+        built = CodeIndex.build(CATALOG)
+        write_snapshot(built, path, catalog_version(CATALOG), built_at=123.0)
+
+        snapshot = read_snapshot(path)
+
+        assert (snapshot.catalog_version, snapshot.built_at) == (catalog_version(CATALOG), 123.0)
+        assert snapshot.index.code_types == built.code_types
+        for query in ("e11.9", "hypertension essential", "colonoscpy", "asthma"):
+            assert snapshot.index.search(query) == built.search(query)
+        assert not snapshot.index.arrays["postings"].flags.writeable
+        assert all(not name.endswith(".tmp") for name in os.listdir(tmp_path))
+
+    def test_empty_catalog_round_trips(self, tmp_path):
+        path = str(tmp_path / "codes.snapshot")
+        write_snapshot(CodeIndex.build([]), path, catalog_version([]))
+
+        assert len(read_snapshot(path).index) == 0
+
+    @pytest.mark.parametrize("damage", ["magic", "format", "truncated"])
+    def test_invalid_files_are_rejected(self, tmp_path, damage):
+        path = str(tmp_path / "codes.snapshot")
+        write_snapshot(CodeIndex.build(CATALOG), path, catalog_version(CATALOG))
+        data = bytearray(open(path, "rb").read())
+        if damage == "magic":
+            data[:8] = b"NOTCODES"
+        elif damage == "format":
+            struct.pack_into("<I", data, 8, catalog_snapshot.FORMAT_VERSION + 1)
+        else:
+            data = data[: len(data) // 2]
+        open(path, "wb").write(bytes(data))
+
+        with pytest.raises(ValueError):
+            read_snapshot(path)
+
+    @pytest.mark.parametrize("damage", ["magic", "header", "truncated"])
+    def test_rejected_file_is_unmapped(self, tmp_path, monkeypatch, damage):
+        path = str(tmp_path / "codes.snapshot")
+        write_snapshot(CodeIndex.build(CATALOG), path, catalog_version(CATALOG))
+        data = bytearray(open(path, "rb").read())
+        if damage == "magic":
+            data[:8] = b"NOTCODES"
+        elif damage == "header":
+            data[24:26] = b"[]"
+        else:
+            data = data[: len(data) - 64]
+        open(path, "wb").write(bytes(data))
+        mappings = []
+        real_mmap = catalog_snapshot.mmap.mmap
+
+        def record(*args, **kwargs):
+            mappings.append(real_mmap(*args, **kwargs))
+            return mappings[-1]
+
+        monkeypatch.setattr(catalog_snapshot.mmap, "mmap", record)
+
+        with pytest.raises(ValueError):
+            read_snapshot(path)
+
+        assert len(mappings) == 1 and mappings[0].closed
+
+
+class TestCompileAndRefresh:
+    def test_compile_skips_an_unchanged_catalog(self, tmp_path):
+        path = str(tmp_path / "codes.snapshot")
+        catalog = Catalog(CATALOG)
+
+        version, written = compile_catalog(catalog.connect, path)
+        assert written and version == catalog_version(list(reversed(CATALOG)))
+        assert compile_catalog(catalog.connect, path) == (version, False)
+        catalog.items = UPDATED
+        assert compile_catalog(catalog.connect, path)[1]
+
+    def test_replaced_snapshot_is_mapped_after_the_refresh_interval(self, tmp_path):
+        """
+        Given a worker serving searches from a snapshot
+        When the compiler replaces the file with an updated catalog
+        Then the worker keeps the old index until the interval passes, then swaps to the new one
+        """
+        path = str(tmp_path / "codes.snapshot")
+        catalog = Catalog(CATALOG)
+        clock = Clock()
+        compile_catalog(catalog.connect, path)
+        index = SnapshotCodeIndex(path, refresh_seconds=60, clock=clock)
+        old = index.snapshot
+
+        catalog.items = UPDATED
+        compile_catalog(catalog.connect, path)
+        clock.now = 30
+        assert index.search("asthma uncomplicated", min_score=0.5) == []
+        clock.now = 61
+        assert [c.code for c in index.search("asthma uncomplicated", min_score=0.5)] == ["J45.909"]
+
+        assert old.index.search("e11.9")[0].code == "E11.9"
+        stats = index.stats()
+        assert (stats.items, stats.refreshes, stats.catalog_version) == (4, 1, catalog_version(UPDATED))
+        assert index.refresh() is False
+
+    def test_unreadable_replacement_keeps_the_current_snapshot(self, tmp_path):
+        path = str(tmp_path / "codes.snapshot")
+        open_code_index(CodeIndexConfig(snapshot_path=path), Catalog(CATALOG).connect)
+        index = SnapshotCodeIndex(path, refresh_seconds=0)
+        os.replace(_write(tmp_path / "broken", b"not a snapshot"), path)
+
+        assert index.search("e11.9")[0].code == "E11.9"
+        assert index.stats().refresh_errors == 1
+
+    def test_open_compiles_only_when_there_is_no_snapshot(self, tmp_path):
+        config = CodeIndexConfig(snapshot_path=str(tmp_path / "codes.snapshot"))
+        catalog = Catalog(CATALOG)
+
+        open_code_index(config, catalog.connect)
+        open_code_index(config, catalog.connect)
+
+        assert catalog.reads == 1
+
+
+def _write(path, data):
+    path.write_bytes(data)
+    return str(path)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
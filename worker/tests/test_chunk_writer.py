@@ -0,0 +1,242 @@
+"""Unit tests for bulk persistence of document chunks into pgvector."""
+
+import asyncio
+import struct
+import uuid
+from array import array
+from contextlib import contextmanager
+import psycopg
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from chunker import Chunk, chunk_hash
+from pipeline import JobContext
+from vector_store import (
+    CHUNK_COLUMNS,
+    DocumentNotFoundError,
+    PgvectorChunkWriter,
+    build_chunk_rows,
+    chunk_id,
+    encode_copy_rows,
+    encode_vector_binary,
+    insert_statements,
+    persist_chunks_stage,
+)
+
+
+DOCUMENT_ID = "7c9e6679-7425-40de-944b-e07fc1f90ae7"
+
+
+def _chunk(index, text="BP 120/80", section=None):
+    return Chunk(
+        index=index, text=text, token_count=4, page=index + 1, page_end=index + 1, section=section,
+        coordinates="72.0,700.0,300.0,712.0", chunk_hash=chunk_hash(text),
+    )
+
+
+def _decode_copy(payload):
+    """Minimal binary COPY reader: returns rows as lists of raw field bytes (None for NULL)."""
+    assert payload.startswith(b"PGCOPY\n\xff\r\n\x00")
+    offset = 11 + 8
+    rows = []
+    while True:
+        (count,) = struct.unpack_from("!h", payload, offset)
+        offset += 2
+        if count == -1:
+            assert offset == len(payload)
+            return rows
+        row = []
+        for _ in range(count):
+            (length,) = struct.unpack_from("!i", payload, offset)
+            offset += 4
+            if length == -1:
+                row.append(None)
+            else:
+                row.append(payload[offset:offset + length])
+                offset += length
+        rows.append(row)
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self._conn.log.append(("execute", sql, params))
+
+    def fetchone(self):
+        return (1,) if self._conn.document_exists else None
+
+    @contextmanager
+    def copy(self, sql):
+        if self._conn.copy_error is not None:
+            raise self._conn.copy_error
+        writes = []
+        yield type("Copy", (), {"write": lambda _, data: writes.append(bytes(data))})()
+        self._conn.log.append(("copy", sql, b"".join(writes)))
+
+
+class FakeConnection:
+    def __init__(self, document_exists=True, copy_error=None):
+        self.document_exists = document_exists
+        self.copy_error = copy_error
+        self.log = []
+        self.transactions = []
+
+    def __call__(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @contextmanager
+    def transaction(self):
+        try:
+            yield
+        except BaseException:
+            self.transactions.append("rollback")
+            raise
+        self.transactions.append("commit")
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+class TestEncoding:
+    def test_vector_binary_format(self):
+        encoded = encode_vector_binary(array("f", [1.0, -2.5]))
+
+        assert encoded == struct.pack("!hhff", 2, 0, 1.0, -2.5)
+
+    def test_halfvec_binary_format(self):
+        encoded = encode_vector_binary([1.0, -2.5], "halfvec")
+
+        assert encoded == struct.pack("!hhee", 2, 0, 1.0, -2.5)
+
+    def test_copy_payload_round_trips(self):
+        rows = build_chunk_rows(DOCUMENT_ID, [_chunk(0), _chunk(1, section="Labs")], [[0.5, 1.0], [2.0, 4.0]])
+
+        decoded = _decode_copy(encode_copy_rows(rows))
+
+        assert len(decoded) == 2
+        assert all(len(row) == len(CHUNK_COLUMNS) for row in decoded)
+        first = decoded[0]
+        assert uuid.UUID(bytes=first[0]) == chunk_id(DOCUMENT_ID, 0)
+        assert uuid.UUID(bytes=first[1]) == uuid.UUID(DOCUMENT_ID)
+        assert struct.unpack("!i", first[2]) == (1,)
+        assert first[3] is None
+        assert first[5] == b"BP 120/80"
+        assert struct.unpack("!hhff", first[6]) == (2, 0, 0.5, 1.0)
+        assert decoded[1][3] == b"Labs"
+
+    def test_rows_fit_column_limits(self):
+        (row,) = build_chunk_rows(DOCUMENT_ID, [_chunk(0, text="a\x00b", section="S" * 150)])
+
+        assert row.text == "ab"
+        assert len(row.section) == 100
+        assert row.embedding is None
+
+    def test_embedding_count_must_match(self):
+        with pytest.raises(ValueError):
+            build_chunk_rows(DOCUMENT_ID, [_chunk(0)], [])
+
+    def test_insert_statements_are_batched(self):
+        rows = build_chunk_rows(DOCUMENT_ID, [_chunk(i) for i in range(5)], [[1.0, 2.0]] * 5)
+
+        statements = list(insert_statements(rows, batch_size=2))
+
+        assert [len(params) for _, params in statements] == [18, 18, 9]
+        sql, params = statements[0]
+        assert sql.count("::vector") == 2
+        assert params[6] == "[1,2]"
+        halfvec_sql, _ = next(insert_statements(rows, batch_size=2, column_type="halfvec"))
+        assert halfvec_sql.count("::halfvec") == 2
+
+
+class TestPgvectorChunkWriter:
+    """Test cases for the per-document transaction."""
+
+    def test_copy_replaces_rows_in_one_transaction(self):
+        """
+        Given an existing document
+        When its chunks are written
+        Then the document is locked, old rows are deleted and new rows are copied in one transaction
+        """
+        conn = FakeConnection()
+        writer = PgvectorChunkWriter(conn)
+
+        ids = writer.write_document(DOCUMENT_ID, [_chunk(0), _chunk(1)], [[1.0], [2.0]])
+
+        assert [entry[0] for entry in conn.log] == ["execute", "execute", "copy"]
+        assert "FOR KEY SHARE" in conn.log[0][1]
+        assert conn.log[1][1].startswith("DELETE FROM document_chunks")
+        assert len(_decode_copy(conn.log[2][2])) == 2
+        assert conn.transactions == ["commit"]
+        assert ids == [chunk_id(DOCUMENT_ID, 0), chunk_id(DOCUMENT_ID, 1)]
+        stats = writer.stats()
+        assert (stats.documents, stats.rows, stats.copy_documents) == (1, 2, 1)
+
+    def test_deleted_document_raises_and_rolls_back(self):
+        conn = FakeConnection(document_exists=False)
+
+        with pytest.raises(DocumentNotFoundError):
+            PgvectorChunkWriter(conn).write_document(DOCUMENT_ID, [_chunk(0)], [[1.0]])
+
+        assert conn.transactions == ["rollback"]
+        assert all(entry[0] != "copy" for entry in conn.log)
+
+    def test_unsupported_copy_falls_back_to_insert(self):
+        conn = FakeConnection(copy_error=psycopg.NotSupportedError("COPY not supported"))
+        writer = PgvectorChunkWriter(conn, insert_batch_size=10)
+
+        writer.write_document(DOCUMENT_ID, [_chunk(0), _chunk(1)], [[1.0], [2.0]])
+        writer.write_document(DOCUMENT_ID, [_chunk(0)], [[1.0]])
+
+        inserts = [entry for entry in conn.log if entry[1].startswith("INSERT")]
+        assert len(inserts) == 2
+        assert conn.transactions == ["rollback", "commit", "commit"]
+        stats = writer.stats()
+        assert (stats.copy_fallbacks, stats.insert_documents, stats.copy_documents) == (1, 2, 0)
+
+    def test_halfvec_writer_copies_float2_vectors(self):
+        conn = FakeConnection()
+
+        PgvectorChunkWriter(conn, column_type="halfvec").write_document(DOCUMENT_ID, [_chunk(0)], [[1.0, 0.5]])
+
+        (row,) = _decode_copy(conn.log[2][2])
+        assert struct.unpack("!hhee", row[6]) == (2, 0, 1.0, 0.5)
+
+    def test_unknown_column_type_is_rejected(self):
+        with pytest.raises(ValueError):
+            PgvectorChunkWriter(FakeConnection(), column_type="sparsevec")
+
+    def test_other_copy_errors_propagate(self):
+        conn = FakeConnection(copy_error=psycopg.IntegrityError("duplicate key"))
+
+        with pytest.raises(psycopg.IntegrityError):
+            PgvectorChunkWriter(conn).write_document(DOCUMENT_ID, [_chunk(0)], [[1.0]])
+
+    def test_stage_sets_chunk_ids(self):
+        stage = persist_chunks_stage(PgvectorChunkWriter(FakeConnection()))
+        context = JobContext(job={"job_id": "j", "document_id": DOCUMENT_ID})
+        context.artifacts.update(chunks=[_chunk(0)], embeddings=[[1.0]])
+
+        asyncio.run(stage.run(context))
+
+        assert context.artifacts["chunk_ids"] == [chunk_id(DOCUMENT_ID, 0)]
+        assert stage.outputs == ("chunk_ids",)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,143 @@
+"""Unit tests for the token-aware streaming chunker."""
+
+import asyncio
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from chunker import ChunkingConfig, chunk_hash, chunk_stage, iter_chunks, regex_tokenize
+from document_parser import ParsedPage, TextSpan
+from pipeline import PipelineExecutor, Stage
+from tests.fixtures.job_payloads import VALID_JOB_PAYLOAD
+
+
+SENTENCE = "Blood pressure 132/84 mmHg and metformin 500 mg twice daily were recorded today.\n"
+
+
+def _pages(count, sentences=40):
+    return [ParsedPage(page_number=i, text=SENTENCE * sentences) for i in range(1, count + 1)]
+
+
+def _words(text):
+    return [text[start:end] for start, end in regex_tokenize(text)]
+
+
+class TestChunkSizing:
+    """Test cases for chunk boundaries and overlap."""
+
+    def test_chunks_respect_token_limits_and_overlap(self):
+        """
+        Given a 10-page document
+        When it is chunked with the default 500-1000 token window
+        Then every chunk but the last is within limits and consecutive chunks share 100 tokens
+        """
+        chunks = list(iter_chunks(_pages(10)))
+
+        assert len(chunks) > 3
+        assert all(500 <= c.token_count <= 1000 for c in chunks[:-1])
+        for previous, current in zip(chunks, chunks[1:]):
+            assert _words(previous.text)[-100:] == _words(current.text)[:100]
+        assert [c.index for c in chunks] == list(range(len(chunks)))
+
+    def test_chunks_prefer_sentence_boundaries(self):
+        chunks = list(iter_chunks(_pages(5)))
+
+        assert all(c.text.endswith("today.") for c in chunks)
+
+    def test_small_document_is_a_single_chunk(self):
+        chunks = list(iter_chunks([ParsedPage(page_number=1, text="BP 120/80.")]))
+
+        assert len(chunks) == 1
+        assert chunks[0].token_count == 5
+
+    def test_empty_document_has_no_chunks(self):
+        assert list(iter_chunks([ParsedPage(page_number=1, text="")])) == []
+
+    def test_invalid_config_is_rejected(self):
+        with pytest.raises(ValueError, match="overlap_tokens"):
+            list(iter_chunks(_pages(1), ChunkingConfig(min_tokens=100, max_tokens=200, overlap_tokens=100)))
+
+
+class TestStreaming:
+    def test_first_chunk_is_emitted_before_last_page_is_read(self):
+        pulled = []
+
+        def pages():
+            for page in _pages(10):
+                pulled.append(page.page_number)
+                yield page
+
+        first = next(iter_chunks(pages()))
+
+        assert first.index == 0
+        assert max(pulled) < 10
+
+    def test_each_page_is_tokenized_once(self):
+        calls = []
+
+        def tokenize(text):
+            calls.append(text)
+            return regex_tokenize(text)
+
+        list(iter_chunks(_pages(8), tokenize=tokenize))
+
+        assert len(calls) == 8
+
+
+class TestChunkMetadata:
+    """Test cases for page, section, coordinate and hash metadata."""
+
+    def test_chunks_carry_page_range_and_section(self):
+        pages = [
+            ParsedPage(page_number=1, text=SENTENCE * 5),
+            ParsedPage(page_number=2, text="MEDICATIONS\n" + SENTENCE * 5),
+        ]
+
+        chunk = list(iter_chunks(pages, ChunkingConfig(min_tokens=20, max_tokens=60, overlap_tokens=5)))[-1]
+
+        assert (chunk.page, chunk.page_end) == (2, 2)
+        assert chunk.section == "MEDICATIONS"
+
+    def test_coordinates_bound_spans_on_first_page(self):
+        page = ParsedPage(
+            page_number=1,
+            text="BP 120/80\nHbA1c 7.2%",
+            spans=(TextSpan("BP 120/80", 72.0, 720.0), TextSpan("HbA1c 7.2%", 90.0, 700.0)),
+        )
+
+        chunk = next(iter_chunks([page]))
+
+        assert chunk.coordinates == "72.0,700.0,90.0,720.0"
+
+    def test_chunk_hash_ignores_whitespace_differences(self):
+        assert chunk_hash("Consent  for\ntreatment ") == chunk_hash("Consent for treatment")
+        assert chunk_hash("Consent for treatment") != chunk_hash("Consent for surgery")
+        assert len(chunk_hash("x")) == 64
+
+    def test_identical_pages_produce_identical_hashes(self):
+        chunks = list(iter_chunks(_pages(6)))
+
+        assert chunks[1].chunk_hash == chunks[2].chunk_hash
+
+
+class TestChunkStage:
+    def test_chunk_stage_consumes_pages_artifact(self):
+        async def load(context):
+            context.artifacts["pages"] = iter(_pages(3))
+
+        executor = PipelineExecutor([Stage("load", load), chunk_stage()])
+
+        async def scenario():
+            await executor.start()
+            context = await executor.submit(VALID_JOB_PAYLOAD)
+            await executor.close()
+            return context
+
+        context = asyncio.run(scenario())
+
+        assert context.artifacts["chunks"][0].page == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
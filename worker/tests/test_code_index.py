@@ -0,0 +1,150 @@
+"""Unit tests for the in-memory billing code index."""
+
+import asyncio
+from contextlib import contextmanager
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from code_index import CPT, ICD10, CatalogItem, CodeIndex, build_code_index, code_suggestion_stage, suggest_codes
+from config import CodeIndexConfig
+from pipeline import JobContext
+
+
+CATALOG = [
+    CatalogItem("E11.9", ICD10, "Type 2 diabetes mellitus without complications"),
+    CatalogItem("E11.65", ICD10, "Type 2 diabetes mellitus with hyperglycemia"),
+    CatalogItem("E10.9", ICD10, "Type 1 diabetes mellitus without complications"),
+    CatalogItem("I10", ICD10, "Essential (primary) hypertension"),
+    CatalogItem("J45.909", ICD10, "Unspecified asthma, uncomplicated"),
+    CatalogItem("99213", CPT, "Office or other outpatient visit for the evaluation and management of an established patient"),
+    CatalogItem("93000", CPT, "Electrocardiogram, routine ECG with at least 12 leads; with interpretation and report"),
+    CatalogItem("45378", CPT, "Colonoscopy, flexible; diagnostic"),
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return CodeIndex.build(CATALOG)
+
+
+def _entity(group, name, value, source_text=None):
+    entity = {"entity_group_name": group, "entity_name": name, "entity_value": value}
+    if source_text:
+        entity["source_text"] = source_text
+    return entity
+
+
+class TestCodeIndex:
+    def test_code_and_exact_matches_score_one(self, index):
+        """
+        Given the catalog
+        When a code in another spelling or a description with reordered words is searched
+        Then the item is found first with score 1.0
+        """
+        (by_code, *_) = index.search("e11.9")
+        (exact, *_) = index.search("Mellitus, type 2 diabetes without complications")
+
+        assert (by_code.code, by_code.score, by_code.match) == ("E11.9", 1.0, "code")
+        assert (exact.code, exact.score, exact.match) == ("E11.9", 1.0, "exact")
+        assert index.get(" i10 ").description == "Essential (primary) hypertension"
+        assert index.get("Z99.9") is None
+
+    def test_misspelled_and_partial_names_match_fuzzily(self, index):
+        top = index.search("diabtes mellitus typ 2", limit=2)
+        colonoscopy = index.search("colonoscopy", limit=1)
+
+        assert {c.code for c in top} == {"E11.9", "E11.65"}
+        assert all(c.match == "fuzzy" and 0.5 < c.score < 1.0 for c in top)
+        assert colonoscopy[0].code == "45378"
+
+    def test_repeated_misspellings_of_one_word_score_below_one(self):
+        index = CodeIndex.build([
+            CatalogItem("47562", CPT, "Cholecystectomy"),
+            CatalogItem("47600", CPT, "Cholecystectomy; open approach"),
+        ])
+
+        results = index.search("cholecystectomyy cholecystecctomy choleecystectomy", limit=2, min_score=0.0)
+
+        assert all(c.match == "fuzzy" and c.score < 1.0 for c in results)
+        assert index.search("cholecystectomyy cholecystecctomy", limit=2, min_score=1.0) == []
+
+    def test_code_types_and_min_score_filter(self, index):
+        assert index.search("hypertension", limit=5, code_types=(CPT,), min_score=0.3) == []
+        assert [c.code for c in index.search("hypertension", limit=5, min_score=0.5)] == ["I10"]
+        assert index.search("E11.9", code_types=(CPT,), min_score=0.5) == []
+
+    def test_index_built_from_its_own_arrays_answers_the_same(self, index):
+        copy = CodeIndex({name: array.copy() for name, array in index.arrays.items()}, index.code_types)
+
+        assert len(copy) == len(CATALOG)
+        assert copy.search("essential hypertension") == index.search("essential hypertension")
+        with pytest.raises(ValueError):
+            CodeIndex({}, ())
+
+    def test_empty_catalog(self):
+        assert CodeIndex.build([]).search("asthma") == []
+        assert CodeIndex.build(CATALOG).search("of the") == []
+
+
+class TestSuggestCodes:
+    def test_diagnoses_and_procedures_get_typed_suggestions(self, index):
+        """
+        Given a payload with a coded diagnosis, an uncoded procedure and a medication
+        When codes are suggested
+        Then the stated code is taken as is, the procedure is matched against CPT and the medication is skipped
+        """
+        payload = {"document_id": "d", "extracted_entities": [
+            _entity("diagnoses", "Type 2 diabetes", "E11.9", source_text="T2DM (E11.9)"),
+            _entity("procedures", "Colonoscopy", "2023-04-01"),
+            _entity("medications", "Metformin", "500 mg"),
+        ]}
+
+        suggestions = suggest_codes(index, payload, limit=3)
+
+        assert [(s.entity_name, s.candidate.code) for s in suggestions] == [
+            ("Type 2 diabetes", "E11.9"), ("Colonoscopy", "45378"),
+        ]
+        assert suggestions[0].row("p-1") == {
+            "PatientId": "p-1", "ExtractedEntityId": None, "Code": "E11.9", "CodeType": ICD10,
+            "SourceText": "T2DM (E11.9)", "Status": "Pending",
+        }
+        assert suggestions[1].source_text == "Colonoscopy 2023-04-01"
+
+    def test_stage_sets_code_suggestions(self, index):
+        context = JobContext(job={"job_id": "j", "document_id": "d"})
+        context.artifacts["entities"] = {"document_id": "d", "extracted_entities": [
+            _entity("diagnoses", "Hypertension", "essential"),
+        ]}
+
+        asyncio.run(code_suggestion_stage(index, CodeIndexConfig(top_n=1)).run(context))
+
+        assert [s.candidate.code for s in context.artifacts["code_suggestions"]] == ["I10"]
+
+
+def test_build_from_catalog_table():
+    class Database:
+        @contextmanager
+        def connect(self):
+            yield self
+
+        @contextmanager
+        def cursor(self):
+            yield self
+
+        def execute(self, sql):
+            self.sql = sql
+
+        def fetchall(self):
+            return [(item.code, item.code_type, item.description) for item in CATALOG]
+
+    db = Database()
+    index = build_code_index(db.connect)
+
+    assert "billing_code_catalog_items" in db.sql
+    assert len(index) == len(CATALOG) and index.code_types == (CPT, ICD10)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -33,6 +33,201 @@ class WorkerConfigTests(unittest.TestCase):
 
         self.assertEqual("test-key", cfg.gemini_api_key)
 
+    def test_load_rabbitmq_config_defaults_match_backend_options(self):
+        with patch.dict(os.environ, {}, clear=True):
+            from worker import config
+
+            with patch.object(config, "_try_load_dotenv", return_value=None):
+                cfg = config.load_rabbitmq_config()
+
+        self.assertEqual("document-processing", cfg.queue)
+        self.assertEqual("document-processing-dlq", cfg.dead_letter_queue)
+        self.assertEqual("clinical-intelligence", cfg.exchange)
+        self.assertEqual(5672, cfg.port)
+
+    def test_load_rabbitmq_config_reads_consumer_tuning(self):
+        env = {"WORKER_PREFETCH_COUNT": "50", "WORKER_MAX_IN_FLIGHT": "8", "WORKER_ACK_INTERVAL_SECONDS": "0.25"}
+        with patch.dict(os.environ, env, clear=True):
+            from worker import config
+
+            with patch.object(config, "_try_load_dotenv", return_value=None):
+                cfg = config.load_rabbitmq_config()
+
+        self.assertEqual(50, cfg.prefetch_count)
+        self.assertEqual(8, cfg.max_in_flight)
+        self.assertEqual(0.25, cfg.ack_interval_seconds)
+
+    def test_load_rabbitmq_config_invalid_number_raises(self):
+        with patch.dict(os.environ, {"WORKER_PREFETCH_COUNT": "lots"}, clear=True):
+            from worker import config
+
+            with patch.object(config, "_try_load_dotenv", return_value=None):
+                with self.assertRaises(RuntimeError) as ctx:
+                    config.load_rabbitmq_config()
+
+        self.assertIn("Invalid configuration value 'WORKER_PREFETCH_COUNT'", str(ctx.exception))
+
+    def test_load_parser_pool_config_allows_in_process_parsing(self):
+        env = {"WORKER_PARSER_POOL_SIZE": "0", "WORKER_PARSER_MAX_TASKS_PER_WORKER": "5"}
+        with patch.dict(os.environ, env, clear=True):
+            from worker import config
+
+            with patch.object(config, "_try_load_dotenv", return_value=None):
+                cfg = config.load_parser_pool_config()
+
+        self.assertEqual(0, cfg.pool_size)
+        self.assertEqual(5, cfg.max_tasks_per_worker)
+        self.assertEqual(120.0, cfg.task_timeout_seconds)
+
+    def test_load_database_config_missing_connection_string_raises(self):
+        with patch.dict(os.environ, {}, clear=True):
+            from worker import config
+
+            with patch.object(config, "_try_load_dotenv", return_value=None):
+                with self.assertRaises(RuntimeError) as ctx:
+                    config.load_database_config()
+
+        self.assertIn("DATABASE_CONNECTION_STRING", str(ctx.exception))
+
+    def test_load_rate_limit_config_reads_quotas(self):
+        env = {"GEMINI_LLM_RPM": "30", "GEMINI_EMBEDDING_TOKENS_PER_DAY": "500000", "WORKER_RATE_LIMIT_BACKEND": "Memory"}
+        with patch.dict(os.environ, env, clear=True):
+            from worker import config
+
+            with patch.object(config, "_try_load_dotenv", return_value=None):
+                cfg = config.load_rate_limit_config()
+
+        self.assertEqual(30, cfg.llm_requests_per_minute)
+        self.assertEqual(500000, cfg.embedding_tokens_per_day)
+        self.assertEqual(1000000, cfg.llm_tokens_per_day)
+        self.assertEqual("memory", cfg.backend)
+        self.assertTrue(cfg.state_path.endswith(os.path.join("clinical-intelligence", "gemini-quota.json")))
+
+    def test_load_rate_limit_config_invalid_backend_raises(self):
+        with patch.dict(os.environ, {"WORKER_RATE_LIMIT_BACKEND": "redis"}, clear=True):
+            from worker import config
+
+            with patch.object(config, "_try_load_dotenv", return_value=None):
+                with self.assertRaises(RuntimeError) as ctx:
+                    config.load_rate_limit_config()
+
+        self.assertIn("WORKER_RATE_LIMIT_BACKEND", str(ctx.exception))
+
+    def test_load_scheduler_config_reads_class_caps(self):
+        env = {"WORKER_DEFAULT_PRIORITY": "BULK", "WORKER_BULK_MAX_IN_FLIGHT": "2"}
+        with patch.dict(os.environ, env, clear=True):
+            from worker import config
+
+            with patch.object(config, "_try_load_dotenv", return_value=None):
+                cfg = config.load_scheduler_config()
+
+        self.assertEqual("bulk", cfg.default_class)
+        self.assertEqual(2, cfg.bulk_max_in_flight)
+        self.assertEqual(4, cfg.interactive_max_in_flight)
+
+    def test_load_ledger_config_reads_path_and_retention(self):
+        env = {"WORKER_LEDGER_PATH": "/var/lib/worker/ledger.sqlite3", "WORKER_LEDGER_RETENTION_HOURS": "12"}
+        with patch.dict(os.environ, env, clear=True):
+            from worker import config
+
+            with patch.object(config, "_try_load_dotenv", return_value=None):
+                cfg = config.load_ledger_config()
+
+        self.assertEqual("/var/lib/worker/ledger.sqlite3", cfg.path)
+        self.assertEqual(12.0, cfg.retention_hours)
+
+    def test_load_retrieval_config_reads_hnsw_settings(self):
+        env = {"WORKER_RETRIEVAL_TOP_K": "5", "WORKER_HNSW_THRESHOLD": "500", "WORKER_HNSW_EF_SEARCH": "128"}
+        with patch.dict(os.environ, env, clear=True):
+            from worker import config
+
+            with patch.object(config, "_try_load_dotenv", return_value=None):
+                cfg = config.load_retrieval_config()
+
+        self.assertEqual(5, cfg.top_k)
+        self.assertEqual(500, cfg.hnsw_threshold)
+        self.assertEqual(16, cfg.hnsw_m)
+        self.assertEqual(128, cfg.hnsw_ef_search)
+
+    def test_load_precision_and_column_type_settings(self):
+        env = {
+            "WORKER_EMBEDDING_CACHE_PRECISION": "INT8",
+            "WORKER_EMBEDDING_COLUMN_TYPE": "halfvec",
+            "WORKER_INDEX_PRECISION": "float16",
+            "WORKER_INDEX_RERANK_FACTOR": "8",
+        }
+        with patch.dict(os.environ, env, clear=True):
+            from worker import config
+
+            with patch.object(config, "_try_load_dotenv", return_value=None):
+                embedding = config.load_embedding_config()
+                retrieval = config.load_retrieval_config()
+
+        self.assertEqual("int8", embedding.cache_precision)
+        self.assertEqual("halfvec", embedding.column_type)
+        self.assertEqual("float16", retrieval.index_precision)
+        self.assertEqual(8, retrieval.rerank_factor)
+
+    def test_unknown_index_precision_is_rejected(self):
+        with patch.dict(os.environ, {"WORKER_INDEX_PRECISION": "int4"}, clear=True):
+            from worker import config
+
+            with patch.object(config, "_try_load_dotenv", return_value=None):
+                with self.assertRaises(RuntimeError) as ctx:
+                    config.load_retrieval_config()
+
+        self.assertIn("WORKER_INDEX_PRECISION", str(ctx.exception))
+
+    def test_load_extraction_config_shares_llm_model(self):
+        env = {"GEMINI_LLM_MODEL": "gemini-2.5-pro", "WORKER_EXTRACTION_CONTEXT_TOKENS": "8000"}
+        with patch.dict(os.environ, env, clear=True):
+            from worker import config
+
+            with patch.object(config, "_try_load_dotenv", return_value=None):
+                cfg = config.load_extraction_config()
+
+        self.assertEqual("gemini-2.5-pro", cfg.model)
+        self.assertEqual(8000, cfg.context_token_budget)
+        self.assertEqual(8192, cfg.max_output_tokens)
+
+    def test_load_extraction_cache_config_reads_limits(self):
+        env = {"WORKER_EXTRACTION_CACHE_TTL_HOURS": "24", "WORKER_EXTRACTION_CACHE_MAX_MB": "64"}
+        with patch.dict(os.environ, env, clear=True):
+            from worker import config
+
+            with patch.object(config, "_try_load_dotenv", return_value=None):
+                cfg = config.load_extraction_cache_config()
+
+        self.assertEqual(24.0, cfg.ttl_hours)
+        self.assertEqual(64.0, cfg.max_megabytes)
+        self.assertTrue(cfg.path.endswith(os.path.join("clinical-intelligence", "extraction-cache.sqlite3")))
+
+    def test_load_code_index_config_rejects_min_score_above_one(self):
+        env = {"WORKER_CODE_SUGGESTION_TOP_N": "5", "WORKER_CODE_SUGGESTION_MIN_SCORE": "1.5"}
+        with patch.dict(os.environ, env, clear=True):
+            from worker import config
+
+            with patch.object(config, "_try_load_dotenv", return_value=None):
+                with self.assertRaises(RuntimeError):
+                    config.load_code_index_config()
+                os.environ["WORKER_CODE_SUGGESTION_MIN_SCORE"] = "0.4"
+                cfg = config.load_code_index_config()
+
+        self.assertEqual(5, cfg.top_n)
+        self.assertEqual(0.4, cfg.min_score)
+        self.assertTrue(cfg.snapshot_path.endswith(os.path.join("clinical-intelligence", "code-index.snapshot")))
+        self.assertEqual(300.0, cfg.refresh_seconds)
+
+    def test_load_health_config_reads_port(self):
+        with patch.dict(os.environ, {"WORKER_HEALTH_PORT": "9100"}, clear=True):
+            from worker import config
+
+            with patch.object(config, "_try_load_dotenv", return_value=None):
+                cfg = config.load_health_config()
+
+        self.assertEqual("0.0.0.0", cfg.host)
+        self.assertEqual(9100, cfg.port)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,205 @@
+"""Unit tests for hash-indexed cross-document conflict detection."""
+
+import asyncio
+import random
+import uuid
+from contextlib import contextmanager
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from conflict_detector import (
+    ConflictIndex,
+    EntityRecord,
+    PgConflictSource,
+    annotate_conflicts,
+    conflict_stage,
+    entity_records,
+    normalize_value,
+)
+from main import validate_entity_payload
+from patient_aggregate import citation_rows, entity_key
+from pipeline import JobContext
+from tests.fixtures.conflicts import naive_conflicts
+
+
+DOC_A = "7c9e6679-7425-40de-944b-e07fc1f90ae7"
+DOC_B = "0b0ad5a4-3c1e-4b8e-9b53-6c2f3f6f1d11"
+DOC_C = "3f2504e0-4f89-41d3-9a0c-0305e82c3301"
+
+
+def _payload(document_id, *entities):
+    return {"schema_version": "1.0", "document_id": document_id, "extracted_entities": list(entities)}
+
+
+def _entity(group, name, value, page=1):
+    return {
+        "entity_group_name": group,
+        "entity_name": name,
+        "entity_value": value,
+        "document_location": {"page": page},
+        "source_text": f"{name} {value}",
+    }
+
+
+class TestNormalizeValue:
+    @pytest.mark.parametrize("left, right", [
+        ("500 mg", "0.5 g"),
+        ("Metformin 500 mg PO BID", "metformin 500mg by mouth twice daily"),
+        ("1 tablet q.d.", "take 1 tablet once a day"),
+        ("1980-03-15", "03/15/1980"),
+        ("March 15, 1980", "15 Mar 1980"),
+        ("120/80 mmHg", "120/80"),
+        ("98.6 F", "37 °C"),
+        ("10 units", "10 U"),
+    ])
+    def test_equivalent_forms_agree(self, left, right):
+        assert normalize_value(left) == normalize_value(right)
+
+    @pytest.mark.parametrize("left, right", [
+        ("500 mg", "850 mg"),
+        ("500 mg BID", "500 mg TID"),
+        ("1980-03-15", "1980-05-13"),
+        ("Penicillin", "Sulfa"),
+    ])
+    def test_different_values_differ(self, left, right):
+        assert normalize_value(left) != normalize_value(right)
+
+
+class TestConflictIndex:
+    def test_disagreement_across_documents_is_a_conflict(self):
+        """
+        Given two documents with different Metformin doses and the same DOB in different formats
+        When conflicts are detected
+        Then only Metformin is reported, with one value per document
+        """
+        index = ConflictIndex.from_records([
+            EntityRecord(DOC_A, "medications", "Metformin", "500 mg"),
+            EntityRecord(DOC_A, "patient_demographics", "Date of birth", "03/15/1980"),
+            EntityRecord(DOC_B, "medications", " metformin", "850 mg"),
+            EntityRecord(DOC_B, "medications", "Metformin", "850mg"),
+            EntityRecord(DOC_B, "patient_demographics", "Date of Birth", "March 15, 1980"),
+        ])
+
+        (group,) = index.conflicts()
+
+        assert group.key == entity_key("medications", "Metformin")
+        assert group.severity == "High"
+        assert group.documents == {DOC_A, DOC_B}
+        assert sorted(c["conflicting_value"] for c in group.conflicting_values()) == ["500 mg", "850 mg"]
+
+    def test_values_within_one_document_are_not_a_cross_document_conflict(self):
+        index = ConflictIndex.from_records([
+            EntityRecord(DOC_A, "medications", "Metformin", "500 mg"),
+            EntityRecord(DOC_A, "medications", "Metformin", "850 mg"),
+        ])
+
+        assert index.conflicts() == []
+
+    def test_add_document_replaces_and_checks_only_touched_keys(self):
+        index = ConflictIndex.from_records([
+            EntityRecord(DOC_A, "medications", "Metformin", "500 mg"),
+            EntityRecord(DOC_A, "allergies", "Penicillin", "rash"),
+            EntityRecord(DOC_B, "allergies", "Penicillin", "anaphylaxis"),
+        ])
+
+        groups = index.add_document(DOC_C, [EntityRecord(DOC_C, "medications", "Metformin", "1000 mg")])
+        assert [g.key for g in groups] == [entity_key("medications", "Metformin")]
+
+        groups = index.add_document(DOC_C, [EntityRecord(DOC_C, "medications", "Metformin", "0.5 g")])
+        assert groups == []
+        assert len(index) == 4
+        assert [g.key for g in index.conflicts()] == [entity_key("allergies", "Penicillin")]
+
+    def test_matches_pairwise_comparison(self):
+        rng = random.Random(22)
+        values = ["500 mg", "0.5 g", "850 mg", "500 mg BID", "500 mg twice daily"]
+        records = [
+            EntityRecord(f"doc-{rng.randrange(8)}", "medications", f"Drug {rng.randrange(15)}", rng.choice(values))
+            for _ in range(300)
+        ]
+
+        index = ConflictIndex.from_records(records)
+
+        assert {g.key for g in index.conflicts()} == naive_conflicts(records)
+
+
+class TestAnnotateConflicts:
+    def test_conflicts_are_added_to_the_new_documents_entities(self):
+        """
+        Given a document whose allergy reaction disagrees with an earlier document
+        When it is annotated
+        Then the entity lists the other value with its source document, once
+        """
+        earlier = EntityRecord(DOC_A, "allergies", "Penicillin", "Anaphylaxis", {"page": 3})
+        payload = _payload(DOC_B, _entity("allergies", "Penicillin", "rash"), _entity("labs", "HbA1c", "7.1%"))
+        payload["extracted_entities"][0]["conflicts"] = [
+            {"conflicting_value": "anaphylaxis", "source_document": DOC_A},
+        ]
+        index = ConflictIndex.from_records([earlier])
+
+        annotated = annotate_conflicts(payload, index.add_document(DOC_B, entity_records(payload)))
+        validate_entity_payload(annotated)
+
+        penicillin, hba1c = annotated["extracted_entities"]
+        assert penicillin["conflicts"] == [{"conflicting_value": "anaphylaxis", "source_document": DOC_A}]
+        assert "conflicts" not in hba1c
+        assert "conflicts" in payload["extracted_entities"][0]
+
+        payload["extracted_entities"][0].pop("conflicts")
+        annotated = annotate_conflicts(payload, index.add_document(DOC_B, entity_records(payload)))
+        assert annotated["extracted_entities"][0]["conflicts"] == [
+            {"conflicting_value": "Anaphylaxis", "source_document": DOC_A, "document_location": {"page": 3}},
+        ]
+        assert "conflicts" not in payload["extracted_entities"][0]
+
+    def test_aggregate_does_not_cite_other_documents_values(self):
+        payload = _payload(DOC_B, _entity("medications", "Metformin", "850 mg"))
+        payload["extracted_entities"][0]["conflicts"] = [
+            {"conflicting_value": "500 mg", "source_document": DOC_A},
+            {"conflicting_value": "1000 mg"},
+        ]
+
+        assert [row.value for row in citation_rows(payload)] == ["850 mg", "1000 mg"]
+
+
+class FakeSource:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    @contextmanager
+    def connect(self):
+        yield self
+
+    @contextmanager
+    def cursor(self):
+        yield self
+
+    def execute(self, sql, params):
+        self.executed.append(params)
+
+    def fetchall(self):
+        return self.rows
+
+
+def test_stage_annotates_against_other_documents():
+    source = FakeSource([(uuid.UUID(DOC_A), "medications", "Metformin", "500 mg", 2, "Medications")])
+    context = JobContext(job={"job_id": "j", "document_id": DOC_B})
+    context.artifacts["entities"] = _payload(DOC_B, _entity("medications", "Metformin", "850 mg"))
+
+    asyncio.run(conflict_stage(PgConflictSource(source.connect)).run(context))
+
+    assert source.executed == [(uuid.UUID(DOC_B), [entity_key("medications", "Metformin")])]
+    (conflict,) = context.artifacts["entities"]["extracted_entities"][0]["conflicts"]
+    assert conflict == {
+        "conflicting_value": "500 mg",
+        "source_document": DOC_A,
+        "document_location": {"page": 2, "section": "Medications"},
+    }
+    assert [g.severity for g in context.artifacts["conflicts"]] == ["High"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,206 @@
+"""Unit tests for the document-processing job consumer."""
+
+import json
+import threading
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from broker import BrokerError, InMemoryBroker
+from config import RabbitMqConfig
+from consumer import JobConsumer
+from tests.fixtures.job_payloads import VALID_JOB_PAYLOAD, JOB_PAYLOAD_MISSING_JOB_ID
+
+
+QUEUE = "document-processing"
+DLQ = "document-processing-dlq"
+
+
+def _job(index):
+    return {**VALID_JOB_PAYLOAD, "document_id": f"doc-{index}"}
+
+
+def _broker(*bodies):
+    broker = InMemoryBroker()
+    broker.declare_queue(QUEUE, dead_letter_queue=DLQ)
+    for body in bodies:
+        broker.publish(QUEUE, body if isinstance(body, bytes) else json.dumps(body).encode())
+    return broker
+
+
+def _config(**overrides):
+    values = {"prefetch_count": 10, "max_in_flight": 4, "ack_batch_size": 5, "ack_interval_seconds": 0.05}
+    values.update(overrides)
+    return RabbitMqConfig(**values)
+
+
+class RecordingChannel:
+    """Wraps an InMemoryChannel and records ack/reject calls."""
+
+    def __init__(self, channel):
+        self._channel = channel
+        self.calls = []
+
+    def __getattr__(self, name):
+        return getattr(self._channel, name)
+
+    def ack(self, delivery_tag, multiple=False):
+        self.calls.append(("ack", delivery_tag, multiple))
+        self._channel.ack(delivery_tag, multiple)
+
+    def reject(self, delivery_tag, requeue):
+        self.calls.append(("reject", delivery_tag, requeue))
+        self._channel.reject(delivery_tag, requeue)
+
+
+class TestInMemoryBroker:
+    """The stand-in broker must enforce the semantics the consumer relies on."""
+
+    def test_prefetch_limits_unacked_deliveries(self):
+        broker = _broker(_job(1), _job(2))
+        channel = broker.channel()
+        channel.qos(1)
+        channel.consume(QUEUE)
+
+        first = channel.get_next(timeout=0.01)
+
+        assert first is not None
+        assert channel.get_next(timeout=0.01) is None
+        channel.ack(first.delivery_tag)
+        assert channel.get_next(timeout=0.01) is not None
+
+    def test_unknown_delivery_tag_is_rejected(self):
+        channel = _broker().channel()
+        channel.consume(QUEUE)
+
+        with pytest.raises(BrokerError, match="unknown delivery tag"):
+            channel.ack(1, multiple=True)
+
+    def test_reject_without_requeue_routes_to_dead_letter_queue(self):
+        broker = _broker(b"payload")
+        channel = broker.channel()
+        channel.consume(QUEUE)
+
+        channel.reject(channel.get_next(timeout=0.01).delivery_tag, requeue=False)
+
+        assert broker.messages(DLQ) == [b"payload"]
+        assert broker.queue_depth(QUEUE) == 0
+
+    def test_cancel_requeues_unacked_in_order(self):
+        broker = _broker(b"a", b"b", b"c")
+        channel = broker.channel()
+        channel.consume(QUEUE)
+        channel.get_next(timeout=0.01)
+        channel.get_next(timeout=0.01)
+
+        channel.cancel()
+
+        assert broker.messages(QUEUE) == [b"a", b"b", b"c"]
+
+
+class TestJobConsumer:
+    """Test cases for the consume loop."""
+
+    def test_valid_jobs_are_processed_and_acked_in_batches(self):
+        broker = _broker(*[_job(i) for i in range(20)])
+        channel = RecordingChannel(broker.channel())
+        handled = []
+        consumer = JobConsumer(channel, lambda job: handled.append(job["document_id"]), _config())
+
+        stats = consumer.run(exit_when_idle=True)
+
+        assert sorted(handled) == sorted(f"doc-{i}" for i in range(20))
+        assert stats.processed == 20
+        assert stats.in_flight == 0
+        acks = [call for call in channel.calls if call[0] == "ack"]
+        assert len(acks) < 20
+        assert broker.queue_depth(QUEUE) == 0
+        assert broker.queue_depth(DLQ) == 0
+        assert channel._unacked == {}
+
+    def test_schema_failures_are_routed_to_dlx(self):
+        broker = _broker(_job(1), JOB_PAYLOAD_MISSING_JOB_ID, b"{not json", [1, 2], _job(2))
+        handled = []
+        consumer = JobConsumer(broker.channel(), lambda job: handled.append(job), _config())
+
+        stats = consumer.run(exit_when_idle=True)
+
+        assert len(handled) == 2
+        assert stats.dead_lettered_invalid == 3
+        assert len(broker.messages(DLQ)) == 3
+        assert broker.messages(DLQ)[1] == b"{not json"
+
+    def test_handler_failures_are_dead_lettered(self):
+        def handler(job):
+            if job["document_id"] == "doc-2":
+                raise RuntimeError("extraction timed out")
+
+        broker = _broker(*[_job(i) for i in range(5)])
+        consumer = JobConsumer(broker.channel(), handler, _config())
+
+        stats = consumer.run(exit_when_idle=True)
+
+        assert stats.processed == 4
+        assert stats.dead_lettered_failed == 1
+        assert json.loads(broker.messages(DLQ)[0])["document_id"] == "doc-2"
+
+    def test_in_flight_never_exceeds_limit(self):
+        lock = threading.Lock()
+        state = {"current": 0, "peak": 0}
+
+        def handler(job):
+            with lock:
+                state["current"] += 1
+                state["peak"] = max(state["peak"], state["current"])
+            threading.Event().wait(0.005)
+            with lock:
+                state["current"] -= 1
+
+        broker = _broker(*[_job(i) for i in range(30)])
+        consumer = JobConsumer(broker.channel(), handler, _config(prefetch_count=20, max_in_flight=3))
+
+        consumer.run(exit_when_idle=True)
+
+        assert 1 <= state["peak"] <= 3
+
+    def test_slow_head_does_not_block_later_acks(self):
+        release = threading.Event()
+
+        def handler(job):
+            if job["document_id"] == "doc-0":
+                release.wait(2)
+
+        broker = _broker(*[_job(i) for i in range(6)])
+        channel = RecordingChannel(broker.channel())
+        consumer = JobConsumer(
+            channel, handler, _config(prefetch_count=3, max_in_flight=3, ack_batch_size=3), poll_interval_seconds=0.01
+        )
+        runner = threading.Thread(target=consumer.run, kwargs={"exit_when_idle": True})
+        runner.start()
+
+        for _ in range(200):
+            if consumer.stats().processed >= 5:
+                break
+            threading.Event().wait(0.01)
+        processed_while_head_blocked = consumer.stats().processed
+        release.set()
+        runner.join(timeout=5)
+
+        assert processed_while_head_blocked == 5
+        assert consumer.stats().processed == 6
+        assert channel._unacked == {}
+
+    def test_stop_requeues_undispatched_deliveries(self):
+        broker = _broker(*[_job(i) for i in range(3)])
+        consumer = JobConsumer(broker.channel(), lambda job: None, _config())
+        consumer.stop()
+
+        stats = consumer.run()
+
+        assert stats.received == 0
+        assert broker.queue_depth(QUEUE) == 3
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,130 @@
+"""Unit tests for the page-streaming document loader."""
+
+import asyncio
+import re
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import document_parser
+from config import DocumentStorageConfig
+from document_loader import load_stage, open_job_pages, resolve_storage_path
+from document_parser import DOCX_MIME_TYPE, PDF_MIME_TYPE, iter_document_pages
+from pipeline import PipelineExecutor, Stage
+from tests.fixtures.documents import build_docx, build_pdf
+from tests.fixtures.job_payloads import VALID_JOB_PAYLOAD
+
+
+def _job(storage_path, mime_type=PDF_MIME_TYPE):
+    return {**VALID_JOB_PAYLOAD, "payload": {"storagePath": storage_path, "mimeType": mime_type}}
+
+
+class TestPageStreaming:
+    """Test cases for lazy page iteration."""
+
+    def test_pdf_pages_carry_dimensions_and_coordinates(self, tmp_path):
+        path = tmp_path / "labs.pdf"
+        path.write_bytes(build_pdf(["BP 120/80"], width=595, height=842))
+
+        page = next(iter_document_pages(str(path), PDF_MIME_TYPE))
+
+        assert (page.page_number, page.width, page.height) == (1, 595.0, 842.0)
+        assert page.spans[0].text == "BP 120/80"
+        assert (page.spans[0].x, page.spans[0].y) == (72.0, 842.0 - 72)
+
+    def test_pdf_pages_are_parsed_on_demand(self, tmp_path, monkeypatch):
+        """
+        Given a 50-page PDF
+        When only the first page is consumed
+        Then only one page has been parsed
+        """
+        path = tmp_path / "long.pdf"
+        path.write_bytes(build_pdf([f"page {i}" for i in range(1, 51)]))
+        parsed = []
+        original = document_parser._pdf_page
+        monkeypatch.setattr(document_parser, "_pdf_page", lambda n, page: parsed.append(n) or original(n, page))
+
+        pages = iter_document_pages(str(path), PDF_MIME_TYPE)
+        first = next(pages)
+
+        assert first.text == "page 1"
+        assert parsed == [1]
+        assert [p.page_number for p in pages] == list(range(2, 51))
+
+    def test_docx_is_split_at_page_breaks(self, tmp_path):
+        path = tmp_path / "note.docx"
+        path.write_bytes(build_docx(["History", "Diabetes", "\f", "Medications", "Metformin 500 mg"]))
+
+        pages = list(iter_document_pages(str(path), DOCX_MIME_TYPE))
+
+        assert [(p.page_number, p.text) for p in pages] == [
+            (1, "History\nDiabetes"),
+            (2, "Medications\nMetformin 500 mg"),
+        ]
+        assert pages[0].width is None and pages[0].spans == ()
+
+
+    def test_last_rendered_break_after_an_explicit_break_adds_no_page(self, tmp_path):
+        path = tmp_path / "note.docx"
+        path.write_bytes(build_docx(["A", "\f", "\fB", "C", "\fD"]))
+
+        pages = list(iter_document_pages(str(path), DOCX_MIME_TYPE))
+
+        assert [(p.page_number, p.text) for p in pages] == [(1, "A"), (2, "B\nC"), (3, "D")]
+
+    def test_pdf_page_tree_loop_is_walked_once(self, tmp_path):
+        data = build_pdf(["Page one", "Page two"])
+        kids = re.search(rb"/Kids \[(\d+) 0 R (\d+) 0 R\]", data)
+        # Point the second kid back at the page tree root (object 2), keeping the xref offsets.
+        looped = data[:kids.start(2)] + b"2".rjust(len(kids.group(2))) + data[kids.end(2):]
+        path = tmp_path / "looped.pdf"
+        path.write_bytes(looped)
+
+        pages = list(iter_document_pages(str(path), PDF_MIME_TYPE))
+
+        assert [(p.page_number, p.text.strip()) for p in pages] == [(1, "Page one")]
+
+
+class TestStorageResolution:
+    def test_storage_path_is_resolved_under_base_path(self, tmp_path):
+        resolved = resolve_storage_path(str(tmp_path), "tenant/patient/doc/original.pdf")
+
+        assert resolved == os.path.join(str(tmp_path), "tenant", "patient", "doc", "original.pdf")
+
+    def test_path_traversal_is_rejected(self, tmp_path):
+        with pytest.raises(ValueError, match="escapes the document storage root"):
+            resolve_storage_path(str(tmp_path), "../secrets.pdf")
+
+    def test_missing_document_fails_before_streaming(self, tmp_path):
+        with pytest.raises(FileNotFoundError, match="missing.pdf"):
+            open_job_pages(_job("missing.pdf"), DocumentStorageConfig(base_path=str(tmp_path)))
+
+
+class TestLoadStage:
+    def test_load_stage_hands_lazy_pages_to_next_stage(self, tmp_path):
+        """
+        Given a stored PDF referenced by the job's storagePath
+        When the job runs through load and a consuming chunk stage
+        Then the chunk stage receives every page in order
+        """
+        (tmp_path / "original.pdf").write_bytes(build_pdf(["page one", "page two"]))
+        seen = []
+
+        async def chunk(context):
+            seen.extend(page.text for page in context.artifacts["pages"])
+
+        executor = PipelineExecutor([load_stage(DocumentStorageConfig(base_path=str(tmp_path))), Stage("chunk", chunk)])
+
+        async def scenario():
+            await executor.start()
+            await executor.submit(_job("original.pdf"))
+            await executor.close()
+
+        asyncio.run(scenario())
+
+        assert seen == ["page one", "page two"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,228 @@
+"""Unit tests for the ChunkHash-keyed embedding cache."""
+
+import asyncio
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from chunker import Chunk, chunk_hash
+from config import EmbeddingConfig
+from db import to_libpq_dsn
+from embedding_cache import EmbeddingCache, LruCache
+from vector_store import PgvectorEmbeddingStore, parse_vector
+
+
+DIMENSIONS = 4
+
+
+def _chunk(text, tokens=10):
+    return Chunk(
+        index=0, text=text, token_count=tokens, page=1, page_end=1, section=None, coordinates=None,
+        chunk_hash=chunk_hash(text),
+    )
+
+
+class FakeEmbedder:
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text)), 0.0, 0.0, 1.0] for text in texts]
+
+
+class FakeStore:
+    def __init__(self, vectors=None, error=None):
+        self.vectors = vectors or {}
+        self.error = error
+        self.requests = []
+
+    def fetch_embeddings(self, chunk_hashes):
+        self.requests.append(list(chunk_hashes))
+        if self.error:
+            raise self.error
+        return {h: self.vectors[h] for h in chunk_hashes if h in self.vectors}
+
+
+def _cache(embedder, store=None, capacity=100):
+    return EmbeddingCache(embedder, store, EmbeddingConfig(dimensions=DIMENSIONS, cache_capacity=capacity))
+
+
+class TestEmbeddingCache:
+    """Test cases for LRU -> store -> model resolution."""
+
+    def test_only_misses_reach_the_model(self):
+        """
+        Given a store that already holds the consent-form embedding
+        When a batch with the consent form and a new note is embedded
+        Then only the new note is sent to the model
+        """
+        consent, note = _chunk("Consent for treatment"), _chunk("BP 132/84", tokens=6)
+        embedder = FakeEmbedder()
+        store = FakeStore({consent.chunk_hash: [9.0, 9.0, 9.0, 9.0]})
+        cache = _cache(embedder, store)
+
+        vectors = asyncio.run(cache.embed_chunks([consent, note]))
+
+        assert embedder.calls == [["BP 132/84"]]
+        assert list(vectors[0]) == [9.0, 9.0, 9.0, 9.0]
+        stats = cache.stats()
+        assert (stats.store_hits, stats.misses, stats.tokens_saved, stats.tokens_embedded) == (1, 1, 10, 6)
+
+    def test_memory_hits_skip_store_and_model(self):
+        embedder = FakeEmbedder()
+        store = FakeStore()
+        cache = _cache(embedder, store)
+        chunk = _chunk("Lab footer: results reviewed by Dr. Smith")
+
+        asyncio.run(cache.embed_chunks([chunk]))
+        asyncio.run(cache.embed_chunks([chunk]))
+
+        assert len(embedder.calls) == 1
+        assert len(store.requests) == 1
+        assert cache.stats().memory_hits == 1
+        assert cache.stats().hit_ratio == 0.5
+
+    def test_duplicates_within_a_batch_are_embedded_once(self):
+        embedder = FakeEmbedder()
+        cache = _cache(embedder)
+        letterhead = "General Hospital, 1 Main St"
+
+        vectors = asyncio.run(cache.embed_chunks([_chunk(letterhead), _chunk("HbA1c 7.2%"), _chunk(letterhead)]))
+
+        assert embedder.calls == [[letterhead, "HbA1c 7.2%"]]
+        assert vectors[0] is vectors[2]
+        assert cache.stats().tokens_saved == 10
+
+    def test_store_failure_falls_back_to_model(self):
+        embedder = FakeEmbedder()
+        cache = _cache(embedder, FakeStore(error=ConnectionError("db down")))
+
+        vectors = asyncio.run(cache.embed_chunks([_chunk("BP 120/80")]))
+
+        assert len(vectors) == 1
+        assert cache.stats().store_errors == 1
+        assert cache.stats().misses == 1
+
+    @pytest.mark.parametrize("precision, tolerance, entry_bytes", [("float16", 1e-2, 8), ("int8", 0.12, 4 + 4)])
+    def test_quantized_memory_tier_returns_close_vectors_only_when_inexact(self, precision, tolerance, entry_bytes):
+        """
+        Given a cache holding its in-process entries as float16 or int8
+        When a chunk is embedded and then looked up again
+        Then an inexact lookup returns a close float32 copy, and the exact lookup used
+        for persistence returns the model's vector again
+        """
+        embedder = FakeEmbedder()
+        cache = EmbeddingCache(
+            embedder, None, EmbeddingConfig(dimensions=DIMENSIONS, cache_capacity=10, cache_precision=precision)
+        )
+        chunk = _chunk("Metformin 500 mg twice daily")
+
+        (first,) = asyncio.run(cache.embed_chunks([chunk]))
+        (hit,) = asyncio.run(cache.embed_chunks([chunk], exact=False))
+        (persisted,) = asyncio.run(cache.embed_chunks([chunk]))
+
+        assert list(first) == list(persisted) == [28.0, 0.0, 0.0, 1.0]
+        assert hit.typecode == "f"
+        assert all(abs(a - b) <= tolerance for a, b in zip(hit, first))
+        assert len(embedder.calls) == 2
+        stats = cache.stats()
+        assert stats.memory_hits == 1
+        assert stats.cached_bytes == entry_bytes
+
+    def test_exact_lookup_with_quantized_tier_reads_the_store(self):
+        chunk = _chunk("Metformin 500 mg twice daily")
+        store = FakeStore({chunk.chunk_hash: [1.0, 2.0, 3.0, 4.0]})
+        embedder = FakeEmbedder()
+        cache = EmbeddingCache(
+            embedder, store, EmbeddingConfig(dimensions=DIMENSIONS, cache_capacity=10, cache_precision="int8")
+        )
+
+        asyncio.run(cache.embed_chunks([chunk]))
+        (vector,) = asyncio.run(cache.embed_chunks([chunk]))
+
+        assert list(vector) == [1.0, 2.0, 3.0, 4.0]
+        assert embedder.calls == []
+        assert cache.stats().store_hits == 2
+
+    def test_wrong_dimensions_are_rejected(self):
+        async def embed(texts):
+            return [[1.0, 2.0] for _ in texts]
+
+        with pytest.raises(ValueError, match="Expected 4-d embedding"):
+            asyncio.run(_cache(embed).embed_chunks([_chunk("BP 120/80")]))
+
+
+class TestLruCache:
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = LruCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        assert cache.get("b") is None
+        assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params):
+        self.executed.append((sql, params))
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self):
+        return self._cursor
+
+
+class TestPgvectorEmbeddingStore:
+    def test_bulk_lookup_uses_one_query(self):
+        cursor = FakeCursor([("abc", "[0.5,1,-2]")])
+        store = PgvectorEmbeddingStore(lambda: FakeConnection(cursor))
+
+        found = store.fetch_embeddings(["abc", "def"])
+
+        assert list(found["abc"]) == [0.5, 1.0, -2.0]
+        sql, params = cursor.executed[0]
+        assert '"ChunkHash" = ANY(%s)' in sql
+        assert params == (["abc", "def"],)
+
+    def test_parse_vector_handles_empty_vector(self):
+        assert len(parse_vector("[]")) == 0
+
+
+class TestConnectionString:
+    def test_npgsql_connection_string_is_translated(self):
+        dsn = to_libpq_dsn("Host=db;Port=5432;Database=ClinicalIntelligence;Username=app;Password=p'w;SSL Mode=Require")
+
+        assert dsn == "host='db' port='5432' dbname='ClinicalIntelligence' user='app' password='p\\'w' sslmode='require'"
+
+    def test_uri_passes_through(self):
+        assert to_libpq_dsn("postgresql://app@db/ci") == "postgresql://app@db/ci"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,181 @@
+"""Unit tests for the Gemini embedding client and the cross-job batcher."""
+
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import EmbeddingConfig
+from embedding_client import EmbeddingApiError, EmbeddingBatcher, GeminiEmbeddingClient
+
+
+class FakeGeminiServer:
+    """Local HTTP server implementing the batchEmbedContents endpoint."""
+
+    def __init__(self, status=200, delay=0.0):
+        self.requests = []
+        self.api_keys = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                server.requests.append((self.path, body))
+                server.api_keys.append(self.headers.get("x-goog-api-key"))
+                threading.Event().wait(delay)
+                if status != 200:
+                    self.send_response(status)
+                    self.end_headers()
+                    self.wfile.write(b'{"error": {"message": "Resource has been exhausted"}}')
+                    return
+                embeddings = [{"values": [float(len(r["content"]["parts"][0]["text"])), 1.0]} for r in body["requests"]]
+                payload = json.dumps({"embeddings": embeddings}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self._httpd.server_address[1]}/v1beta"
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class FakeEmbedder:
+    def __init__(self, delay=0.0, fail=False):
+        self.calls = []
+        self.delay = delay
+        self.fail = fail
+
+    async def __call__(self, texts):
+        self.calls.append(list(texts))
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise EmbeddingApiError(503, "unavailable")
+        return [[float(len(text))] for text in texts]
+
+
+def _config(**overrides):
+    values = {"batch_max_texts": 4, "batch_max_tokens": 1000, "batch_max_wait_seconds": 0.02}
+    values.update(overrides)
+    return EmbeddingConfig(**values)
+
+
+class TestGeminiEmbeddingClient:
+    def test_batch_embed_request_shape(self):
+        with FakeGeminiServer() as server:
+            client = GeminiEmbeddingClient("test-key", EmbeddingConfig(), base_url=server.base_url)
+            vectors = asyncio.run(client.embed(["BP 120/80", "HbA1c"]))
+
+        path, body = server.requests[0]
+        assert path == "/v1beta/models/text-embedding-004:batchEmbedContents"
+        assert body["requests"][0]["model"] == "models/text-embedding-004"
+        assert body["requests"][1]["content"]["parts"][0]["text"] == "HbA1c"
+        assert server.api_keys == ["test-key"]
+        assert vectors == [[9.0, 1.0], [5.0, 1.0]]
+
+    def test_http_errors_raise_embedding_api_error(self):
+        with FakeGeminiServer(status=429) as server:
+            client = GeminiEmbeddingClient("test-key", base_url=server.base_url)
+            with pytest.raises(EmbeddingApiError) as exc_info:
+                asyncio.run(client.embed(["BP 120/80"]))
+
+        assert exc_info.value.status == 429
+        assert "exhausted" in str(exc_info.value)
+
+
+class TestEmbeddingBatcher:
+    """Test cases for coalescing, flushing and fan-out."""
+
+    def test_concurrent_jobs_share_requests_and_get_their_own_vectors(self):
+        """
+        Given three jobs embedding two chunks each at the same time
+        When the batch limit is four texts
+        Then two requests are sent and each job receives its own vectors in order
+        """
+        embedder = FakeEmbedder()
+        batcher = EmbeddingBatcher(embedder, _config())
+
+        async def scenario():
+            jobs = [["a", "bb"], ["ccc", "dddd"], ["eeeee", "ffffff"]]
+            return await asyncio.gather(*(batcher.embed(texts) for texts in jobs))
+
+        results = asyncio.run(scenario())
+
+        assert results == [[[1.0], [2.0]], [[3.0], [4.0]], [[5.0], [6.0]]]
+        assert [len(call) for call in embedder.calls] == [4, 2]
+        stats = batcher.stats()
+        assert (stats.requests, stats.size_flushes, stats.deadline_flushes) == (2, 1, 1)
+
+    def test_deadline_flushes_partial_batch(self):
+        embedder = FakeEmbedder()
+        batcher = EmbeddingBatcher(embedder, _config(batch_max_texts=100, batch_max_wait_seconds=0.01))
+
+        async def scenario():
+            started = asyncio.get_running_loop().time()
+            vectors = await batcher.embed(["BP 120/80"])
+            return vectors, asyncio.get_running_loop().time() - started
+
+        vectors, elapsed = asyncio.run(scenario())
+
+        assert vectors == [[9.0]]
+        assert elapsed < 0.5
+        assert batcher.stats().deadline_flushes == 1
+
+    def test_token_limit_splits_batches(self):
+        embedder = FakeEmbedder()
+        batcher = EmbeddingBatcher(embedder, _config(batch_max_texts=100, batch_max_tokens=10), count_tokens=len)
+
+        async def scenario():
+            return await batcher.embed(["aaaa", "bbbb", "cccc", "dd"])
+
+        asyncio.run(scenario())
+
+        assert embedder.calls == [["aaaa", "bbbb"], ["cccc", "dd"]]
+
+    def test_failed_request_fails_every_caller_in_the_batch(self):
+        batcher = EmbeddingBatcher(FakeEmbedder(fail=True), _config())
+
+        async def scenario():
+            return await asyncio.gather(batcher.embed(["a"]), batcher.embed(["b"]), return_exceptions=True)
+
+        results = asyncio.run(scenario())
+
+        assert all(isinstance(r, EmbeddingApiError) for r in results)
+        assert batcher.stats().failed_requests == 1
+
+    def test_concurrent_requests_are_bounded(self):
+        state = {"current": 0, "peak": 0}
+
+        async def embed(texts):
+            state["current"] += 1
+            state["peak"] = max(state["peak"], state["current"])
+            await asyncio.sleep(0.01)
+            state["current"] -= 1
+            return [[0.0] for _ in texts]
+
+        batcher = EmbeddingBatcher(embed, _config(batch_max_texts=1, max_concurrent_requests=2))
+
+        asyncio.run(batcher.embed([str(i) for i in range(8)]))
+
+        assert state["peak"] == 2
+        assert batcher.stats().requests == 8
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
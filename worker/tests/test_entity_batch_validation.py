@@ -0,0 +1,136 @@
+"""Unit tests for batch entity payload validation."""
+
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from main import validate_entity_payloads_batch
+from tests.fixtures.entity_payloads import (
+    VALID_ENTITY_PAYLOAD,
+    VALID_ENTITY_PAYLOAD_WITH_MULTIPLE_ENTITIES,
+    ENTITY_PAYLOAD_MISSING_SCHEMA_VERSION,
+    ENTITY_PAYLOAD_UNKNOWN_SCHEMA_VERSION,
+)
+
+
+def _payload_with_entities(*entities):
+    return {"schema_version": "1.0", "document_id": "doc-123", "extracted_entities": list(entities)}
+
+
+GOOD_ENTITY = {"entity_group_name": "medications", "entity_name": "medication_name", "entity_value": "Aspirin"}
+MISSING_VALUE_ENTITY = {"entity_group_name": "medications", "entity_name": "dose"}
+WRONG_TYPE_ENTITY = {"entity_group_name": "vitals", "entity_name": "weight", "entity_value": 82}
+
+
+class TestEntityBatchValidation:
+    """Test cases for validate_entity_payloads_batch."""
+
+    def test_all_valid_payloads_are_returned_unchanged(self):
+        """Given: Batch of valid payloads
+        When: validate_entity_payloads_batch called
+        Then: Every payload is valid and no errors are reported
+        """
+        result = validate_entity_payloads_batch(
+            [VALID_ENTITY_PAYLOAD, VALID_ENTITY_PAYLOAD_WITH_MULTIPLE_ENTITIES]
+        )
+
+        assert result.valid == [VALID_ENTITY_PAYLOAD, VALID_ENTITY_PAYLOAD_WITH_MULTIPLE_ENTITIES]
+        assert result.valid_indexes == [0, 1]
+        assert result.errors == []
+        assert result.rejected_indexes == []
+        assert result.dropped_entities == 0
+
+    def test_errors_are_structured_per_item(self):
+        """Given: Payload with an invalid entity
+        When: validate_entity_payloads_batch called
+        Then: Error carries payload index, JSON path, keyword code and entity index
+        """
+        result = validate_entity_payloads_batch(
+            [VALID_ENTITY_PAYLOAD, _payload_with_entities(GOOD_ENTITY, WRONG_TYPE_ENTITY)]
+        )
+
+        assert result.rejected_indexes == [1]
+        assert len(result.errors) == 1
+        error = result.errors[0]
+        assert error.index == 1
+        assert error.path == "$.extracted_entities[1].entity_value"
+        assert error.code == "type"
+        assert error.entity_index == 1
+
+    def test_invalid_entities_fail_whole_document_by_default(self):
+        """Given: Payload with one invalid entity
+        When: validate_entity_payloads_batch called without dropping
+        Then: Payload is rejected
+        """
+        result = validate_entity_payloads_batch([_payload_with_entities(GOOD_ENTITY, MISSING_VALUE_ENTITY)])
+
+        assert result.valid == []
+        assert result.rejected_indexes == [0]
+        assert [e.code for e in result.errors] == ["required"]
+
+    def test_drop_invalid_entities_keeps_good_entities(self):
+        """Given: Payload mixing valid and invalid entities
+        When: validate_entity_payloads_batch called with drop_invalid_entities=True
+        Then: Payload is accepted with only the valid entities and drops are counted
+        """
+        payload = _payload_with_entities(GOOD_ENTITY, MISSING_VALUE_ENTITY, GOOD_ENTITY, WRONG_TYPE_ENTITY)
+
+        result = validate_entity_payloads_batch([payload], drop_invalid_entities=True)
+
+        assert result.valid_indexes == [0]
+        assert result.valid[0]["extracted_entities"] == [GOOD_ENTITY, GOOD_ENTITY]
+        assert result.dropped_entities == 2
+        assert {e.entity_index for e in result.errors} == {1, 3}
+        assert len(payload["extracted_entities"]) == 4
+
+    def test_document_level_errors_are_never_dropped(self):
+        """Given: Payload missing document_id and containing an invalid entity
+        When: validate_entity_payloads_batch called with drop_invalid_entities=True
+        Then: Payload is rejected
+        """
+        payload = _payload_with_entities(MISSING_VALUE_ENTITY)
+        del payload["document_id"]
+
+        result = validate_entity_payloads_batch([payload], drop_invalid_entities=True)
+
+        assert result.valid == []
+        assert result.rejected_indexes == [0]
+        assert any(e.entity_index is None and e.code == "required" for e in result.errors)
+
+    def test_schema_version_problems_are_reported_not_raised(self):
+        """Given: Payloads with missing and unknown schema versions
+        When: validate_entity_payloads_batch called
+        Then: Both are rejected with distinct codes
+        """
+        result = validate_entity_payloads_batch(
+            [ENTITY_PAYLOAD_MISSING_SCHEMA_VERSION, ENTITY_PAYLOAD_UNKNOWN_SCHEMA_VERSION, VALID_ENTITY_PAYLOAD]
+        )
+
+        assert result.rejected_indexes == [0, 1]
+        assert result.valid_indexes == [2]
+        assert [(e.index, e.code) for e in result.errors] == [(0, "required"), (1, "unknown_schema_version")]
+        assert "Unknown entity schema version: 2.0" in result.errors[1].message
+
+    def test_non_object_payload_is_rejected(self):
+        """Given: Batch containing a non-object item
+        When: validate_entity_payloads_batch called
+        Then: Item is rejected with a type error at the root path
+        """
+        result = validate_entity_payloads_batch(["not a payload"])
+
+        assert result.rejected_indexes == [0]
+        assert (result.errors[0].path, result.errors[0].code) == ("$", "type")
+
+    def test_accepts_generators(self):
+        """Given: Payloads supplied lazily
+        When: validate_entity_payloads_batch called with a generator
+        Then: All payloads are validated
+        """
+        result = validate_entity_payloads_batch(VALID_ENTITY_PAYLOAD for _ in range(3))
+
+        assert result.valid_indexes == [0, 1, 2]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
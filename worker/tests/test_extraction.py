@@ -0,0 +1,243 @@
+"""Unit tests for single-call entity extraction against a local fake LLM."""
+
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from chunker import Chunk, chunk_hash
+from config import ExtractionConfig, RetrievalConfig
+from extraction import (
+    ENTITY_CATEGORIES,
+    ExtractionEngine,
+    ExtractionResponseError,
+    RetrievedChunk,
+    build_prompt,
+    extract_stage,
+    pack_context,
+    rank_chunks,
+)
+from llm_client import GeminiLlmClient, LlmApiError, LlmResponse
+from pipeline import JobContext
+
+
+DOCUMENT_ID = "7c9e6679-7425-40de-944b-e07fc1f90ae7"
+OVERLAP = "Current medications reviewed with the patient today and reconciled against pharmacy records."
+
+
+def _chunk(index, text, page=1, section=None):
+    return Chunk(index, text, len(text.split()), page, page, section, "72.0,700.0,300.0,712.0", chunk_hash(text))
+
+
+def _retrieved(*chunks, document_id=DOCUMENT_ID):
+    return [RetrievedChunk(document_id, chunk) for chunk in chunks]
+
+
+class FakeLlm:
+    """Local stand-in for the Gemini client: records prompts and returns a canned reply."""
+
+    def __init__(self, reply, prompt_tokens=1200, completion_tokens=300):
+        self.reply = reply
+        self.prompts = []
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+
+    async def __call__(self, prompt):
+        self.prompts.append(prompt)
+        text = self.reply if isinstance(self.reply, str) else json.dumps(self.reply)
+        return LlmResponse(text, self.prompt_tokens, self.completion_tokens)
+
+
+class TestPackContext:
+    """Test cases for token budgeting, overlap removal and ordering."""
+
+    def test_overlap_between_neighbours_is_sent_once(self):
+        """
+        Given two consecutive chunks that share the chunker's overlap
+        When both are packed
+        Then the shared text appears once and its tokens are not charged twice
+        """
+        first = _chunk(0, "Assessment: type 2 diabetes, stable. " + OVERLAP)
+        second = _chunk(1, OVERLAP + " Metformin 500 mg twice daily.")
+
+        context = pack_context(_retrieved(second, first), token_budget=1000)
+
+        assert context.text.count(OVERLAP) == 1
+        assert context.labels == ("C1", "C2")
+        assert [c.chunk.index for c in context.chunks] == [0, 1]
+        assert context.overlap_tokens_removed > 0
+        assert context.tokens < pack_context(_retrieved(first), 1000).tokens + pack_context(_retrieved(second), 1000).tokens
+
+    def test_budget_keeps_best_ranked_and_orders_by_page(self):
+        chunks = [_chunk(i, f"Page {i + 1} note " + "word " * 40, page=i + 1) for i in range(5)]
+        ranked = _retrieved(chunks[3], chunks[0], chunks[4], chunks[1], chunks[2])
+        one_chunk_cost = pack_context(_retrieved(chunks[0]), 10_000).tokens
+
+        context = pack_context(ranked, token_budget=2 * one_chunk_cost)
+
+        assert [c.chunk.page for c in context.chunks] == [1, 4]
+        assert context.dropped_chunks == 3
+        assert context.tokens <= 2 * one_chunk_cost
+
+    def test_duplicate_text_is_dropped(self):
+        letterhead = "General Hospital, 1 Main St, Springfield"
+
+        context = pack_context(
+            _retrieved(_chunk(0, letterhead)) + _retrieved(_chunk(0, letterhead), document_id="other-doc"), 1000
+        )
+
+        assert len(context.chunks) == 1
+        assert context.chunk_hashes == [chunk_hash(letterhead)]
+
+
+class TestExtractionEngine:
+    def test_one_call_returns_validated_payload_with_provenance(self):
+        """
+        Given two excerpts and a fenced JSON reply citing them by label
+        When a document is extracted
+        Then one call is made and the payload matches the entity contract with locations from the chunks
+        """
+        chunks = [_chunk(0, "Metformin 500 mg PO BID", page=2, section="Medications"),
+                  _chunk(5, "Metformin 850 mg daily", page=7)]
+        llm = FakeLlm("```json\n" + json.dumps({"extracted_entities": [
+            {"entity_group_name": "Medication", "entity_name": "Metformin", "entity_value": 500, "chunk": "C1",
+             "source_text": "Metformin 500 mg PO BID",
+             "conflicts": [{"conflicting_value": "850 mg daily", "chunk": "C2"}]},
+            {"entity_group_name": "allergies", "entity_name": "Penicillin", "entity_value": None},
+        ]}) + "\n```")
+        engine = ExtractionEngine(llm)
+
+        result = asyncio.run(engine.extract(DOCUMENT_ID, _retrieved(*chunks)))
+
+        assert len(llm.prompts) == 1
+        assert all(category in llm.prompts[0] for category in ENTITY_CATEGORIES)
+        (entity,) = result.payload["extracted_entities"]
+        assert result.payload["schema_version"] == "1.0" and result.payload["document_id"] == DOCUMENT_ID
+        assert (entity["entity_group_name"], entity["entity_value"]) == ("medications", "500")
+        assert entity["document_location"]["page"] == 2
+        assert entity["document_location"]["section"] == "Medications"
+        assert entity["document_location"]["coordinates"] == {"x": 72.0, "y": 700.0, "width": 228.0, "height": 12.0}
+        assert entity["conflicts"][0]["source_document"] == DOCUMENT_ID
+        assert entity["conflicts"][0]["document_location"]["page"] == 7
+        assert (result.usage.prompt_tokens, result.usage.completion_tokens) == (1200, 300)
+        assert result.usage.context_chunks == 2
+        stats = engine.stats()
+        assert (stats.jobs, stats.llm_calls, stats.entities, stats.failures) == (1, 1, 1, 0)
+
+    def test_invalid_json_fails_the_job(self):
+        engine = ExtractionEngine(FakeLlm("Sure! Here are the entities:"))
+
+        with pytest.raises(ExtractionResponseError):
+            asyncio.run(engine.extract(DOCUMENT_ID, _retrieved(_chunk(0, "BP 120/80"))))
+
+        assert engine.stats().failures == 1
+        assert engine.stats().prompt_tokens == 1200
+
+    def test_no_chunks_skips_the_llm(self):
+        llm = FakeLlm({"extracted_entities": []})
+
+        result = asyncio.run(ExtractionEngine(llm).extract(DOCUMENT_ID, []))
+
+        assert llm.prompts == []
+        assert result.payload["extracted_entities"] == []
+
+    def test_stage_ranks_by_category_vectors(self):
+        """
+        Given chunk embeddings and one query vector per category
+        When the extract stage runs with a budget for a single chunk
+        Then the best match for the first category is the chunk that is sent
+        """
+        chunks = [_chunk(i, f"Excerpt number {i} " + "text " * 20) for i in range(4)]
+        embeddings = [[1.0, 0.0], [0.0, 1.0], [0.7, 0.7], [-1.0, 0.0]]
+        llm = FakeLlm({"extracted_entities": []})
+        budget = pack_context(_retrieved(chunks[0]), 10_000).tokens
+        stage = extract_stage(ExtractionEngine(llm, ExtractionConfig(context_token_budget=budget)), [[0.0, 1.0], [1.0, 0.0]])
+        context = JobContext(job={"job_id": "j", "document_id": DOCUMENT_ID})
+        context.artifacts.update(chunks=chunks, embeddings=embeddings)
+
+        asyncio.run(stage.run(context))
+
+        assert "Excerpt number 1 " in llm.prompts[0]
+        assert "Excerpt number 0 " not in llm.prompts[0]
+        assert context.artifacts["entities"]["extracted_entities"] == []
+        assert context.artifacts["extraction_usage"].dropped_chunks == 3
+
+
+def test_rank_chunks_interleaves_categories_then_appends_the_rest():
+    chunks = [_chunk(i, f"chunk {i}") for i in range(4)]
+    embeddings = [[1.0, 0.0], [0.9, 0.1], [0.0, 1.0], [-1.0, -1.0]]
+
+    ranked = rank_chunks(DOCUMENT_ID, chunks, embeddings, [[1.0, 0.0], [0.0, 1.0]], RetrievalConfig(top_k=2))
+
+    assert [r.chunk.index for r in ranked] == [0, 2, 1, 3]
+
+
+def test_build_prompt_requires_json_only_output():
+    prompt = build_prompt(pack_context(_retrieved(_chunk(0, "BP 120/80", section="Vitals")), 1000))
+
+    assert "Return only a JSON object" in prompt
+    assert "[C1 | page 1 | section Vitals]\nBP 120/80" in prompt
+
+
+class FakeGenerateServer:
+    """Local HTTP server implementing the generateContent endpoint."""
+
+    def __init__(self, reply):
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                server.requests.append((self.path, json.loads(self.rfile.read(int(self.headers["Content-Length"])))))
+                payload = json.dumps(reply).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self._httpd.server_address[1]}/v1beta"
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class TestGeminiLlmClient:
+    def test_generate_requests_json_and_reads_usage(self):
+        reply = {
+            "candidates": [{"content": {"parts": [{"text": '{"extracted_entities": []}'}]}, "finishReason": "STOP"}],
+            "usageMetadata": {"promptTokenCount": 812, "candidatesTokenCount": 45},
+        }
+        with FakeGenerateServer(reply) as server:
+            client = GeminiLlmClient("test-key", ExtractionConfig(max_output_tokens=1024), base_url=server.base_url)
+            response = asyncio.run(client.generate("prompt"))
+
+        path, body = server.requests[0]
+        assert path == "/v1beta/models/gemini-2.5-flash:generateContent"
+        assert body["generationConfig"]["responseMimeType"] == "application/json"
+        assert body["generationConfig"]["maxOutputTokens"] == 1024
+        assert response == LlmResponse('{"extracted_entities": []}', 812, 45)
+
+    def test_truncated_reply_raises(self):
+        reply = {"candidates": [{"content": {"parts": [{"text": '{"extracted'}]}, "finishReason": "MAX_TOKENS"}]}
+        with FakeGenerateServer(reply) as server:
+            with pytest.raises(LlmApiError, match="truncated"):
+                asyncio.run(GeminiLlmClient("test-key", base_url=server.base_url).generate("prompt"))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
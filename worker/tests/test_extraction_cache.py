@@ -0,0 +1,179 @@
+"""Unit tests for the extraction result cache."""
+
+import asyncio
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from chunker import Chunk, chunk_hash
+from config import ExtractionConfig
+from extraction import PROMPT_VERSION, ExtractionEngine, RetrievedChunk, pack_context
+from extraction_cache import (
+    CachedExtraction,
+    ExtractionCache,
+    InMemoryExtractionStore,
+    SqliteExtractionStore,
+    extraction_key,
+    location_fingerprint,
+)
+from llm_client import LlmResponse
+
+
+FIRST_UPLOAD = "7c9e6679-7425-40de-944b-e07fc1f90ae7"
+RE_UPLOAD = "0b0ad5a4-3c1e-4b8e-9b53-6c2f3f6f1d11"
+REPLY = (
+    '{"extracted_entities": [{"entity_group_name": "medications", "entity_name": "Metformin",'
+    ' "entity_value": "500 mg", "chunk": "C1", "conflicts": [{"conflicting_value": "850 mg", "chunk": "C2"}]}]}'
+)
+
+
+def _chunks(page=1):
+    texts = ["Metformin 500 mg PO BID", "Metformin 850 mg daily"]
+    return [
+        Chunk(i, text, len(text.split()), page + i, page + i, None, None, chunk_hash(text))
+        for i, text in enumerate(texts)
+    ]
+
+
+def _retrieved(document_id, page=1):
+    return [RetrievedChunk(document_id, chunk) for chunk in _chunks(page)]
+
+
+class FakeLlm:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self, prompt):
+        self.calls += 1
+        return LlmResponse(REPLY, 1500, 250)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestEngineWithCache:
+    def test_re_upload_is_served_from_cache_for_the_new_document(self):
+        """
+        Given a document that was extracted once
+        When a re-upload with the same chunks is extracted
+        Then no LLM call is made and the payload names the new document
+        """
+        llm = FakeLlm()
+        cache = ExtractionCache(InMemoryExtractionStore(3600, 1 << 20))
+        engine = ExtractionEngine(llm, cache=cache)
+
+        first = asyncio.run(engine.extract(FIRST_UPLOAD, _retrieved(FIRST_UPLOAD)))
+        second = asyncio.run(engine.extract(RE_UPLOAD, _retrieved(RE_UPLOAD)))
+
+        assert llm.calls == 1
+        assert not first.usage.cached and second.usage.cached
+        assert (second.usage.prompt_tokens, second.usage.completion_tokens) == (0, 0)
+        assert second.payload["document_id"] == RE_UPLOAD
+        assert second.payload["extracted_entities"][0]["conflicts"][0]["source_document"] == RE_UPLOAD
+        assert second.payload["extracted_entities"][0]["document_location"] == {"page": 1}
+        assert first.payload["document_id"] == FIRST_UPLOAD
+        stats = cache.stats()
+        assert (stats.lookups, stats.hits, stats.misses, stats.stored) == (2, 1, 1, 1)
+        assert stats.hit_ratio == 0.5
+        assert (stats.prompt_tokens_saved, stats.completion_tokens_saved) == (1500, 250)
+        assert (engine.stats().llm_calls, engine.stats().cache_hits) == (1, 1)
+
+    def test_different_model_or_locations_miss(self):
+        llm = FakeLlm()
+        store = InMemoryExtractionStore(3600, 1 << 20)
+        asyncio.run(ExtractionEngine(llm, cache=ExtractionCache(store)).extract(FIRST_UPLOAD, _retrieved(FIRST_UPLOAD)))
+        other_model = ExtractionEngine(llm, ExtractionConfig(model="gemini-2.5-pro"), cache=ExtractionCache(store))
+        same_model = ExtractionCache(store)
+
+        asyncio.run(other_model.extract(RE_UPLOAD, _retrieved(RE_UPLOAD)))
+        asyncio.run(ExtractionEngine(llm, cache=same_model).extract(RE_UPLOAD, _retrieved(RE_UPLOAD, page=5)))
+
+        assert llm.calls == 3
+        assert same_model.stats().rejected_entries == 1
+
+    def test_entry_that_no_longer_validates_is_dropped(self):
+        llm = FakeLlm()
+        store = InMemoryExtractionStore(3600, 1 << 20)
+        clock = Clock()
+        cache = ExtractionCache(store, clock)
+        context = pack_context(_retrieved(FIRST_UPLOAD), 24000)
+        key = extraction_key(ExtractionConfig().model, PROMPT_VERSION, context.chunk_hashes)
+        bad = {"schema_version": "1.0", "document_id": FIRST_UPLOAD, "extracted_entities": [{"entity_name": "x"}]}
+        store.put(key, CachedExtraction(bad, (FIRST_UPLOAD,) * 2, location_fingerprint(context), 1, 1, clock.now), clock.now)
+
+        result = asyncio.run(ExtractionEngine(llm, cache=cache).extract(FIRST_UPLOAD, _retrieved(FIRST_UPLOAD)))
+
+        assert llm.calls == 1
+        assert result.payload["extracted_entities"][0]["entity_name"] == "Metformin"
+        assert cache.stats().rejected_entries == 1
+        assert store.get(key, clock.now).payload == result.payload
+
+
+class TestSqliteExtractionStore:
+    def _entry(self, size=0):
+        return CachedExtraction({"extracted_entities": [], "pad": "x" * size}, (), "", 10, 5, 0.0)
+
+    def test_entries_expire_after_ttl(self, tmp_path):
+        store = SqliteExtractionStore(str(tmp_path / "cache.sqlite3"), ttl_seconds=60, max_bytes=1 << 20)
+        store.put("a", self._entry(), now=100.0)
+        store.put("b", self._entry(), now=150.0)
+
+        assert store.get("a", now=159.0).prompt_tokens == 10
+        assert store.get("a", now=161.0) is None
+        assert store.prune(now=161.0) == 1
+        assert store.get("b", now=161.0) is not None
+
+    def test_size_limit_evicts_least_recently_used(self, tmp_path):
+        store = SqliteExtractionStore(str(tmp_path / "cache.sqlite3"), ttl_seconds=3600, max_bytes=2500)
+        store.put("a", self._entry(1000), now=1.0)
+        store.put("b", self._entry(1000), now=2.0)
+        store.get("a", now=3.0)
+
+        evicted = store.put("c", self._entry(1000), now=4.0)
+
+        assert evicted == 1
+        assert store.get("b", now=5.0) is None
+        assert store.get("a", now=5.0) is not None and store.get("c", now=5.0) is not None
+
+    def test_file_is_private_to_the_worker_user(self, tmp_path):
+        path = tmp_path / "cache.sqlite3"
+        path.write_bytes(b"")
+        path.chmod(0o644)
+
+        SqliteExtractionStore(str(path), ttl_seconds=60, max_bytes=1 << 20)
+
+        assert path.stat().st_mode & 0o777 == 0o600
+
+    def test_cache_survives_reopen(self, tmp_path):
+        path = str(tmp_path / "cache.sqlite3")
+        clock = Clock()
+        llm = FakeLlm()
+        first = ExtractionCache(SqliteExtractionStore(path, 3600, 1 << 20), clock)
+        asyncio.run(ExtractionEngine(llm, cache=first).extract(FIRST_UPLOAD, _retrieved(FIRST_UPLOAD)))
+
+        reopened = ExtractionCache(SqliteExtractionStore(path, 3600, 1 << 20), clock)
+        asyncio.run(ExtractionEngine(llm, cache=reopened).extract(RE_UPLOAD, _retrieved(RE_UPLOAD)))
+        clock.now += 3601
+        asyncio.run(ExtractionEngine(llm, cache=reopened).extract(RE_UPLOAD, _retrieved(RE_UPLOAD)))
+
+        assert llm.calls == 2
+        assert reopened.stats().hits == 1
+
+
+def test_in_memory_store_evicts_by_size():
+    store = InMemoryExtractionStore(3600, 600)
+    for key in "abc":
+        store.put(key, CachedExtraction({"pad": "x" * 200}, (), "", 0, 0, 0.0), 0.0)
+
+    assert store.get("a", 0.0) is None
+    assert store.get("c", 0.0) is not None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,149 @@
+"""Parity tests for the generated fast-path validators."""
+
+import ast
+import copy
+import inspect
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from jsonschema import Draft7Validator
+
+from main import _load_job_schema, _load_entity_schema
+from fast_validators import UnsupportedSchemaError, compile_schema, generate_source
+from schema_registry import SchemaRegistry
+from tests.fixtures import job_payloads, entity_payloads
+from tests import test_entity_validation
+
+
+def _fixtures(module):
+    return [
+        pytest.param(value, id=name)
+        for name, value in vars(module).items()
+        if name.isupper() and isinstance(value, dict)
+    ]
+
+
+def _entity(**overrides):
+    entity = {
+        "entity_group_name": "medications",
+        "entity_name": "medication_name",
+        "entity_value": "Aspirin",
+    }
+    entity.update(overrides)
+    return {"schema_version": "1.0", "document_id": "doc-123", "extracted_entities": [entity]}
+
+
+_LOCATION = {"page": 1, "section": "Header", "coordinates": {"x": 1, "y": 2.5, "width": 3, "height": 4}}
+
+JOB_EDGE_CASES = [
+    pytest.param("not an object", id="non-object"),
+    pytest.param({**job_payloads.VALID_JOB_PAYLOAD, "job_id": "00000000-0000-0000-0000-000000000000\n"}, id="uuid-trailing-newline"),
+    pytest.param({**job_payloads.VALID_JOB_PAYLOAD, "job_id": 123}, id="uuid-non-string"),
+    pytest.param({**job_payloads.VALID_JOB_PAYLOAD, "status": ["pending"]}, id="status-unhashable"),
+    pytest.param({**job_payloads.VALID_JOB_PAYLOAD, "schema_version": 1.0}, id="schema-version-number"),
+    pytest.param({**job_payloads.VALID_JOB_PAYLOAD, "document_id": None}, id="document-id-null"),
+    pytest.param({**job_payloads.VALID_JOB_PAYLOAD, "payload": []}, id="payload-array"),
+]
+
+ENTITY_EDGE_CASES = [
+    pytest.param([], id="non-object"),
+    pytest.param(_entity(document_location=_LOCATION), id="full-location"),
+    pytest.param(_entity(document_location={"page": 0}), id="page-below-minimum"),
+    pytest.param(_entity(document_location={"page": 2.0}), id="page-integral-float"),
+    pytest.param(_entity(document_location={"page": 2.5}), id="page-fractional-float"),
+    pytest.param(_entity(document_location={"page": True}), id="page-bool"),
+    pytest.param(_entity(document_location={"coordinates": {"x": 1, "y": 2, "width": 3}}), id="coordinates-missing-height"),
+    pytest.param(_entity(document_location={"coordinates": {"x": True, "y": 2, "width": 3, "height": 4}}), id="coordinates-bool"),
+    pytest.param(_entity(conflicts=[{"conflicting_value": "81 mg", "document_location": _LOCATION}]), id="conflict"),
+    pytest.param(_entity(conflicts=[{"source_document": "doc-2"}]), id="conflict-missing-value"),
+    pytest.param(_entity(conflicts={}), id="conflicts-object"),
+    pytest.param(_entity(entity_value=5), id="entity-value-number"),
+    pytest.param({**entity_payloads.VALID_ENTITY_PAYLOAD, "extracted_entities": ["x"]}, id="entity-not-object"),
+    pytest.param({**entity_payloads.VALID_ENTITY_PAYLOAD, "additional_entities": []}, id="additional-array"),
+]
+
+
+def _entity_test_payloads():
+    """Collect the inline payloads used by test_entity_validation.py."""
+    source = inspect.getsource(test_entity_validation.TestEntityValidation)
+    payloads = []
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Assign) and isinstance(node.value, ast.Dict):
+            name = node.targets[0].id
+            payloads.append(pytest.param(ast.literal_eval(node.value), id=f"{name}-{len(payloads)}"))
+    return payloads
+
+
+class TestFastValidatorParity:
+    """Generated predicates must agree with Draft7Validator.is_valid."""
+
+    @pytest.fixture(scope="class")
+    def job_schema(self):
+        return _load_job_schema()
+
+    @pytest.fixture(scope="class")
+    def entity_schema(self):
+        return _load_entity_schema("1.0")
+
+    @pytest.mark.parametrize("payload", _fixtures(job_payloads) + JOB_EDGE_CASES)
+    def test_job_schema_parity(self, job_schema, payload):
+        fast = compile_schema(job_schema)
+        assert fast(payload) == Draft7Validator(job_schema).is_valid(payload)
+
+    @pytest.mark.parametrize(
+        "payload", _fixtures(entity_payloads) + _entity_test_payloads() + ENTITY_EDGE_CASES
+    )
+    def test_entity_schema_parity(self, entity_schema, payload):
+        fast = compile_schema(entity_schema)
+        assert fast(payload) == Draft7Validator(entity_schema).is_valid(payload)
+
+    def test_fast_validator_does_not_mutate_payload(self, entity_schema):
+        payload = _entity(document_location=_LOCATION)
+        before = copy.deepcopy(payload)
+
+        compile_schema(entity_schema)(payload)
+
+        assert payload == before
+
+
+class TestFastValidatorCompiler:
+    """Test cases for schema compilation and fallbacks."""
+
+    def test_generated_source_is_self_contained(self):
+        source = generate_source(_load_job_schema())
+        namespace = {}
+
+        exec(source, namespace)
+
+        assert namespace["is_valid"](job_payloads.VALID_JOB_PAYLOAD)
+        assert "re.compile" in source
+        assert "frozenset" in source
+
+    def test_unsupported_keyword_raises(self):
+        schema = {"type": "object", "properties": {"name": {"type": "string", "maxLength": 3}}}
+
+        with pytest.raises(UnsupportedSchemaError, match="maxLength"):
+            compile_schema(schema)
+
+    def test_non_string_enum_raises(self):
+        with pytest.raises(UnsupportedSchemaError):
+            compile_schema({"type": "object", "properties": {"n": {"enum": [1, 2]}}})
+
+    def test_unresolvable_ref_raises(self):
+        with pytest.raises(UnsupportedSchemaError, match="Unresolvable"):
+            compile_schema({"type": "array", "items": {"$ref": "#/definitions/Missing"}})
+
+    def test_registry_falls_back_to_generic_validator_for_unsupported_schema(self):
+        schema = {"type": "object", "properties": {"name": {"maxLength": 3}}}
+        registry = SchemaRegistry({"custom": lambda version: schema})
+
+        compiled = registry.get("custom", "1.0")
+
+        assert compiled.is_valid({"name": "abc"})
+        assert not compiled.is_valid({"name": "abcd"})
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,175 @@
+"""Unit tests for the worker health and metrics server."""
+
+import asyncio
+import json
+import urllib.error
+import urllib.request
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from broker import InMemoryBroker
+from config import HealthConfig, RabbitMqConfig
+from consumer import JobConsumer
+from health import (
+    HealthServer,
+    broker_check,
+    consumer_metrics,
+    pipeline_metrics,
+    pool_check,
+    rate_limiter_metrics,
+    render_metrics,
+    schema_registry_check,
+)
+from main import JOB_CONTRACT, JOB_SCHEMA_VERSION, get_schema_registry
+from pipeline import PipelineExecutor, Stage
+from rate_limiter import ModelQuota, RateLimiter
+from tests.fixtures.job_payloads import VALID_JOB_PAYLOAD
+
+
+class Pool:
+    """The parts of a psycopg_pool.ConnectionPool the pool check reads."""
+
+    def __init__(self, size=4, available=3):
+        self.closed = False
+        self._stats = {"pool_size": size, "pool_available": available}
+
+    def get_stats(self):
+        return dict(self._stats)
+
+
+class ClosedChannel:
+    is_open = False
+
+
+def _get(server, path):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}{path}", timeout=5) as response:
+            return response.status, response.headers["Content-Type"], response.read().decode()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers["Content-Type"], e.read().decode()
+
+
+class TestHealthEndpoints:
+    def test_ready_when_every_dependency_is_up(self):
+        """
+        Given a server with schema registry, broker and pool readiness checks
+        When the health endpoints are requested over HTTP
+        Then each returns 200 with the status of its checks
+        """
+        readiness = {
+            "schemas": schema_registry_check(get_schema_registry(), [(JOB_CONTRACT, JOB_SCHEMA_VERSION)]),
+            "broker": broker_check(InMemoryBroker().channel()),
+            "database": pool_check(Pool()),
+        }
+
+        with HealthServer(HealthConfig(host="127.0.0.1", port=0), readiness=readiness) as server:
+            live = _get(server, "/health/live")
+            status, content_type, body = _get(server, "/health/ready")
+            health = _get(server, "/health")
+
+        assert live[0] == 200 and json.loads(live[2]) == {"status": "Healthy", "checks": {}}
+        assert (status, content_type) == (200, "application/json")
+        checks = json.loads(body)["checks"]
+        assert set(checks) == {"schemas", "broker", "database"}
+        assert checks["database"] == {"status": "Healthy", "detail": "3 of 4 connections available"}
+        assert health[0] == 200
+
+    def test_one_failing_dependency_makes_the_worker_unready_but_live(self):
+        pool = Pool()
+        pool.closed = True
+        server = HealthServer(readiness={
+            "broker": broker_check(ClosedChannel()),
+            "database": pool_check(pool),
+            "empty_pool": pool_check(Pool(size=0, available=0)),
+            "schemas": schema_registry_check(get_schema_registry(), [(JOB_CONTRACT, JOB_SCHEMA_VERSION)]),
+        })
+
+        status, _, body = server.respond("/health/ready")
+
+        assert status == 503
+        result = json.loads(body)
+        assert result["status"] == "Unhealthy"
+        assert {name: check["status"] for name, check in result["checks"].items()} == {
+            "broker": "Unhealthy", "database": "Unhealthy", "empty_pool": "Unhealthy", "schemas": "Healthy",
+        }
+        assert result["checks"]["broker"]["detail"] == "Broker connection is closed"
+        assert server.respond("/health/live")[0] == 200
+        assert server.respond("/health")[0] == 503
+        assert server.respond("/nope")[0] == 404
+
+    def test_unloadable_schema_fails_readiness(self):
+        check = schema_registry_check(get_schema_registry(), [(JOB_CONTRACT, "9.9")])
+
+        status, _, body = HealthServer(readiness={"schemas": check}).respond("/health/ready")
+
+        assert status == 503
+        assert "Unknown job schema version" in json.loads(body)["checks"]["schemas"]["detail"]
+
+
+class TestMetrics:
+    def test_consumer_pipeline_and_rate_limiter_metrics(self):
+        """
+        Given a consumer, pipeline and rate limiter that have processed work
+        When /metrics is requested
+        Then job counts, per-stage latency histograms and Gemini throttle counters are exposed
+        """
+        broker = InMemoryBroker()
+        broker.declare_queue("document-processing", dead_letter_queue="document-processing-dlq")
+        broker.publish("document-processing", json.dumps(VALID_JOB_PAYLOAD).encode())
+        broker.publish("document-processing", b"not json")
+        consumer = JobConsumer(broker.channel(), lambda job: None, RabbitMqConfig(), poll_interval_seconds=0.01)
+        consumer.run(exit_when_idle=True)
+
+        async def noop(context):
+            pass
+
+        executor = PipelineExecutor([Stage("load", noop), Stage("chunk", noop)])
+        clock = [0.0]
+
+        async def sleep(seconds):
+            clock[0] += seconds
+
+        limiter = RateLimiter({"gemini-2.5-flash": ModelQuota(1, 1000)}, clock=lambda: clock[0], sleep=sleep)
+
+        async def scenario():
+            await executor.start()
+            await executor.submit(VALID_JOB_PAYLOAD)
+            await executor.close()
+            await limiter.acquire("gemini-2.5-flash", 10)
+            await limiter.acquire("gemini-2.5-flash", 10)
+
+        asyncio.run(scenario())
+        server = HealthServer(collectors=[
+            consumer_metrics(consumer), pipeline_metrics(executor), rate_limiter_metrics(limiter),
+        ])
+
+        status, content_type, text = server.respond("/metrics")
+        lines = text.splitlines()
+
+        assert status == 200 and content_type.startswith("text/plain; version=0.0.4")
+        assert "worker_jobs_processed_total 1" in lines
+        assert 'worker_jobs_dead_lettered_total{reason="invalid"} 1' in lines
+        assert "worker_jobs_in_flight 0" in lines
+        assert "# TYPE worker_stage_duration_seconds histogram" in lines
+        assert 'worker_stage_duration_seconds_bucket{stage="chunk",le="+Inf"} 1' in lines
+        assert 'worker_stage_duration_seconds_count{stage="load"} 1' in lines
+        assert 'worker_stage_jobs_total{stage="load",outcome="completed"} 1' in lines
+        assert 'worker_gemini_requests_total{model="gemini-2.5-flash"} 2' in lines
+        assert 'worker_gemini_throttled_total{model="gemini-2.5-flash"} 1' in lines
+        assert 'worker_gemini_tokens_total{model="gemini-2.5-flash"} 20' in lines
+
+    def test_failing_collector_is_skipped(self):
+        def broken():
+            raise RuntimeError("boom")
+            yield
+
+        def labelled():
+            yield 'worker_example{name="a\\"b"} 1'
+
+        assert render_metrics([broken, labelled]) == 'worker_example{name="a\\"b"} 1\n'
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
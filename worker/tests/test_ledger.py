@@ -0,0 +1,204 @@
+"""Unit tests for the per-job stage ledger and pipeline retries."""
+
+import asyncio
+from array import array
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from chunker import Chunk
+from code_index import ICD10, CodeCandidate, SuggestedCode
+from conflict_detector import ConflictGroup, EntityRecord
+from ledger import (
+    InMemoryLedgerStore,
+    SqliteLedgerStore,
+    StageLedger,
+    StageRecord,
+    decode_outputs,
+    encode_outputs,
+    fingerprint,
+)
+from pipeline import DEFAULT_STAGE_NAMES, PipelineExecutor, Stage, StageError
+from tests.fixtures.job_payloads import VALID_JOB_PAYLOAD
+
+
+class FlakyStages:
+    """The default stages with run counters; `fail_at` fails that stage once."""
+
+    def __init__(self, fail_at=None):
+        self.fail_at = fail_at
+        self.runs = {name: 0 for name in DEFAULT_STAGE_NAMES}
+
+    def build(self):
+        outputs = {"load": ("pages",), "chunk": ("chunks",), "embed": ("embeddings",), "extract": ("entities",)}
+        return [
+            Stage(name, self._runner(name), outputs=outputs.get(name, ()), checkpoint=name != "load")
+            for name in DEFAULT_STAGE_NAMES
+        ]
+
+    def _runner(self, name):
+        async def run(context):
+            self.runs[name] += 1
+            if name == self.fail_at:
+                self.fail_at = None
+                raise TimeoutError(f"{name} timed out")
+            if name == "load":
+                context.artifacts["pages"] = iter(["page 1", "page 2"])
+            elif name == "chunk":
+                context.artifacts["chunks"] = [f"chunk of {page}" for page in context.artifacts["pages"]]
+            elif name == "embed":
+                context.artifacts["embeddings"] = [array("f", [len(c), 1.0]) for c in context.artifacts["chunks"]]
+            elif name == "extract":
+                context.artifacts["entities"] = {"count": len(context.artifacts["embeddings"])}
+
+        return run
+
+
+def _run_job(stages, ledger):
+    executor = PipelineExecutor(stages.build(), ledger=ledger)
+
+    async def scenario():
+        await executor.start()
+        try:
+            return await executor.submit(VALID_JOB_PAYLOAD)
+        finally:
+            await executor.close()
+
+    return asyncio.run(scenario()), executor
+
+
+class TestStageLedgerRetries:
+    """Test cases for resuming a retried job after a failure at each stage."""
+
+    @pytest.mark.parametrize("failing_stage", DEFAULT_STAGE_NAMES)
+    def test_retry_reruns_only_unfinished_stages(self, failing_stage):
+        """
+        Given a job whose first attempt fails at one stage
+        When the same job is delivered again
+        Then completed checkpointed stages are skipped and the result matches an uninterrupted run
+        """
+        stages = FlakyStages(fail_at=failing_stage)
+        ledger = StageLedger(InMemoryLedgerStore())
+
+        with pytest.raises(StageError) as exc_info:
+            _run_job(stages, ledger)
+        assert exc_info.value.stage == failing_stage
+
+        context, executor = _run_job(stages, ledger)
+
+        failed_index = DEFAULT_STAGE_NAMES.index(failing_stage)
+        resume_index = 0 if failed_index <= 1 else failed_index
+        expected = {
+            name: (1 if i < resume_index else 2 if i <= failed_index else 1)
+            for i, name in enumerate(DEFAULT_STAGE_NAMES)
+        }
+        assert stages.runs == expected
+        assert context.artifacts["entities"] == {"count": 2}
+        assert context.skipped_stages == set(DEFAULT_STAGE_NAMES[:resume_index])
+        assert sum(s.skipped for s in executor.stats()) == resume_index
+
+    def test_finished_job_redelivery_is_a_no_op(self):
+        stages = FlakyStages()
+        ledger = StageLedger(InMemoryLedgerStore())
+        _run_job(stages, ledger)
+
+        context, _ = _run_job(stages, ledger)
+
+        assert set(stages.runs.values()) == {1}
+        assert context.skipped_stages == set(DEFAULT_STAGE_NAMES)
+
+    def test_tampered_outputs_are_recomputed(self):
+        store = InMemoryLedgerStore()
+        ledger = StageLedger(store)
+        stages = FlakyStages(fail_at="extract")
+        with pytest.raises(StageError):
+            _run_job(stages, ledger)
+
+        key = f"{VALID_JOB_PAYLOAD['job_id']}:{VALID_JOB_PAYLOAD['document_id']}"
+        record = store.load(key)["embed"]
+        store.save(key, StageRecord("embed", "0" * 64, record.outputs, record.completed_at))
+
+        context, _ = _run_job(stages, ledger)
+
+        assert stages.runs["chunk"] == 1
+        assert stages.runs["embed"] == 2
+        assert context.skipped_stages == {"load", "chunk"}
+        assert ledger.stats().stale_records == 1
+
+    def test_store_failures_do_not_fail_jobs(self):
+        class BrokenStore:
+            def load(self, job_key):
+                raise OSError("disk full")
+
+            save = drop_outputs = load
+
+        ledger = StageLedger(BrokenStore())
+
+        context, _ = _run_job(FlakyStages(), ledger)
+
+        assert context.artifacts["entities"] == {"count": 2}
+        assert ledger.stats().store_errors > 0
+
+
+class TestSqliteLedgerStore:
+    def test_records_survive_reopening_and_prune(self, tmp_path):
+        path = str(tmp_path / "ledger.sqlite3")
+        store = SqliteLedgerStore(path)
+        store.save("job:doc", StageRecord("chunk", "abc", b"data", 100.0))
+        store.close()
+
+        reopened = SqliteLedgerStore(path)
+        assert reopened.load("job:doc")["chunk"] == StageRecord("chunk", "abc", b"data", 100.0)
+        reopened.drop_outputs("job:doc")
+        assert reopened.load("job:doc")["chunk"].outputs is None
+        assert reopened.prune(completed_before=200.0) == 1
+        assert reopened.load("job:doc") == {}
+
+    def test_file_is_private_to_the_worker_user(self, tmp_path):
+        path = tmp_path / "state" / "ledger.sqlite3"
+        SqliteLedgerStore(str(path)).close()
+
+        assert (path.parent.stat().st_mode & 0o777, path.stat().st_mode & 0o777) == (0o700, 0o600)
+
+
+class TestOutputEncoding:
+    def test_stage_artifacts_round_trip(self):
+        """
+        Given the artifacts the pipeline stages produce
+        When they are encoded for the ledger and decoded again
+        Then the values, their types and their fingerprint are unchanged
+        """
+        record = EntityRecord("d-1", "vitals", "BP", "120/80", {"page": 1})
+        outputs = {
+            "chunks": [Chunk(0, "text", 1, 1, 1, "Plan", None, "h")],
+            "embeddings": [array("f", [0.5, -1.0])],
+            "conflicts": [ConflictGroup("vitals/bp", "vitals", "BP", "high", {"120/80": (record,)})],
+            "code_suggestions": [SuggestedCode("diagnoses", "HTN", "HTN", CodeCandidate("I10", ICD10, "x", 1.0, "exact"))],
+            "entities": {"document_id": "d-1", "$ref": b"\x00"},
+        }
+
+        decoded = decode_outputs(encode_outputs(outputs))
+
+        assert decoded == outputs
+        assert fingerprint(decoded) == fingerprint(outputs)
+
+    def test_unlisted_types_are_refused(self):
+        class Other:
+            pass
+
+        with pytest.raises(TypeError):
+            encode_outputs({"x": Other()})
+        with pytest.raises(ValueError):
+            decode_outputs(b'{"x": {"$type": "os.system", "fields": {"command": "true"}}}')
+
+
+def test_fingerprint_is_stable_and_content_sensitive():
+    value = [{"b": array("f", [1.0]), "a": ("x", 1)}]
+
+    assert fingerprint(value) == fingerprint([{"a": ("x", 1), "b": array("f", [1.0])}])
+    assert fingerprint(value) != fingerprint([{"b": array("f", [2.0]), "a": ("x", 1)}])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,188 @@
+"""Unit tests for document parsing and the parser process pool."""
+
+import asyncio
+import threading
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import DocumentStorageConfig, ParserPoolConfig
+from document_parser import DOCX_MIME_TYPE, PDF_MIME_TYPE, UnsupportedDocumentError, parse_document
+import parser_pool
+from parser_pool import ParserPool, ParserWorkerError, ParseTimeoutError, parse_stage
+from pipeline import PipelineExecutor
+from tests.fixtures.documents import build_docx, build_pdf
+from tests.fixtures.job_payloads import VALID_JOB_PAYLOAD
+from tests.fixtures import parsers
+
+
+class TestParseDocument:
+    def test_pdf_pages_are_numbered_from_one(self, tmp_path):
+        path = tmp_path / "labs.pdf"
+        path.write_bytes(build_pdf(["BP 120/80", "HbA1c 7.2%"]))
+
+        pages = parse_document(str(path), PDF_MIME_TYPE)
+
+        assert [(p.page_number, p.text) for p in pages] == [(1, "BP 120/80"), (2, "HbA1c 7.2%")]
+
+    def test_docx_body_is_single_page(self, tmp_path):
+        path = tmp_path / "note.docx"
+        path.write_bytes(build_docx(["Metformin 500 mg"]))
+
+        pages = parse_document(str(path), DOCX_MIME_TYPE)
+
+        assert len(pages) == 1
+        assert "Metformin 500 mg" in pages[0].text
+
+    def test_unsupported_mime_type_raises(self):
+        with pytest.raises(UnsupportedDocumentError, match="text/plain"):
+            parse_document("note.txt", "text/plain")
+
+
+class TestInProcessParserPool:
+    """Pool size 0 parses in the calling thread."""
+
+    def test_parses_without_worker_processes(self, tmp_path):
+        path = tmp_path / "labs.pdf"
+        path.write_bytes(build_pdf(["page one"]))
+
+        with ParserPool(ParserPoolConfig(pool_size=0)) as pool:
+            pages = pool.parse(str(path), PDF_MIME_TYPE)
+            stats = pool.stats()
+
+        assert pages[0].text == "page one"
+        assert stats.completed == 1
+        assert stats.saturation == 0.0
+
+    def test_parse_errors_propagate_and_are_counted(self):
+        with ParserPool(ParserPoolConfig(pool_size=0), parse_fn=parsers.failing_parse) as pool:
+            with pytest.raises(ValueError, match="corrupt document"):
+                pool.parse("a.pdf", PDF_MIME_TYPE)
+            assert pool.stats().failed == 1
+
+
+class TestParserProcessPool:
+    """Test cases for the multi-process pool."""
+
+    def test_parsing_runs_in_worker_process(self):
+        with ParserPool(ParserPoolConfig(pool_size=1), parse_fn=parsers.pid_parse) as pool:
+            pages = pool.parse("a.pdf", PDF_MIME_TYPE)
+
+        assert int(pages[0].text) != os.getpid()
+
+    def test_workers_are_recycled_after_max_tasks(self):
+        """
+        Given a single worker recycled after two documents
+        When five documents are parsed
+        Then three distinct worker processes handle them
+        """
+        config = ParserPoolConfig(pool_size=1, max_tasks_per_worker=2)
+        with ParserPool(config, parse_fn=parsers.pid_parse) as pool:
+            pids = [pool.parse(f"{i}.pdf", PDF_MIME_TYPE)[0].text for i in range(5)]
+            stats = pool.stats()
+
+        assert pids[0] == pids[1] and pids[2] == pids[3]
+        assert len(set(pids)) == 3
+        assert stats.recycled == 2
+        assert stats.completed == 5
+
+    def test_timeout_kills_worker_and_pool_recovers(self):
+        with ParserPool(ParserPoolConfig(pool_size=1), parse_fn=parsers.slow_parse) as pool:
+            with pytest.raises(ParseTimeoutError):
+                pool.parse("5", PDF_MIME_TYPE, timeout=0.2)
+            pages = pool.parse("0", PDF_MIME_TYPE, timeout=5)
+            stats = pool.stats()
+
+        assert pages[0].text == "0"
+        assert stats.timed_out == 1
+        assert stats.failed == 1
+        assert stats.busy == 0
+
+    def test_worker_errors_and_crashes_surface(self):
+        with ParserPool(ParserPoolConfig(pool_size=1), parse_fn=parsers.failing_parse) as pool:
+            with pytest.raises(ValueError, match="corrupt document"):
+                pool.parse("a.pdf", PDF_MIME_TYPE)
+
+        with ParserPool(ParserPoolConfig(pool_size=1), parse_fn=parsers.crashing_parse) as pool:
+            with pytest.raises(ParserWorkerError, match="exited"):
+                pool.parse("a.pdf", PDF_MIME_TYPE)
+
+    def test_worker_that_died_while_idle_is_replaced(self):
+        """
+        Given a pool whose only worker process died between jobs
+        When a document is parsed
+        Then the parse fails without leaking a busy slot and the next parse runs on a new worker
+        """
+        with ParserPool(ParserPoolConfig(pool_size=1), parse_fn=parsers.pid_parse) as pool:
+            dead = pool._idle.queue[0].process
+            dead.kill()
+            dead.join()
+
+            with pytest.raises(ParserWorkerError):
+                pool.parse("a.pdf", PDF_MIME_TYPE)
+            pages = pool.parse("b.pdf", PDF_MIME_TYPE)
+            stats = pool.stats()
+
+        assert int(pages[0].text) != dead.pid
+        assert (stats.busy, stats.failed, stats.completed) == (0, 1, 1)
+
+    def test_slot_survives_a_failed_replacement(self, monkeypatch):
+        with ParserPool(ParserPoolConfig(pool_size=1), parse_fn=parsers.crashing_parse) as pool:
+            def cannot_start(*args):
+                raise OSError("fork failed")
+
+            spawn = parser_pool._WorkerProcess
+            monkeypatch.setattr(parser_pool, "_WorkerProcess", cannot_start)
+            with pytest.raises(ParserWorkerError):
+                pool.parse("a.pdf", PDF_MIME_TYPE)
+            with pytest.raises(ParserWorkerError):
+                pool.parse("b.pdf", PDF_MIME_TYPE)
+            monkeypatch.setattr(parser_pool, "_WorkerProcess", spawn)
+            pool._parse_fn = parsers.pid_parse
+            pages = pool.parse("c.pdf", PDF_MIME_TYPE)
+            stats = pool.stats()
+
+        assert int(pages[0].text) > 0
+        assert (stats.busy, stats.failed, stats.completed) == (0, 2, 1)
+
+    def test_saturation_reports_busy_workers(self):
+        """
+        Given a pool of two workers
+        When three slow parses are submitted concurrently
+        Then the pool is fully saturated with one caller waiting
+        """
+        with ParserPool(ParserPoolConfig(pool_size=2), parse_fn=parsers.slow_parse) as pool:
+            threads = [threading.Thread(target=pool.parse, args=("0.5", PDF_MIME_TYPE)) for _ in range(3)]
+            for thread in threads:
+                thread.start()
+            threading.Event().wait(0.2)
+            stats = pool.stats()
+            for thread in threads:
+                thread.join()
+
+        assert stats.saturation == 1.0
+        assert stats.waiting == 1
+
+
+class TestParseStage:
+    def test_load_stage_parses_stored_document(self, tmp_path):
+        (tmp_path / "tenant").mkdir()
+        (tmp_path / "tenant" / "original.pdf").write_bytes(build_pdf(["page one", "page two"]))
+        job = {**VALID_JOB_PAYLOAD, "payload": {"storagePath": "tenant/original.pdf", "mimeType": PDF_MIME_TYPE}}
+        pool = ParserPool(ParserPoolConfig(pool_size=0))
+        executor = PipelineExecutor([parse_stage(pool, DocumentStorageConfig(base_path=str(tmp_path)))])
+
+        async def scenario():
+            await executor.start()
+            context = await executor.submit(job)
+            await executor.close()
+            return context
+
+        context = asyncio.run(scenario())
+
+        assert [p.text for p in context.artifacts["pages"]] == ["page one", "page two"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
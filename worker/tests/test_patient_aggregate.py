@@ -0,0 +1,302 @@
+"""Unit tests for the incrementally maintained patient entity aggregate."""
+
+import asyncio
+import uuid
+from contextlib import contextmanager
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import patient_aggregate
+from patient_aggregate import PatientAggregate, PgPatientAggregateStore, aggregate_stage, entity_key
+from pipeline import JobContext
+
+
+PATIENT_ID = uuid.UUID("3f2504e0-4f89-41d3-9a0c-0305e82c3301")
+DOC_A = "7c9e6679-7425-40de-944b-e07fc1f90ae7"
+DOC_B = "0b0ad5a4-3c1e-4b8e-9b53-6c2f3f6f1d11"
+
+
+def _payload(document_id, *entities):
+    return {"schema_version": "1.0", "document_id": document_id, "extracted_entities": list(entities)}
+
+
+def _entity(group, name, value, page=1, conflicts=None):
+    entity = {
+        "entity_group_name": group,
+        "entity_name": name,
+        "entity_value": value,
+        "document_location": {"page": page},
+        "source_text": f"{name} {value}",
+    }
+    if conflicts:
+        entity["conflicts"] = conflicts
+    return entity
+
+
+def _entities(aggregate):
+    return {
+        entity_key(e["entity_group_name"], e["entity_name"]): e
+        for entities in aggregate.by_category().values() for e in entities
+    }
+
+
+class TestPatientAggregate:
+    def test_documents_merge_by_category_and_name_with_citations(self):
+        """
+        Given two documents that both mention Metformin, once with a different dose
+        When both are applied
+        Then one merged entity lists each distinct value with its citations
+        """
+        aggregate = PatientAggregate()
+        aggregate.apply(_payload(DOC_A, _entity("medications", "Metformin", "500 mg", page=2),
+                                 _entity("allergies", "Penicillin", "rash")))
+        aggregate.apply(_payload(DOC_B, _entity("medications", " metformin ", "500 MG", page=4,
+                                                conflicts=[{"conflicting_value": "850 mg"}])))
+
+        (metformin,) = aggregate.by_category()["medications"]
+        assert metformin["entity_name"] == "Metformin"
+        assert [v["value"] for v in metformin["values"]] == ["500 mg", "850 mg"]
+        assert [(c["document_id"], c["page"]) for c in metformin["values"][0]["citations"]] == [(DOC_B, 4), (DOC_A, 2)]
+        assert metformin["values"][1]["citations"][0]["document_id"] == DOC_B
+        assert list(aggregate.by_category()) == ["allergies", "medications"]
+
+    def test_reapply_replaces_and_remove_retracts(self):
+        aggregate = PatientAggregate()
+        aggregate.apply(_payload(DOC_A, _entity("medications", "Metformin", "500 mg"), _entity("labs", "HbA1c", "7.1%")))
+        aggregate.apply(_payload(DOC_B, _entity("medications", "Metformin", "500 mg")))
+
+        delta = aggregate.apply(_payload(DOC_A, _entity("medications", "Metformin", "500 mg")))
+
+        assert (delta.inserted, delta.retracted, delta.changed_values, delta.deleted_values) == (1, 2, 1, 1)
+        assert list(_entities(aggregate)) == [entity_key("medications", "Metformin")]
+        assert aggregate.values[(entity_key("medications", "metformin"), "500 mg")]["citations"] == 2
+
+        aggregate.remove_document(DOC_B)
+        aggregate.remove_document(DOC_A)
+        assert aggregate.values == {} and aggregate.document_citations == {}
+
+    def test_incremental_matches_full_rebuild(self):
+        documents = [f"00000000-0000-0000-0000-{i:012d}" for i in range(30)]
+        names = ["Metformin", "Lisinopril", "Atorvastatin", "Aspirin"]
+        latest = {}
+        aggregate = PatientAggregate()
+        for step in range(120):
+            document_id = documents[(step * 7) % len(documents)]
+            payload = _payload(document_id, *[
+                _entity("medications", names[(step + j) % len(names)], f"{(step % 3 + j) * 250} mg", page=j + 1)
+                for j in range(step % 4)
+            ])
+            aggregate.apply(payload)
+            latest[document_id] = payload
+
+        rebuilt = PatientAggregate.rebuild(latest.values())
+
+        assert {k: v["citations"] for k, v in aggregate.values.items()} == {
+            k: v["citations"] for k, v in rebuilt.values.items()
+        }
+        assert aggregate.by_category() == rebuilt.by_category()
+
+
+class FakeCursor:
+    """Executes the store's statements against in-memory tables."""
+
+    def __init__(self, db):
+        self._db = db
+        self._rows = []
+        self.rowcount = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=()):
+        db = self._db
+        db.log.append(sql)
+        if sql == patient_aggregate._LOCK_DOCUMENT_SQL:
+            document = db.documents.get(params[0])
+            self._rows = [tuple(document)] if document else []
+        elif sql == patient_aggregate._CITED_PATIENT_SQL:
+            self._rows = [(c[0],) for c in db.citations if c[3] == params[0]][:1]
+        elif sql == patient_aggregate._RETRACT_CITATIONS_SQL:
+            removed = [c for c in db.citations if c[0] == params[0] and c[3] == params[1]]
+            db.citations = [c for c in db.citations if c not in removed]
+            self._rows = [(c[1], c[2]) for c in removed]
+        elif sql == patient_aggregate._INSERT_CITATION_SQL:
+            db.citations.append(tuple(params))
+        elif sql == patient_aggregate._CHANGE_VALUE_SQL:
+            patient, key, value_key, category, name, value, change = params
+            row = db.values.setdefault((patient, key, value_key), [category, name, value, 0])
+            row[3] += change
+        elif sql == patient_aggregate._DELETE_EMPTY_VALUES_SQL:
+            empty = [k for k, v in db.values.items() if k[0] == params[0] and v[3] <= 0]
+            for k in empty:
+                del db.values[k]
+            self.rowcount = len(empty)
+        elif sql == patient_aggregate._LOAD_VALUES_SQL:
+            self._rows = [(k[1], k[2], *v) for k, v in db.values.items() if k[0] == params[0]]
+        elif sql == patient_aggregate._LOAD_CITATIONS_SQL:
+            self._rows = [c[1:] for c in db.citations if c[0] == params[0]]
+        elif sql == patient_aggregate._REBUILD_SOURCE_SQL:
+            self._rows = db.source_rows
+        elif sql == patient_aggregate._CLEAR_PATIENT_SQL[0]:
+            db.citations = [c for c in db.citations if c[0] != params[0]]
+        elif sql == patient_aggregate._CLEAR_PATIENT_SQL[1]:
+            db.values = {k: v for k, v in db.values.items() if k[0] != params[0]}
+
+    def executemany(self, sql, rows):
+        for params in rows:
+            self.execute(sql, params)
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return list(self._rows)
+
+
+class FakeDatabase:
+    def __init__(self):
+        # Id -> [PatientId, IsDeleted]
+        self.documents = {uuid.UUID(DOC_A): [PATIENT_ID, False], uuid.UUID(DOC_B): [PATIENT_ID, False]}
+        self.values = {}
+        self.citations = []
+        self.source_rows = []
+        self.log = []
+        self.transactions = 0
+
+    @contextmanager
+    def connect(self):
+        yield self
+
+    @contextmanager
+    def transaction(self):
+        yield
+        self.transactions += 1
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+class TestPgPatientAggregateStore:
+    def test_apply_writes_only_the_documents_rows(self):
+        """
+        Given a patient whose aggregate already cites Metformin
+        When another document citing Metformin is applied
+        Then only its citation is inserted and the value count is adjusted
+        """
+        db = FakeDatabase()
+        store = PgPatientAggregateStore(db.connect)
+        store.apply(_payload(DOC_A, _entity("medications", "Metformin", "500 mg"), _entity("labs", "HbA1c", "7.1%")))
+        writes = len(db.log)
+
+        store.apply(_payload(DOC_B, _entity("medications", "Metformin", "500 MG", page=3)))
+
+        assert db.log[writes:] == [
+            patient_aggregate._LOCK_DOCUMENT_SQL,
+            patient_aggregate._LOCK_PATIENT_SQL,
+            patient_aggregate._RETRACT_CITATIONS_SQL,
+            patient_aggregate._INSERT_CITATION_SQL,
+            patient_aggregate._CHANGE_VALUE_SQL,
+        ]
+        assert db.values[(PATIENT_ID, entity_key("medications", "Metformin"), "500 mg")] == [
+            "medications", "Metformin", "500 mg", 2
+        ]
+        loaded = store.load(str(PATIENT_ID))
+        assert [c["page"] for c in loaded["medications"][0]["values"][0]["citations"]] == [3, 1]
+        stats = store.stats()
+        assert (stats.documents, stats.citations_inserted, stats.citations_retracted, db.transactions) == (2, 3, 0, 2)
+
+    def test_reapply_and_remove_match_in_memory_aggregate(self):
+        db = FakeDatabase()
+        store = PgPatientAggregateStore(db.connect)
+        reference = PatientAggregate()
+        payloads = [
+            _payload(DOC_A, _entity("medications", "Metformin", "500 mg"), _entity("labs", "HbA1c", "7.1%")),
+            _payload(DOC_B, _entity("medications", "Metformin", "850 mg")),
+            _payload(DOC_A, _entity("medications", "Metformin", "850 mg", page=5)),
+        ]
+        for payload in payloads:
+            store.apply(payload)
+            reference.apply(payload)
+
+        assert store.load(str(PATIENT_ID)) == reference.by_category()
+        delta = store.remove_document(DOC_B)
+        reference.remove_document(DOC_B)
+        assert store.load(str(PATIENT_ID)) == reference.by_category()
+        assert (delta.retracted, delta.deleted_values) == (1, 0)
+
+    def test_remove_document_after_it_was_deleted(self):
+        """
+        Given a patient aggregate citing two documents
+        When one document's row is deleted and then removed from the aggregate
+        Then its citations are retracted and the value counts follow
+        """
+        db = FakeDatabase()
+        store = PgPatientAggregateStore(db.connect)
+        store.apply(_payload(DOC_A, _entity("medications", "Metformin", "500 mg")))
+        store.apply(_payload(DOC_B, _entity("medications", "Metformin", "500 mg"), _entity("labs", "HbA1c", "7.1%")))
+        del db.documents[uuid.UUID(DOC_B)]
+
+        delta = store.remove_document(DOC_B)
+
+        assert (delta.retracted, delta.deleted_values) == (2, 1)
+        assert list(db.values.values()) == [["medications", "Metformin", "500 mg", 1]]
+        assert store.load(str(PATIENT_ID)) == PatientAggregate.rebuild(
+            [_payload(DOC_A, _entity("medications", "Metformin", "500 mg"))]
+        ).by_category()
+        assert store.remove_document(DOC_B).retracted == 0
+
+    def test_soft_deleted_document_is_retracted_as_in_rebuild(self):
+        db = FakeDatabase()
+        store = PgPatientAggregateStore(db.connect)
+        store.apply(_payload(DOC_A, _entity("medications", "Metformin", "500 mg")))
+        store.apply(_payload(DOC_B, _entity("medications", "Metformin", "850 mg")))
+        db.documents[uuid.UUID(DOC_B)][1] = True
+
+        delta = store.apply(_payload(DOC_B, _entity("medications", "Metformin", "850 mg")))
+        incremental = store.load(str(PATIENT_ID))
+        # The rebuild query leaves out deleted documents.
+        db.source_rows = [(uuid.UUID(DOC_A), "medications", "Metformin", "500 mg", 1, None, "Metformin 500 mg")]
+        store.rebuild(str(PATIENT_ID))
+
+        assert (delta.inserted, delta.retracted) == (0, 1)
+        assert incremental == store.load(str(PATIENT_ID))
+
+    def test_unknown_document_raises(self):
+        store = PgPatientAggregateStore(FakeDatabase().connect)
+
+        with pytest.raises(LookupError):
+            store.apply(_payload(str(uuid.uuid4()), _entity("labs", "HbA1c", "7.1%")))
+
+    def test_rebuild_matches_incremental_state(self):
+        db = FakeDatabase()
+        store = PgPatientAggregateStore(db.connect)
+        store.apply(_payload(DOC_A, _entity("medications", "Metformin", "500 mg", page=2)))
+        store.apply(_payload(DOC_B, _entity("medications", "Metformin", "500 mg", page=4)))
+        incremental = store.load(str(PATIENT_ID))
+        db.source_rows = [
+            (uuid.UUID(DOC_A), "medications", "Metformin", "500 mg", 2, None, "Metformin 500 mg"),
+            (uuid.UUID(DOC_B), "medications", "Metformin", "500 mg", 4, None, "Metformin 500 mg"),
+        ]
+        db.values[(PATIENT_ID, "labs/stale", "1")] = ["labs", "stale", "1", 1]
+
+        assert store.rebuild(str(PATIENT_ID)) == 1
+        assert store.load(str(PATIENT_ID)) == incremental
+        assert store.stats().rebuilds == 1
+
+    def test_stage_applies_entities(self):
+        db = FakeDatabase()
+        context = JobContext(job={"job_id": "j", "document_id": DOC_A})
+        context.artifacts["entities"] = _payload(DOC_A, _entity("vitals", "Blood pressure", "120/80"))
+
+        asyncio.run(aggregate_stage(PgPatientAggregateStore(db.connect)).run(context))
+
+        assert list(db.values) == [(PATIENT_ID, entity_key("vitals", "Blood pressure"), "120/80")]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
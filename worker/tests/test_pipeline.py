@@ -0,0 +1,191 @@
+"""Unit tests for the asyncio document-processing pipeline."""
+
+import asyncio
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from metrics import LatencyHistogram
+from pipeline import DEFAULT_STAGE_NAMES, PipelineExecutor, Stage, StageError
+from tests.fixtures.job_payloads import VALID_JOB_PAYLOAD, JOB_PAYLOAD_MISSING_JOB_ID
+
+
+def _job(index):
+    return {**VALID_JOB_PAYLOAD, "document_id": f"doc-{index}"}
+
+
+def _recording_stage(name, log, delay=0.0):
+    async def run(context):
+        await asyncio.sleep(delay)
+        log.append((name, context.document_id))
+        context.artifacts[name] = True
+
+    return Stage(name, run)
+
+
+class TestLatencyHistogram:
+    def test_snapshot_is_cumulative(self):
+        histogram = LatencyHistogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            histogram.observe(value)
+
+        snapshot = histogram.snapshot()
+
+        assert snapshot.buckets == ((0.1, 1), (1.0, 3), (float("inf"), 4))
+        assert snapshot.count == 4
+        assert snapshot.sum == pytest.approx(6.05)
+
+
+class TestPipelineExecutor:
+    """Test cases for the stage pipeline."""
+
+    def test_job_runs_through_stages_in_order(self):
+        """
+        Given a pipeline with the default stage names
+        When a valid job is submitted
+        Then every stage runs once in order and the context carries their artifacts
+        """
+        log = []
+        executor = PipelineExecutor([_recording_stage(name, log) for name in DEFAULT_STAGE_NAMES])
+
+        async def scenario():
+            await executor.start()
+            context = await executor.submit(_job(1))
+            await executor.close()
+            return context
+
+        context = asyncio.run(scenario())
+
+        assert [name for name, _ in log] == list(DEFAULT_STAGE_NAMES)
+        assert set(context.artifacts) == set(DEFAULT_STAGE_NAMES)
+        assert set(context.stage_seconds) == set(DEFAULT_STAGE_NAMES)
+        assert all(stats.completed == 1 for stats in executor.stats())
+
+    def test_invalid_job_is_rejected_before_enqueue(self):
+        log = []
+        executor = PipelineExecutor([_recording_stage("load", log)])
+
+        async def scenario():
+            await executor.start()
+            try:
+                with pytest.raises(ValueError, match="Invalid job payload"):
+                    await executor.submit(JOB_PAYLOAD_MISSING_JOB_ID)
+            finally:
+                await executor.close()
+
+        asyncio.run(scenario())
+
+        assert log == []
+
+    def test_stage_failure_fails_only_that_job(self):
+        """
+        Given a chunk stage that fails for one document
+        When several jobs are submitted
+        Then that job raises StageError naming the stage and the others complete
+        """
+        log = []
+
+        async def chunk(context):
+            if context.document_id == "doc-1":
+                raise RuntimeError("no text layer")
+
+        executor = PipelineExecutor([_recording_stage("load", log), Stage("chunk", chunk), _recording_stage("embed", log)])
+
+        async def scenario():
+            await executor.start()
+            results = await asyncio.gather(*(executor.submit(_job(i)) for i in range(3)), return_exceptions=True)
+            await executor.close()
+            return results
+
+        results = asyncio.run(scenario())
+
+        assert isinstance(results[1], StageError)
+        assert results[1].stage == "chunk"
+        assert "no text layer" in str(results[1])
+        assert {("embed", "doc-0"), ("embed", "doc-2")} <= set(log)
+        stats = {s.name: s for s in executor.stats()}
+        assert stats["chunk"].failed == 1
+        assert stats["embed"].completed == 2
+
+    def test_stages_overlap_across_jobs(self):
+        """
+        Given two 20 ms stages
+        When eight jobs are submitted together
+        Then total time is close to the pipelined bound, not the sequential sum
+        """
+        log = []
+        stages = [
+            Stage("embed", _recording_stage("embed", log, 0.02).run, concurrency=4),
+            Stage("extract", _recording_stage("extract", log, 0.02).run, concurrency=4),
+        ]
+        executor = PipelineExecutor(stages)
+
+        async def scenario():
+            await executor.start()
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            await asyncio.gather(*(executor.submit(_job(i)) for i in range(8)))
+            elapsed = loop.time() - started
+            await executor.close()
+            return elapsed
+
+        elapsed = asyncio.run(scenario())
+
+        assert elapsed < 8 * 2 * 0.02 / 2
+
+    def test_bounded_queue_exposes_depth(self):
+        """
+        Given a blocked single-worker stage with a queue of two
+        When five jobs are submitted
+        Then the stage queue depth is capped at two
+        """
+        release = None
+
+        async def load(context):
+            await release.wait()
+
+        executor = PipelineExecutor([Stage("load", load)], queue_size=2)
+
+        async def scenario():
+            nonlocal release
+            release = asyncio.Event()
+            await executor.start()
+            submissions = [asyncio.create_task(executor.submit(_job(i))) for i in range(5)]
+            await asyncio.sleep(0.01)
+            depth = executor.stats()[0].queue_depth
+            in_progress = executor.stats()[0].in_progress
+            release.set()
+            await asyncio.gather(*submissions)
+            await executor.close()
+            return depth, in_progress
+
+        depth, in_progress = asyncio.run(scenario())
+
+        assert depth == 2
+        assert in_progress == 1
+        assert executor.stats()[0].latency.count == 5
+
+    def test_threadsafe_bridge_for_consumer_handlers(self):
+        log = []
+        executor = PipelineExecutor([_recording_stage("load", log), _recording_stage("chunk", log)])
+        executor.start_in_thread()
+        try:
+            context = executor.submit_threadsafe(_job(7)).result(timeout=2)
+            with pytest.raises(ValueError):
+                executor.submit_threadsafe(JOB_PAYLOAD_MISSING_JOB_ID)
+        finally:
+            executor.close_thread()
+
+        assert context.document_id == "doc-7"
+        assert log == [("load", "doc-7"), ("chunk", "doc-7")]
+
+    def test_duplicate_stage_names_are_rejected(self):
+        log = []
+
+        with pytest.raises(ValueError, match="Duplicate stage names"):
+            PipelineExecutor([_recording_stage("load", log), _recording_stage("load", log)])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,86 @@
+"""Unit tests for float16/int8 embedding quantization."""
+
+import sys
+import os
+import numpy as np
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from quantization import (
+    FLOAT16,
+    FLOAT32,
+    INT8,
+    bytes_per_vector,
+    check_precision,
+    decode_vector,
+    dequantize_rows,
+    encode_vector,
+    quantize_rows,
+    score_rows,
+)
+
+
+def _unit_rows(count, dimensions=64, seed=1):
+    rows = np.random.default_rng(seed).standard_normal((count, dimensions)).astype(np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+class TestQuantizeRows:
+    @pytest.mark.parametrize("precision, dtype, max_error", [(FLOAT16, np.float16, 1e-3), (INT8, np.int8, 5e-3)])
+    def test_round_trip_error_is_bounded(self, precision, dtype, max_error):
+        rows = _unit_rows(50)
+
+        data, scales = quantize_rows(rows, precision)
+
+        assert data.dtype == dtype
+        assert (scales is not None) == (precision == INT8)
+        assert np.abs(dequantize_rows(data, scales) - rows).max() < max_error
+
+    def test_int8_uses_full_range_per_row_and_keeps_zero_rows(self):
+        rows = np.array([[0.5, -0.25], [0.0, 0.0]], dtype=np.float32)
+
+        data, scales = quantize_rows(rows, INT8)
+
+        assert data[0].tolist() == [127, -64]
+        assert data[1].tolist() == [0, 0]
+        assert np.all(np.isfinite(scales))
+
+    @pytest.mark.parametrize("precision", [FLOAT32, FLOAT16, INT8])
+    def test_blocked_scores_match_dequantized_product(self, precision):
+        rows = _unit_rows(100)
+        queries = _unit_rows(3, seed=2)
+        data, scales = quantize_rows(rows, precision)
+
+        scores = score_rows(queries, data, scales, block_rows=7)
+
+        assert scores.shape == (3, 100)
+        assert np.allclose(scores, queries @ dequantize_rows(data, scales).T, atol=1e-5)
+
+
+class TestVectorEncoding:
+    @pytest.mark.parametrize("precision, tolerance", [(FLOAT16, 2e-3), (INT8, 2e-2)])
+    def test_encode_decode_round_trip(self, precision, tolerance):
+        vector = [0.1 * i - 1.0 for i in range(20)]
+
+        encoded = encode_vector(vector, precision)
+        decoded = decode_vector(encoded, precision)
+
+        assert isinstance(encoded, bytes) and len(encoded) == bytes_per_vector(20, precision)
+        assert decoded.typecode == "f" and len(decoded) == 20
+        assert max(abs(a - b) for a, b in zip(decoded, vector)) < tolerance
+
+    def test_float32_keeps_the_array(self):
+        vector = encode_vector([1.0, 2.0], FLOAT32)
+
+        assert decode_vector(vector, FLOAT32) is vector
+
+    def test_sizes_per_768_dimensions(self):
+        assert [bytes_per_vector(768, p) for p in (FLOAT32, FLOAT16, INT8)] == [3072, 1536, 772]
+
+    def test_unknown_precision_is_rejected(self):
+        with pytest.raises(ValueError):
+            check_precision("int4")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,182 @@
+"""Unit tests for the shared Gemini token-bucket rate limiter."""
+
+import asyncio
+import multiprocessing
+import stat
+import time
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import RateLimitConfig
+from rate_limiter import (
+    BucketSpec,
+    FileBucketStore,
+    InMemoryBucketStore,
+    ModelQuota,
+    RateLimiter,
+    build_rate_limiter,
+)
+
+
+class FakeClock:
+    """Clock whose sleeps advance time instantly."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _limiter(clock, store=None, **quota):
+    return RateLimiter(
+        {"gemini-2.5-flash": ModelQuota(**quota)},
+        store=store or InMemoryBucketStore(),
+        clock=clock,
+        sleep=clock.sleep,
+        max_sleep_seconds=60.0,
+    )
+
+
+def _take_permits(path, count, results):
+    store = FileBucketStore(path)
+    spec = BucketSpec(capacity=10, refill_per_second=1e-6)
+    granted = sum(1 for _ in range(count) if store.try_acquire([("flash:requests", spec, 1.0)], time.time()) == 0.0)
+    results.put(granted)
+
+
+class TestBucketStores:
+    def test_acquire_is_all_or_nothing(self):
+        store = InMemoryBucketStore()
+        requests = BucketSpec(capacity=5, refill_per_second=1.0)
+        tokens = BucketSpec(capacity=100, refill_per_second=10.0)
+
+        assert store.try_acquire([("r", requests, 1), ("t", tokens, 80)], now=0.0) == 0.0
+        wait = store.try_acquire([("r", requests, 1), ("t", tokens, 80)], now=0.0)
+
+        assert wait == pytest.approx(6.0)
+        # The request bucket was not charged by the refused call.
+        assert store.try_acquire([("r", requests, 4)], now=0.0) == 0.0
+
+    def test_file_store_persists_between_instances(self, tmp_path):
+        path = str(tmp_path / "quota.json")
+        spec = BucketSpec(capacity=2, refill_per_second=1.0)
+
+        assert FileBucketStore(path).try_acquire([("k", spec, 2)], now=0.0) == 0.0
+
+        assert FileBucketStore(path).try_acquire([("k", spec, 1)], now=0.0) == pytest.approx(1.0)
+
+    def test_file_store_is_private_and_refuses_symlinks(self, tmp_path):
+        path = str(tmp_path / "state" / "quota.json")
+        FileBucketStore(path).try_acquire([("k", BucketSpec(capacity=2, refill_per_second=1.0), 1)], now=0.0)
+
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+        assert stat.S_IMODE(os.stat(os.path.dirname(path)).st_mode) == 0o700
+
+        target = tmp_path / "target"
+        target.write_text("keep")
+        link = str(tmp_path / "state" / "link.json")
+        os.symlink(target, link)
+        with pytest.raises(OSError):
+            FileBucketStore(link)
+        assert target.read_text() == "keep"
+
+    def test_file_store_is_shared_across_processes(self, tmp_path):
+        """
+        Given four processes competing for a bucket of ten permits
+        When each tries to take ten permits
+        Then exactly ten are granted in total
+        """
+        path = str(tmp_path / "quota.json")
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        processes = [context.Process(target=_take_permits, args=(path, 10, results)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        granted = sum(results.get(timeout=60) for _ in processes)
+        for process in processes:
+            process.join(timeout=60)
+
+        assert granted == 10
+
+
+class TestRateLimiter:
+    """Test cases for awaiting permits and exported statistics."""
+
+    def test_requests_beyond_rpm_wait_instead_of_failing(self):
+        """
+        Given a quota of 15 requests per minute
+        When 16 requests are made at once
+        Then the first 15 go through immediately and the 16th waits four seconds
+        """
+        clock = FakeClock()
+        limiter = _limiter(clock, requests_per_minute=15)
+
+        async def scenario():
+            return [await limiter.acquire("gemini-2.5-flash") for _ in range(16)]
+
+        waits = asyncio.run(scenario())
+
+        assert waits[:15] == [0.0] * 15
+        assert waits[15] == pytest.approx(4.0)
+        stats = limiter.stats()[0]
+        assert (stats.acquired, stats.throttled) == (16, 1)
+        assert stats.wait_seconds == pytest.approx(4.0)
+        assert stats.wait.count == 16
+
+    def test_token_budget_throttles_large_requests(self):
+        clock = FakeClock()
+        limiter = _limiter(clock, requests_per_minute=1000, tokens_per_day=86400)
+
+        async def scenario():
+            await limiter.acquire("gemini-2.5-flash", tokens=86400)
+            return await limiter.acquire("gemini-2.5-flash", tokens=30)
+
+        assert asyncio.run(scenario()) == pytest.approx(30.0)
+        assert limiter.stats()[0].tokens == 86430
+
+    def test_request_larger_than_budget_raises(self):
+        limiter = _limiter(FakeClock(), tokens_per_day=100)
+
+        with pytest.raises(ValueError):
+            asyncio.run(limiter.acquire("gemini-2.5-flash", tokens=101))
+
+    def test_unknown_model_raises(self):
+        with pytest.raises(KeyError):
+            asyncio.run(_limiter(FakeClock()).acquire("gemini-1.0-pro"))
+
+    def test_limit_wraps_calls_with_token_count(self):
+        clock = FakeClock()
+        limiter = _limiter(clock, requests_per_minute=60, tokens_per_day=100000)
+        calls = []
+
+        async def embed(texts):
+            calls.append(texts)
+            return [[0.0] for _ in texts]
+
+        limited = limiter.limit("gemini-2.5-flash", embed, lambda texts: sum(len(t) for t in texts))
+
+        asyncio.run(limited(["abc", "de"]))
+
+        assert calls == [["abc", "de"]]
+        assert limiter.stats()[0].tokens == 5
+
+    def test_build_rate_limiter_uses_configured_models(self, tmp_path):
+        config = RateLimitConfig(state_path=str(tmp_path / "quota.json"))
+        limiter = build_rate_limiter(config)
+
+        asyncio.run(limiter.acquire("text-embedding-004", tokens=10))
+
+        assert [s.model for s in limiter.stats()] == ["gemini-2.5-flash", "text-embedding-004"]
+        assert os.path.exists(config.state_path)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
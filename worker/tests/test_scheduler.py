@@ -0,0 +1,142 @@
+"""Unit tests for priority classes and fair scheduling of prefetched jobs."""
+
+import json
+import threading
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from broker import InMemoryBroker
+from config import RabbitMqConfig, SchedulerConfig
+from consumer import JobConsumer
+from scheduler import BULK, INTERACTIVE, FairScheduler, classify_job, job_tenant
+from tests.fixtures.job_payloads import VALID_JOB_PAYLOAD
+
+
+def _job(document_id, priority=None, user="user-a"):
+    payload = {"uploadedByUserId": user}
+    if priority is not None:
+        payload["priority"] = priority
+    return {**VALID_JOB_PAYLOAD, "document_id": document_id, "payload": payload}
+
+
+def _drain(scheduler):
+    order = []
+    while True:
+        scheduled = scheduler.pop()
+        if scheduled is None:
+            return order
+        order.append(scheduled.job["document_id"])
+        scheduler.finish(scheduled)
+
+
+class TestClassification:
+    def test_priority_and_tenant_come_from_payload(self):
+        assert classify_job(_job("d", priority="Bulk")) == BULK
+        assert classify_job(_job("d", priority="urgent")) == INTERACTIVE
+        assert classify_job(VALID_JOB_PAYLOAD, default=BULK) == BULK
+        assert job_tenant(_job("d", user="u-1")) == "u-1"
+        assert job_tenant({**VALID_JOB_PAYLOAD, "payload": {"patientId": "p-1"}}) == "p-1"
+        assert job_tenant(VALID_JOB_PAYLOAD) == "anonymous"
+
+
+class TestFairScheduler:
+    """Test cases for class priority, concurrency caps and uploader fairness."""
+
+    def test_interactive_jumps_ahead_of_queued_bulk(self):
+        scheduler = FairScheduler()
+        for i in range(3):
+            scheduler.push(_job(f"bulk-{i}", priority=BULK))
+        scheduler.push(_job("upload", priority=INTERACTIVE))
+
+        assert _drain(scheduler) == ["upload", "bulk-0", "bulk-1", "bulk-2"]
+
+    def test_bulk_concurrency_cap_keeps_a_slot_free(self):
+        """
+        Given a bulk cap of two and a backlog of bulk jobs
+        When jobs are started without finishing any
+        Then only two bulk jobs start, and an interactive job can still start
+        """
+        scheduler = FairScheduler(SchedulerConfig(bulk_max_in_flight=2))
+        for i in range(5):
+            scheduler.push(_job(f"bulk-{i}", priority=BULK))
+
+        started = [scheduler.pop(), scheduler.pop()]
+        assert scheduler.pop() is None
+
+        scheduler.push(_job("upload"))
+        assert scheduler.pop().job["document_id"] == "upload"
+
+        scheduler.finish(started[0])
+        assert scheduler.pop().job["document_id"] == "bulk-2"
+        stats = {s.name: s for s in scheduler.stats()}
+        assert (stats[BULK].running, stats[BULK].queued, stats[BULK].started) == (2, 2, 3)
+
+    def test_uploaders_are_interleaved(self):
+        scheduler = FairScheduler()
+        for i in range(4):
+            scheduler.push(_job(f"a-{i}", priority=BULK, user="backfill"))
+        scheduler.push(_job("b-0", priority=BULK, user="clinician"))
+        scheduler.push(_job("b-1", priority=BULK, user="clinician"))
+
+        assert _drain(scheduler) == ["a-0", "b-0", "a-1", "b-1", "a-2", "a-3"]
+
+    def test_weights_share_slots_proportionally(self):
+        scheduler = FairScheduler(weights={"heavy": 3.0})
+        for i in range(6):
+            scheduler.push(_job(f"h-{i}", user="heavy"))
+            scheduler.push(_job(f"l-{i}", user="light"))
+
+        first_eight = _drain(scheduler)[:8]
+
+        assert sum(1 for d in first_eight if d.startswith("h-")) == 6
+
+    def test_idle_uploader_gets_no_backlog_credit(self):
+        scheduler = FairScheduler()
+        for i in range(4):
+            scheduler.push(_job(f"a-{i}", user="a"))
+        _drain(scheduler)
+        for i in range(2):
+            scheduler.push(_job(f"a-late-{i}", user="a"))
+        scheduler.push(_job("b-0", user="b"))
+        scheduler.push(_job("b-1", user="b"))
+
+        assert _drain(scheduler) == ["b-0", "a-late-0", "b-1", "a-late-1"]
+
+
+class TestConsumerScheduling:
+    def test_consumer_starts_interactive_before_prefetched_bulk(self):
+        """
+        Given bulk jobs ahead of one interactive job in the queue
+        When the consumer runs one job at a time with a scheduler
+        Then the interactive job is handled before the remaining bulk jobs
+        """
+        broker = InMemoryBroker()
+        broker.declare_queue("document-processing", dead_letter_queue="document-processing-dlq")
+        for i in range(5):
+            broker.publish("document-processing", json.dumps(_job(f"bulk-{i}", priority=BULK)).encode())
+        broker.publish("document-processing", json.dumps(_job("upload")).encode())
+
+        release = threading.Event()
+        handled = []
+
+        def handler(job):
+            release.wait(5)
+            handled.append(job["document_id"])
+
+        config = RabbitMqConfig(prefetch_count=10, max_in_flight=1, ack_batch_size=5, ack_interval_seconds=0.05)
+        scheduler = FairScheduler(SchedulerConfig(interactive_max_in_flight=1, bulk_max_in_flight=1))
+        consumer = JobConsumer(broker.channel(), handler, config, 0.01, scheduler=scheduler)
+        threading.Timer(0.2, release.set).start()
+
+        stats = consumer.run(exit_when_idle=True)
+
+        assert handled[:2] == ["bulk-0", "upload"]
+        assert stats.processed == 6
+        assert stats.queued == 0
+        assert broker.queue_depth("document-processing") == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,195 @@
+"""Unit tests for the cached schema/validator registry."""
+
+import pytest
+import sys
+import os
+from unittest.mock import patch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import main
+from main import validate_job_payload, validate_entity_payload, get_schema_registry, reload_schemas
+from schema_registry import SchemaRegistry
+from tests.fixtures.job_payloads import VALID_JOB_PAYLOAD, JOB_PAYLOAD_INVALID_STATUS
+from tests.fixtures.entity_payloads import VALID_ENTITY_PAYLOAD
+from tests.fixtures.schemas import MOCK_JOB_SCHEMA, MOCK_ENTITY_SCHEMA
+
+
+def _counting_loader(schema):
+    calls = []
+
+    def loader(schema_version):
+        calls.append(schema_version)
+        return schema
+
+    return loader, calls
+
+
+class TestSchemaRegistry:
+    """Test cases for SchemaRegistry caching, reload and counters."""
+
+    def test_validator_is_loaded_once_and_then_served_from_cache(self):
+        """Given: Empty registry
+        When: get_validator called repeatedly for the same key
+        Then: Loader runs once and subsequent calls count as hits
+        """
+        loader, calls = _counting_loader(MOCK_JOB_SCHEMA)
+        registry = SchemaRegistry({"job": loader})
+
+        first = registry.get_validator("job", "1.0")
+        second = registry.get_validator("job", "1.0")
+        third = registry.get_validator("job", "1.0")
+
+        assert first is second is third
+        assert calls == ["1.0"]
+        stats = registry.stats()
+        assert stats.loads == 1
+        assert stats.hits == 2
+        assert stats.cached == 1
+
+    def test_validators_are_keyed_by_kind_and_version(self):
+        """Given: Registry with job and entity loaders
+        When: Validators requested for each kind
+        Then: Each kind gets its own validator
+        """
+        job_loader, _ = _counting_loader(MOCK_JOB_SCHEMA)
+        entity_loader, _ = _counting_loader(MOCK_ENTITY_SCHEMA)
+        registry = SchemaRegistry({"job": job_loader, "entity": entity_loader})
+
+        assert registry.get_schema("job", "1.0")["title"] == "Job"
+        assert registry.get_schema("entity", "1.0")["title"] == "EntityExtractionResult"
+        assert registry.stats().cached == 2
+
+    def test_unknown_kind_raises(self):
+        """Given: Registry without a loader for the kind
+        When: get_validator called
+        Then: Raises ValueError naming the kind
+        """
+        registry = SchemaRegistry({})
+
+        with pytest.raises(ValueError, match="Unknown contract kind: job"):
+            registry.get_validator("job", "1.0")
+
+    def test_loader_errors_are_not_cached(self):
+        """Given: Loader rejecting the requested version
+        When: get_validator called twice
+        Then: Error propagates each time and nothing is cached
+        """
+        def loader(schema_version):
+            raise ValueError(f"Unknown entity schema version: {schema_version}")
+
+        registry = SchemaRegistry({"entity": loader})
+
+        for _ in range(2):
+            with pytest.raises(ValueError, match="Unknown entity schema version: 2.0"):
+                registry.get_validator("entity", "2.0")
+        assert registry.stats().cached == 0
+        assert registry.stats().loads == 0
+
+    def test_reload_replaces_cached_validators(self):
+        """Given: Cached validator
+        When: reload() called
+        Then: Loader runs again and a new validator is served
+        """
+        loader, calls = _counting_loader(MOCK_JOB_SCHEMA)
+        registry = SchemaRegistry({"job": loader})
+        before = registry.get_validator("job", "1.0")
+
+        registry.reload()
+
+        after = registry.get_validator("job", "1.0")
+        assert after is not before
+        assert calls == ["1.0", "1.0"]
+        stats = registry.stats()
+        assert stats.reloads == 1
+        assert stats.loads == 2
+
+    def test_failed_reload_keeps_previous_validators(self):
+        """Given: Cached validator and a loader that starts failing
+        When: reload() called
+        Then: Error propagates and the previous validator stays cached
+        """
+        state = {"fail": False}
+
+        def loader(schema_version):
+            if state["fail"]:
+                raise ValueError("Invalid JSON in job schema file: boom")
+            return MOCK_JOB_SCHEMA
+
+        registry = SchemaRegistry({"job": loader})
+        before = registry.get_validator("job", "1.0")
+        state["fail"] = True
+
+        with pytest.raises(ValueError, match="Invalid JSON in job schema file"):
+            registry.reload()
+
+        assert registry.get_validator("job", "1.0") is before
+        assert registry.stats().reloads == 0
+
+    def test_warm_preloads_requested_keys(self):
+        """Given: Empty registry
+        When: warm() called with keys
+        Then: Validators are loaded before first use
+        """
+        loader, calls = _counting_loader(MOCK_ENTITY_SCHEMA)
+        registry = SchemaRegistry({"entity": loader})
+
+        registry.warm([("entity", "1.0")])
+
+        assert calls == ["1.0"]
+        assert registry.stats().cached == 1
+
+
+class TestMainUsesRegistry:
+    """Test cases for validate_* functions sharing the process-wide registry."""
+
+    def test_repeated_job_validation_does_not_reload_schema(self):
+        """Given: Job validator already cached
+        When: validate_job_payload called again
+        Then: Schema file is not re-read
+        """
+        validate_job_payload(VALID_JOB_PAYLOAD)
+
+        with patch.object(main, "_load_job_schema", side_effect=AssertionError("schema reloaded")):
+            validate_job_payload(VALID_JOB_PAYLOAD)
+            with pytest.raises(ValueError, match="Invalid job payload"):
+                validate_job_payload(JOB_PAYLOAD_INVALID_STATUS)
+
+    def test_repeated_entity_validation_counts_hits(self):
+        """Given: Process-wide registry
+        When: validate_entity_payload called twice
+        Then: Hit counter increases without additional loads
+        """
+        registry = get_schema_registry()
+        validate_entity_payload(VALID_ENTITY_PAYLOAD)
+        before = registry.stats()
+
+        validate_entity_payload(VALID_ENTITY_PAYLOAD)
+
+        after = registry.stats()
+        assert after.hits == before.hits + 1
+        assert after.loads == before.loads
+
+    def test_reload_schemas_refreshes_process_registry(self):
+        """Given: Cached job validator
+        When: reload_schemas() called
+        Then: Reload counter increases and validation still works
+        """
+        validate_job_payload(VALID_JOB_PAYLOAD)
+        before = get_schema_registry().stats()
+
+        stats = reload_schemas()
+
+        assert stats.reloads == before.reloads + 1
+        validate_job_payload(VALID_JOB_PAYLOAD)
+
+    def test_non_string_entity_schema_version_fails(self):
+        """Given: Worker initialized
+        When: validate_entity_payload with a non-string schema_version
+        Then: Raises ValueError about unknown version
+        """
+        with pytest.raises(ValueError, match="Unknown entity schema version"):
+            validate_entity_payload({"schema_version": ["1.0"], "document_id": "doc-123", "extracted_entities": []})
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,117 @@
+"""Unit tests for the streaming NDJSON validation CLI."""
+
+import io
+import json
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from validate_ndjson import main, run, validate_line, validate_stream
+from tests.fixtures.job_payloads import VALID_JOB_PAYLOAD, JOB_PAYLOAD_INVALID_STATUS
+from tests.fixtures.entity_payloads import VALID_ENTITY_PAYLOAD, ENTITY_PAYLOAD_UNKNOWN_SCHEMA_VERSION
+
+
+def _ndjson(*records):
+    lines = [r if isinstance(r, str) else json.dumps(r) for r in records]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class TestValidateLine:
+    """Test cases for per-line validation."""
+
+    def test_detects_job_and_entity_contracts(self):
+        assert validate_line(json.dumps(VALID_JOB_PAYLOAD).encode()) == ("job", None)
+        assert validate_line(json.dumps(VALID_ENTITY_PAYLOAD).encode()) == ("entity", None)
+
+    def test_reports_validation_reason(self):
+        contract, error = validate_line(json.dumps(JOB_PAYLOAD_INVALID_STATUS).encode())
+
+        assert contract == "job"
+        assert "Invalid job payload" in error
+
+    def test_reports_malformed_json(self):
+        contract, error = validate_line(b"{not json")
+
+        assert contract is None
+        assert error.startswith("Invalid JSON")
+
+    def test_explicit_contract_overrides_detection(self):
+        contract, error = validate_line(json.dumps(VALID_JOB_PAYLOAD).encode(), contract="entity")
+
+        assert contract == "entity"
+        assert "Invalid entity payload" in error
+
+    def test_undetectable_record_is_invalid(self):
+        assert validate_line(b'{"foo": 1}')[1].startswith("Unable to detect contract")
+        assert validate_line(b"[1, 2]")[1] == "Record is not a JSON object"
+
+
+class TestStreamingValidation:
+    """Test cases for streaming validation over NDJSON input."""
+
+    def test_results_preserve_line_numbers_and_skip_blank_lines(self):
+        data = _ndjson(VALID_JOB_PAYLOAD, "", JOB_PAYLOAD_INVALID_STATUS, VALID_ENTITY_PAYLOAD)
+
+        chunks = list(validate_stream(io.BytesIO(data), chunk_size=2))
+
+        assert [c.total for c in chunks] == [2, 1]
+        assert [r.line_number for r in chunks[0].invalid] == [3]
+        assert chunks[1].invalid == []
+
+    def test_iteration_is_lazy(self):
+        def lines():
+            yield json.dumps(VALID_JOB_PAYLOAD).encode()
+            raise AssertionError("input consumed ahead of the consumer")
+
+        first = next(validate_stream(lines(), chunk_size=1))
+
+        assert (first.total, first.invalid) == (1, [])
+
+    def test_run_writes_invalid_records_with_reasons(self):
+        data = _ndjson(VALID_JOB_PAYLOAD, ENTITY_PAYLOAD_UNKNOWN_SCHEMA_VERSION, "{broken")
+        invalid_out = io.StringIO()
+
+        summary = run(io.BytesIO(data), invalid_out)
+
+        assert (summary.total, summary.valid, summary.invalid) == (3, 1, 2)
+        records = [json.loads(line) for line in invalid_out.getvalue().splitlines()]
+        assert [r["line"] for r in records] == [2, 3]
+        assert "Unknown entity schema version: 2.0" in records[0]["error"]
+        assert records[1]["record"] == "{broken"
+        assert summary.records_per_second > 0
+
+    def test_process_pool_matches_in_process_results(self):
+        data = _ndjson(*([VALID_JOB_PAYLOAD, JOB_PAYLOAD_INVALID_STATUS, VALID_ENTITY_PAYLOAD] * 20))
+
+        serial = list(validate_stream(io.BytesIO(data), chunk_size=7))
+        pooled = list(validate_stream(io.BytesIO(data), workers=2, chunk_size=7))
+
+        assert pooled == serial
+        assert sum(c.total for c in pooled) == 60
+        assert sum(len(c.invalid) for c in pooled) == 20
+
+
+class TestCli:
+    """Test cases for the command-line entry point."""
+
+    def test_cli_exit_code_and_side_file(self, tmp_path, capsys):
+        source = tmp_path / "dump.ndjson"
+        source.write_bytes(_ndjson(VALID_JOB_PAYLOAD, JOB_PAYLOAD_INVALID_STATUS))
+        invalid = tmp_path / "invalid.ndjson"
+
+        exit_code = main([str(source), "--invalid-out", str(invalid)])
+
+        assert exit_code == 1
+        assert len(invalid.read_text().splitlines()) == 1
+        assert "Validated 2 records: 1 valid, 1 invalid" in capsys.readouterr().err
+
+    def test_cli_all_valid_returns_zero(self, tmp_path):
+        source = tmp_path / "dump.ndjson"
+        source.write_bytes(_ndjson(VALID_JOB_PAYLOAD, VALID_JOB_PAYLOAD))
+
+        assert main([str(source), "--contract", "job"]) == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
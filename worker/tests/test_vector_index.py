@@ -0,0 +1,290 @@
+"""Unit tests for the in-process chunk vector index and scoped retrieval."""
+
+import sys
+import os
+from unittest.mock import patch
+import numpy as np
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import RetrievalConfig
+from vector_index import ChunkRetriever, ExactIndex, HnswIndex, SearchHit, build_index, normalize_rows, top_k
+from vector_store import PgvectorChunkSearch
+
+
+DIMENSIONS = 32
+
+
+def _vectors(count, seed=3):
+    return np.random.default_rng(seed).standard_normal((count, DIMENSIONS)).astype(np.float32)
+
+
+class FakeCursor:
+    def __init__(self, log, rows):
+        self._log = log
+        self._rows = rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params):
+        self._log.append((sql, params))
+
+    def fetchall(self):
+        return self._rows
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.log = []
+        self._rows = rows
+
+    def __call__(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self):
+        return FakeCursor(self.log, self._rows)
+
+
+class TestTopKKernel:
+    """Test cases for the batched exact top-K kernel."""
+
+    @pytest.mark.parametrize("k", [1, 7, 200])
+    def test_matches_full_sort_for_every_query(self, k):
+        """
+        Given 120 unit vectors and a batch of 9 queries
+        When top_k is asked for k results
+        Then each row matches a full descending sort of that query's cosine scores
+        """
+        matrix = normalize_rows(_vectors(120), DIMENSIONS)
+        queries = normalize_rows(_vectors(9, seed=4), DIMENSIONS)
+
+        indices, scores = top_k(matrix, queries, k)
+
+        expected_k = min(k, 120)
+        assert indices.shape == scores.shape == (9, expected_k)
+        for row, query in enumerate(queries):
+            full = matrix @ query
+            assert list(indices[row]) == list(np.argsort(-full, kind="stable")[:expected_k])
+            assert np.allclose(scores[row], full[indices[row]], atol=1e-6)
+
+    def test_normalize_rows_is_contiguous_float32_and_keeps_zero_rows(self):
+        matrix = normalize_rows(np.array([[3.0, 4.0], [0.0, 0.0]]), 2)
+
+        assert matrix.dtype == np.float32 and matrix.flags["C_CONTIGUOUS"]
+        assert np.allclose(matrix, [[0.6, 0.8], [0.0, 0.0]])
+
+
+class TestExactIndex:
+    def test_returns_cosine_top_k_in_order(self):
+        vectors = _vectors(50)
+        index = ExactIndex(DIMENSIONS)
+        index.add([f"c{i}" for i in range(50)], vectors)
+
+        hits = index.search(vectors[7] * 3.0, k=5)
+
+        assert hits[0] == SearchHit("c7", pytest.approx(1.0, abs=1e-5))
+        assert [h.score for h in hits] == sorted((h.score for h in hits), reverse=True)
+        assert len(index.search(vectors[0], k=500)) == 50
+
+    def test_incremental_adds_match_one_batch(self):
+        vectors = _vectors(300)
+        grown = ExactIndex(DIMENSIONS, capacity=8)
+        for start in range(0, 300, 40):
+            grown.add(list(range(start, min(start + 40, 300))), vectors[start:start + 40])
+        batch = ExactIndex(DIMENSIONS)
+        batch.add(list(range(300)), vectors)
+
+        queries = _vectors(5, seed=8)
+
+        assert len(grown) == 300
+        assert grown.search_many(queries, 10) == batch.search_many(queries, 10)
+        single = grown.search(queries[2], 10)
+        assert [h.id for h in grown.search_many(queries, 10)[2]] == [h.id for h in single]
+
+    def test_rejects_wrong_dimensions(self):
+        index = ExactIndex(DIMENSIONS)
+
+        with pytest.raises(ValueError):
+            index.add(["a"], np.zeros((1, DIMENSIONS + 1)))
+        with pytest.raises(ValueError):
+            index.add(["a", "b"], np.zeros((1, DIMENSIONS)))
+
+    def test_empty_index_returns_nothing(self):
+        assert ExactIndex(DIMENSIONS).search(np.ones(DIMENSIONS), k=3) == []
+
+
+class TestQuantizedExactIndex:
+    """Test cases for float16/int8 storage with full-precision re-ranking."""
+
+    @pytest.mark.parametrize("precision", ["float16", "int8"])
+    def test_rerank_restores_exact_results(self, precision):
+        """
+        Given an index storing quantized rows and a full-precision source
+        When a batch of queries is searched
+        Then the results equal float32 exact search and the source is read once
+        """
+        vectors = _vectors(400)
+        fetches = []
+
+        def full_precision(ids):
+            fetches.append(list(ids))
+            return vectors[list(ids)]
+
+        exact = ExactIndex(DIMENSIONS)
+        exact.add(list(range(400)), vectors)
+        quantized = ExactIndex(DIMENSIONS, precision=precision, full_precision=full_precision, rerank_factor=4)
+        quantized.add(list(range(400)), vectors)
+        queries = _vectors(6, seed=12)
+
+        results = quantized.search_many(queries, 5)
+
+        expected = exact.search_many(queries, 5)
+        assert [[h.id for h in hits] for hits in results] == [[h.id for h in hits] for hits in expected]
+        for hits, expected_hits in zip(results, expected):
+            assert [h.score for h in hits] == pytest.approx([h.score for h in expected_hits], abs=1e-5)
+        assert len(fetches) == 1 and len(fetches[0]) <= 6 * 20
+
+    def test_without_full_precision_scores_are_approximate(self):
+        vectors = _vectors(100)
+        index = ExactIndex(DIMENSIONS, precision="int8")
+        index.add(list(range(100)), vectors)
+
+        (hit,) = index.search(vectors[42], 1)
+
+        assert hit.id == 42
+        assert hit.score == pytest.approx(1.0, abs=0.02)
+        assert index.matrix.dtype == np.int8
+        assert index.nbytes == 100 * (DIMENSIONS + 4)
+
+    def test_build_index_applies_configured_precision(self):
+        config = RetrievalConfig(index_precision="float16", rerank_factor=2)
+
+        index = build_index(list(range(10)), _vectors(10), DIMENSIONS, config)
+
+        assert index.precision == "float16"
+        assert index.nbytes == 10 * DIMENSIONS * 2
+
+
+class TestHnswIndex:
+    def test_matches_exact_search_on_small_sets(self):
+        """
+        Given 500 random vectors in both an HNSW and an exact index
+        When 20 queries are run
+        Then HNSW finds at least 95% of the exact top 10
+        """
+        vectors = _vectors(500)
+        ids = list(range(500))
+        exact = ExactIndex(DIMENSIONS)
+        exact.add(ids, vectors)
+        hnsw = HnswIndex(DIMENSIONS, capacity=100)
+        hnsw.add(ids[:250], vectors[:250])
+        hnsw.add(ids[250:], vectors[250:])
+
+        queries = _vectors(20, seed=9)
+        found = sum(
+            len({h.id for h in hnsw.search(q, 10)} & {h.id for h in exact.search(q, 10)}) for q in queries
+        )
+
+        assert len(hnsw) == 500
+        assert found / 200 >= 0.95
+        assert hnsw.search(vectors[3], 1)[0].score == pytest.approx(1.0, abs=1e-4)
+
+
+class TestBuildIndex:
+    def test_picks_index_by_size(self):
+        config = RetrievalConfig(hnsw_threshold=100)
+
+        assert isinstance(build_index(list(range(99)), _vectors(99), DIMENSIONS, config), ExactIndex)
+        assert isinstance(build_index(list(range(100)), _vectors(100), DIMENSIONS, config), HnswIndex)
+
+    def test_falls_back_to_exact_without_hnswlib(self):
+        with patch.dict(sys.modules, {"hnswlib": None}):
+            index = build_index(list(range(10)), _vectors(10), DIMENSIONS, RetrievalConfig(hnsw_threshold=1))
+
+        assert isinstance(index, ExactIndex)
+
+
+class TestChunkRetriever:
+    """Test cases for local vs pgvector routing."""
+
+    def test_scope_queries_stay_local_and_others_go_remote(self):
+        remote_calls = []
+
+        def remote(query, k, document_ids):
+            remote_calls.append((k, list(document_ids)))
+            return [SearchHit("remote", 0.5)]
+
+        vectors = _vectors(20)
+        index = build_index([f"c{i}" for i in range(20)], vectors, DIMENSIONS)
+        retriever = ChunkRetriever(["doc-1"], index, remote, RetrievalConfig(top_k=3))
+
+        local = retriever.search(vectors[0])
+        same_scope = retriever.search(vectors[0], document_ids=["doc-1"])
+        other = retriever.search(vectors[0], k=5, document_ids=["doc-1", "doc-2"])
+
+        assert [h.id for h in local][:1] == ["c0"] and len(local) == 3
+        assert same_scope == local
+        assert other == [SearchHit("remote", 0.5)]
+        assert remote_calls == [(5, ["doc-1", "doc-2"])]
+        assert (retriever.local_queries, retriever.remote_queries) == (2, 1)
+
+        batch = retriever.search_many(vectors[:4])
+        assert [hits[0].id for hits in batch] == ["c0", "c1", "c2", "c3"]
+        assert retriever.local_queries == 6
+
+    def test_out_of_scope_without_remote_raises(self):
+        retriever = ChunkRetriever(["doc-1"], ExactIndex(DIMENSIONS))
+
+        with pytest.raises(LookupError):
+            retriever.search(np.ones(DIMENSIONS), document_ids=["doc-2"])
+
+
+class TestPgvectorChunkSearch:
+    def test_cosine_query_is_scoped_to_documents(self):
+        conn = FakeConnection([("chunk-1", 0.9)])
+
+        hits = PgvectorChunkSearch(conn).search([1.0, 0.5], 10, ["7c9e6679-7425-40de-944b-e07fc1f90ae7"])
+
+        sql, params = conn.log[0]
+        assert '"Embedding" <=> %(query)s::vector' in sql
+        assert '"DocumentId" = ANY(%(documents)s)' in sql
+        assert params["query"] == "[1,0.5]" and params["k"] == 10
+        assert hits == [SearchHit("chunk-1", 0.9)]
+
+    def test_halfvec_column_casts_query(self):
+        conn = FakeConnection([])
+
+        PgvectorChunkSearch(conn, column_type="halfvec").search([1.0], 5)
+
+        assert conn.log[0][0].count("::halfvec") == 2
+
+    def test_fetch_vectors_keeps_requested_order(self):
+        first, second = "7c9e6679-7425-40de-944b-e07fc1f90ae7", "16fd2706-8baf-433b-82eb-8c7fada847da"
+        conn = FakeConnection([(second, "[3,4]"), (first, "[1,2]")])
+
+        vectors = PgvectorChunkSearch(conn).fetch_vectors([first, second])
+
+        assert [list(v) for v in vectors] == [[1.0, 2.0], [3.0, 4.0]]
+        with pytest.raises(LookupError):
+            PgvectorChunkSearch(FakeConnection([])).fetch_vectors([first])
+
+    def test_unscoped_query_searches_all_chunks(self):
+        conn = FakeConnection([])
+
+        PgvectorChunkSearch(conn).search([1.0], 5)
+
+        assert "DocumentId" not in conn.log[0][0]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,214 @@
+"""Stream-validate NDJSON dumps of job and entity payloads.
+
+Reads one JSON payload per line from a file or stdin, validates each line against
+its contract (job or entity, detected per line unless --contract is given) and
+writes invalid records with their reasons to a side file. Input is processed in
+fixed-size chunks with a bounded number of chunks in flight, so memory use does
+not depend on input size.
+
+Usage:
+    python worker/validate_ndjson.py traffic.ndjson --invalid-out invalid.ndjson
+    cat dlq.ndjson | python worker/validate_ndjson.py - --contract job --workers 4
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple
+
+from main import JOB_CONTRACT, ENTITY_CONTRACT, validate_entity_payload, validate_job_payload
+
+
+AUTO_CONTRACT = "auto"
+_VALIDATORS = {
+    JOB_CONTRACT: validate_job_payload,
+    ENTITY_CONTRACT: validate_entity_payload,
+}
+
+Chunk = List[Tuple[int, bytes]]
+
+
+@dataclass(frozen=True)
+class LineResult:
+    line_number: int
+    contract: Optional[str]
+    error: Optional[str]
+    raw: bytes
+
+
+@dataclass(frozen=True)
+class ChunkResult:
+    total: int
+    invalid: List[LineResult]
+
+
+@dataclass(frozen=True)
+class ValidationSummary:
+    total: int
+    valid: int
+    invalid: int
+    elapsed_seconds: float
+
+    @property
+    def records_per_second(self) -> float:
+        return self.total / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+
+def detect_contract(record: dict) -> Optional[str]:
+    if "extracted_entities" in record:
+        return ENTITY_CONTRACT
+    if "job_id" in record or "status" in record:
+        return JOB_CONTRACT
+    return None
+
+
+def validate_line(raw: bytes, contract: str = AUTO_CONTRACT) -> Tuple[Optional[str], Optional[str]]:
+    """Return (contract, error) for one NDJSON line; error is None when valid."""
+    try:
+        record = json.loads(raw)
+    except ValueError as e:
+        return None, f"Invalid JSON: {e}"
+
+    if not isinstance(record, dict):
+        return None, "Record is not a JSON object"
+
+    resolved = detect_contract(record) if contract == AUTO_CONTRACT else contract
+    if resolved is None:
+        return None, "Unable to detect contract (expected a job or entity payload)"
+
+    try:
+        _VALIDATORS[resolved](record)
+    except ValueError as e:
+        return resolved, str(e)
+    return resolved, None
+
+
+def _validate_chunk(chunk: Chunk, contract: str) -> ChunkResult:
+    invalid = []
+    for line_number, raw in chunk:
+        resolved, error = validate_line(raw, contract)
+        if error is not None:
+            invalid.append(LineResult(line_number, resolved, error, raw))
+    return ChunkResult(total=len(chunk), invalid=invalid)
+
+
+def _chunks(stream: Iterable[bytes], chunk_size: int) -> Iterator[Chunk]:
+    chunk: Chunk = []
+    for line_number, raw in enumerate(stream, start=1):
+        raw = raw.strip()
+        if not raw:
+            continue
+        chunk.append((line_number, raw))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def validate_stream(
+    stream: Iterable[bytes],
+    contract: str = AUTO_CONTRACT,
+    workers: int = 0,
+    chunk_size: int = 1000,
+) -> Iterator[ChunkResult]:
+    """Yield a ChunkResult per `chunk_size` non-blank lines, in input order.
+
+    Only invalid lines are materialized as LineResult records. With workers > 0,
+    chunks are validated in a process pool with at most `2 * workers` chunks in
+    flight at any time.
+    """
+    chunks = _chunks(stream, chunk_size)
+
+    if workers <= 0:
+        for chunk in chunks:
+            yield _validate_chunk(chunk, contract)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(pool.submit(_validate_chunk, chunk, contract))
+            if len(in_flight) >= workers * 2:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def _invalid_record(result: LineResult) -> str:
+    return json.dumps(
+        {
+            "line": result.line_number,
+            "contract": result.contract,
+            "error": result.error,
+            "record": result.raw.decode("utf-8", errors="replace"),
+        }
+    )
+
+
+def run(
+    stream: BinaryIO,
+    invalid_out=None,
+    contract: str = AUTO_CONTRACT,
+    workers: int = 0,
+    chunk_size: int = 1000,
+) -> ValidationSummary:
+    started = time.perf_counter()
+    total = invalid = 0
+
+    for chunk_result in validate_stream(stream, contract, workers, chunk_size):
+        total += chunk_result.total
+        invalid += len(chunk_result.invalid)
+        if invalid_out is not None:
+            for result in chunk_result.invalid:
+                invalid_out.write(_invalid_record(result) + "\n")
+
+    return ValidationSummary(
+        total=total,
+        valid=total - invalid,
+        invalid=invalid,
+        elapsed_seconds=time.perf_counter() - started,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Validate NDJSON job/entity payload dumps.")
+    parser.add_argument("input", nargs="?", default="-", help="NDJSON file path, or '-' for stdin (default)")
+    parser.add_argument("--invalid-out", help="Write invalid records with reasons to this NDJSON file")
+    parser.add_argument(
+        "--contract",
+        choices=[AUTO_CONTRACT, JOB_CONTRACT, ENTITY_CONTRACT],
+        default=AUTO_CONTRACT,
+        help="Contract to validate against (default: detect per line)",
+    )
+    parser.add_argument("--workers", type=int, default=0, help="Process pool size (default: 0, in-process)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Lines per work unit")
+    args = parser.parse_args(argv)
+
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+
+    stream = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    invalid_out = open(args.invalid_out, "w", encoding="utf-8") if args.invalid_out else None
+    try:
+        summary = run(stream, invalid_out, args.contract, args.workers, args.chunk_size)
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+        if invalid_out is not None:
+            invalid_out.close()
+
+    print(
+        f"Validated {summary.total} records: {summary.valid} valid, {summary.invalid} invalid "
+        f"in {summary.elapsed_seconds:.2f}s ({summary.records_per_second:.0f} records/s)",
+        file=sys.stderr,
+    )
+    return 1 if summary.invalid else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,318 @@
+"""In-process vector search over a patient's or document set's chunk embeddings.
+
+Extraction only needs to search the few hundred chunks the worker just
+produced, so a round-trip to pgvector per query is wasted latency. Small sets
+use `ExactIndex`, exact cosine top-K with the `top_k` kernel (one matrix
+product for a whole batch of queries, then `argpartition`). Sets of
+`hnsw_threshold` vectors or more use `HnswIndex` (hnswlib, approximate), when
+hnswlib is installed. `ChunkRetriever` answers queries inside its scope from
+the local index and sends anything outside it (other documents of the patient,
+cross-document search) to pgvector.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, List, Optional, Protocol, Sequence
+
+from config import RetrievalConfig
+from quantization import FLOAT32, INT8, bytes_per_vector, check_precision, quantize_rows, score_rows, storage_dtype
+
+
+logger = logging.getLogger(__name__)
+
+
+def _numpy():
+    try:
+        import numpy
+    except ModuleNotFoundError as e:
+        raise ModuleNotFoundError(
+            "Missing dependency 'numpy'. Install worker requirements with: pip install -r worker/requirements.txt"
+        ) from e
+    return numpy
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    id: Hashable
+    score: float
+
+
+# Returns full-precision vectors for the given ids, in the same order.
+FullPrecisionFetch = Callable[[Sequence[Hashable]], Any]
+
+
+class VectorIndex(Protocol):
+    def add(self, ids: Sequence[Hashable], vectors: Any) -> None:
+        ...
+
+    def search(self, query: Sequence[float], k: int) -> List[SearchHit]:
+        ...
+
+    def search_many(self, queries: Any, k: int) -> List[List[SearchHit]]:
+        ...
+
+    def __len__(self) -> int:
+        ...
+
+
+class ExactIndex:
+    """Exact cosine top-K over a contiguous matrix of unit vectors.
+
+    Rows live in one preallocated buffer that doubles when full, so adding a
+    document's chunks does not copy the whole matrix each time. With a
+    `precision` of float16 or int8 the rows are stored quantized (see
+    quantization.py). Searches then take the best `k * rerank_factor`
+    candidates by quantized score and, when `full_precision` is given, re-rank
+    them with the full-precision vectors it returns for their ids.
+    """
+
+    def __init__(
+        self,
+        dimensions: int,
+        capacity: int = 256,
+        precision: str = FLOAT32,
+        full_precision: Optional[FullPrecisionFetch] = None,
+        rerank_factor: int = 4,
+    ):
+        self._dimensions = dimensions
+        self._precision = check_precision(precision)
+        self._full_precision = full_precision
+        self._rerank_factor = max(rerank_factor, 1)
+        self._ids: List[Hashable] = []
+        self._buffer, self._scales = self._allocate(max(capacity, 1))
+
+    @property
+    def precision(self) -> str:
+        return self._precision
+
+    @property
+    def matrix(self):
+        """The stored (possibly quantized) rows, in insertion order (a view, not a copy)."""
+        return self._buffer[: len(self._ids)]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the stored rows (and int8 scales), excluding spare capacity."""
+        return bytes_per_vector(self._dimensions, self._precision) * len(self._ids)
+
+    def add(self, ids: Sequence[Hashable], vectors: Any) -> None:
+        matrix = normalize_rows(vectors, self._dimensions)
+        if len(ids) != len(matrix):
+            raise ValueError(f"Got {len(ids)} ids for {len(matrix)} vectors")
+        size, needed = len(self._ids), len(self._ids) + len(ids)
+        if needed > len(self._buffer):
+            buffer, scales = self._allocate(max(needed, 2 * len(self._buffer)))
+            buffer[:size] = self._buffer[:size]
+            if scales is not None:
+                scales[:size] = self._scales[:size]
+            self._buffer, self._scales = buffer, scales
+        data, scales = quantize_rows(matrix, self._precision)
+        self._buffer[size:needed] = data
+        if scales is not None:
+            self._scales[size:needed] = scales
+        self._ids.extend(ids)
+
+    def search(self, query: Sequence[float], k: int) -> List[SearchHit]:
+        return self.search_many([query], k)[0]
+
+    def search_many(self, queries: Any, k: int) -> List[List[SearchHit]]:
+        if not self._ids or k <= 0:
+            return [[] for _ in range(len(queries))]
+        unit_queries = normalize_rows(queries, self._dimensions)
+        size = len(self._ids)
+        scales = self._scales[:size] if self._scales is not None else None
+        scores = score_rows(unit_queries, self._buffer[:size], scales)
+        if self._precision == FLOAT32:
+            indices, scores = select_top_k(scores, k)
+        else:
+            indices, scores = select_top_k(scores, k * self._rerank_factor)
+            if self._full_precision is not None:
+                indices, scores = self._rerank(unit_queries, indices)
+            indices, scores = indices[:, :k], scores[:, :k]
+        ids = self._ids
+        return [
+            [SearchHit(ids[i], score) for i, score in zip(row.tolist(), row_scores.tolist())]
+            for row, row_scores in zip(indices, scores)
+        ]
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _allocate(self, rows: int):
+        np = _numpy()
+        buffer = np.empty((rows, self._dimensions), dtype=storage_dtype(self._precision))
+        scales = np.empty(rows, dtype=np.float32) if self._precision == INT8 else None
+        return buffer, scales
+
+    def _rerank(self, unit_queries, candidates):
+        """Rescore each query's candidates with full-precision vectors, fetched once for the whole batch."""
+        np = _numpy()
+        rows = np.unique(candidates)
+        full = normalize_rows(self._full_precision([self._ids[i] for i in rows.tolist()]), self._dimensions)
+        positions = np.searchsorted(rows, candidates)
+        exact = np.einsum("qcd,qd->qc", full[positions], unit_queries)
+        order = np.argsort(-exact, axis=1, kind="stable")
+        return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(exact, order, axis=1)
+
+
+class HnswIndex:
+    """Approximate cosine top-K with hnswlib, the in-process counterpart of ix_document_chunks_embedding_hnsw."""
+
+    def __init__(self, dimensions: int, config: RetrievalConfig = RetrievalConfig(), capacity: int = 1024):
+        try:
+            import hnswlib
+        except ModuleNotFoundError as e:
+            raise ModuleNotFoundError(
+                "Missing dependency 'hnswlib'. Install worker requirements with: pip install -r worker/requirements.txt"
+            ) from e
+
+        self._dimensions = dimensions
+        self._ef_search = config.hnsw_ef_search
+        self._ids: List[Hashable] = []
+        self._index = hnswlib.Index(space="cosine", dim=dimensions)
+        self._index.init_index(max_elements=capacity, ef_construction=config.hnsw_ef_construction, M=config.hnsw_m)
+        self._index.set_num_threads(1)
+
+    def add(self, ids: Sequence[Hashable], vectors: Any) -> None:
+        np = _numpy()
+        matrix = normalize_rows(vectors, self._dimensions)
+        if len(ids) != len(matrix):
+            raise ValueError(f"Got {len(ids)} ids for {len(matrix)} vectors")
+        needed = len(self._ids) + len(ids)
+        if needed > self._index.get_max_elements():
+            self._index.resize_index(max(needed, 2 * self._index.get_max_elements()))
+        self._index.add_items(matrix, np.arange(len(self._ids), needed))
+        self._ids.extend(ids)
+
+    def search(self, query: Sequence[float], k: int) -> List[SearchHit]:
+        return self.search_many([query], k)[0]
+
+    def search_many(self, queries: Any, k: int) -> List[List[SearchHit]]:
+        if not self._ids or k <= 0:
+            return [[] for _ in range(len(queries))]
+        k = min(k, len(self._ids))
+        self._index.set_ef(max(self._ef_search, k))
+        labels, distances = self._index.knn_query(normalize_rows(queries, self._dimensions), k=k)
+        ids = self._ids
+        return [
+            [SearchHit(ids[label], 1.0 - distance) for label, distance in zip(row.tolist(), row_distances.tolist())]
+            for row, row_distances in zip(labels, distances)
+        ]
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+def build_index(
+    ids: Sequence[Hashable],
+    vectors: Any,
+    dimensions: int,
+    config: RetrievalConfig = RetrievalConfig(),
+    full_precision: Optional[FullPrecisionFetch] = None,
+) -> VectorIndex:
+    """Exact index below `hnsw_threshold` vectors, HNSW at or above it (exact if hnswlib is missing).
+
+    `config.index_precision` applies to the exact index; hnswlib always stores float32.
+    """
+    def exact() -> ExactIndex:
+        return ExactIndex(
+            dimensions, max(len(ids), 1), config.index_precision, full_precision, config.rerank_factor
+        )
+
+    index: VectorIndex
+    if len(ids) >= config.hnsw_threshold:
+        try:
+            index = HnswIndex(dimensions, config, capacity=len(ids))
+        except ModuleNotFoundError as e:
+            logger.warning("Falling back to exact search over %d vectors: %s", len(ids), e)
+            index = exact()
+    else:
+        index = exact()
+    if len(ids):
+        index.add(ids, vectors)
+    return index
+
+
+def normalize_rows(vectors: Any, dimensions: int):
+    """Copy `vectors` into a C-contiguous float32 matrix of unit rows (zero rows stay zero)."""
+    np = _numpy()
+    matrix = np.array(vectors, dtype=np.float32, order="C", ndmin=2)
+    if matrix.ndim != 2 or matrix.shape[1] != dimensions:
+        raise ValueError(f"Expected vectors of {dimensions} dimensions, got shape {matrix.shape}")
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
+
+def top_k(matrix: Any, queries: Any, k: int):
+    """Top-`k` rows of `matrix` by dot product for every row of `queries`.
+
+    Both arguments should already be unit rows from `normalize_rows`, which
+    makes the dot product the cosine similarity. All queries are scored with one
+    matrix product; `argpartition` then selects each query's `k` best in linear
+    time and only those `k` are sorted. Returns `(indices, scores)`, both of
+    shape `(len(queries), min(k, len(matrix)))`, best first.
+    """
+    return select_top_k(queries @ matrix.T, k)
+
+
+def select_top_k(scores: Any, k: int):
+    """`top_k` on an already computed `(queries, rows)` score matrix."""
+    np = _numpy()
+    k = min(k, scores.shape[1])
+    if k < scores.shape[1]:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(k), (len(scores), k))
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(candidate_scores, order, axis=1)
+
+
+RemoteSearch = Callable[[Sequence[float], int, Optional[Sequence[str]]], List[SearchHit]]
+
+
+class ChunkRetriever:
+    """Top-K chunk search scoped to a set of documents, with a remote fallback.
+
+    `remote` is called for queries outside the local scope, e.g.
+    `vector_store.PgvectorChunkSearch(connect).search`.
+    """
+
+    def __init__(
+        self,
+        document_ids: Sequence[str],
+        index: VectorIndex,
+        remote: Optional[RemoteSearch] = None,
+        config: RetrievalConfig = RetrievalConfig(),
+    ):
+        self._scope = frozenset(str(d) for d in document_ids)
+        self._index = index
+        self._remote = remote
+        self._top_k = config.top_k
+        self.local_queries = 0
+        self.remote_queries = 0
+
+    def search(
+        self, query: Sequence[float], k: Optional[int] = None, document_ids: Optional[Sequence[str]] = None
+    ) -> List[SearchHit]:
+        """Search `document_ids` (default: the local scope); any other document set goes to `remote`."""
+        k = k or self._top_k
+        if document_ids is None or frozenset(str(d) for d in document_ids) == self._scope:
+            self.local_queries += 1
+            return self._index.search(query, k)
+        if self._remote is None:
+            raise LookupError("Query is outside the local index scope and no remote search is configured")
+        self.remote_queries += 1
+        return self._remote(query, k, document_ids)
+
+    def search_many(
+        self, queries: Any, k: Optional[int] = None, document_ids: Optional[Sequence[str]] = None
+    ) -> List[List[SearchHit]]:
+        """`search` for a batch of queries; local batches are scored in one pass."""
+        k = k or self._top_k
+        if document_ids is None or frozenset(str(d) for d in document_ids) == self._scope:
+            self.local_queries += len(queries)
+            return self._index.search_many(queries, k)
+        return [self.search(query, k, document_ids) for query in queries]
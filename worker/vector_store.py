@@ -0,0 +1,370 @@
+"""pgvector access for `document_chunks` (see Server/ClinicalIntelligence.Api/add_vector_tables.sql).
+
+`PgvectorChunkWriter` persists a document's chunks and embeddings in one
+transaction. Rows are streamed with a binary `COPY` (vectors in pgvector's
+binary format), or written as multi-row INSERTs where COPY is unavailable.
+
+`column_type` selects the `"Embedding"` column's pgvector type: `vector`
+(float4, the schema default) or `halfvec` (float2, half the storage and index
+size). It must match the column the Server migrations created.
+"""
+
+import asyncio
+import logging
+import struct
+import sys
+import threading
+import time
+import uuid
+from array import array
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from chunker import Chunk
+from metrics import HistogramSnapshot, LatencyHistogram
+from pipeline import JobContext, Stage
+from vector_index import SearchHit
+
+
+logger = logging.getLogger(__name__)
+
+
+_FETCH_EMBEDDINGS_SQL = (
+    'SELECT DISTINCT ON ("ChunkHash") "ChunkHash", "Embedding"::text '
+    'FROM document_chunks WHERE "ChunkHash" = ANY(%s) AND "Embedding" IS NOT NULL'
+)
+
+
+def parse_vector(text: str) -> array:
+    """Parse pgvector's text form (`[0.1,0.2,...]`) into a float32 array."""
+    body = text.strip()[1:-1]
+    return array("f", map(float, body.split(","))) if body else array("f")
+
+
+class PgvectorEmbeddingStore:
+    """Looks up embeddings already stored for identical chunk text.
+
+    `connect` returns a context-managed DB-API connection (a psycopg connection
+    or a pool checkout).
+    """
+
+    def __init__(self, connect: Callable[[], Any]):
+        self._connect = connect
+
+    def fetch_embeddings(self, chunk_hashes: Sequence[str]) -> Dict[str, array]:
+        if not chunk_hashes:
+            return {}
+        with self._connect() as conn:
+            with conn.cursor() as cur:
+                cur.execute(_FETCH_EMBEDDINGS_SQL, (list(chunk_hashes),))
+                return {chunk_hash: parse_vector(vector) for chunk_hash, vector in cur.fetchall()}
+
+
+_SEARCH_CHUNKS_SQL = (
+    'SELECT "Id", 1 - ("Embedding" <=> %(query)s::{column_type}) FROM document_chunks '
+    'WHERE "Embedding" IS NOT NULL {scope}ORDER BY "Embedding" <=> %(query)s::{column_type} LIMIT %(k)s'
+)
+
+_FETCH_CHUNK_VECTORS_SQL = 'SELECT "Id", "Embedding"::text FROM document_chunks WHERE "Id" = ANY(%s)'
+
+VECTOR_COLUMN_TYPES = ("vector", "halfvec")
+
+
+def _check_column_type(column_type: str) -> str:
+    if column_type not in VECTOR_COLUMN_TYPES:
+        raise ValueError(f"Unknown vector column type '{column_type}'")
+    return column_type
+
+
+class PgvectorChunkSearch:
+    """Cosine top-K over `document_chunks` in Postgres; the cross-document fallback for `ChunkRetriever`."""
+
+    def __init__(self, connect: Callable[[], Any], column_type: str = "vector"):
+        self._connect = connect
+        self._column_type = _check_column_type(column_type)
+
+    def search(self, query: Sequence[float], k: int, document_ids: Optional[Sequence[str]] = None) -> List[SearchHit]:
+        params: Dict[str, Any] = {"query": format_vector(query), "k": k}
+        scope = ""
+        if document_ids is not None:
+            scope = 'AND "DocumentId" = ANY(%(documents)s) '
+            params["documents"] = [uuid.UUID(str(d)) for d in document_ids]
+        with self._connect() as conn:
+            with conn.cursor() as cur:
+                cur.execute(_SEARCH_CHUNKS_SQL.format(scope=scope, column_type=self._column_type), params)
+                return [SearchHit(chunk_id, float(score)) for chunk_id, score in cur.fetchall()]
+
+    def fetch_vectors(self, chunk_ids: Sequence[Any]) -> List[array]:
+        """Stored embeddings for `chunk_ids`, in order; the re-ranking source for a quantized `ExactIndex`."""
+        with self._connect() as conn:
+            with conn.cursor() as cur:
+                cur.execute(_FETCH_CHUNK_VECTORS_SQL, ([uuid.UUID(str(c)) for c in chunk_ids],))
+                found = {str(chunk_id): vector for chunk_id, vector in cur.fetchall()}
+        missing = [str(c) for c in chunk_ids if found.get(str(c)) is None]
+        if missing:
+            raise LookupError(f"No stored embedding for chunk(s) {', '.join(missing[:5])}")
+        return [parse_vector(found[str(c)]) for c in chunk_ids]
+
+
+CHUNK_COLUMNS = (
+    '"Id"', '"DocumentId"', '"Page"', '"Section"', '"Coordinates"',
+    '"TextContent"', '"Embedding"', '"TokenCount"', '"ChunkHash"',
+)
+
+_COPY_CHUNKS_SQL = f"COPY document_chunks ({', '.join(CHUNK_COLUMNS)}) FROM STDIN (FORMAT BINARY)"
+_INSERT_CHUNKS_SQL = f"INSERT INTO document_chunks ({', '.join(CHUNK_COLUMNS)}) VALUES "
+_INSERT_ROW_SQL = "(%s, %s, %s, %s, %s, %s, %s::{column_type}, %s, %s)"
+# FOR KEY SHARE blocks a concurrent delete of the document until we commit.
+_LOCK_DOCUMENT_SQL = 'SELECT 1 FROM documents WHERE "Id" = %s FOR KEY SHARE'
+# Replaces rows from an earlier attempt; ON DELETE CASCADE removes their entity_citations.
+_DELETE_CHUNKS_SQL = 'DELETE FROM document_chunks WHERE "DocumentId" = %s'
+
+_COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+_COPY_TRAILER = struct.pack("!h", -1)
+_NULL_FIELD = struct.pack("!i", -1)
+_SECTION_MAX = 100
+_COORDINATES_MAX = 100
+
+_CHUNK_ID_NAMESPACE = uuid.UUID("6f1c1a52-5a43-4d8e-9f5e-2b8f3f0c8d11")
+
+
+class DocumentNotFoundError(LookupError):
+    """The document row is gone (deleted while the job was running)."""
+
+
+def chunk_id(document_id: str, index: int) -> uuid.UUID:
+    """Deterministic chunk Id, so a retried job produces the same rows and citations."""
+    return uuid.uuid5(_CHUNK_ID_NAMESPACE, f"{document_id}:{index}")
+
+
+def encode_vector_binary(vector: Sequence[float], column_type: str = "vector") -> bytes:
+    """pgvector binary wire format: int16 dimensions, int16 unused, big-endian float4 (float2 for halfvec) values."""
+    if column_type == "halfvec":
+        return struct.pack(f"!hh{len(vector)}e", len(vector), 0, *vector)
+    values = vector if isinstance(vector, array) and vector.typecode == "f" else array("f", vector)
+    if sys.byteorder == "little":
+        values = array("f", values)
+        values.byteswap()
+    return struct.pack("!hh", len(values), 0) + values.tobytes()
+
+
+def format_vector(vector: Sequence[float]) -> str:
+    return "[" + ",".join(format(v, ".9g") for v in vector) + "]"
+
+
+@dataclass(frozen=True)
+class ChunkRow:
+    id: uuid.UUID
+    document_id: uuid.UUID
+    page: Optional[int]
+    section: Optional[str]
+    coordinates: Optional[str]
+    text: str
+    embedding: Optional[Sequence[float]]
+    token_count: Optional[int]
+    chunk_hash: Optional[str]
+
+
+def _clean_text(value: Optional[str], limit: Optional[int] = None) -> Optional[str]:
+    if value is None:
+        return None
+    # PostgreSQL text cannot hold NUL, which PDF extraction occasionally yields.
+    value = value.replace("\x00", "")
+    return value[:limit] if limit is not None else value
+
+
+def build_chunk_rows(
+    document_id: str, chunks: Sequence[Chunk], embeddings: Optional[Sequence[Sequence[float]]] = None
+) -> List[ChunkRow]:
+    if embeddings is not None and len(embeddings) != len(chunks):
+        raise ValueError(f"Got {len(embeddings)} embeddings for {len(chunks)} chunks")
+    document_uuid = uuid.UUID(str(document_id))
+    return [
+        ChunkRow(
+            id=chunk_id(str(document_uuid), chunk.index),
+            document_id=document_uuid,
+            page=chunk.page,
+            section=_clean_text(chunk.section, _SECTION_MAX),
+            coordinates=_clean_text(chunk.coordinates, _COORDINATES_MAX),
+            text=_clean_text(chunk.text),
+            embedding=embeddings[i] if embeddings is not None else None,
+            token_count=chunk.token_count,
+            chunk_hash=chunk.chunk_hash,
+        )
+        for i, chunk in enumerate(chunks)
+    ]
+
+
+def _field(data: Optional[bytes]) -> bytes:
+    return _NULL_FIELD if data is None else struct.pack("!i", len(data)) + data
+
+
+def _text(value: Optional[str]) -> Optional[bytes]:
+    return None if value is None else value.encode("utf-8")
+
+
+def _int4(value: Optional[int]) -> Optional[bytes]:
+    return None if value is None else struct.pack("!i", value)
+
+
+def encode_copy_rows(rows: Sequence[ChunkRow], column_type: str = "vector") -> bytes:
+    """The complete binary COPY payload (header, tuples, trailer) for `CHUNK_COLUMNS`."""
+    parts = [_COPY_HEADER]
+    field_count = struct.pack("!h", len(CHUNK_COLUMNS))
+    for row in rows:
+        parts.append(field_count)
+        parts.append(_field(row.id.bytes))
+        parts.append(_field(row.document_id.bytes))
+        parts.append(_field(_int4(row.page)))
+        parts.append(_field(_text(row.section)))
+        parts.append(_field(_text(row.coordinates)))
+        parts.append(_field(_text(row.text)))
+        parts.append(_field(encode_vector_binary(row.embedding, column_type) if row.embedding is not None else None))
+        parts.append(_field(_int4(row.token_count)))
+        parts.append(_field(_text(row.chunk_hash)))
+    parts.append(_COPY_TRAILER)
+    return b"".join(parts)
+
+
+def insert_statements(rows: Sequence[ChunkRow], batch_size: int, column_type: str = "vector"):
+    """Yield (sql, params) multi-row INSERTs of at most `batch_size` rows each."""
+    row_sql = _INSERT_ROW_SQL.format(column_type=column_type)
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        params: List[Any] = []
+        for row in batch:
+            params.extend((
+                row.id, row.document_id, row.page, row.section, row.coordinates, row.text,
+                format_vector(row.embedding) if row.embedding is not None else None,
+                row.token_count, row.chunk_hash,
+            ))
+        yield _INSERT_CHUNKS_SQL + ", ".join([row_sql] * len(batch)), params
+
+
+@dataclass(frozen=True)
+class ChunkWriterStats:
+    documents: int
+    rows: int
+    copy_documents: int
+    insert_documents: int
+    copy_fallbacks: int
+    latency: HistogramSnapshot
+
+    @property
+    def mean_rows_per_second(self) -> float:
+        return self.rows / self.latency.sum if self.latency.sum else 0.0
+
+
+class PgvectorChunkWriter:
+    """Writes a document's chunk rows in one transaction.
+
+    `connect` returns a context-managed psycopg connection (e.g. `pool.connection`
+    from `db.create_pool`). `method` is `copy` (binary COPY, falling back to
+    INSERT if the server or proxy rejects COPY) or `insert`.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        method: str = "copy",
+        insert_batch_size: int = 200,
+        column_type: str = "vector",
+    ):
+        if method not in ("copy", "insert"):
+            raise ValueError(f"Unknown chunk write method '{method}'")
+        self._connect = connect
+        self._column_type = _check_column_type(column_type)
+        self._method = method
+        self._insert_batch_size = insert_batch_size
+        self._lock = threading.Lock()
+        self._documents = 0
+        self._rows = 0
+        self._copy_documents = 0
+        self._insert_documents = 0
+        self._copy_fallbacks = 0
+        self._latency = LatencyHistogram()
+
+    def write_document(
+        self, document_id: str, chunks: Sequence[Chunk], embeddings: Optional[Sequence[Sequence[float]]] = None
+    ) -> List[uuid.UUID]:
+        """Replace the document's chunk rows; returns the chunk Ids in chunk order."""
+        rows = build_chunk_rows(document_id, chunks, embeddings)
+        document_uuid = uuid.UUID(str(document_id))
+        started = time.perf_counter()
+        method = self._method
+        if method == "copy":
+            try:
+                self._write(document_uuid, rows, self._copy)
+            except Exception as e:
+                if not _is_copy_unsupported(e):
+                    raise
+                logger.warning("Binary COPY unavailable, falling back to multi-row INSERT: %s", e)
+                self._method = method = "insert"
+                with self._lock:
+                    self._copy_fallbacks += 1
+        if method == "insert":
+            self._write(document_uuid, rows, self._insert)
+
+        self._latency.observe(time.perf_counter() - started)
+        with self._lock:
+            self._documents += 1
+            self._rows += len(rows)
+            if method == "copy":
+                self._copy_documents += 1
+            else:
+                self._insert_documents += 1
+        return [row.id for row in rows]
+
+    def stats(self) -> ChunkWriterStats:
+        with self._lock:
+            return ChunkWriterStats(
+                documents=self._documents,
+                rows=self._rows,
+                copy_documents=self._copy_documents,
+                insert_documents=self._insert_documents,
+                copy_fallbacks=self._copy_fallbacks,
+                latency=self._latency.snapshot(),
+            )
+
+    def _write(
+        self, document_id: uuid.UUID, rows: Sequence[ChunkRow], write_rows: Callable[[Any, Sequence[ChunkRow]], None]
+    ) -> None:
+        with self._connect() as conn:
+            with conn.transaction():
+                with conn.cursor() as cur:
+                    cur.execute(_LOCK_DOCUMENT_SQL, (document_id,))
+                    if cur.fetchone() is None:
+                        raise DocumentNotFoundError(f"Document {document_id} no longer exists")
+                    cur.execute(_DELETE_CHUNKS_SQL, (document_id,))
+                    if rows:
+                        write_rows(cur, rows)
+
+    def _copy(self, cur, rows: Sequence[ChunkRow]) -> None:
+        with cur.copy(_COPY_CHUNKS_SQL) as copy:
+            copy.write(encode_copy_rows(rows, self._column_type))
+
+    def _insert(self, cur, rows: Sequence[ChunkRow]) -> None:
+        for sql, params in insert_statements(rows, self._insert_batch_size, self._column_type):
+            cur.execute(sql, params)
+
+
+def _is_copy_unsupported(error: Exception) -> bool:
+    try:
+        import psycopg
+    except ModuleNotFoundError:
+        return False
+    return isinstance(error, psycopg.NotSupportedError)
+
+
+def persist_chunks_stage(writer: PgvectorChunkWriter, concurrency: int = 1) -> Stage:
+    """Pipeline `persist_chunks` stage: writes chunks and embeddings, sets `artifacts['chunk_ids']`."""
+
+    async def run(context: JobContext) -> None:
+        context.artifacts["chunk_ids"] = await asyncio.to_thread(
+            writer.write_document,
+            context.document_id,
+            context.artifacts["chunks"],
+            context.artifacts.get("embeddings"),
+        )
+
+    return Stage("persist_chunks", run, concurrency=concurrency, outputs=("chunk_ids",))